@@ -1,6 +1,9 @@
 const express = require('express');
 const mysql = require('mysql2');
 const cors = require('cors');
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
 require('dotenv').config();
 
 const app = express();
@@ -36,6 +39,77 @@ const handleDatabaseError = (err, res) => {
     });
 };
 
+// Menu responses precomputed by sql-scripts-scrapers/menu_payloads.py, kept in memory as gzipped JSON
+const MENU_PAYLOAD_DIR = process.env.MENU_PAYLOAD_DIR || path.join(__dirname, 'sql-scripts-scrapers', 'menu_api');
+const MENU_PAYLOAD_MANIFEST = path.join(MENU_PAYLOAD_DIR, 'manifest.json');
+let menuPayloads = { halls: [], files: new Map() };
+
+// (Re)load the manifest, reading only the payloads whose ETag changed since the last load
+const loadMenuPayloads = () => {
+    let manifest;
+    try {
+        manifest = JSON.parse(fs.readFileSync(MENU_PAYLOAD_MANIFEST, 'utf8'));
+    } catch (err) {
+        if (err.code !== 'ENOENT') {
+            console.error('Error reading menu payload manifest:', err);
+        }
+        return;
+    }
+
+    const files = new Map();
+    let reloaded = 0;
+    for (const [date, halls] of Object.entries(manifest.menus || {})) {
+        for (const [hall, entry] of Object.entries(halls)) {
+            const key = `${date}|${hall}`;
+            const loaded = menuPayloads.files.get(key);
+            if (loaded && loaded.etag === entry.etag) {
+                files.set(key, loaded);
+                continue;
+            }
+            try {
+                files.set(key, { etag: entry.etag, gzip: fs.readFileSync(path.join(MENU_PAYLOAD_DIR, entry.path)) });
+                reloaded++;
+            } catch (err) {
+                console.error('Error reading menu payload:', entry.path, err.message);
+            }
+        }
+    }
+    menuPayloads = { halls: manifest.halls || [], files };
+    console.log(`Loaded ${files.size} precomputed menus (${reloaded} changed)`);
+};
+
+loadMenuPayloads();
+fs.watchFile(MENU_PAYLOAD_MANIFEST, { interval: 5000 }, loadMenuPayloads);
+
+// Same matching as the LIKE '%name%' lookup: an exact name first, then a case-insensitive substring
+const findMenuPayload = (name, date) => {
+    if (!date) {
+        return null;
+    }
+    const needle = name.toLowerCase();
+    const hall = menuPayloads.halls.find(hall => hall === name)
+        || menuPayloads.halls.find(hall => hall.toLowerCase().includes(needle));
+    return hall ? menuPayloads.files.get(`${date}|${hall}`) : null;
+};
+
+const sendMenuPayload = (req, res, payload) => {
+    const etag = `"${payload.etag}"`;
+    res.set('ETag', etag);
+    res.set('Vary', 'Accept-Encoding');
+    res.set('Cache-Control', 'no-cache');
+    if (req.get('If-None-Match') === etag) {
+        res.status(304).end();
+        return;
+    }
+    res.type('application/json');
+    if (req.acceptsEncodings('gzip')) {
+        res.set('Content-Encoding', 'gzip');
+        res.send(payload.gzip);
+    } else {
+        res.send(zlib.gunzipSync(payload.gzip));
+    }
+};
+
 db.query('DROP TABLE IF EXISTS meal_planner', (err) => {
     if (err) {
         console.error('Error dropping table:', err);
@@ -145,6 +219,12 @@ app.get('/dining-halls/:name/menu', async (req, res) => {
         
         console.log('Menu request params:', { name, date });
 
+        const payload = findMenuPayload(name, date);
+        if (payload) {
+            sendMenuPayload(req, res, payload);
+            return;
+        }
+
         // First get exact dining hall name
         const nameQuery = `
             SELECT DISTINCT dining_hall 
@@ -184,7 +264,7 @@ app.get('/dining-halls/:name/menu', async (req, res) => {
                 FROM menu_items mi
                 LEFT JOIN foods f ON mi.food_id = f.food_id
                 WHERE mi.dining_hall = ?
-                AND DATE(mi.date) = ?
+                AND mi.date = ?
                 ORDER BY 
                     CASE mi.meal
                         WHEN 'Breakfast' THEN 1
@@ -478,6 +558,24 @@ app.get('/meal-planner/:userId', (req, res) => {
     });
 });
 
+// Per-day totals and %DV for a user, kept up to date by sql-scripts-scrapers/planner_rollups.py
+app.get('/meal-planner/:userId/daily', (req, res) => {
+    const query = `
+        SELECT *
+        FROM meal_planner_daily
+        WHERE user_id = ?
+        ORDER BY day DESC
+    `;
+
+    db.query(query, [req.params.userId], (err, results) => {
+        if (err) {
+            handleDatabaseError(err, res);
+            return;
+        }
+        res.json(results);
+    });
+});
+
 // Health check endpoint
 app.get('/health', (req, res) => {
     db.query('SELECT 1', (err) => {
@@ -0,0 +1,201 @@
+"""
+Pool of long-lived, pre-warmed browser drivers fed from a work-stealing queue.
+
+Each worker owns one driver for the whole run. Jobs are pushed onto a
+worker's own deque (so follow-up jobs stay on the browser that already has
+the right hall selected); a worker whose deque is empty steals from the back
+of the busiest other deque. Jobs may submit further jobs while they run.
+"""
+import collections
+import concurrent.futures
+import threading
+import time
+
+# Attempts at starting a new driver for a worker whose driver died before the worker retires
+REPLACE_ATTEMPTS = 3
+
+
+class WorkStealingQueue:
+    """
+    One deque per worker plus a count of unfinished jobs, so workers know when
+    the run is over even if a running job may still submit more work.
+    """
+
+    def __init__(self, num_workers):
+        self.deques = [collections.deque() for _ in range(num_workers)]
+        self.condition = threading.Condition()
+        self.unfinished = 0
+        self.next_worker = 0
+
+    def put(self, job, worker_index=None):
+        with self.condition:
+            if worker_index is None:
+                worker_index = self.next_worker
+                self.next_worker = (self.next_worker + 1) % len(self.deques)
+            self.deques[worker_index].append(job)
+            self.unfinished += 1
+            self.condition.notify_all()
+
+    def get(self, worker_index):
+        """
+        Return (job, stolen) for the worker, or None once every job has finished.
+        """
+        with self.condition:
+            while True:
+                own = self.deques[worker_index]
+                if own:
+                    return own.popleft(), False
+                victim = max(self.deques, key=len)
+                if victim:
+                    return victim.pop(), True
+                if self.unfinished == 0:
+                    return None
+                self.condition.wait()
+
+    def task_done(self):
+        with self.condition:
+            self.unfinished -= 1
+            if self.unfinished == 0:
+                self.condition.notify_all()
+
+
+class Worker:
+    """
+    A pooled driver plus whatever navigation state the job handler keeps on it.
+    """
+
+    def __init__(self, index, driver):
+        self.index = index
+        self.driver = driver
+        self.state = {}
+        self.jobs_done = 0
+        self.jobs_stolen = 0
+        self.errors = 0
+        self.replace_failures = 0
+        self.retired = False
+        self.busy_time = 0.0
+
+
+class DriverPool:
+    """
+    Runs jobs on `size` warm drivers. `create_driver` builds a ready-to-use driver,
+    `handle_job(pool, worker, job)` does the work and may call pool.submit().
+    """
+
+    def __init__(self, create_driver, size=4):
+        self.create_driver = create_driver
+        self.size = size
+        self.queue = WorkStealingQueue(size)
+        self.workers = []
+        self.wall_time = 0.0
+
+    def warm_up(self):
+        """
+        Start every driver in parallel so no job pays for a cold browser start. If any of them fails
+        to start, the ones that did are quit before the error is raised.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.size) as executor:
+            futures = [executor.submit(self.create_driver) for _ in range(self.size)]
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            for future in futures:
+                if future.exception() is None:
+                    _quit(future.result())
+            raise errors[0]
+        self.workers = [Worker(index, future.result()) for index, future in enumerate(futures)]
+
+    def submit(self, job, worker_index=None):
+        self.queue.put(job, worker_index)
+
+    def replace_driver(self, worker):
+        _quit(worker.driver)
+        worker.driver = None
+        worker.state = {}
+        worker.driver = self.create_driver()
+
+    def recover_driver(self, worker):
+        """
+        Replace a dead driver, trying up to REPLACE_ATTEMPTS times. Returns False (and retires the
+        worker, leaving its queued jobs to be stolen by the others) if no new driver would start.
+        """
+        for attempt in range(REPLACE_ATTEMPTS):
+            try:
+                self.replace_driver(worker)
+                return True
+            except Exception as e:
+                worker.replace_failures += 1
+                print(f"Worker {worker.index} could not start a new driver (attempt {attempt + 1}): {e}")
+        worker.retired = True
+        print(f"Worker {worker.index} retired after {REPLACE_ATTEMPTS} failed driver starts")
+        return False
+
+    def driver_alive(self, worker):
+        try:
+            worker.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def work(self, worker, handle_job):
+        while not worker.retired:
+            task = self.queue.get(worker.index)
+            if task is None:
+                return
+            job, stolen = task
+            start_time = time.time()
+            try:
+                handle_job(self, worker, job)
+            except Exception as e:
+                worker.errors += 1
+                print(f"Worker {worker.index} failed job {job}: {e}")
+                # Forget the navigation state; the next job re-selects from scratch
+                worker.state = {}
+                if not self.driver_alive(worker):
+                    self.recover_driver(worker)
+            finally:
+                worker.busy_time += time.time() - start_time
+                worker.jobs_done += 1
+                if stolen:
+                    worker.jobs_stolen += 1
+                self.queue.task_done()
+
+    def run(self, jobs, handle_job):
+        start_time = time.time()
+        if not self.workers:
+            self.warm_up()
+        for job in jobs:
+            self.submit(job)
+
+        threads = [threading.Thread(target=self.work, args=(worker, handle_job)) for worker in self.workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_time = time.time() - start_time
+        if self.queue.unfinished:
+            print(f"{self.queue.unfinished} jobs were left unrun because every worker retired")
+
+    def close(self):
+        for worker in self.workers:
+            if worker.driver is not None:
+                _quit(worker.driver)
+
+    def utilization_report(self):
+        """
+        Return one line per worker with jobs run, jobs stolen, errors and busy share of wall time.
+        """
+        lines = []
+        for worker in self.workers:
+            utilization = worker.busy_time / self.wall_time * 100 if self.wall_time else 0.0
+            lines.append(f"Worker {worker.index}: {worker.jobs_done} jobs ({worker.jobs_stolen} stolen, "
+                         f"{worker.errors} errors), busy {worker.busy_time:.1f}s / {self.wall_time:.1f}s "
+                         f"({utilization:.0f}%)" + (f", retired after {worker.replace_failures} failed driver starts"
+                                                     if worker.retired else ""))
+        return lines
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        print(f"Error while quitting the driver: {e}")
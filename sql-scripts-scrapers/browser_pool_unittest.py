@@ -0,0 +1,118 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import browser_pool
+
+
+class TestWorkStealingQueue(unittest.TestCase):
+
+    def test_own_jobs_first_then_steal_from_back(self):
+        queue = browser_pool.WorkStealingQueue(2)
+        queue.put("a1", 0)
+        queue.put("a2", 0)
+        queue.put("a3", 0)
+        self.assertEqual(queue.get(1), ("a3", True))
+        self.assertEqual(queue.get(0), ("a1", False))
+
+    def test_get_returns_none_when_all_done(self):
+        queue = browser_pool.WorkStealingQueue(1)
+        queue.put("job")
+        job, _ = queue.get(0)
+        queue.task_done()
+        self.assertIsNone(queue.get(0))
+
+
+class TestDriverPool(unittest.TestCase):
+
+    def test_fanned_out_jobs_are_shared_between_workers(self):
+        pool = browser_pool.DriverPool(MagicMock, size=3)
+        done = []
+        lock = threading.Lock()
+
+        def handle_job(pool, worker, job):
+            if job[0] == "hall":
+                for meal in range(9):
+                    pool.submit(("meal", job[1], meal), worker.index)
+                return
+            time.sleep(0.01)
+            with lock:
+                done.append(job)
+
+        pool.run([("hall", "Rand")], handle_job)
+
+        self.assertEqual(len(done), 9)
+        self.assertEqual(sum(worker.jobs_done for worker in pool.workers), 10)
+        self.assertGreater(sum(worker.jobs_stolen for worker in pool.workers), 0)
+        self.assertEqual(len(pool.utilization_report()), 3)
+
+    def test_dead_driver_is_replaced_after_failure(self):
+        pool = browser_pool.DriverPool(MagicMock, size=1)
+        pool.warm_up()
+        worker = pool.workers[0]
+        dead_driver = worker.driver
+        type(dead_driver).current_url = property(lambda self: (_ for _ in ()).throw(RuntimeError("gone")))
+
+        def handle_job(pool, worker, job):
+            worker.state["hall"] = job
+            raise RuntimeError("boom")
+
+        pool.run(["job"], handle_job)
+
+        self.assertIsNot(worker.driver, dead_driver)
+        self.assertEqual(worker.state, {})
+        self.assertEqual(worker.errors, 1)
+
+
+    def test_warm_up_failure_quits_the_drivers_that_started(self):
+        started = []
+        lock = threading.Lock()
+
+        def create_driver():
+            with lock:
+                if len(started) == 1:
+                    started.append(None)
+                    raise RuntimeError("chrome failed to start")
+                driver = MagicMock()
+                started.append(driver)
+                return driver
+
+        pool = browser_pool.DriverPool(create_driver, size=3)
+        with self.assertRaises(RuntimeError):
+            pool.warm_up()
+        drivers = [driver for driver in started if driver is not None]
+        self.assertEqual(len(drivers), 2)
+        for driver in drivers:
+            driver.quit.assert_called_once()
+        self.assertEqual(pool.workers, [])
+
+    def test_worker_retires_when_no_new_driver_starts(self):
+        drivers = [MagicMock()]
+        type(drivers[0]).current_url = property(lambda self: (_ for _ in ()).throw(RuntimeError("gone")))
+
+        def create_driver():
+            if drivers:
+                return drivers.pop()
+            raise RuntimeError("chrome failed to start")
+
+        pool = browser_pool.DriverPool(create_driver, size=1)
+        pool.warm_up()
+        done = []
+
+        def handle_job(pool, worker, job):
+            done.append(job)
+            raise RuntimeError("boom")
+
+        # The worker can't get a new driver, so it retires and the run ends instead of hanging
+        pool.run(["first", "second"], handle_job)
+        worker = pool.workers[0]
+        self.assertTrue(worker.retired)
+        self.assertEqual(worker.replace_failures, browser_pool.REPLACE_ATTEMPTS)
+        self.assertEqual(done, ["first"])
+        self.assertEqual(pool.queue.unfinished, 1)
+        self.assertIn("retired", pool.utilization_report()[0])
+        pool.close()
+
+if __name__ == '__main__':
+    unittest.main()
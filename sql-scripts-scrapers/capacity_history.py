@@ -0,0 +1,197 @@
+"""
+Append-only occupancy history with hourly and weekly rollups.
+
+Each hall gets its own files under capacity_history/:
+
+    <hall>.samples   raw samples, 5 bytes each: uint32 minute since the epoch, uint8 percent full (255 = missing)
+    <hall>.hourly    one 6-byte record per finished hour: uint32 hour, uint8 mean, uint8 max
+    <hall>.weekly.npy  sum and count of hourly means for each of the 168 hours of the week
+
+Samples are appended as they arrive. When a sample lands in a new hour the
+previous hour is rolled up into the hourly file and folded into the weekly
+profile, so a "typical occupancy at this weekday and time" forecast is a
+lookup into 168 precomputed slots instead of a rescan of the raw samples.
+Weekdays and hours are in local time.
+
+    python capacity_history.py --import capacity_samples.csv
+    python capacity_history.py --hall Rand --forecast
+"""
+import argparse
+import csv
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_HISTORY_DIR = "capacity_history"
+MISSING = 255
+HOURS_PER_WEEK = 168
+
+SAMPLE_DTYPE = np.dtype([("minute", "<u4"), ("percent", "u1")])
+HOURLY_DTYPE = np.dtype([("hour", "<u4"), ("mean", "u1"), ("max", "u1")])
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def hall_slug(hall_name):
+    return re.sub(r"[^a-z0-9]+", "-", hall_name.lower()).strip("-")
+
+
+def hour_of_week(timestamps, utc_offset=None):
+    """
+    Local hour of the week (Monday 00:00 = 0) for a timestamp or array of timestamps.
+    utc_offset defaults to the local offset at each timestamp's hour.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if utc_offset is None:
+        utc_offset = np.vectorize(lambda value: time.localtime(int(value)).tm_gmtoff, otypes=[np.int64])(timestamps) \
+            if timestamps.size else np.zeros(0, dtype=np.int64)
+    local = timestamps + utc_offset
+    # 1970-01-01 was a Thursday, three days after a Monday
+    return ((local // 86400 + 3) % 7) * 24 + (local // 3600) % 24
+
+
+class HallHistory:
+    """
+    Files and rollups for one hall. Use CapacityHistory.hall() rather than creating these directly.
+    """
+
+    def __init__(self, root, hall_name, utc_offset=None):
+        self.hall_name = hall_name
+        self.utc_offset = utc_offset
+        base = os.path.join(root, hall_slug(hall_name))
+        self.samples_path = base + ".samples"
+        self.hourly_path = base + ".hourly"
+        self.weekly_path = base + ".weekly.npy"
+        self.lock = threading.Lock()
+
+        if os.path.exists(self.weekly_path):
+            self.weekly = np.load(self.weekly_path)
+        else:
+            self.weekly = np.zeros((2, HOURS_PER_WEEK), dtype=np.float64)
+
+        # Recover the hour that was still open when the last run stopped
+        hourly = self.hourly()
+        last_rolled = int(hourly["hour"][-1]) if len(hourly) else -1
+        samples = self.samples()
+        pending = samples[samples["minute"] // 60 > last_rolled]
+        self.pending_hour = int(pending["minute"][-1]) // 60 if len(pending) else None
+        self.pending = [int(value) for minute, value in zip(pending["minute"], pending["percent"])
+                        if minute // 60 == self.pending_hour and value != MISSING]
+
+    def samples(self):
+        if not os.path.exists(self.samples_path):
+            return np.zeros(0, dtype=SAMPLE_DTYPE)
+        return np.fromfile(self.samples_path, dtype=SAMPLE_DTYPE)
+
+    def hourly(self):
+        if not os.path.exists(self.hourly_path):
+            return np.zeros(0, dtype=HOURLY_DTYPE)
+        return np.fromfile(self.hourly_path, dtype=HOURLY_DTYPE)
+
+    def append(self, timestamp, percent):
+        """
+        Append one sample. percent is 0-100 or None. Samples older than the open hour are stored but not rolled up.
+        """
+        minute = int(timestamp) // 60
+        hour = minute // 60
+        record = np.array([(minute, MISSING if percent is None else min(max(int(percent), 0), 254))], dtype=SAMPLE_DTYPE)
+        with self.lock:
+            with open(self.samples_path, mode='ab') as file:
+                record.tofile(file)
+            if self.pending_hour is not None and hour > self.pending_hour:
+                self._roll_up()
+            if self.pending_hour is None or hour >= self.pending_hour:
+                self.pending_hour = hour
+                if percent is not None:
+                    self.pending.append(int(percent))
+
+    def _roll_up(self):
+        if self.pending:
+            mean = int(round(sum(self.pending) / len(self.pending)))
+            record = np.array([(self.pending_hour, mean, max(self.pending))], dtype=HOURLY_DTYPE)
+            with open(self.hourly_path, mode='ab') as file:
+                record.tofile(file)
+            slot = int(hour_of_week(self.pending_hour * 3600, self.utc_offset))
+            self.weekly[0, slot] += mean
+            self.weekly[1, slot] += 1
+            np.save(self.weekly_path, self.weekly)
+        self.pending_hour = None
+        self.pending = []
+
+    def weekly_profile(self):
+        """
+        Typical percent full for each of the 168 hours of the week (NaN where there's no data).
+        """
+        sums, counts = self.weekly
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+    def typical(self, timestamps):
+        """
+        Typical percent full at each timestamp's weekday and hour, from the weekly profile.
+        """
+        return self.weekly_profile()[hour_of_week(timestamps, self.utc_offset)]
+
+
+class CapacityHistory:
+    """
+    One HallHistory per hall under a directory. utc_offset fixes the time zone used for
+    weekdays and hours (seconds east of UTC); by default the local zone is used.
+    """
+
+    def __init__(self, root=DEFAULT_HISTORY_DIR, utc_offset=None):
+        self.root = root
+        self.utc_offset = utc_offset
+        self.halls = {}
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def hall(self, hall_name):
+        with self.lock:
+            if hall_name not in self.halls:
+                self.halls[hall_name] = HallHistory(self.root, hall_name, self.utc_offset)
+            return self.halls[hall_name]
+
+    def append(self, hall_name, timestamp, percent):
+        self.hall(hall_name).append(timestamp, percent)
+
+    def typical(self, hall_name, timestamps):
+        return self.hall(hall_name).typical(timestamps)
+
+    def import_csv(self, samples_csv):
+        """
+        Append the rows of a capacity_poller samples CSV. Returns the number of samples.
+        """
+        count = 0
+        with open(samples_csv, mode='r', newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                percent = row["Percentage Full"].rstrip("%")
+                self.append(row["Unit"], float(row["Timestamp"]), int(percent) if percent.isdigit() else None)
+                count += 1
+        return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store and forecast dining hall occupancy.")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_DIR)
+    parser.add_argument("--import", dest="import_csv", metavar="CSV", help="Append a capacity_samples.csv")
+    parser.add_argument("--hall", help="Hall to forecast")
+    parser.add_argument("--forecast", action="store_true", help="Print the hall's typical week")
+    args = parser.parse_args(argv)
+
+    history = CapacityHistory(args.history)
+    if args.import_csv:
+        print(f"Imported {history.import_csv(args.import_csv)} samples")
+    if args.hall:
+        now = time.time()
+        print(f"{args.hall} is typically {history.typical(args.hall, now):.0f}% full at this time")
+        if args.forecast:
+            profile = history.hall(args.hall).weekly_profile().reshape(7, 24)
+            for day, values in zip(WEEKDAYS, profile):
+                print(day, " ".join("  -" if np.isnan(value) else f"{value:3.0f}" for value in values))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import capacity_history
+from capacity_history import CapacityHistory
+
+# Monday 2024-11-04 00:00 UTC
+MONDAY = 1730678400
+
+
+class TestHourOfWeek(unittest.TestCase):
+
+    def test_monday_midnight_is_zero(self):
+        self.assertEqual(int(capacity_history.hour_of_week(MONDAY, utc_offset=0)), 0)
+        self.assertEqual(int(capacity_history.hour_of_week(MONDAY + 2 * 86400 + 12 * 3600 + 59 * 60, utc_offset=0)), 60)
+        # Central time is six hours behind, so this is still Sunday 18:00 locally
+        self.assertEqual(int(capacity_history.hour_of_week(MONDAY, utc_offset=-6 * 3600)), 6 * 24 + 18)
+
+
+class TestCapacityHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmpdir, "capacity_history")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def fill_two_weeks(self, history):
+        # Rand is 40% full Mondays at noon and 10% otherwise, sampled every minute from 11:00 to 13:59
+        for week in range(2):
+            for day in range(7):
+                for minute in range(11 * 60, 14 * 60):
+                    timestamp = MONDAY + week * 7 * 86400 + day * 86400 + minute * 60
+                    history.append("Rand", timestamp, 40 if day == 0 and minute // 60 == 12 else 10)
+
+    def test_samples_are_one_byte_values_and_roll_up_hourly(self):
+        history = CapacityHistory(self.root, utc_offset=0)
+        history.append("Rand", MONDAY + 60, 12)
+        history.append("Rand", MONDAY + 120, None)
+        history.append("Rand", MONDAY + 180, 20)
+        hall = history.hall("Rand")
+        self.assertEqual(os.path.getsize(hall.samples_path), 3 * capacity_history.SAMPLE_DTYPE.itemsize)
+        self.assertEqual(len(hall.hourly()), 0)
+
+        history.append("Rand", MONDAY + 3600, 30)
+        hourly = hall.hourly()
+        self.assertEqual((int(hourly["hour"][0]), int(hourly["mean"][0]), int(hourly["max"][0])), (MONDAY // 3600, 16, 20))
+
+    def test_typical_occupancy_from_weekly_profile(self):
+        history = CapacityHistory(self.root, utc_offset=0)
+        self.fill_two_weeks(history)
+        hall = history.hall("Rand")
+        self.assertEqual(len(hall.hourly()), 2 * 7 * 3 - 1)
+
+        noon_monday = MONDAY + 3 * 7 * 86400 + 12 * 3600 + 30 * 60
+        typical = history.typical("Rand", [noon_monday, noon_monday + 86400, noon_monday + 6 * 3600])
+        self.assertEqual(typical[0], 40)
+        self.assertEqual(typical[1], 10)
+        self.assertTrue(np.isnan(typical[2]))
+
+    def test_reopening_recovers_the_open_hour(self):
+        history = CapacityHistory(self.root, utc_offset=0)
+        history.append("Rand", MONDAY, 10)
+        history.append("Rand", MONDAY + 60, 30)
+
+        reopened = CapacityHistory(self.root, utc_offset=0)
+        reopened.append("Rand", MONDAY + 120, 20)
+        reopened.append("Rand", MONDAY + 3600, 50)
+        hourly = reopened.hall("Rand").hourly()
+        self.assertEqual(len(hourly), 1)
+        self.assertEqual(int(hourly["mean"][0]), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+"""
+Long-running occupancy poller for the campus dining wait-times page.
+
+hall_capacity_scraper.py starts Chrome, reads the page once and exits. This
+poller stays up, fetches the page on a fixed schedule with aiohttp and parses
+the .dining-facility blocks from the HTML, so there is no browser at all.
+Each hall's samples go into a fixed-size ring buffer in memory. New samples
+are appended to capacity_samples.csv every flush interval, and
+vanderbilt_wait_times.csv is rewritten with the latest reading so existing
+readers keep working. Flushed samples also go to the per-hall history in
+capacity_history.py.
+
+    python capacity_poller.py --interval 60
+    python capacity_poller.py --url http://127.0.0.1:8766/ --iterations 3     # against a stub page
+"""
+import argparse
+import asyncio
+import csv
+import os
+import time
+from array import array
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+import capacity_history
+from nutrition_label import HTML_PARSER, element_text
+
+WAIT_TIMES_URL = "https://campusdining.vanderbilt.edu/wait-times/"
+SNAPSHOT_CSV = "vanderbilt_wait_times.csv"
+SAMPLES_CSV = "capacity_samples.csv"
+SNAPSHOT_HEADER = ["Unit", "Seating Capacity", "Percentage Full"]
+SAMPLES_HEADER = ["Timestamp", "Unit", "Seating Capacity", "Percentage Full"]
+REQUEST_TIMEOUT = 20
+
+
+def _number(text):
+    digits = "".join(char for char in text or "" if char.isdigit())
+    return int(digits) if digits else None
+
+
+def parse_wait_times(html):
+    """
+    Return [(unit, seating capacity, percentage full)] for every .dining-facility block.
+    Numbers are ints, or None when the page leaves them out.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    facilities = []
+    for facility in soup.select(".dining-facility"):
+        name = element_text(facility.select_one("h6"))
+        if not name:
+            continue
+        capacity_text = element_text(facility.select_one("p"))
+        capacity = _number(capacity_text.split(": ", 1)[-1]) if capacity_text else None
+        percentage = _number(element_text(facility.select_one(".capacity-chart-metric")))
+        facilities.append((name, capacity, percentage))
+    return facilities
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of (timestamp, percentage full) samples. The oldest sample is overwritten when full.
+    total counts every sample ever appended, so a reader can tell which ones it has already seen.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.timestamps = array('d', [0.0] * size)
+        self.values = array('h', [0] * size)
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.size)
+
+    def append(self, timestamp, value):
+        index = self.total % self.size
+        self.timestamps[index] = timestamp
+        self.values[index] = -1 if value is None else value
+        self.total += 1
+
+    def since(self, position):
+        """
+        Samples appended after the position-th one, oldest first, as (timestamp, value) with None for missing values.
+        Samples that were already overwritten are skipped.
+        """
+        start = max(position, self.total - self.size)
+        samples = []
+        for count in range(start, self.total):
+            index = count % self.size
+            value = self.values[index]
+            samples.append((self.timestamps[index], None if value < 0 else value))
+        return samples
+
+    def latest(self):
+        return self.since(self.total - 1)[0] if self.total else None
+
+
+class CapacityPoller:
+    """
+    Polls the wait-times page every interval seconds and keeps a ring buffer per hall.
+    """
+
+    def __init__(self, url=WAIT_TIMES_URL, interval=60, buffer_size=1440, flush_interval=600,
+                 snapshot_csv=SNAPSHOT_CSV, samples_csv=SAMPLES_CSV, history_dir=None):
+        self.url = url
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.snapshot_csv = snapshot_csv
+        self.samples_csv = samples_csv
+        self.history = capacity_history.CapacityHistory(history_dir) if history_dir else None
+        self.buffers = {}
+        self.capacities = {}
+        self.flushed = {}
+        self.polls = 0
+        self.errors = 0
+
+    def record(self, facilities, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        for name, capacity, percentage in facilities:
+            if name not in self.buffers:
+                self.buffers[name] = RingBuffer(self.buffer_size)
+                self.flushed[name] = 0
+            self.buffers[name].append(timestamp, percentage)
+            if capacity is not None:
+                self.capacities[name] = capacity
+
+    async def poll_once(self, session):
+        """
+        Fetch and parse the page once. Errors are counted and reported, not raised, so the loop keeps going.
+        """
+        try:
+            async with session.get(self.url) as response:
+                response.raise_for_status()
+                html = await response.text()
+            facilities = parse_wait_times(html)
+            self.record(facilities)
+            self.polls += 1
+            return facilities
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.errors += 1
+            print(f"Error polling {self.url}: {e}")
+            return None
+
+    def flush(self):
+        """
+        Append samples not yet on disk to the samples CSV and rewrite the snapshot CSV. Returns samples written.
+        """
+        new_file = not os.path.exists(self.samples_csv)
+        written = 0
+        with open(self.samples_csv, mode='a', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            if new_file:
+                writer.writerow(SAMPLES_HEADER)
+            for name, buffer in self.buffers.items():
+                for timestamp, value in buffer.since(self.flushed[name]):
+                    writer.writerow([round(timestamp, 3), name, self.capacities.get(name, ""), "" if value is None else value])
+                    if self.history is not None:
+                        self.history.append(name, timestamp, value)
+                    written += 1
+                self.flushed[name] = buffer.total
+
+        with open(self.snapshot_csv, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(SNAPSHOT_HEADER)
+            for name, buffer in self.buffers.items():
+                latest = buffer.latest()
+                percentage = "" if latest is None or latest[1] is None else f"{latest[1]}%"
+                writer.writerow([name, self.capacities.get(name, ""), percentage])
+        return written
+
+    async def run(self, iterations=None):
+        """
+        Poll until cancelled (or for a number of iterations), flushing every flush_interval and on the way out.
+        Polls are scheduled against the event loop clock so slow responses don't make the schedule drift.
+        """
+        loop = asyncio.get_running_loop()
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        next_poll = loop.time()
+        last_flush = loop.time()
+        count = 0
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                while iterations is None or count < iterations:
+                    await self.poll_once(session)
+                    count += 1
+                    if loop.time() - last_flush >= self.flush_interval:
+                        await asyncio.to_thread(self.flush)
+                        last_flush = loop.time()
+                    if iterations is not None and count >= iterations:
+                        break
+                    next_poll += self.interval
+                    await asyncio.sleep(max(next_poll - loop.time(), 0))
+        finally:
+            self.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll dining hall occupancy without a browser.")
+    parser.add_argument("--url", default=WAIT_TIMES_URL)
+    parser.add_argument("--interval", type=float, default=60, help="Seconds between polls")
+    parser.add_argument("--flush-interval", type=float, default=600, help="Seconds between writes to disk")
+    parser.add_argument("--buffer-size", type=int, default=1440, help="Samples kept in memory per hall")
+    parser.add_argument("--iterations", type=int, default=None, help="Stop after this many polls")
+    parser.add_argument("--history", default=capacity_history.DEFAULT_HISTORY_DIR,
+                        help="Directory of the per-hall history files")
+    args = parser.parse_args(argv)
+
+    poller = CapacityPoller(args.url, args.interval, args.buffer_size, args.flush_interval, history_dir=args.history)
+    try:
+        asyncio.run(poller.run(args.iterations))
+    except KeyboardInterrupt:
+        pass
+    print(f"Polled {poller.polls} times ({poller.errors} errors) for {len(poller.buffers)} halls")
+
+
+if __name__ == "__main__":
+    main()
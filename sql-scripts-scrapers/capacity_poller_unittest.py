@@ -0,0 +1,92 @@
+import asyncio
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import capacity_poller
+import replay_server
+from capacity_poller import CapacityPoller, RingBuffer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "wait_times")
+
+
+class TestParseWaitTimes(unittest.TestCase):
+
+    def test_parses_every_facility(self):
+        with open(os.path.join(FIXTURE_DIR, "index.html"), encoding='utf-8') as file:
+            facilities = capacity_poller.parse_wait_times(file.read())
+        self.assertEqual(facilities, [("Branscomb Munchie Mart", 12, 33), ("Rand", 623, 13), ("Kissam", 167, 3), ("The Pub", 100, 1)])
+
+    def test_missing_metric(self):
+        html = '<div class="dining-facility"><h6>Rand</h6><p>Seating Capacity: 623</p></div>'
+        self.assertEqual(capacity_poller.parse_wait_times(html), [("Rand", 623, None)])
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_overwrites_oldest_samples(self):
+        buffer = RingBuffer(3)
+        for second in range(5):
+            buffer.append(float(second), second * 10)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.since(0), [(2.0, 20), (3.0, 30), (4.0, 40)])
+        self.assertEqual(buffer.since(4), [(4.0, 40)])
+        self.assertEqual(buffer.latest(), (4.0, 40))
+
+    def test_missing_values(self):
+        buffer = RingBuffer(2)
+        buffer.append(1.0, None)
+        self.assertEqual(buffer.since(0), [(1.0, None)])
+
+
+class TestCapacityPoller(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.server, base_url = replay_server.start_replay_server(FIXTURE_DIR)
+        self.url = base_url.split("/nn-prod")[0] + "/wait-times/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_polls_stub_page_and_flushes(self):
+        samples_csv = os.path.join(self.tmpdir, "capacity_samples.csv")
+        snapshot_csv = os.path.join(self.tmpdir, "vanderbilt_wait_times.csv")
+        poller = CapacityPoller(self.url, interval=0.05, buffer_size=2, flush_interval=3600,
+                                snapshot_csv=snapshot_csv, samples_csv=samples_csv,
+                                history_dir=os.path.join(self.tmpdir, "capacity_history"))
+        asyncio.run(poller.run(iterations=3))
+
+        self.assertEqual(poller.polls, 3)
+        self.assertEqual(len(poller.buffers["Rand"]), 2)
+        with open(samples_csv, newline='', encoding='utf-8') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], capacity_poller.SAMPLES_HEADER)
+        # Only what still fits in the ring buffers reaches disk at the final flush
+        self.assertEqual(len(rows) - 1, 4 * 2)
+        with open(snapshot_csv, newline='', encoding='utf-8') as file:
+            self.assertIn(["Rand", "623", "13%"], list(csv.reader(file)))
+
+        self.assertEqual(len(poller.history.hall("Rand").samples()), 2)
+
+        # A second flush has nothing new to write
+        self.assertEqual(poller.flush(), 0)
+
+    def test_missing_page_is_counted_not_raised(self):
+        server, base_url = replay_server.start_replay_server(os.path.join(self.tmpdir, "no_fixtures"))
+        try:
+            poller = CapacityPoller(base_url.split("/nn-prod")[0] + "/wait-times/", interval=0,
+                                    snapshot_csv=os.path.join(self.tmpdir, "a.csv"),
+                                    samples_csv=os.path.join(self.tmpdir, "b.csv"))
+            asyncio.run(poller.run(iterations=2))
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual((poller.polls, poller.errors), (0, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,361 @@
+"""
+Change-data feed between the scrapers and the database.
+
+Every scrape rewrites nutrition_info.csv and the menu store as a whole, even
+though most labels and menu rows are the same as the day before. After a run,
+publish() compares the new foods and the menus of the dates just scraped with
+the previous run's snapshot and appends only the differences to an ordered
+JSONL log:
+
+    change_feed/
+        changes.jsonl      # {"seq", "run", "table", "op", "key", "row"}, seq increasing across runs
+        snapshot.json      # what the database looks like once every change is applied, with the
+                           # seq and byte offset in changes.jsonl it has caught up to
+
+op is "insert", "update" or "delete"; key holds the row's unique key (food_id
+for foods, dining_hall/date/meal/category/food_name for menu_items) and row
+the typed column values, as db_loader writes them. Within a run, foods are
+inserted and updated first, then menu rows, and removed foods are deleted
+last, so menu rows never point at a food that isn't there yet.
+
+apply_changes() is the consumer: it applies the changes after the last seq it
+recorded in change_feed_state, in the same transaction as the new seq, so a
+load takes time in proportion to what changed and can be rerun safely. The
+state and the snapshot also keep the byte offset just past their last change,
+so reading the log starts there instead of decoding every earlier line.
+
+    python change_feed.py publish                   # after the scrapers (they also publish themselves)
+    python change_feed.py apply --sqlite dining.db  # or MySQL with DB_HOST/DB_USER/... as db_loader.py
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+import db_loader
+import menu_store
+import scraper_common
+
+DEFAULT_FEED_DIR = "change_feed"
+CHANGES_NAME = "changes.jsonl"
+SNAPSHOT_NAME = "snapshot.json"
+STATE_TABLE = "change_feed_state"
+DEFAULT_CONSUMER = "db_loader"
+
+FOOD_KEY = ["food_id"]
+FOOD_COLUMNS = [column for field, column, kind in db_loader.FOOD_COLUMNS]
+
+
+def read_snapshot(feed_dir=DEFAULT_FEED_DIR):
+    path = os.path.join(feed_dir, SNAPSHOT_NAME)
+    if not os.path.exists(path):
+        return {"seq": 0, "offset": 0, "runs": 0, "foods": {}, "menus": {}}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def last_logged(feed_dir=DEFAULT_FEED_DIR):
+    """
+    (seq, run) of the last complete change in the log, (0, 0) if there is none. A partly written last line
+    from a crashed publish is cut off so the next append starts on a line of its own.
+    """
+    path = os.path.join(feed_dir, CHANGES_NAME)
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path, mode='rb+') as file:
+        end = file.seek(0, os.SEEK_END)
+        # Read backwards until the chunk holds the last complete line
+        tail = b""
+        position = end
+        while position > 0 and tail.count(b"\n") < 2:
+            size = min(4096, position)
+            position -= size
+            file.seek(position)
+            tail = file.read(size) + tail
+        complete_end = tail.rfind(b"\n") + 1
+        if complete_end < len(tail):
+            file.truncate(position + complete_end)
+        lines = tail[:complete_end].splitlines()
+    if not lines or not lines[-1].strip():
+        return 0, 0
+    change = json.loads(lines[-1])
+    return change["seq"], change["run"]
+
+
+def roll_forward(snapshot, feed_dir=DEFAULT_FEED_DIR):
+    """
+    Bring a snapshot up to the end of the log. A publish that crashed after appending its changes but before
+    replacing the snapshot leaves the snapshot behind what consumers will apply; diffing against it would reuse
+    logged seqs (which consumers skip) and miss deletes of the rows that run added.
+    """
+    logged_seq, logged_run = last_logged(feed_dir)
+    if logged_seq <= snapshot["seq"]:
+        return snapshot
+    for change, snapshot["offset"] in read_log(feed_dir, after=snapshot["seq"], offset=snapshot["offset"]):
+        values = change["row"] or change["key"]
+        if change["table"] == "foods":
+            food_id = str(change["key"]["food_id"])
+            if change["op"] == "delete":
+                snapshot["foods"].pop(food_id, None)
+            else:
+                snapshot["foods"][food_id] = [values[column] for column in FOOD_COLUMNS]
+            continue
+        menus = snapshot["menus"].setdefault(values["date"], {})
+        key = json.dumps([change["key"][column] for column in db_loader.MENU_KEY])
+        if change["op"] == "delete":
+            menus.pop(key, None)
+        else:
+            menus[key] = [values[column] for column in db_loader.MENU_COLUMNS]
+        if not menus:
+            del snapshot["menus"][values["date"]]
+    snapshot["seq"] = logged_seq
+    snapshot["runs"] = max(snapshot["runs"], logged_run)
+    return snapshot
+
+
+def food_rows(nutrition_csv):
+    """
+    {food_id (as a string, like JSON keys): typed foods row as a list} from nutrition_info.csv.
+    """
+    return {str(row[0]): list(row) for row in db_loader.read_csv_rows(nutrition_csv, db_loader.food_row)
+            if row[0] is not None}
+
+
+def menu_rows(rows):
+    """
+    {key string: typed menu_items row as a list} from meals CSV style rows. A repeated key keeps its last row.
+    """
+    menus = {}
+    for row in rows:
+        typed = list(db_loader.menu_row(row))
+        # Stored as '' like db_loader does, since the unique key can't include NULL
+        if typed[5] is None:
+            typed[5] = ""
+        values = dict(zip(db_loader.MENU_COLUMNS, typed))
+        menus[json.dumps([values[column] for column in db_loader.MENU_KEY])] = typed
+    return menus
+
+
+def diff_rows(table, columns, key_columns, old, new):
+    """
+    (inserts and updates, deletes) turning the old {key: row} into the new one, each in key order.
+    """
+    upserts = []
+    deletes = []
+    for key in sorted(new):
+        if key not in old:
+            upserts.append(("insert", new[key]))
+        elif old[key] != new[key]:
+            upserts.append(("update", new[key]))
+    for key in sorted(old):
+        if key not in new:
+            deletes.append(("delete", old[key]))
+
+    def change(op, row):
+        values = dict(zip(columns, row))
+        return {"table": table, "op": op, "key": {column: values[column] for column in key_columns},
+                "row": None if op == "delete" else values}
+
+    return [change(op, row) for op, row in upserts], [change(op, row) for op, row in deletes]
+
+
+def publish(nutrition_csv=scraper_common.nutrition_csv_filename, store=None, dates=None, feed_dir=DEFAULT_FEED_DIR):
+    """
+    Append the differences between this run and the snapshot to the change log, then save the new snapshot.
+    Menus are compared only for the given dates (every date in the store if None), since a run only scrapes a
+    few days and the others stay as they were. Returns {"insert", "update", "delete"} counts.
+    """
+    store = store or menu_store.MenuStore()
+    snapshot = roll_forward(read_snapshot(feed_dir), feed_dir)
+    dates = store.dates() if dates is None else sorted({scraper_common.normalize_date(date) for date in dates})
+
+    foods = food_rows(nutrition_csv)
+    food_upserts, food_deletes = diff_rows("foods", FOOD_COLUMNS, FOOD_KEY, snapshot["foods"], foods)
+    menu_changes = []
+    for date in dates:
+        menus = menu_rows(store.read_date(date))
+        upserts, deletes = diff_rows("menu_items", db_loader.MENU_COLUMNS, db_loader.MENU_KEY,
+                                     snapshot["menus"].get(date, {}), menus)
+        menu_changes.extend(deletes + upserts)
+        if menus:
+            snapshot["menus"][date] = menus
+        else:
+            snapshot["menus"].pop(date, None)
+
+    changes = food_upserts + menu_changes + food_deletes
+    run = snapshot["runs"] + 1
+    os.makedirs(feed_dir, exist_ok=True)
+    if changes:
+        with open(os.path.join(feed_dir, CHANGES_NAME), mode='ab') as file:
+            for change in changes:
+                snapshot["seq"] += 1
+                line = json.dumps(dict(seq=snapshot["seq"], run=run, **change), separators=(",", ":")) + "\n"
+                file.write(line.encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+            snapshot["offset"] = file.tell()
+
+    # The snapshot is only replaced once the log is on disk; after a crash in between, the next run rolls it
+    # forward from the log before comparing
+    snapshot["runs"] = run
+    snapshot["foods"] = foods
+    temp_path = os.path.join(feed_dir, SNAPSHOT_NAME + ".tmp")
+    with open(temp_path, mode='w', encoding='utf-8') as file:
+        json.dump(snapshot, file, separators=(",", ":"))
+    os.replace(temp_path, os.path.join(feed_dir, SNAPSHOT_NAME))
+
+    counts = {"insert": 0, "update": 0, "delete": 0}
+    for change in changes:
+        counts[change["op"]] += 1
+    return counts
+
+
+def read_log(feed_dir=DEFAULT_FEED_DIR, after=0, offset=0):
+    """
+    (change, byte offset just past its line) for the changes with a seq greater than after, in log order.
+    Reading starts at offset, the end of a line read before; one that isn't at a line start of this log
+    (e.g. it was replaced) starts from the beginning instead.
+    """
+    path = os.path.join(feed_dir, CHANGES_NAME)
+    if not os.path.exists(path):
+        return
+    with open(path, mode='rb') as file:
+        if 0 < offset <= file.seek(0, os.SEEK_END):
+            file.seek(offset - 1)
+            if file.read(1) != b"\n":
+                offset = 0
+        else:
+            offset = 0
+        file.seek(offset)
+        for line in file:
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                change = json.loads(line)
+            except ValueError:
+                continue  # Partly written last line of a crashed publish
+
+            if change["seq"] > after:
+                yield change, offset
+
+
+def read_changes(feed_dir=DEFAULT_FEED_DIR, after=0, offset=0):
+    """
+    Changes with a seq greater than after, in log order.
+    """
+    for change, end in read_log(feed_dir, after, offset):
+        yield change
+
+
+def create_state_table(connection, dialect):
+    consumer_type = "TEXT" if dialect.name == "sqlite" else "VARCHAR(100)"
+    offset_type = "INTEGER" if dialect.name == "sqlite" else "BIGINT"
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} (\n"
+                   f"    consumer {consumer_type} PRIMARY KEY,\n"
+                   "    seq INTEGER NOT NULL,\n"
+                   f"    log_offset {offset_type} NOT NULL\n"
+                   ")")
+    connection.commit()
+
+
+def applied_position(connection, dialect, consumer=DEFAULT_CONSUMER):
+    """
+    (seq, byte offset in changes.jsonl) this consumer has applied up to, (0, 0) before its first apply.
+    """
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT seq, log_offset FROM {STATE_TABLE} WHERE consumer = {dialect.placeholder}", (consumer,))
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def _statement(dialect, table, kind):
+    key_columns = FOOD_KEY if table == "foods" else db_loader.MENU_KEY
+    if kind == "upsert":
+        return dialect.upsert(table, FOOD_COLUMNS if table == "foods" else db_loader.MENU_COLUMNS, key_columns)
+    return f"DELETE FROM {table} WHERE " + " AND ".join(f"{column} = {dialect.placeholder}" for column in key_columns)
+
+
+def _parameters(change):
+    if change["op"] == "delete":
+        return tuple(change["key"].values())
+    columns = FOOD_COLUMNS if change["table"] == "foods" else db_loader.MENU_COLUMNS
+    return tuple(change["row"][column] for column in columns)
+
+
+def apply_changes(connection, dialect, feed_dir=DEFAULT_FEED_DIR, consumer=DEFAULT_CONSUMER,
+                  batch_size=db_loader.BATCH_SIZE):
+    """
+    Apply the changes this consumer hasn't seen yet, in seq order and in one transaction together with the
+    consumer's new seq. Consecutive changes with the same statement are sent as one executemany batch.
+    Returns {"insert", "update", "delete"} counts.
+    """
+    create_state_table(connection, dialect)
+    counts = {"insert": 0, "update": 0, "delete": 0}
+    cursor = connection.cursor()
+    last_seq, offset = applied_position(connection, dialect, consumer)
+    try:
+        statement = None
+        batch = []
+        for change, offset in read_log(feed_dir, after=last_seq, offset=offset):
+            # Inserts and updates share the upsert, so only a change of table or a delete starts a new batch
+            change_statement = (change["table"], "delete" if change["op"] == "delete" else "upsert")
+            if batch and (change_statement != statement or len(batch) >= batch_size):
+                cursor.executemany(_statement(dialect, *statement), batch)
+                batch = []
+            statement = change_statement
+            batch.append(_parameters(change))
+            counts[change["op"]] += 1
+            last_seq = change["seq"]
+        if batch:
+            cursor.executemany(_statement(dialect, *statement), batch)
+
+        cursor.execute(f"DELETE FROM {STATE_TABLE} WHERE consumer = {dialect.placeholder}", (consumer,))
+        cursor.execute(f"INSERT INTO {STATE_TABLE} (consumer, seq, log_offset) "
+                       f"VALUES ({dialect.placeholder}, {dialect.placeholder}, {dialect.placeholder})",
+                       (consumer, last_seq, offset))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish scraper changes as a JSONL feed, or apply them to the database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish_parser = commands.add_parser("publish", help="Diff the latest run against the snapshot and append the changes")
+    publish_parser.add_argument("--nutrition-csv", default=scraper_common.nutrition_csv_filename)
+    publish_parser.add_argument("--store", default=menu_store.DEFAULT_STORE_DIR)
+    publish_parser.add_argument("--date", action="append", help="Only compare this date's menus (repeatable)")
+    apply_parser = commands.add_parser("apply", help="Apply the changes not yet in the database")
+    apply_parser.add_argument("--sqlite", metavar="PATH", help="Apply to a SQLite file instead of MySQL")
+    apply_parser.add_argument("--consumer", default=DEFAULT_CONSUMER)
+    for command_parser in (publish_parser, apply_parser):
+        command_parser.add_argument("--feed", default=DEFAULT_FEED_DIR)
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    if args.command == "publish":
+        counts = publish(args.nutrition_csv, menu_store.MenuStore(args.store), args.date, args.feed)
+        print(f"Published {counts['insert']} inserts, {counts['update']} updates and {counts['delete']} deletes "
+              f"to {args.feed}")
+        return
+
+    if args.sqlite:
+        connection, dialect = sqlite3.connect(args.sqlite), db_loader.Dialect("sqlite")
+    else:
+        connection, dialect = db_loader.connect_mysql(), db_loader.Dialect("mysql")
+    try:
+        db_loader.create_tables(connection, dialect)
+        counts = apply_changes(connection, dialect, args.feed, args.consumer)
+    finally:
+        connection.close()
+    print(f"Applied {counts['insert']} inserts, {counts['update']} updates and {counts['delete']} deletes "
+          f"in {time.time() - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
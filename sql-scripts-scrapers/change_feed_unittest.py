@@ -0,0 +1,160 @@
+import csv
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import change_feed
+import db_loader
+import scraper_common
+from menu_store import MenuStore
+from scraper_common import meals_csv_dict as meal_row
+
+
+class TestChangeFeed(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.feed_dir = os.path.join(self.tmpdir, "change_feed")
+        self.nutrition_csv = os.path.join(self.tmpdir, "nutrition_info.csv")
+        self.store = MenuStore(os.path.join(self.tmpdir, "menu_store"))
+        self.connection = sqlite3.connect(os.path.join(self.tmpdir, "dining.db"))
+        self.dialect = db_loader.Dialect("sqlite")
+        db_loader.create_tables(self.connection, self.dialect)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.tmpdir)
+
+    def scrape(self, foods, menus, dates=("2024-11-05",)):
+        with open(self.nutrition_csv, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(scraper_common.NUTRITION_HEADER)
+            for food_id, name, calories in foods:
+                writer.writerow(scraper_common.nutrition_csv_row(food_id, name, {"Calories": calories}, {}))
+        self.store.import_rows(menus, today=datetime.date(2024, 11, 5))
+        return change_feed.publish(self.nutrition_csv, self.store, dates, self.feed_dir)
+
+    def apply(self):
+        return change_feed.apply_changes(self.connection, self.dialect, self.feed_dir)
+
+    def table(self, sql):
+        return self.connection.execute(sql).fetchall()
+
+    def test_second_run_publishes_only_the_differences(self):
+        first = self.scrape([(1, "Kale", "20"), (2, "Eggs", "70")],
+                            [meal_row(1, "Rand", "2024/11/05", "Lunch", "Kale", "Sides"),
+                             meal_row(2, "Rand", "2024/11/05", "Breakfast", "Eggs", "")])
+        self.assertEqual(first, {"insert": 4, "update": 0, "delete": 0})
+
+        # Eggs' label changed, Kale left the menu and the catalog, Rice is new
+        second = self.scrape([(2, "Eggs", "80"), (3, "Rice", "200")],
+                             [meal_row(2, "Rand", "2024/11/05", "Breakfast", "Eggs", ""),
+                              meal_row(3, "Rand", "2024/11/05", "Lunch", "Rice", "Sides")])
+        self.assertEqual(second, {"insert": 2, "update": 1, "delete": 2})
+        changes = [change for change in change_feed.read_changes(self.feed_dir) if change["run"] == 2]
+        self.assertEqual([change["seq"] for change in changes], [5, 6, 7, 8, 9])
+        # Foods are upserted first, then menu rows, and removed foods go last
+        self.assertEqual([(change["table"], change["op"]) for change in changes],
+                         [("foods", "update"), ("foods", "insert"), ("menu_items", "delete"),
+                          ("menu_items", "insert"), ("foods", "delete")])
+        self.assertEqual(changes[2]["key"], {"dining_hall": "Rand", "date": "2024-11-05", "meal": "Lunch",
+                                             "category": "Sides", "food_name": "Kale"})
+
+        self.assertEqual(self.scrape([(2, "Eggs", "80"), (3, "Rice", "200")],
+                                     [meal_row(2, "Rand", "2024/11/05", "Breakfast", "Eggs", ""),
+                                      meal_row(3, "Rand", "2024/11/05", "Lunch", "Rice", "Sides")]),
+                         {"insert": 0, "update": 0, "delete": 0})
+
+    def test_dates_not_scraped_are_left_alone(self):
+        self.scrape([(1, "Kale", "20")], [meal_row(1, "Rand", "2024-11-05", "Lunch", "Kale", "Sides")])
+        counts = self.scrape([(1, "Kale", "20")], [meal_row(1, "Rand", "2024-11-06", "Lunch", "Kale", "Sides")],
+                             dates=["2024-11-06"])
+        self.assertEqual(counts, {"insert": 1, "update": 0, "delete": 0})
+        self.assertEqual(sorted(change_feed.read_snapshot(self.feed_dir)["menus"]), ["2024-11-05", "2024-11-06"])
+
+    def test_consumer_applies_each_change_once(self):
+        self.scrape([(1, "Kale", "20"), (2, "Eggs", "70")],
+                    [meal_row(1, "Rand", "2024-11-05", "Lunch", "Kale", "Sides"),
+                     meal_row(2, "Rand", "2024-11-05", "Breakfast", "Eggs", "")])
+        self.assertEqual(self.apply(), {"insert": 4, "update": 0, "delete": 0})
+        self.assertEqual(self.apply(), {"insert": 0, "update": 0, "delete": 0})
+
+        self.scrape([(2, "Eggs", "80")], [meal_row(2, "Rand", "2024-11-05", "Breakfast", "Eggs", "")])
+        self.assertEqual(self.apply(), {"insert": 0, "update": 1, "delete": 2})
+        self.assertEqual(self.table("SELECT food_id, food_name, calories FROM foods"), [(2, "Eggs", 80)])
+        self.assertEqual(self.table("SELECT food_id, date, meal, food_name, category FROM menu_items"),
+                         [(2, "2024-11-05", "Breakfast", "Eggs", "")])
+        log_size = os.path.getsize(os.path.join(self.feed_dir, change_feed.CHANGES_NAME))
+        self.assertEqual(change_feed.applied_position(self.connection, self.dialect), (7, log_size))
+
+    def test_reading_resumes_at_the_recorded_offset(self):
+        self.scrape([(1, "Kale", "20")], [meal_row(1, "Rand", "2024-11-05", "Lunch", "Kale", "Sides")])
+        self.apply()
+        seq, offset = change_feed.applied_position(self.connection, self.dialect)
+        snapshot = change_feed.read_snapshot(self.feed_dir)
+        self.assertEqual((snapshot["seq"], snapshot["offset"]), (seq, offset))
+        self.scrape([(1, "Kale", "30")], [meal_row(1, "Rand", "2024-11-05", "Lunch", "Kale", "Sides")])
+
+        # Lines before the offset aren't read again: garbling them changes nothing
+        log_path = os.path.join(self.feed_dir, change_feed.CHANGES_NAME)
+        with open(log_path, mode='rb+') as file:
+            file.write(b"x" * (offset - 1))
+        self.assertEqual([change["seq"] for change in change_feed.read_changes(self.feed_dir, seq, offset)], [3])
+        self.assertEqual(self.apply(), {"insert": 0, "update": 1, "delete": 0})
+        self.assertEqual(change_feed.applied_position(self.connection, self.dialect), (3, os.path.getsize(log_path)))
+
+        # An offset that isn't at the start of a line of this log reads it from the beginning
+        self.assertEqual([change["seq"] for change in change_feed.read_changes(self.feed_dir, 2, offset + 1)], [3])
+        self.assertEqual([change["seq"] for change in change_feed.read_changes(self.feed_dir, 2, 10 ** 6)], [3])
+
+    def test_crash_before_the_snapshot_does_not_reuse_seqs(self):
+        self.scrape([(1, "Kale", "20")], [meal_row(1, "Rand", "2024-11-05", "Lunch", "Kale", "Sides")])
+        self.apply()
+        snapshot_path = os.path.join(self.feed_dir, change_feed.SNAPSHOT_NAME)
+        with open(snapshot_path, encoding='utf-8') as file:
+            before_crash = file.read()
+        self.scrape([(1, "Kale", "20"), (2, "Eggs", "70")],
+                    [meal_row(1, "Rand", "2024-11-05", "Lunch", "Kale", "Sides"),
+                     meal_row(2, "Rand", "2024-11-05", "Breakfast", "Eggs", "")])
+        self.assertEqual(self.apply(), {"insert": 2, "update": 0, "delete": 0})
+        # The run crashed after appending to the log but before replacing the snapshot, halfway into a line
+        with open(snapshot_path, mode='w', encoding='utf-8') as file:
+            file.write(before_crash)
+        with open(os.path.join(self.feed_dir, change_feed.CHANGES_NAME), mode='a', encoding='utf-8') as file:
+            file.write('{"seq":4,"run":')
+
+        self.scrape([(1, "Kale", "20"), (2, "Eggs", "70"), (3, "Rice", "200")],
+                    [meal_row(1, "Rand", "2024-11-05", "Lunch", "Kale", "Sides"),
+                     meal_row(3, "Rand", "2024-11-05", "Dinner", "Rice", "Sides")])
+        changes = list(change_feed.read_changes(self.feed_dir, after=4))
+        self.assertEqual([(change["seq"], change["run"], change["op"]) for change in changes],
+                         [(5, 3, "insert"), (6, 3, "delete"), (7, 3, "insert")])
+        # Nothing is skipped and the crashed run's Eggs menu row is deleted: the database matches the last run
+        self.apply()
+        self.assertEqual(self.table("SELECT food_id FROM foods ORDER BY food_id"), [(1,), (2,), (3,)])
+        self.assertEqual(self.table("SELECT meal, food_name FROM menu_items ORDER BY meal"),
+                         [("Dinner", "Rice"), ("Lunch", "Kale")])
+
+    def test_feed_matches_a_full_load(self):
+        foods = [(food_id, f"Food {food_id}", str(food_id * 10)) for food_id in range(1, 8)]
+        menus = [meal_row(food_id, "Rand", "2024-11-05", "Lunch", f"Food {food_id}", "Sides") for food_id in range(1, 8)]
+        self.scrape(foods, menus)
+        self.scrape(foods[2:] + [(9, "Food 9", "90")],
+                    menus[3:] + [meal_row(9, "Rand", "2024-11-05", "Dinner", "Food 9", "")])
+        change_feed.apply_changes(self.connection, self.dialect, self.feed_dir, batch_size=2)
+
+        expected = sqlite3.connect(":memory:")
+        db_loader.create_tables(expected, self.dialect)
+        db_loader.load(expected, self.dialect, self.nutrition_csv, meal_rows=self.store.read_date("2024-11-05"))
+        # foods.id is an autoincrement counter, so every other column is compared
+        for sql in (f"SELECT {', '.join(change_feed.FOOD_COLUMNS)} FROM foods ORDER BY food_id",
+                    "SELECT * FROM menu_items ORDER BY food_id"):
+            self.assertEqual(self.table(sql), expected.execute(sql).fetchall())
+        expected.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Single writer thread for the scrapers' CSV output.
+
+Scraping threads hand rows to a queue and carry on; one background thread
+owns the files, opens each of them once per run, buffers rows and writes them
+out when a batch fills up or a time limit passes. close() drains the queue,
+flushes and closes every file.
+"""
+import csv
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class BufferedCsvWriter:
+    """
+    Queue-fed CSV writer. Files are opened on first use in append mode, or explicitly with open_file().
+    """
+
+    def __init__(self, batch_size=500, flush_interval=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.error = None
+        self.files = {}
+        self.buffers = {}
+        self.rows_written = 0
+
+    def start(self):
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="csv-writer", daemon=True)
+                self.thread.start()
+
+    def open_file(self, filename, header=None, mode='w'):
+        """
+        Queue (re)creating a file, optionally with a header row. Rows written afterwards go after it.
+        """
+        self.start()
+        self.queue.put(("open", filename, (header, mode)))
+
+    def write_row(self, filename, row):
+        self.write_rows(filename, [row])
+
+    def write_rows(self, filename, rows):
+        if self.error is not None:
+            raise self.error
+        self.start()
+        self.queue.put(("rows", filename, list(rows)))
+
+    def close(self):
+        """
+        Flush everything still queued, close the files and stop the thread. Re-raises a writer error.
+        """
+        with self.start_lock:
+            thread = self.thread
+            self.thread = None
+        if thread is not None:
+            self.queue.put(_STOP)
+            thread.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _file(self, filename, mode='a'):
+        if filename not in self.files:
+            self.files[filename] = open(filename, mode=mode, newline='', encoding='utf-8')
+            self.buffers[filename] = []
+        return self.files[filename]
+
+    def _flush(self):
+        for filename, rows in self.buffers.items():
+            if rows:
+                file = self.files[filename]
+                csv.writer(file).writerows(rows)
+                file.flush()
+                self.rows_written += len(rows)
+                rows.clear()
+
+    def _close_files(self):
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+        self.buffers = {}
+
+    def run(self):
+        buffered = 0
+        last_flush = time.monotonic()
+        try:
+            while True:
+                timeout = max(self.flush_interval - (time.monotonic() - last_flush), 0)
+                try:
+                    message = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    message = None
+
+                if message is _STOP:
+                    break
+                if message is not None:
+                    kind, filename, payload = message
+                    if kind == "open":
+                        header, mode = payload
+                        self._flush()
+                        if filename in self.files:
+                            self.files.pop(filename).close()
+                            self.buffers.pop(filename)
+                        file = self._file(filename, mode)
+                        if header is not None:
+                            csv.writer(file).writerow(header)
+                    else:
+                        self._file(filename)
+                        self.buffers[filename].extend(payload)
+                        buffered += len(payload)
+
+                if buffered >= self.batch_size or time.monotonic() - last_flush >= self.flush_interval:
+                    self._flush()
+                    buffered = 0
+                    last_flush = time.monotonic()
+            self._flush()
+        except Exception as e:
+            print(f"Error in CSV writer thread: {e}")
+            self.error = e
+        finally:
+            self._close_files()
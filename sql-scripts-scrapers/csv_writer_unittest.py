@@ -0,0 +1,55 @@
+import concurrent.futures
+import csv
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from csv_writer import BufferedCsvWriter
+
+
+class TestBufferedCsvWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "out.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read(self):
+        with open(self.filename, newline='', encoding='utf-8') as file:
+            return list(csv.reader(file))
+
+    def test_rows_from_many_threads_land_after_header(self):
+        writer = BufferedCsvWriter(batch_size=7)
+        writer.open_file(self.filename, header=["a", "b"])
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            executor.map(lambda i: writer.write_row(self.filename, [i, i * 2]), range(100))
+        writer.close()
+
+        rows = self.read()
+        self.assertEqual(rows[0], ["a", "b"])
+        self.assertEqual(sorted(int(row[0]) for row in rows[1:]), list(range(100)))
+        self.assertEqual(writer.rows_written, 100)
+
+    def test_each_file_opened_once(self):
+        with patch("builtins.open", wraps=open) as mock_open:
+            with BufferedCsvWriter(batch_size=1) as writer:
+                for i in range(20):
+                    writer.write_row(self.filename, [i])
+        self.assertEqual(mock_open.call_count, 1)
+        self.assertEqual(len(self.read()), 20)
+
+    def test_flushes_on_time_threshold(self):
+        writer = BufferedCsvWriter(batch_size=1000, flush_interval=0.1)
+        writer.write_row(self.filename, ["x"])
+        time.sleep(0.4)
+        self.assertEqual(self.read(), [["x"]])
+        writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,343 @@
+"""
+Bulk loader for the API's MySQL tables (foods and menu_items).
+
+Replaces the LOAD DATA scripts (load_nutrition.sql, load_nutrition_windows_mamp.sql
+and load_dining_meals.sql). The scraper CSVs are read as a stream and their values
+parsed here ('NA' and 'N/A' become NULL, '12%' becomes 12, 'Today' becomes a date),
+then written with batched executemany upserts. Everything happens in one
+transaction, so the API keeps serving the old rows until the new ones are committed
+instead of seeing an empty table mid-load.
+
+The same code runs against SQLite, which is what the tests use.
+
+    python db_loader.py                      # MySQL, using DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME
+    python db_loader.py --sqlite dining.db   # local SQLite file
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import time
+
+import menu_store
+import scrape_checkpoint
+import scraper_common
+
+BATCH_SIZE = 1000
+
+NULL_VALUES = {"", "NA", "N/A", "NULL", "%"}
+
+# nutrition_info.csv column -> (foods column, type)
+FOOD_COLUMNS = [
+    ("Food ID", "food_id", "int"),
+    ("Food Name", "food_name", "text"),
+    ("Serving Size", "serving_size", "text"),
+    ("Calories", "calories", "int"),
+    ("Calories from Fat", "calories_from_fat", "int"),
+    ("Total Fat", "total_fat", "amount"),
+    ("Total Fat %", "total_fat_pdv", "int"),
+    ("Saturated Fat", "saturated_fat", "amount"),
+    ("Saturated Fat %", "saturated_fat_pdv", "int"),
+    ("Trans Fat", "trans_fat", "amount"),
+    ("Cholesterol", "cholesterol", "amount"),
+    ("Cholesterol %", "cholesterol_pdv", "int"),
+    ("Sodium", "sodium", "amount"),
+    ("Sodium %", "sodium_pdv", "int"),
+    ("Potassium", "potassium", "amount"),
+    ("Potassium %", "potassium_pdv", "int"),
+    ("Total Carbohydrates", "total_carbohydrates", "amount"),
+    ("Total Carbohydrates %", "total_carbohydrates_pdv", "int"),
+    ("Dietary Fiber", "dietary_fiber", "amount"),
+    ("Dietary Fiber %", "dietary_fiber_pdv", "int"),
+    ("Sugars", "sugars", "amount"),
+    ("Protein", "protein", "amount"),
+    ("Protein %", "protein_pdv", "int"),
+    ("Vitamin A %", "vitamin_a_pdv", "int"),
+    ("Vitamin C %", "vitamin_c_pdv", "int"),
+    ("Calcium %", "calcium_pdv", "int"),
+    ("Iron %", "iron_pdv", "int"),
+    ("Vitamin D %", "vitamin_d_pdv", "int"),
+    ("Ingredients", "ingredients", "text"),
+    ("Alcohol", "has_alcohol", "bool"),
+    ("Coconut", "has_coconut", "bool"),
+    ("Dairy", "has_dairy", "bool"),
+    ("Egg", "has_egg", "bool"),
+    ("Fish", "has_fish", "bool"),
+    ("Gluten", "has_gluten", "bool"),
+    ("Peanut", "has_peanut", "bool"),
+    ("Pork", "has_pork", "bool"),
+    ("Sesame", "has_sesame", "bool"),
+    ("Shellfish", "has_shellfish", "bool"),
+    ("Soy", "has_soy", "bool"),
+    ("Tree Nut", "has_tree_nut", "bool"),
+    ("Cage Free Certified", "is_cage_free_certified", "bool"),
+    ("Certified Organic", "is_certified_organic", "bool"),
+    ("Halal", "is_halal", "bool"),
+    ("Humanely Raised & Handled", "is_humanely_raised", "bool"),
+    ("Kosher", "is_kosher", "bool"),
+    ("Local", "is_local", "bool"),
+    ("Vegan", "is_vegan", "bool"),
+    ("Vegetarian", "is_vegetarian", "bool")
+]
+
+MENU_COLUMNS = ["food_id", "dining_hall", "date", "meal", "food_name", "category"]
+MENU_KEY = ["dining_hall", "date", "meal", "category", "food_name"]
+
+SQL_TYPES = {
+    "mysql": {"int": "INT", "text": "VARCHAR(255)", "amount": "VARCHAR(10)", "bool": "BOOLEAN"},
+    "sqlite": {"int": "INTEGER", "text": "TEXT", "amount": "TEXT", "bool": "INTEGER"}
+}
+
+
+def parse_int(value):
+    """
+    '12%' -> 12, '< 1%' -> 0, 'NA'/'N/A'/'%'/'' -> None.
+    """
+    value = (value or "").strip()
+    if value in NULL_VALUES:
+        return None
+    if value.startswith("<"):
+        return 0
+    try:
+        return int(float(value.rstrip("%").replace(",", "")))
+    except ValueError:
+        return None
+
+
+def parse_amount(value):
+    """
+    Amounts keep their unit ('20mg', '< 1g'); missing values become None.
+    """
+    value = (value or "").strip()
+    return None if value in NULL_VALUES else value
+
+
+def parse_text(value):
+    value = (value or "").strip()
+    return None if value in ("", "NULL") else value
+
+
+def parse_bool(value):
+    return 1 if str(value).strip().lower() == "true" else 0
+
+
+PARSERS = {"int": parse_int, "text": parse_text, "amount": parse_amount, "bool": parse_bool}
+
+
+def food_row(row):
+    """
+    Typed foods row, in FOOD_COLUMNS order, from a nutrition_info.csv row.
+    """
+    return tuple(PARSERS[kind](row.get(field)) for field, column, kind in FOOD_COLUMNS)
+
+
+def menu_row(row, today=None):
+    """
+    Typed menu_items row from a dining_meals_nutrition.csv row; 'Today' becomes today's date.
+    """
+    return (parse_int(row["Food ID"]), row["Dining Hall"], scraper_common.normalize_date(row["Date"], today),
+            row["Meal"], row["Food Name"], parse_text(row["Category"]))
+
+
+def read_csv_rows(filename, parse_row):
+    with open(filename, mode='r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            yield parse_row(row)
+
+
+def batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Dialect:
+    """
+    The SQL that differs between MySQL and SQLite.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.placeholder = "?" if name == "sqlite" else "%s"
+        self.types = SQL_TYPES[name]
+
+    def create_foods(self):
+        columns = ",\n    ".join(f"{column} {self.types[kind]}" for field, column, kind in FOOD_COLUMNS
+                                 if column not in ("food_id", "ingredients"))
+        if self.name == "sqlite":
+            return ("CREATE TABLE IF NOT EXISTS foods (\n"
+                    "    id INTEGER PRIMARY KEY AUTOINCREMENT,\n"
+                    "    food_id INTEGER NOT NULL UNIQUE,\n"
+                    f"    {columns},\n"
+                    "    ingredients TEXT\n"
+                    ")")
+        return ("CREATE TABLE IF NOT EXISTS foods (\n"
+                "    id INT AUTO_INCREMENT PRIMARY KEY,\n"
+                "    food_id INT NOT NULL,\n"
+                f"    {columns},\n"
+                "    ingredients TEXT,\n"
+                "    UNIQUE KEY idx_food_id (food_id)\n"
+                ")")
+
+    def create_menu_items(self):
+        if self.name == "sqlite":
+            return ("CREATE TABLE IF NOT EXISTS menu_items (\n"
+                    "    food_id INTEGER,\n"
+                    "    dining_hall TEXT NOT NULL,\n"
+                    "    date TEXT NOT NULL,\n"
+                    "    meal TEXT NOT NULL,\n"
+                    "    food_name TEXT NOT NULL,\n"
+                    "    category TEXT NOT NULL DEFAULT '',\n"
+                    f"    UNIQUE ({', '.join(MENU_KEY)})\n"
+                    ")")
+        return ("CREATE TABLE IF NOT EXISTS menu_items (\n"
+                "    food_id INT,\n"
+                "    dining_hall VARCHAR(100) NOT NULL,\n"
+                "    date DATE NOT NULL,\n"
+                "    meal VARCHAR(50) NOT NULL,\n"
+                "    food_name VARCHAR(255) NOT NULL,\n"
+                "    category VARCHAR(100) NOT NULL DEFAULT '',\n"
+                "    INDEX idx_food_id (food_id),\n"
+                f"    UNIQUE KEY idx_menu_entry ({', '.join(MENU_KEY)})\n"
+                ")")
+
+    def upsert(self, table, columns, key):
+        placeholders = ", ".join([self.placeholder] * len(columns))
+        updates = [column for column in columns if column not in key]
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        if self.name == "sqlite":
+            return sql + (f" ON CONFLICT({', '.join(key)}) DO UPDATE SET "
+                          + ", ".join(f"{column} = excluded.{column}" for column in updates))
+        return sql + " ON DUPLICATE KEY UPDATE " + ", ".join(f"{column} = VALUES({column})" for column in updates)
+
+
+def connect_mysql():
+    """
+    Connect with the same environment variables server.js uses. Exits with a hint if the MySQL driver
+    isn't installed.
+    """
+    try:
+        import mysql.connector  # Only needed when loading into MySQL
+    except ImportError:
+        print("MySQL support needs the mysql-connector-python package: pip install mysql-connector-python "
+              "(or pass --sqlite PATH to use a SQLite file)")
+        raise SystemExit(1)
+
+    return mysql.connector.connect(
+        host=os.environ.get("DB_HOST", "localhost"),
+        port=int(os.environ.get("DB_PORT", 3306)),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        database=os.environ.get("DB_NAME", "dining_halls"),
+        autocommit=False
+    )
+
+
+def create_tables(connection, dialect, reset=False):
+    cursor = connection.cursor()
+    if reset:
+        # One-off migration from the LOAD DATA tables, which have no unique keys to upsert on
+        cursor.execute("DROP TABLE IF EXISTS menu_items")
+        cursor.execute("DROP TABLE IF EXISTS foods")
+    cursor.execute(dialect.create_foods())
+    cursor.execute(dialect.create_menu_items())
+    connection.commit()
+
+
+def load(connection, dialect, nutrition_csv=scraper_common.nutrition_csv_filename,
+         meals_csv=scraper_common.meals_csv_filename, today=None, batch_size=BATCH_SIZE, meal_rows=None, done=None):
+    """
+    Upsert both CSVs in one transaction. Menu rows for the (date, hall) pairs in meals_csv are
+    replaced, so items dropped from a menu disappear; other halls and dates are left alone.
+    meal_rows (meals CSV style dicts, e.g. from a menu_store partition) can be given instead of
+    meals_csv. With done, the (date, hall, meal) menus a run finished (ScrapeCheckpoint.done_menus),
+    only those menus are replaced, like MenuStore.import_rows, and a meal that failed keeps its rows.
+    Returns (foods, menu items) loaded.
+    """
+    food_columns = [column for field, column, kind in FOOD_COLUMNS]
+    food_sql = dialect.upsert("foods", food_columns, ["food_id"])
+    menu_sql = dialect.upsert("menu_items", MENU_COLUMNS, MENU_KEY)
+
+    def menu_rows():
+        if meal_rows is None:
+            rows = read_csv_rows(meals_csv, lambda row: menu_row(row, today))
+        else:
+            rows = (menu_row(row, today) for row in meal_rows)
+        for row in rows:
+            # The unique key can't include NULL, so a missing category is stored as ''
+            yield row if row[5] is not None else row[:5] + ("",)
+
+    food_count = 0
+    menu_count = 0
+    cursor = connection.cursor()
+    try:
+        for batch in batches((row for row in read_csv_rows(nutrition_csv, food_row) if row[0] is not None), batch_size):
+            cursor.executemany(food_sql, batch)
+            food_count += len(batch)
+
+        if done is not None:
+            # Every finished menu is cleared, including ones that came back empty
+            menus = sorted({(scraper_common.normalize_date(date_value, today), hall_name, meal_time)
+                            for date_value, hall_name, meal_time in done})
+            cursor.executemany(f"DELETE FROM menu_items WHERE date = {dialect.placeholder} "
+                               f"AND dining_hall = {dialect.placeholder} AND meal = {dialect.placeholder}", menus)
+        halls = set()
+        for batch in batches(menu_rows(), batch_size):
+            new_halls = {(row[2], row[1]) for row in batch} - halls
+            if new_halls and done is None:
+                cursor.executemany(f"DELETE FROM menu_items WHERE date = {dialect.placeholder} "
+                                   f"AND dining_hall = {dialect.placeholder}", sorted(new_halls))
+            halls.update(new_halls)
+            cursor.executemany(menu_sql, batch)
+            menu_count += len(batch)
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return food_count, menu_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the scraper CSVs into the foods and menu_items tables.")
+    parser.add_argument("--nutrition-csv", default=scraper_common.nutrition_csv_filename)
+    parser.add_argument("--meals-csv", default=scraper_common.meals_csv_filename)
+    parser.add_argument("--menu-store", metavar="DIR", help="Read menus from a menu_store.py directory instead")
+    parser.add_argument("--date", help="With --menu-store, load only this date's partitions")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="Replace only the menus this scrape_checkpoint.jsonl finished instead of whole halls")
+    parser.add_argument("--sqlite", metavar="PATH", help="Load into a SQLite file instead of MySQL")
+    parser.add_argument("--reset-schema", action="store_true",
+                        help="Drop and recreate the tables (needed once for tables created by the old LOAD DATA scripts)")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    if args.sqlite:
+        connection, dialect = sqlite3.connect(args.sqlite), Dialect("sqlite")
+    else:
+        connection, dialect = connect_mysql(), Dialect("mysql")
+    try:
+        create_tables(connection, dialect, reset=args.reset_schema)
+        meal_rows = None
+        if args.menu_store:
+            store = menu_store.MenuStore(args.menu_store)
+            dates = [args.date] if args.date else store.dates()
+            meal_rows = (row for date in dates for row in store.read_date(date))
+        done = None
+        if args.checkpoint:
+            done = [(entry["date"], entry["hall"], entry["meal"])
+                    for entry in scrape_checkpoint.read_manifest(args.checkpoint).values()]
+        food_count, menu_count = load(connection, dialect, args.nutrition_csv, args.meals_csv,
+                                      meal_rows=meal_rows, done=done)
+    finally:
+        connection.close()
+    print(f"Loaded {food_count} foods and {menu_count} menu items in {time.time() - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
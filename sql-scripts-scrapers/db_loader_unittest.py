@@ -0,0 +1,149 @@
+import csv
+import datetime
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import db_loader
+import menu_store
+import scraper_common
+
+
+class TestParsing(unittest.TestCase):
+
+    def test_parse_values(self):
+        self.assertEqual(db_loader.parse_int("12%"), 12)
+        self.assertEqual(db_loader.parse_int("< 1%"), 0)
+        self.assertIsNone(db_loader.parse_int("%"))
+        self.assertIsNone(db_loader.parse_int("N/A"))
+        self.assertEqual(db_loader.parse_amount("< 1g"), "< 1g")
+        self.assertIsNone(db_loader.parse_amount("NA"))
+        self.assertEqual(db_loader.parse_bool("TRUE"), 1)
+        self.assertEqual(db_loader.parse_bool("False"), 0)
+
+    def test_menu_row_resolves_today(self):
+        row = {"Food ID": "3", "Dining Hall": "Rand", "Date": "Today", "Meal": "Lunch", "Food Name": "Kale", "Category": "Sides"}
+        self.assertEqual(db_loader.menu_row(row, datetime.date(2024, 11, 5)),
+                         (3, "Rand", "2024-11-05", "Lunch", "Kale", "Sides"))
+
+
+    def test_missing_mysql_driver_exits_with_a_hint(self):
+        # A None entry in sys.modules makes the import fail as if the package weren't installed
+        with mock.patch.dict(sys.modules, {"mysql": None, "mysql.connector": None}):
+            with self.assertRaises(SystemExit) as raised:
+                db_loader.connect_mysql()
+        self.assertEqual(raised.exception.code, 1)
+
+
+class TestLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.nutrition_csv = os.path.join(self.tmpdir, "nutrition_info.csv")
+        self.meals_csv = os.path.join(self.tmpdir, "dining_meals_nutrition.csv")
+        self.connection = sqlite3.connect(os.path.join(self.tmpdir, "dining.db"))
+        self.dialect = db_loader.Dialect("sqlite")
+        db_loader.create_tables(self.connection, self.dialect)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.tmpdir)
+
+    def write_csv(self, filename, header, rows):
+        with open(filename, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    def write_foods(self, calories="70"):
+        self.write_csv(self.nutrition_csv, scraper_common.NUTRITION_HEADER, [
+            scraper_common.nutrition_csv_row(1, "Kale", {"Calories": "20", "Protein": "< 1g", "Protein %": "%"},
+                                             {"Vegan": True}),
+            scraper_common.nutrition_csv_row(2, "Eggs", {"Calories": calories, "Total Fat %": "7%"}, {"Egg": True})
+        ])
+
+    def load(self, batch_size=db_loader.BATCH_SIZE):
+        return db_loader.load(self.connection, self.dialect, self.nutrition_csv, self.meals_csv,
+                              today=datetime.date(2024, 11, 5), batch_size=batch_size)
+
+    def test_load_and_reload(self):
+        self.write_foods()
+        self.write_csv(self.meals_csv, scraper_common.MEALS_HEADER, [
+            [1, "Rand", "Today", "Lunch", "Kale", "Sides"],
+            [2, "Rand", "Today", "Breakfast", "Eggs", "Hot Line"],
+            [2, "Rand", "2024/11/06", "Breakfast", "Eggs", "Hot Line"]
+        ])
+        self.assertEqual(self.load(batch_size=2), (2, 3))
+        self.assertEqual(self.connection.execute(
+            "SELECT calories, protein, protein_pdv, is_vegan, has_egg FROM foods WHERE food_id = 1").fetchone(),
+            (20, "< 1g", None, 1, 0))
+
+        # A second load updates foods in place and replaces the menus of the (date, hall) pairs it contains
+        self.write_foods(calories="90")
+        self.write_csv(self.meals_csv, scraper_common.MEALS_HEADER, [
+            [2, "Rand", "2024/11/05", "Breakfast", "Eggs", "Hot Line"]
+        ])
+        self.assertEqual(self.load(), (2, 1))
+        self.assertEqual(self.connection.execute("SELECT COUNT(*), MAX(calories) FROM foods").fetchone(), (2, 90))
+        self.assertEqual(self.connection.execute(
+            "SELECT date, meal FROM menu_items ORDER BY date").fetchall(),
+            [("2024-11-05", "Breakfast"), ("2024-11-06", "Breakfast")])
+
+    def test_reload_replaces_only_its_halls_or_done_menus(self):
+        self.write_foods()
+        self.write_csv(self.meals_csv, scraper_common.MEALS_HEADER, [
+            [1, "Rand", "Today", "Lunch", "Kale", "Sides"],
+            [2, "Rand", "Today", "Breakfast", "Eggs", "Hot Line"],
+            [2, "Commons", "Today", "Breakfast", "Eggs", "Hot Line"]
+        ])
+        self.load()
+
+        # Commons isn't in this batch, so its menu for the same date stays
+        self.write_csv(self.meals_csv, scraper_common.MEALS_HEADER, [[1, "Rand", "Today", "Dinner", "Kale", "Sides"]])
+        self.load()
+        self.assertEqual(self.connection.execute(
+            "SELECT dining_hall, meal FROM menu_items ORDER BY dining_hall").fetchall(),
+            [("Commons", "Breakfast"), ("Rand", "Dinner")])
+
+        # With done, Rand's Dinner is replaced, Commons' finished (now empty) Breakfast is cleared
+        # and Rand's Lunch, which the run didn't finish, is added to the hall's rows
+        self.write_csv(self.meals_csv, scraper_common.MEALS_HEADER, [
+            [2, "Rand", "Today", "Dinner", "Eggs", "Hot Line"],
+            [1, "Rand", "Today", "Lunch", "Kale", "Sides"]
+        ])
+        db_loader.load(self.connection, self.dialect, self.nutrition_csv, self.meals_csv,
+                       today=datetime.date(2024, 11, 5),
+                       done=[("2024-11-05", "Rand", "Dinner"), ("2024/11/05", "Commons", "Breakfast")])
+        self.assertEqual(self.connection.execute(
+            "SELECT dining_hall, meal, food_name FROM menu_items ORDER BY meal").fetchall(),
+            [("Rand", "Dinner", "Eggs"), ("Rand", "Lunch", "Kale")])
+
+    def test_failed_load_keeps_previous_rows(self):
+        self.write_foods()
+        self.write_csv(self.meals_csv, scraper_common.MEALS_HEADER, [[1, "Rand", "Today", "Lunch", "Kale", "Sides"]])
+        self.load()
+
+        self.write_foods(calories="90")
+        self.write_csv(self.meals_csv, ["Food ID", "Dining Hall"], [[1, "Rand"]])
+        with self.assertRaises(KeyError):
+            self.load()
+        self.assertEqual(self.connection.execute("SELECT MAX(calories) FROM foods").fetchone(), (70,))
+        self.assertEqual(self.connection.execute("SELECT COUNT(*) FROM menu_items").fetchone(), (1,))
+
+    def test_load_one_day_from_menu_store(self):
+        self.write_foods()
+        store = menu_store.MenuStore(os.path.join(self.tmpdir, "menu_store"))
+        store.write_partition("2024-11-06", "Rand", [
+            {"Food ID": "2", "Meal": "Breakfast", "Food Name": "Eggs", "Category": "Hot Line"}
+        ])
+        self.assertEqual(db_loader.load(self.connection, self.dialect, self.nutrition_csv,
+                                        meal_rows=store.read_date("2024-11-06")), (2, 1))
+        self.assertEqual(self.connection.execute("SELECT date, food_id FROM menu_items").fetchall(), [("2024-11-06", 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+"""
+Shared Chrome setup for the Selenium scrapers.
+
+The scrapers only read text out of the DOM, so the lean profile runs headless,
+returns from driver.get() once the DOM is ready (the scrapers' own waits cover
+the AJAX that follows), and has Chrome drop requests for images, fonts, media
+and analytics scripts before they leave the browser. Stylesheets and the
+site's own scripts still load: visibility checks and the jQuery request
+counter in scraper_waits depend on them. The full profile is the old setup,
+kept for debugging in a visible window.
+
+The profile comes from the SCRAPER_BROWSER_PROFILE environment variable
+(lean by default) unless a script passes one in. SCRAPER_CHROMEDRIVER names a
+chromedriver binary to use instead of downloading one.
+
+    python driver_profile.py --benchmark --runs 3
+    python driver_profile.py --benchmark --url https://campusdining.vanderbilt.edu/wait-times/ --json results.json
+"""
+import argparse
+import json
+import os
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+import scraper_common
+import scraper_waits
+
+LEAN = "lean"
+FULL = "full"
+PROFILES = [FULL, LEAN]
+PROFILE_ENV = "SCRAPER_BROWSER_PROFILE"
+DRIVER_PATH_ENV = "SCRAPER_CHROMEDRIVER"
+
+BLOCKED_EXTENSIONS = [
+    # Images
+    "png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp",
+    # Fonts
+    "woff", "woff2", "ttf", "otf", "eot",
+    # Media
+    "mp4", "webm", "mp3", "ogg", "wav", "m4a"
+]
+# Chrome DevTools URL patterns; "*" matches anything. Each extension also gets a
+# pattern for a query string after it (cache busters like logo.png?v=3).
+BLOCKED_URL_PATTERNS = [f"*.{extension}" for extension in BLOCKED_EXTENSIONS] + \
+    [f"*.{extension}?*" for extension in BLOCKED_EXTENSIONS] + [
+    # Analytics and tracking scripts
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*connect.facebook.net*",
+    "*hotjar.com*", "*newrelic.com*", "*nr-data.net*", "*siteimproveanalytics*", "*clarity.ms*"
+]
+
+
+def default_profile():
+    return os.environ.get(PROFILE_ENV, LEAN)
+
+
+def chrome_options(profile=None):
+    """
+    Chrome options for a profile. Both profiles use a fixed 1920x1080 window.
+    """
+    profile = profile or default_profile()
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown browser profile {profile!r}, expected one of {PROFILES}")
+
+    options = Options()
+    options.add_argument("--disable-gpu")  # Disable GPU hardware acceleration
+    options.add_argument("--window-size=1920,1080")  # Set the window size to ensure everything fits correctly
+    options.add_argument("--no-sandbox")  # Bypass OS security model
+    options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
+    if profile == LEAN:
+        options.add_argument("--headless=new")
+        options.add_argument("--mute-audio")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        options.page_load_strategy = "eager"
+    return options
+
+
+def block_resources(driver, patterns=BLOCKED_URL_PATTERNS):
+    """
+    Have Chrome fail requests matching the patterns. Stays in effect across navigations.
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+
+
+def create_chrome(profile=None, driver_path=None):
+    """
+    Start Chrome with a profile. driver_path is a chromedriver binary; by default Selenium finds one.
+    """
+    profile = profile or default_profile()
+    service = Service(driver_path) if driver_path else Service()
+    driver = webdriver.Chrome(service=service, options=chrome_options(profile))
+    if profile == LEAN:
+        block_resources(driver)
+    return driver
+
+
+def driver_memory(driver):
+    """
+    Resident memory in bytes of chromedriver and every browser process under it, or None without psutil.
+    """
+    try:
+        import psutil  # Only needed for the benchmark
+    except ImportError:
+        return None
+    process = psutil.Process(driver.service.process.pid)
+    total = 0
+    for member in [process] + process.children(recursive=True):
+        try:
+            total += member.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+def benchmark_profile(profile, url, runs):
+    """
+    Start a fresh driver per run and time startup and page load until the network is idle.
+    Returns [{"startup", "page_ready", "memory"}] per run.
+    """
+    results = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        driver = create_chrome(profile)
+        try:
+            started = time.perf_counter()
+            driver.get(url)
+            scraper_waits.wait_until(driver, scraper_waits.network_idle, 60)
+            ready = time.perf_counter()
+            results.append({
+                "startup": started - start_time,
+                "page_ready": ready - started,
+                "memory": driver_memory(driver)
+            })
+        finally:
+            driver.quit()
+    return results
+
+
+def _median(values):
+    values = sorted(value for value in values if value is not None)
+    return values[len(values) // 2] if values else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the lean and full browser profiles.")
+    parser.add_argument("--benchmark", action="store_true", help="Time page loads and measure memory per profile")
+    parser.add_argument("--url", default=scraper_common.BASE_URL)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", metavar="PATH", help="Also write the per-run results here")
+    args = parser.parse_args(argv)
+
+    if not args.benchmark:
+        print(f"Default profile: {default_profile()} (set {PROFILE_ENV}=full for a visible, unfiltered browser)")
+        return
+
+    results = {profile: benchmark_profile(profile, args.url, args.runs) for profile in PROFILES}
+    print(f"{'profile':8} {'startup':>9} {'page ready':>11} {'memory':>10}")
+    for profile, runs in results.items():
+        memory = _median(run["memory"] for run in runs)
+        print(f"{profile:8} {_median(run['startup'] for run in runs):8.2f}s "
+              f"{_median(run['page_ready'] for run in runs):10.2f}s "
+              f"{'n/a' if memory is None else f'{memory / 2 ** 20:.0f} MB':>10}")
+    full_ready = _median(run["page_ready"] for run in results[FULL])
+    lean_ready = _median(run["page_ready"] for run in results[LEAN])
+    print(f"Lean page ready is {full_ready / max(lean_ready, 1e-9):.1f}x faster (median of {args.runs} runs)")
+
+    if args.json:
+        with open(args.json, mode='w', encoding='utf-8') as file:
+            json.dump({"url": args.url, "runs": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
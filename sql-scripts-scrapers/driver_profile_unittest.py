@@ -0,0 +1,60 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+import driver_profile
+
+
+class TestChromeOptions(unittest.TestCase):
+
+    def test_lean_profile(self):
+        options = driver_profile.chrome_options(driver_profile.LEAN)
+        self.assertIn("--headless=new", options.arguments)
+        self.assertIn("--blink-settings=imagesEnabled=false", options.arguments)
+        self.assertEqual(options.page_load_strategy, "eager")
+        self.assertEqual(options.experimental_options["prefs"]["profile.managed_default_content_settings.images"], 2)
+
+    def test_full_profile_loads_everything(self):
+        options = driver_profile.chrome_options(driver_profile.FULL)
+        self.assertNotIn("--headless=new", options.arguments)
+        self.assertIn("--window-size=1920,1080", options.arguments)
+        self.assertEqual(options.page_load_strategy, "normal")
+
+    def test_profile_from_environment(self):
+        with patch.dict(os.environ, {driver_profile.PROFILE_ENV: driver_profile.FULL}):
+            self.assertEqual(driver_profile.default_profile(), driver_profile.FULL)
+            self.assertNotIn("--headless=new", driver_profile.chrome_options().arguments)
+        with patch.dict(os.environ, {driver_profile.PROFILE_ENV: "tiny"}):
+            with self.assertRaises(ValueError):
+                driver_profile.chrome_options()
+
+
+class TestCreateChrome(unittest.TestCase):
+
+    @patch('driver_profile.webdriver.Chrome')
+    def test_lean_driver_blocks_resources(self, mock_chrome):
+        driver = driver_profile.create_chrome(driver_profile.LEAN)
+        self.assertIs(driver, mock_chrome.return_value)
+        calls = driver.execute_cdp_cmd.call_args_list
+        self.assertEqual(calls[0].args, ("Network.enable", {}))
+        self.assertEqual(calls[1].args[0], "Network.setBlockedURLs")
+        blocked = calls[1].args[1]["urls"]
+        self.assertIn("*.woff2", blocked)
+        self.assertIn("*.png?*", blocked)
+        self.assertIn("*google-analytics.com*", blocked)
+        # Stylesheets and scripts from the site itself still load
+        self.assertFalse([pattern for pattern in blocked if ".css" in pattern or ".js" in pattern])
+
+    @patch('driver_profile.webdriver.Chrome')
+    def test_full_driver_blocks_nothing(self, mock_chrome):
+        driver = driver_profile.create_chrome(driver_profile.FULL)
+        driver.execute_cdp_cmd.assert_not_called()
+
+    def test_memory_counts_the_process_tree(self):
+        driver = MagicMock()
+        driver.service.process.pid = os.getpid()
+        self.assertGreater(driver_profile.driver_memory(driver), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
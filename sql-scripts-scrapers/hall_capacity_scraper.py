@@ -1,23 +1,13 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 import csv
 import time
+import driver_profile
 
-# Configure Chrome options
-options = Options()
-options.add_argument("--disable-gpu")  # Disable GPU hardware acceleration
-options.add_argument("--window-size=1920,1080")  # Set window size to ensure everything fits correctly
-options.add_argument("--no-sandbox")  # Bypass OS security model
-options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
-options.add_argument("--headless")  # Run Chrome in headless mode
-
-# Initialize WebDriver
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+# Initialize WebDriver: headless, with images, fonts and analytics blocked
+driver = driver_profile.create_chrome(driver_path=ChromeDriverManager().install())
 
 # URL to scrape
 url = "https://campusdining.vanderbilt.edu/wait-times/"
@@ -0,0 +1,313 @@
+"""
+Compiled weekly opening hours for "which halls are open now" lookups.
+
+Hours live in three shapes that don't agree with each other:
+
+    dining_hall_hours.csv   Dining Hall,Day,Opening,Closing     (24h "7:00", or "Closed")
+    dininghall_hours.csv    Dining Hall,Day,Breakfast,Lunch,Dinner   ("7:00AM-10:00AM" or "CLOSED")
+    data.sql                INSERT INTO Hours (dining_hall_id, day_of_week, meal_type_id, opening_time, closing_time)
+
+The compiler parses each of them once into minute-of-week intervals per hall
+(Monday 00:00 = 0), splitting ranges that cross midnight and wrapping Sunday
+night into Monday morning, then merges each hall's intervals into sorted
+start/end lists. is_open, open_halls and next_opening are then a bisect into
+those lists instead of string parsing on every request.
+
+The sources spell the same hall differently ("Zeppos" and "Zeppos Dining",
+"Suzie's Featheringhill" and "Suzie’s Featheringill"), so halls are matched on
+hall_key(): the name casefolded, with accents and curly quotes folded, the
+"Dining Center/Hall" and "- Contains Peanuts" suffixes stripped, and the few
+remaining differences mapped through HALL_ALIASES. A hall found in more than
+one source takes its name and hours from the first one listed in SOURCES, and
+lookups accept any of its spellings.
+
+    python hours_index.py --compile
+    python hours_index.py --at "2024-11-05 12:30"
+    python hours_index.py --hall "Rand Dining Center"
+"""
+import argparse
+import bisect
+import csv
+import datetime
+import json
+import os
+import re
+import unicodedata
+
+DEFAULT_INDEX_PATH = "hours_index.json"
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+CLOCK_PATTERN = re.compile(r"^\s*(\d{1,2}):(\d{2})(?::\d{2})?\s*([AaPp][Mm])?\s*$")
+SQL_HALL_PATTERN = re.compile(r"\('((?:[^']|'')*)'\)")
+SQL_HOURS_PATTERN = re.compile(r"\(\s*(\d+)\s*,\s*'(\w+)'\s*,\s*\d+\s*,\s*'([\d:]+)'\s*,\s*'([\d:]+)'\s*\)")
+
+QUOTES = str.maketrans({"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"'})
+CONTAINS_SUFFIX_PATTERN = re.compile(r"\s+-\s+contains\b.*$")
+DINING_SUFFIX_PATTERN = re.compile(r"\s+dining(\s+(center|hall))?$")
+
+# hall_key() -> hall_key() for names that differ by more than spelling
+HALL_ALIASES = {
+    "suziesfeatheringhill": "suziesfeatheringill",
+    "suziescentrallibraryfoodforthoughtcafe": "suziesfoodforthoughtcafe",
+    "pub": "pubatovercupoak"
+}
+
+
+def parse_clock(text):
+    """
+    Minutes after midnight for "7:00", "07:00:00" or "7:00PM". Returns None for "Closed" and anything else.
+    """
+    match = CLOCK_PATTERN.match(text or "")
+    if not match:
+        return None
+    hours, minutes, suffix = int(match.group(1)), int(match.group(2)), match.group(3)
+    if suffix:
+        hours = hours % 12 + (12 if suffix.upper() == "PM" else 0)
+    if hours > 24 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+def hall_key(name):
+    """
+    The key halls are matched on: "The Commons Dining Center" and "Commons" both give "commons".
+    """
+    text = unicodedata.normalize("NFKD", name.translate(QUOTES))
+    text = "".join(character for character in text if not unicodedata.combining(character)).casefold().strip()
+    text = CONTAINS_SUFFIX_PATTERN.sub("", text)
+    text = re.sub(r"^the\s+", "", text)
+    text = DINING_SUFFIX_PATTERN.sub("", text)
+    key = re.sub(r"[^a-z0-9]+", "", text)
+    return HALL_ALIASES.get(key, key)
+
+
+def week_minute(when):
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+def day_interval(day, opening, closing):
+    """
+    [(start, end)] minute-of-week intervals for one day's opening and closing minutes.
+    A closing time at or before the opening time runs past midnight, and past Sunday it wraps to Monday.
+    """
+    start = DAYS.index(day.strip().capitalize()) * MINUTES_PER_DAY + opening
+    end = start - opening + closing
+    if closing <= opening:
+        end += MINUTES_PER_DAY
+    if end > MINUTES_PER_WEEK:
+        return [(start, MINUTES_PER_WEEK), (0, end - MINUTES_PER_WEEK)]
+    return [(start, end)]
+
+
+def merge_intervals(intervals):
+    """
+    Sort intervals and join the ones that overlap or touch. Returns (starts, ends).
+    """
+    starts, ends = [], []
+    for start, end in sorted(intervals):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def _read_text(path):
+    # The scraped CSVs were written on Windows, so hall names like "Café" may be cp1252
+    try:
+        with open(path, encoding='utf-8') as file:
+            return file.read()
+    except UnicodeDecodeError:
+        with open(path, encoding='cp1252') as file:
+            return file.read()
+
+
+def read_opening_closing_csv(path):
+    """
+    {hall: [(start, end)]} from dining_hall_hours.csv (Opening and Closing columns).
+    """
+    halls = {}
+    for row in csv.DictReader(_read_text(path).splitlines()):
+        intervals = halls.setdefault(row["Dining Hall"].strip(), [])
+        opening, closing = parse_clock(row["Opening"]), parse_clock(row["Closing"])
+        if opening is not None and closing is not None:
+            intervals.extend(day_interval(row["Day"], opening, closing))
+    return halls
+
+
+def read_meal_ranges_csv(path):
+    """
+    {hall: [(start, end)]} from dininghall_hours.csv, one "7:00AM-10:00AM" range per meal column.
+    """
+    halls = {}
+    for row in csv.DictReader(_read_text(path).splitlines()):
+        intervals = halls.setdefault(row["Dining Hall"].strip(), [])
+        for meal in ("Breakfast", "Lunch", "Dinner"):
+            opening_text, _, closing_text = (row.get(meal) or "").partition("-")
+            opening, closing = parse_clock(opening_text), parse_clock(closing_text)
+            if opening is not None and closing is not None:
+                intervals.extend(day_interval(row["Day"], opening, closing))
+    return halls
+
+
+def read_hours_sql(path):
+    """
+    {hall: [(start, end)]} from the DiningHalls and Hours inserts in data.sql. Hall ids follow insert order.
+    """
+    text = _read_text(path)
+    names = []
+    halls_insert = re.search(r"INSERT INTO DiningHalls[^;]*;", text)
+    if halls_insert:
+        names = [name.replace("''", "'") for name in SQL_HALL_PATTERN.findall(halls_insert.group(0))]
+
+    halls = {name: [] for name in names}
+    hours_insert = re.search(r"INSERT INTO Hours[^;]*;", text)
+    for hall_id, day, opening, closing in SQL_HOURS_PATTERN.findall(hours_insert.group(0) if hours_insert else ""):
+        index = int(hall_id) - 1
+        if 0 <= index < len(names):
+            halls[names[index]].extend(day_interval(day, parse_clock(opening), parse_clock(closing)))
+    return halls
+
+
+# Most recently scraped first
+SOURCES = [
+    ("dining_hall_hours.csv", read_opening_closing_csv),
+    ("dininghall_hours.csv", read_meal_ranges_csv),
+    ("data.sql", read_hours_sql)
+]
+
+
+class HoursIndex:
+    """
+    Sorted, non-overlapping minute-of-week intervals per hall: {hall: (starts, ends)}.
+    """
+
+    def __init__(self, halls=None, sources=None):
+        self.halls = halls or {}
+        self.sources = sources or {}
+        self.names = {hall_key(hall): hall for hall in self.halls}
+
+    @classmethod
+    def compile(cls, sources=SOURCES):
+        """
+        Parse [(path, reader)] sources, skipping missing files. Halls are matched on hall_key();
+        the first source to list a hall wins.
+        """
+        halls, hall_sources, names = {}, {}, {}
+        for path, reader in sources:
+            if not os.path.exists(path):
+                continue
+            for hall, intervals in reader(path).items():
+                key = hall_key(hall)
+                if key in names:
+                    # Two spellings in the same source (or a lower priority one) add nothing new
+                    if hall_sources[names[key]] == os.path.basename(path):
+                        halls[names[key]] = merge_intervals(list(zip(*halls[names[key]])) + intervals)
+                    continue
+                names[key] = hall
+                halls[hall] = merge_intervals(intervals)
+                hall_sources[hall] = os.path.basename(path)
+        return cls(halls, hall_sources)
+
+    def resolve(self, hall):
+        """
+        The index's name for any spelling of a hall, or hall itself if it isn't indexed.
+        """
+        return hall if hall in self.halls else self.names.get(hall_key(hall), hall)
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        data = {hall: {"starts": starts, "ends": ends, "source": self.sources.get(hall)}
+                for hall, (starts, ends) in sorted(self.halls.items())}
+        with open(path, mode='w', encoding='utf-8') as file:
+            json.dump(data, file, indent=1)
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        return cls({hall: (entry["starts"], entry["ends"]) for hall, entry in data.items()},
+                   {hall: entry["source"] for hall, entry in data.items()})
+
+    def _interval_at(self, hall, minute):
+        starts, ends = self.halls.get(self.resolve(hall), ([], []))
+        index = bisect.bisect_right(starts, minute) - 1
+        if index >= 0 and minute < ends[index]:
+            return index
+        return None
+
+    def is_open(self, hall, when):
+        return self._interval_at(hall, week_minute(when)) is not None
+
+    def open_halls(self, when):
+        minute = week_minute(when)
+        return sorted(hall for hall in self.halls if self._interval_at(hall, minute) is not None)
+
+    def closes_at(self, hall, when):
+        """
+        When the hall next closes if it's open at when, otherwise None.
+        """
+        minute = week_minute(when)
+        index = self._interval_at(hall, minute)
+        if index is None:
+            return None
+        starts, ends = self.halls[self.resolve(hall)]
+        end = ends[index]
+        # Sunday night's interval carries on into Monday morning's
+        if end == MINUTES_PER_WEEK and starts[0] == 0 and index != 0:
+            end += ends[0]
+        return _at_minute(when, end - minute)
+
+    def next_opening(self, hall, when):
+        """
+        The next time after when that the hall opens, looking up to a week ahead, or None if it never does.
+        """
+        starts, ends = self.halls.get(self.resolve(hall), ([], []))
+        # A Monday 00:00 start that continues Sunday night isn't an opening
+        wraps = bool(starts) and starts[0] == 0 and ends[-1] == MINUTES_PER_WEEK
+        openings = starts[1:] if wraps else starts
+        if not openings:
+            return None
+        minute = week_minute(when)
+        index = bisect.bisect_right(openings, minute)
+        if index < len(openings):
+            return _at_minute(when, openings[index] - minute)
+        return _at_minute(when, openings[0] + MINUTES_PER_WEEK - minute)
+
+
+def _at_minute(when, minutes_ahead):
+    return when.replace(second=0, microsecond=0) + datetime.timedelta(minutes=minutes_ahead)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile opening hours and answer which halls are open.")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--compile", action="store_true", help="Rebuild the index from the hours files")
+    parser.add_argument("--at", help="Time to ask about, as YYYY-MM-DD HH:MM (default now)")
+    parser.add_argument("--hall", help="Show when this hall next opens or closes")
+    args = parser.parse_args(argv)
+
+    if args.compile or not os.path.exists(args.index):
+        index = HoursIndex.compile()
+        index.save(args.index)
+        print(f"Compiled hours for {len(index.halls)} halls to {args.index}")
+    else:
+        index = HoursIndex.load(args.index)
+
+    when = datetime.datetime.strptime(args.at, "%Y-%m-%d %H:%M") if args.at else datetime.datetime.now()
+    if args.hall:
+        closing = index.closes_at(args.hall, when)
+        if closing is not None:
+            print(f"{args.hall} is open until {closing:%a %H:%M}")
+        else:
+            opening = index.next_opening(args.hall, when)
+            print(f"{args.hall} is closed" + (f", opens {opening:%a %H:%M}" if opening else ""))
+    else:
+        for hall in index.open_halls(when):
+            print(hall)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+import hours_index
+from hours_index import HoursIndex
+
+# 2024-11-04 is a Monday
+MONDAY = datetime.date(2024, 11, 4)
+
+
+def at(days, hour, minute=0):
+    return datetime.datetime.combine(MONDAY + datetime.timedelta(days=days), datetime.time(hour, minute))
+
+
+class TestParsing(unittest.TestCase):
+
+    def test_hall_key(self):
+        same = [("Zeppos", "Zeppos Dining"), ("Commons", "The Commons Dining Center"), ("VandyBlenz", "Vandy Blenz"),
+                ("Suzie's Featheringhill", "Suzie\u2019s Featheringill"),
+                ("Café Carmichael - Contains Peanuts & Treenuts", "Cafe Carmichael"),
+                ("E. Bronson Ingram", "E. Bronson Ingram Dining Center"),
+                ("Rothschild Dining Hall", "Rothschild Dining Center - Contains Peanuts & Treenuts"),
+                ("The Pub", "The Pub at Overcup Oak")]
+        for first, second in same:
+            self.assertEqual(hours_index.hall_key(first), hours_index.hall_key(second), (first, second))
+        self.assertNotEqual(hours_index.hall_key("Commons Munchie"), hours_index.hall_key("Commons"))
+
+    def test_parse_clock_formats(self):
+        self.assertEqual(hours_index.parse_clock("7:00"), 420)
+        self.assertEqual(hours_index.parse_clock("07:30:00"), 450)
+        self.assertEqual(hours_index.parse_clock("5:00PM"), 1020)
+        self.assertEqual(hours_index.parse_clock("12:00PM"), 720)
+        self.assertEqual(hours_index.parse_clock("12:00AM"), 0)
+        self.assertIsNone(hours_index.parse_clock("Closed"))
+        self.assertIsNone(hours_index.parse_clock("CLOSED"))
+
+    def test_range_past_midnight_is_split_and_wraps_the_week(self):
+        self.assertEqual(hours_index.day_interval("Friday", 1320, 120), [(7080, 7320)])
+        self.assertEqual(hours_index.day_interval("Sunday", 1320, 120),
+                         [(9960, hours_index.MINUTES_PER_WEEK), (0, 120)])
+
+    def test_merge_joins_overlapping_and_touching(self):
+        self.assertEqual(hours_index.merge_intervals([(600, 900), (420, 600), (1020, 1260), (800, 950)]),
+                         ([420, 1020], [950, 1260]))
+
+
+class TestHoursIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.opening_csv = os.path.join(self.tmpdir, "dining_hall_hours.csv")
+        with open(self.opening_csv, mode='wb') as file:
+            file.write("Dining Hall,Day,Opening,Closing\n"
+                       "Rand Dining Center,Monday,7:00,10:00\n"
+                       "Rand Dining Center,Monday,11:00,15:00\n"
+                       "Rand Dining Center,Sunday,Closed,Closed\n"
+                       "Branscomb Munchie,Sunday,20:00,2:00\n"
+                       "Café Carmichael,Monday,7:00,21:00\n".encode("cp1252"))
+        self.ranges_csv = os.path.join(self.tmpdir, "dininghall_hours.csv")
+        with open(self.ranges_csv, mode='w', encoding='utf-8') as file:
+            file.write("Dining Hall,Day,Breakfast,Lunch,Dinner,\n"
+                       "Rand Dining Center,Tuesday,7:00AM-10:00AM,11:00AM-3:00PM,5:00PM-9:00PM,\n"
+                       "The Commons Dining Center,Monday,CLOSED,11:00AM-3:00PM,5:00PM-9:00PM,\n")
+        self.sql = os.path.join(self.tmpdir, "data.sql")
+        with open(self.sql, mode='w', encoding='utf-8') as file:
+            file.write("INSERT INTO DiningHalls (name) VALUES\n"
+                       "    ('The Pub'),\n    ('The Commons Dining Center');\n"
+                       "INSERT INTO Hours (dining_hall_id, day_of_week, meal_type_id, opening_time, closing_time) VALUES\n"
+                       "    (1, 'Monday', 2, '11:00:00', '14:00:00'),  -- Lunch\n"
+                       "    (2, 'Tuesday', 1, '06:00:00', '09:00:00');\n")
+        self.index = HoursIndex.compile([
+            (self.opening_csv, hours_index.read_opening_closing_csv),
+            (self.ranges_csv, hours_index.read_meal_ranges_csv),
+            (self.sql, hours_index.read_hours_sql),
+            (os.path.join(self.tmpdir, "missing.csv"), hours_index.read_opening_closing_csv)
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_first_source_listing_a_hall_wins(self):
+        self.assertEqual(self.index.sources["Rand Dining Center"], "dining_hall_hours.csv")
+        self.assertEqual(self.index.sources["The Commons Dining Center"], "dininghall_hours.csv")
+        self.assertEqual(self.index.sources["The Pub"], "data.sql")
+        # Rand's Tuesday hours only exist in the lower priority source
+        self.assertFalse(self.index.is_open("Rand Dining Center", at(1, 8)))
+        self.assertEqual(self.index.halls["The Pub"], ([660], [840]))
+
+    def test_spellings_of_a_hall_are_one_hall(self):
+        # data.sql's 'The Commons Dining Center' is the ranges CSV's hall; its Tuesday breakfast isn't used
+        self.assertEqual(sorted(self.index.halls), ["Branscomb Munchie", "Café Carmichael", "Rand Dining Center",
+                                                    "The Commons Dining Center", "The Pub"])
+        self.assertFalse(self.index.is_open("Commons", at(1, 7)))
+        self.assertTrue(self.index.is_open("cafe carmichael - Contains Peanuts & Treenuts", at(0, 8)))
+        self.assertEqual(self.index.resolve("Commons"), "The Commons Dining Center")
+        self.assertEqual(self.index.resolve("Nowhere"), "Nowhere")
+
+    def test_open_halls(self):
+        self.assertEqual(self.index.open_halls(at(0, 8)), ["Café Carmichael", "Rand Dining Center"])
+        self.assertEqual(self.index.open_halls(at(0, 12)),
+                         ["Café Carmichael", "Rand Dining Center", "The Commons Dining Center", "The Pub"])
+        self.assertEqual(self.index.open_halls(at(0, 10)), ["Café Carmichael"])
+        self.assertEqual(self.index.open_halls(at(0, 1)), ["Branscomb Munchie"])
+        self.assertEqual(self.index.open_halls(at(6, 23)), ["Branscomb Munchie"])
+
+    def test_next_opening_and_closing(self):
+        self.assertEqual(self.index.next_opening("Rand Dining Center", at(0, 10, 15)), at(0, 11))
+        # After Monday lunch the next opening is a week later
+        self.assertEqual(self.index.next_opening("Rand Dining Center", at(0, 16)), at(7, 7))
+        self.assertIsNone(self.index.next_opening("Nowhere", at(0, 16)))
+        self.assertEqual(self.index.closes_at("Rand Dining Center", at(0, 12, 30)), at(0, 15))
+        self.assertIsNone(self.index.closes_at("Rand Dining Center", at(0, 10, 30)))
+
+    def test_midnight_wrap_is_one_opening(self):
+        self.assertEqual(self.index.next_opening("Branscomb Munchie", at(0, 1)), at(6, 20))
+        self.assertEqual(self.index.closes_at("Branscomb Munchie", at(6, 22)), at(7, 2))
+
+    def test_save_and_load(self):
+        path = os.path.join(self.tmpdir, "hours_index.json")
+        self.index.save(path)
+        loaded = HoursIndex.load(path)
+        self.assertEqual(loaded.halls, {hall: (list(starts), list(ends)) for hall, (starts, ends) in self.index.halls.items()})
+        self.assertEqual(loaded.sources, self.index.sources)
+        self.assertEqual(loaded.open_halls(at(0, 12)), self.index.open_halls(at(0, 12)))
+
+
+if __name__ == "__main__":
+    unittest.main()
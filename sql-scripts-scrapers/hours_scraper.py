@@ -1,20 +1,117 @@
+import argparse
 import csv
-from selenium import webdriver
+import json
+import os
+import time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
 import traceback
+import driver_profile
+import scraper_waits
+
+NETNUTRITION_URL = "https://netnutrition.cbord.com/nn-prod/vucampusdining"
+hours_csv_filename = "dining_hall_hours.csv"
+HOURS_HEADER = ["Dining Hall", "Day", "Opening", "Closing"]
+# The last measured time of each path, so a batch run can report its speedup without rerunning the modals
+timings_filename = "hours_scraper_timings.json"
+
+MODAL_XPATH = "//div[@id='cbo_nn_hoursOfOperation' and contains(@class, 'modal show')]"
+
+# Opens every unit's hours modal in turn inside the page and returns
+# [{name, cells: [[td text, ...], ...], error}] in one call. A modal counts as loaded
+# once it is shown with at least one row and either the request its badge started
+# (XMLHttpRequest or fetch, counted by the script itself) has finished or its rows
+# were rebuilt: the previous unit's rows are marked stale before the click, so two
+# units with the same hours aren't mistaken for one. The modals are still opened one
+# after another; what it saves is the WebDriver round trips of every click and wait.
+BATCH_HOURS_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var timeout = arguments[0];
+var units = Array.prototype.slice.call(document.querySelectorAll('.unit__wrapper'));
+var results = [];
+
+function text(element) { return element ? (element.innerText || element.textContent || '').trim() : ''; }
+function modal() { return document.getElementById('cbo_nn_hoursOfOperation'); }
+function shown() { var m = modal(); return m && m.classList.contains('show') ? m : null; }
+function rows(m) { return m ? Array.prototype.slice.call(m.querySelectorAll('.table-responsive tr')) : []; }
+function cells(m) {
+    return rows(m).map(function (row) {
+        return Array.prototype.slice.call(row.querySelectorAll('td')).map(text);
+    });
+}
+function waitFor(check, callback) {
+    var start = Date.now();
+    (function poll() {
+        var value = check();
+        if (value || Date.now() - start > timeout) { callback(value); return; }
+        setTimeout(poll, 50);
+    })();
+}
+
+// Counts the page's requests, with or without jQuery; kept across calls so they're only wrapped once
+var watch = window.__nnRequestWatch;
+if (!watch) {
+    watch = window.__nnRequestWatch = {started: 0, active: 0};
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        watch.started++;
+        watch.active++;
+        this.addEventListener('loadend', function () { watch.active--; });
+        try {
+            return send.apply(this, arguments);
+        } catch (e) {
+            watch.active--;
+            throw e;
+        }
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            watch.started++;
+            watch.active++;
+            return fetch.apply(this, arguments).finally(function () { watch.active--; });
+        };
+    }
+}
+function idle() { return watch.active === 0 && (!window.jQuery || jQuery.active === 0); }
+
+function next(index) {
+    if (index >= units.length) { done(results); return; }
+    var unit = units[index];
+    var name = text(unit.querySelector('.unit__name-link'));
+    var badge = unit.querySelector("a[class*='badge']");
+    if (!badge) { results.push({name: name, cells: null, error: 'no schedule button'}); next(index + 1); return; }
+
+    var requestsBefore = watch.started;
+    rows(modal()).forEach(function (row) { row.setAttribute('data-nn-stale', ''); });
+    badge.click();
+    waitFor(function () {
+        var m = shown();
+        if (!m || !idle()) { return null; }
+        var current = rows(m);
+        var rebuilt = current.every(function (row) { return !row.hasAttribute('data-nn-stale'); });
+        if (watch.started === requestsBefore && !rebuilt) { return null; }
+        return current.length ? cells(m) : null;
+    }, function (loaded) {
+        results.push({name: name, cells: loaded, error: loaded ? null : 'hours modal did not load'});
+        var close = document.getElementById('btn_nn_hours_close');
+        if (close) { close.click(); }
+        waitFor(function () { return !shown(); }, function () { next(index + 1); });
+    });
+}
+next(0);
+"""
 
-# Set up Selenium WebDriver
-options = webdriver.ChromeOptions()
-options.add_argument("--start-maximized")  # Maintain maximizing the window as preferred
-# Make sure to replace 'chromedriver' with the correct path if necessary
-driver = webdriver.Chrome(options=options)
-driver.get("https://netnutrition.cbord.com/nn-prod/vucampusdining")
+
+def create_driver(profile=None, url=NETNUTRITION_URL):
+    # Set up Selenium WebDriver with the shared profile (lean and headless by default)
+    driver = driver_profile.create_chrome(profile)
+    driver.get(url)
+    return driver
 
 # Function to handle the 'Continue' button
-def click_continue():
+def click_continue(driver):
     try:
         continue_button = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.XPATH, "//button[@aria-label='Continue']"))
@@ -27,79 +124,189 @@ def click_continue():
         driver.quit()
         exit()
 
-# Click the 'Continue' button to proceed to the dining halls page
-click_continue()
+    # Wait for the units list to load
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.ID, "cbo_nn_unitDataList"))
+    )
 
-# Wait for the units list to load
-WebDriverWait(driver, 10).until(
-    EC.presence_of_element_located((By.ID, "cbo_nn_unitDataList"))
-)
+def schedule_rows(hall_name, cells):
+    """
+    Turn the hours table's cell texts into dining_hall_hours.csv rows.
+    A row with two cells is a closed day: [hall, day, status, "Closed"].
+    """
+    rows = []
+    for columns in cells:
+        if len(columns) == 3:
+            rows.append([hall_name, columns[0], columns[1], columns[2]])
+        elif len(columns) == 2:  # Handle the case where the dining hall is closed
+            rows.append([hall_name, columns[0], columns[1], "Closed"])
+    return rows
 
-# Open CSV file for writing
-with open('dining_hall_hours.csv', mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Dining Hall", "Day", "Opening", "Closing"])
+def scrape_hours_modal(driver, hall_names=None):
+    """
+    The original path: open each unit's hours modal from Selenium, read its cells and close it.
+    hall_names limits it to those units.
+    """
+    schedule = []
 
     # Find all unit elements and iterate through them
     units = driver.find_elements(By.CLASS_NAME, "unit__wrapper")
 
     for unit in units:
+        name_element = None
         try:
             # Find the name and the schedule button
             name_element = unit.find_element(By.CLASS_NAME, "unit__name-link")
+            hall_name = name_element.text
+            if hall_names is not None and hall_name not in hall_names:
+                continue
             schedule_button = unit.find_element(By.XPATH, ".//a[contains(@class, 'badge')]")
-            
-            # Scroll schedule button into view and click it using JavaScript
-            driver.execute_script("arguments[0].scrollIntoView(true);", schedule_button)
-            time.sleep(0.1)  # Let the scrolling animation finish before attempting to click
-            driver.execute_script("arguments[0].click();", schedule_button)
-            print(f"Clicked schedule button for: {name_element.text}")
-
-            # Short delay to allow the modal to initialize
-            time.sleep(0.1)
-
-            # Wait for the modal to appear
-            modal = WebDriverWait(driver, 20).until(
-                EC.visibility_of_element_located((By.XPATH, "//div[@id='cbo_nn_hoursOfOperation' and contains(@class, 'modal show')]"))
-            )
-            print(f"Modal appeared for: {name_element.text}")
-
-            # Extract schedule information from the modal
-            rows = WebDriverWait(modal, 20).until(
-                EC.presence_of_all_elements_located((By.XPATH, ".//div[@class='table-responsive']//tr"))
-            )
-            
-            for row in rows:
-                columns = row.find_elements(By.TAG_NAME, "td")
-                if len(columns) == 3:
-                    day = columns[0].text
-                    opening = columns[1].text
-                    closing = columns[2].text
-                    writer.writerow([name_element.text, day, opening, closing])
-                    print(f"Recorded schedule for {name_element.text}: {day} - {opening} to {closing}")
-                elif len(columns) == 2:  # Handle the case where the dining hall is closed
-                    day = columns[0].text
-                    status = columns[1].text
-                    writer.writerow([name_element.text, day, status, "Closed"])
-                    print(f"Recorded schedule for {name_element.text}: {day} - {status}")
+
+            # Click the schedule button using JavaScript; a script click needs no scrolling
+            with scraper_waits.timer.stage("open_modal"):
+                driver.execute_script("arguments[0].click();", schedule_button)
+                print(f"Clicked schedule button for: {hall_name}")
+
+                # Wait for the modal to appear
+                modal = scraper_waits.wait_until(driver, EC.visibility_of_element_located((By.XPATH, MODAL_XPATH)))
+                print(f"Modal appeared for: {hall_name}")
+
+                # Extract schedule information from the modal
+                rows = scraper_waits.wait_until(
+                    modal, EC.presence_of_all_elements_located((By.XPATH, ".//div[@class='table-responsive']//tr"))
+                )
+
+            with scraper_waits.timer.stage("read_modal"):
+                cells = [[column.text for column in row.find_elements(By.TAG_NAME, "td")] for row in rows]
+            for row in schedule_rows(hall_name, cells):
+                schedule.append(row)
+                print(f"Recorded schedule for {hall_name}: {row[1]} - {row[2]} to {row[3]}")
 
             # Close the modal using the 'x' button with JavaScript
-            close_button = WebDriverWait(modal, 20).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[@id='btn_nn_hours_close']"))
-            )
-            driver.execute_script("arguments[0].click();", close_button)
-            print(f"Closed modal for: {name_element.text}")
-            
-            # Wait for the modal to be completely closed
-            WebDriverWait(driver, 20).until(
-                EC.invisibility_of_element_located((By.XPATH, "//div[@id='cbo_nn_hoursOfOperation' and contains(@class, 'modal show')]"))
-            )
-            
-            # Pause briefly to ensure the modal is fully closed before continuing
-            time.sleep(0.1)
+            with scraper_waits.timer.stage("close_modal"):
+                close_button = scraper_waits.wait_until(
+                    modal, EC.element_to_be_clickable((By.XPATH, "//button[@id='btn_nn_hours_close']"))
+                )
+                driver.execute_script("arguments[0].click();", close_button)
+                print(f"Closed modal for: {hall_name}")
+
+                # Wait for the modal to be completely closed
+                scraper_waits.wait_until(driver, EC.invisibility_of_element_located((By.XPATH, MODAL_XPATH)))
         except Exception as e:
             print(f"Error processing unit {name_element.text if name_element else 'unknown'}: {e}")
             print(traceback.format_exc())
 
-# Close the WebDriver
-driver.quit()
+    return schedule
+
+def scrape_hours_batch(driver, timeout=20):
+    """
+    Collect every unit's hours in a single in-page script call. Units the script couldn't read are
+    scraped again through the modal path. Returns the same rows as scrape_hours_modal, or None if the
+    script couldn't run so the caller can fall back.
+    """
+    driver.set_script_timeout(timeout * 60)
+    try:
+        with scraper_waits.timer.stage("batch_hours"):
+            results = driver.execute_async_script(BATCH_HOURS_SCRIPT, timeout * 1000)
+    except Exception as e:
+        print(f"Batch hours extraction failed: {e}")
+        return None
+
+    results = results or []
+    failed = {result["name"] for result in results if result.get("error")}
+    for result in results:
+        if result.get("error"):
+            print(f"Error processing unit {result.get('name') or 'unknown'}: {result['error']}")
+    print(f"Recorded schedules for {len(results) - len(failed)} of {len(results)} units in one pass")
+
+    # Retry the units that failed one modal at a time, so the CSV has the same content as the modal path
+    retried = {}
+    if failed:
+        print(f"Retrying {len(failed)} units through their hours modals")
+        for row in scrape_hours_modal(driver, failed):
+            retried.setdefault(row[0], []).append(row)
+
+    schedule = []
+    for result in results:
+        if result.get("error"):
+            schedule.extend(retried.get(result["name"], []))
+        else:
+            schedule.extend(schedule_rows(result["name"], result["cells"]))
+    return schedule
+
+def read_timings(filename=timings_filename):
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, encoding='utf-8') as file:
+        return json.load(file)
+
+def record_timing(mode, seconds, filename=timings_filename):
+    timings = read_timings(filename)
+    timings[mode] = {"seconds": round(seconds, 3), "measured_at": time.time()}
+    with open(filename, mode='w', encoding='utf-8') as file:
+        json.dump(timings, file)
+
+def speedup_report(batch_time, modal_time):
+    return f"Batch: {batch_time:.2f}s, per-unit modals: {modal_time:.2f}s ({modal_time / max(batch_time, 1e-9):.1f}x faster)"
+
+def write_hours_csv(schedule, filename=hours_csv_filename):
+    # Open CSV file for writing
+    with open(filename, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(HOURS_HEADER)
+        writer.writerows(schedule)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape dining hall hours from NetNutrition.")
+    parser.add_argument("--mode", choices=["batch", "modal", "compare"], default="batch",
+                        help="batch reads every unit in one script call; modal is the original per-unit path; "
+                             "compare runs both, checks they match and reports the speedup")
+    parser.add_argument("--browser", choices=driver_profile.PROFILES, default=None,
+                        help="lean (headless, no images/fonts/analytics) or full (visible, loads everything)")
+    parser.add_argument("--url", default=NETNUTRITION_URL, help="NetNutrition page to read, e.g. a replay_server.py URL")
+    args = parser.parse_args(argv)
+
+    driver = create_driver(args.browser, args.url)
+    try:
+        # Click the 'Continue' button to proceed to the dining halls page
+        click_continue(driver)
+
+        schedule = None
+        batch_time = None
+        if args.mode in ("batch", "compare"):
+            start_time = time.perf_counter()
+            schedule = scrape_hours_batch(driver)
+            batch_time = time.perf_counter() - start_time
+            if schedule is not None:
+                record_timing("batch", batch_time)
+
+        if schedule is None or args.mode == "compare":
+            start_time = time.perf_counter()
+            modal_schedule = scrape_hours_modal(driver)
+            modal_time = time.perf_counter() - start_time
+            record_timing("modal", modal_time)
+            if schedule is None:
+                schedule = modal_schedule
+            else:
+                match = "identical" if modal_schedule == schedule else "DIFFERENT"
+                print(f"{speedup_report(batch_time, modal_time)}, rows {match}")
+        elif batch_time is not None:
+            # Compare against the last measured modal run rather than paying for one every time
+            modal_timing = read_timings().get("modal")
+            if modal_timing is None:
+                print(f"Batch: {batch_time:.2f}s (no modal baseline yet; run --mode compare once to measure one)")
+            else:
+                measured = time.strftime("%Y-%m-%d", time.localtime(modal_timing["measured_at"]))
+                print(f"{speedup_report(batch_time, modal_timing['seconds'])}, modal time measured {measured}")
+
+        write_hours_csv(schedule)
+    finally:
+        # Close the WebDriver
+        driver.quit()
+
+    for line in scraper_waits.timer.report():
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
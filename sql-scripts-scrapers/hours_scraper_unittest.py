@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import hours_scraper
+
+CELLS = [["Monday", "11:00", "22:00"], ["Sunday", "Closed"], ["Notes"]]
+
+
+class TestHoursScraper(unittest.TestCase):
+
+    def test_schedule_rows(self):
+        self.assertEqual(hours_scraper.schedule_rows("Rand", CELLS), [
+            ["Rand", "Monday", "11:00", "22:00"],
+            ["Rand", "Sunday", "Closed", "Closed"]
+        ])
+
+    def test_batch_reads_every_unit_in_one_call(self):
+        driver = MagicMock()
+        driver.execute_async_script.return_value = [
+            {"name": "Rand", "cells": CELLS, "error": None},
+            {"name": "The Pub", "cells": [["Friday", "16:00", "23:00"]], "error": None}
+        ]
+        schedule = hours_scraper.scrape_hours_batch(driver)
+        driver.execute_async_script.assert_called_once()
+        self.assertEqual(schedule, [
+            ["Rand", "Monday", "11:00", "22:00"],
+            ["Rand", "Sunday", "Closed", "Closed"],
+            ["The Pub", "Friday", "16:00", "23:00"]
+        ])
+
+    def test_batch_retries_failed_units_through_the_modal(self):
+        driver = MagicMock()
+        driver.execute_async_script.return_value = [
+            {"name": "Rand", "cells": CELLS, "error": None},
+            {"name": "Kissam", "cells": None, "error": "hours modal did not load"},
+            {"name": "The Pub", "cells": [["Friday", "16:00", "23:00"]], "error": None}
+        ]
+        original_scrape_hours_modal = hours_scraper.scrape_hours_modal
+        calls = []
+
+        def scrape_hours_modal(driver, hall_names=None):
+            calls.append(hall_names)
+            return [["Kissam", "Monday", "07:00", "20:00"]]
+
+        hours_scraper.scrape_hours_modal = scrape_hours_modal
+        try:
+            schedule = hours_scraper.scrape_hours_batch(driver)
+        finally:
+            hours_scraper.scrape_hours_modal = original_scrape_hours_modal
+        self.assertEqual(calls, [{"Kissam"}])
+        # The retried unit keeps its place in the unit order
+        self.assertEqual([row[0] for row in schedule], ["Rand", "Rand", "Kissam", "The Pub"])
+
+    def test_batch_failure_returns_none(self):
+        driver = MagicMock()
+        driver.execute_async_script.side_effect = Exception("script timeout")
+        self.assertIsNone(hours_scraper.scrape_hours_batch(driver))
+
+    def test_modal_path_produces_same_rows(self):
+        def cell(text):
+            element = MagicMock()
+            element.text = text
+            return element
+
+        def row(texts):
+            element = MagicMock()
+            element.find_elements.return_value = [cell(text) for text in texts]
+            return element
+
+        unit = MagicMock()
+        unit.find_element.return_value.text = "Rand"
+        driver = MagicMock()
+        driver.find_elements.return_value = [unit]
+        rows = [row(texts) for texts in CELLS]
+        original_wait_until = hours_scraper.scraper_waits.wait_until
+        hours_scraper.scraper_waits.wait_until = lambda target, condition, timeout=20: rows
+        try:
+            schedule = hours_scraper.scrape_hours_modal(driver)
+        finally:
+            hours_scraper.scraper_waits.wait_until = original_wait_until
+        self.assertEqual(schedule, hours_scraper.schedule_rows("Rand", CELLS))
+
+    def test_modal_path_can_be_limited_to_some_units(self):
+        unit = MagicMock()
+        unit.find_element.return_value.text = "Rand"
+        driver = MagicMock()
+        driver.find_elements.return_value = [unit]
+        self.assertEqual(hours_scraper.scrape_hours_modal(driver, {"Kissam"}), [])
+        driver.execute_script.assert_not_called()
+
+    def test_timings_are_recorded(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, "hours_scraper_timings.json")
+            self.assertEqual(hours_scraper.read_timings(filename), {})
+            hours_scraper.record_timing("modal", 12.5, filename)
+            hours_scraper.record_timing("batch", 2.5, filename)
+            timings = hours_scraper.read_timings(filename)
+            self.assertEqual((timings["modal"]["seconds"], timings["batch"]["seconds"]), (12.5, 2.5))
+            self.assertEqual(hours_scraper.speedup_report(2.5, 12.5),
+                             "Batch: 2.50s, per-unit modals: 12.50s (5.0x faster)")
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_write_hours_csv(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, "dining_hall_hours.csv")
+            hours_scraper.write_hours_csv([["Rand", "Monday", "11:00", "22:00"]], filename)
+            with open(filename, encoding='utf-8') as file:
+                self.assertEqual(file.read().splitlines(), ["Dining Hall,Day,Opening,Closing", "Rand,Monday,11:00,22:00"])
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
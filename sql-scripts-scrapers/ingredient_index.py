@@ -0,0 +1,208 @@
+"""
+Ingredient tokenizer and inverted ingredient index.
+
+The Ingredients column repeats the same long sub-ingredient declarations (GF
+Vegetable Base, Olive Oil Blend, ...) across hundreds of foods. Each
+declaration is split at its top-level commas into entries; the nutrition cache
+(nutrition_cache.py) stores every distinct entry once in its
+ingredient_entries table and a food keeps only the list of its entry IDs.
+IngredientIndex is built from that table: entries are further split into
+their nested components, and an inverted index from component words to
+entries answers "which foods contain sesame oil or maltodextrin" with set
+lookups instead of substring scans.
+
+    python ingredient_index.py "sesame oil" maltodextrin --date Today
+"""
+import argparse
+import csv
+import re
+
+import scraper_common
+
+OPENING = "(["
+CLOSING = ")]"
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def split_top_level(text, separators=","):
+    """
+    Split text at separators that aren't inside parentheses or brackets.
+    """
+    parts = []
+    depth = 0
+    start = 0
+    for index, char in enumerate(text):
+        if char in OPENING:
+            depth += 1
+        elif char in CLOSING:
+            depth = max(depth - 1, 0)
+        elif char in separators and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def split_declaration(text):
+    """
+    Split an ingredient declaration into its top-level entries. Missing values give no entries.
+    """
+    text = (text or "").strip()
+    if text in ("", "NA", "N/A"):
+        return []
+    return split_top_level(text)
+
+
+def components(entry):
+    """
+    Every ingredient named in an entry, nested ones included, e.g.
+    'Olive Oil Blend (CANOLA OIL, OLIVE OIL.)' -> ['Olive Oil Blend', 'CANOLA OIL', 'OLIVE OIL'].
+    """
+    found = []
+    depth = 0
+    start = 0
+    name_end = None
+    for index, char in enumerate(entry):
+        if char in OPENING:
+            if depth == 0:
+                name_end = index
+                start = index + 1
+            depth += 1
+        elif char in CLOSING and depth > 0:
+            depth -= 1
+            if depth == 0:
+                for part in split_top_level(entry[start:index], ",."):
+                    found.extend(components(part))
+    name = (entry[:name_end] if name_end is not None else entry).strip(" .")
+    return ([name] if name else []) + found
+
+
+def words(text):
+    return WORD_PATTERN.findall(text.lower())
+
+
+class IngredientIndex:
+    """
+    Ingredient entries by ID, each food's entry IDs and a word -> entry ID inverted index.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.entry_ids = {}
+        self.foods = {}
+        self.entry_foods = {}
+        self.word_entries = {}
+
+    def add_entry(self, entry_id, entry):
+        self.entries[entry_id] = entry
+        self.entry_ids[entry] = entry_id
+        self.entry_foods[entry_id] = set()
+        for component in components(entry):
+            component_words = words(component)
+            for word in component_words:
+                self.word_entries.setdefault(word, {}).setdefault(entry_id, []).append(frozenset(component_words))
+
+    def intern(self, entry):
+        entry_id = self.entry_ids.get(entry)
+        if entry_id is None:
+            entry_id = max(self.entries, default=0) + 1
+            self.add_entry(entry_id, entry)
+        return entry_id
+
+    def set_food(self, food_id, entry_ids):
+        self.foods[food_id] = entry_ids
+        for entry_id in entry_ids:
+            self.entry_foods[entry_id].add(food_id)
+
+    def add_food(self, food_id, declaration):
+        entry_ids = [self.intern(entry) for entry in split_declaration(declaration)]
+        self.set_food(food_id, entry_ids)
+        return entry_ids
+
+    def ingredients(self, food_id):
+        """
+        Rebuild a food's declaration from its entry IDs.
+        """
+        return ", ".join(self.entries[entry_id] for entry_id in self.foods.get(food_id, []))
+
+    def entries_containing(self, ingredient):
+        """
+        IDs of entries with a component whose words include every word of ingredient.
+        """
+        query_words = words(ingredient)
+        if not query_words:
+            return set()
+        # Start from the rarest word so common ones like 'oil' don't widen the scan
+        candidates = min((self.word_entries.get(word, {}) for word in query_words), key=len)
+        matches = set()
+        needed = set(query_words)
+        for entry_id, component_word_sets in candidates.items():
+            if any(needed <= component_words for component_words in component_word_sets):
+                matches.add(entry_id)
+        return matches
+
+    def foods_containing(self, *ingredients, food_ids=None):
+        """
+        Food IDs containing any of the ingredients, optionally limited to food_ids (e.g. today's menu).
+        """
+        found = set()
+        for ingredient in ingredients:
+            for entry_id in self.entries_containing(ingredient):
+                found |= self.entry_foods[entry_id]
+        if food_ids is not None:
+            found &= set(food_ids)
+        return found
+
+    @classmethod
+    def from_cache(cls, cache):
+        """
+        Index a NutritionCache's ingredient_entries table under the cache's own entry IDs. Declarations the
+        cache keeps as text are split here, with entries the table lacks given IDs past its last one.
+        """
+        entries, foods, declarations = cache.ingredient_dictionary()
+        index = cls()
+        for entry_id, entry in entries.items():
+            index.add_entry(entry_id, entry)
+        for food_id, entry_ids in foods.items():
+            index.set_food(food_id, entry_ids)
+        for food_id, declaration in declarations.items():
+            index.add_food(food_id, declaration)
+        return index
+
+
+def menu_food_ids(meals_csv, date_value):
+    """
+    Food IDs on any menu for a date ('Today', '2024/11/05' or an ISO date).
+    """
+    date_value = scraper_common.normalize_date(date_value)
+    food_ids = set()
+    with open(meals_csv, mode='r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            if scraper_common.normalize_date(row["Date"]) == date_value and row.get("Food ID", "").isdigit():
+                food_ids.add(int(row["Food ID"]))
+    return food_ids
+
+
+def main(argv=None):
+    # nutrition_cache imports this module for its tokenizer
+    import nutrition_cache
+
+    parser = argparse.ArgumentParser(description="Find the foods that contain an ingredient.")
+    parser.add_argument("ingredients", nargs="+", help="Ingredients to look for, e.g. 'sesame oil' maltodextrin")
+    parser.add_argument("--cache", default=nutrition_cache.DEFAULT_CACHE_PATH, help="Nutrition cache to index")
+    parser.add_argument("--meals-csv", default=scraper_common.meals_csv_filename)
+    parser.add_argument("--date", help="Only foods on a menu that day")
+    args = parser.parse_args(argv)
+
+    cache = nutrition_cache.NutritionCache(args.cache)
+    try:
+        index = IngredientIndex.from_cache(cache)
+    finally:
+        cache.close()
+    food_ids = menu_food_ids(args.meals_csv, args.date) if args.date else None
+    for food_id in sorted(index.foods_containing(*args.ingredients, food_ids=food_ids)):
+        print(food_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import ingredient_index
+from ingredient_index import IngredientIndex
+from nutrition_cache import NutritionCache
+
+OLIVE_OIL = "Olive Oil Blend (90 CANOLA OIL 10 EXTRA VIRGIN OLIVE OIL.)"
+VEGETABLE_BASE = ("GF Vegetable Base (SAUTEED VEGETABLE PUREE MIX (CARROTS, ONIONS, CELERY), SALT, "
+                  "2% OR LESS OF YEAST EXTRACT, MALTODEXTRIN. WATER)")
+
+
+class TestTokenizer(unittest.TestCase):
+
+    def test_split_declaration_keeps_nested_commas(self):
+        declaration = f"Spinach, {VEGETABLE_BASE}, {OLIVE_OIL}"
+        self.assertEqual(ingredient_index.split_declaration(declaration), ["Spinach", VEGETABLE_BASE, OLIVE_OIL])
+        self.assertEqual(ingredient_index.split_declaration("NA"), [])
+
+    def test_components_include_nested_ingredients(self):
+        self.assertEqual(ingredient_index.components(VEGETABLE_BASE), [
+            "GF Vegetable Base", "SAUTEED VEGETABLE PUREE MIX", "CARROTS", "ONIONS", "CELERY", "SALT",
+            "2% OR LESS OF YEAST EXTRACT", "MALTODEXTRIN", "WATER"
+        ])
+
+
+class TestIngredientIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = IngredientIndex()
+        self.index.add_food(1, f"Spinach, {VEGETABLE_BASE}, {OLIVE_OIL}")
+        self.index.add_food(2, f"Brown Rice, Water, {VEGETABLE_BASE}")
+        self.index.add_food(3, "Noodles, Toasted Sesame Oil, Soy Sauce")
+        self.index.add_food(4, "Sesame Seeds, Canola Oil")
+
+    def test_entries_are_interned(self):
+        self.assertEqual(len(self.index.entries), 10)
+        self.assertEqual(self.index.foods[1][1], self.index.foods[2][2])
+        self.assertEqual(self.index.ingredients(2), f"Brown Rice, Water, {VEGETABLE_BASE}")
+
+    def test_foods_containing(self):
+        self.assertEqual(self.index.foods_containing("sesame oil"), {3})
+        self.assertEqual(self.index.foods_containing("sesame oil", "maltodextrin"), {1, 2, 3})
+        self.assertEqual(self.index.foods_containing("Maltodextrin", food_ids=[2, 3]), {2})
+        self.assertEqual(self.index.foods_containing("peanut"), set())
+
+    def test_from_cache_uses_the_cache_entry_ids(self):
+        tmpdir = tempfile.mkdtemp()
+        cache = NutritionCache(os.path.join(tmpdir, "nutrition_cache.db"), seed_csv=None)
+        try:
+            cache.put("Spinach", {"Ingredients": f"Spinach, {VEGETABLE_BASE}, {OLIVE_OIL}"}, {})
+            cache.put("Stir Fry", {"Ingredients": "Noodles, Toasted Sesame Oil, Soy Sauce"}, {})
+            # Odd spacing keeps this declaration as text in the cache
+            rice = cache.put("Rice", {"Ingredients": f"Brown Rice,  {VEGETABLE_BASE}"}, {})
+            index = IngredientIndex.from_cache(cache)
+            entries = cache.ingredient_dictionary()[0]
+        finally:
+            cache.close()
+            shutil.rmtree(tmpdir)
+        self.assertEqual({entry_id: index.entries[entry_id] for entry_id in entries}, entries)
+        self.assertEqual(index.foods_containing("sesame oil"), {2})
+        self.assertEqual(index.foods_containing("maltodextrin"), {1, rice})
+        self.assertEqual(index.foods[rice][1], index.foods[1][1])
+        self.assertEqual(index.foods_containing("brown rice"), {rice})
+
+if __name__ == '__main__':
+    unittest.main()
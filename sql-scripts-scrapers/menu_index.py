@@ -0,0 +1,122 @@
+"""
+In-memory allergen/diet index over the scraped menus.
+
+Every food's 20 filter flags are packed into one integer (scraper_common.filter_mask)
+when its label is cached, and the index is built from those stored masks
+(NutritionCache.food_masks()). Each (hall, date, meal) menu keeps its Food IDs
+grouped by mask. A query such as "vegan, no gluten, no sesame, Rand, Tuesday
+dinner" is then a couple of bitwise tests per distinct mask on the menus it
+touches, instead of scanning 20 boolean columns and joining.
+
+    python menu_index.py --hall "Rand Dining Center" --meal Dinner --require Vegan --exclude Gluten Sesame
+"""
+import argparse
+import csv
+
+import scraper_common
+from nutrition_cache import DEFAULT_CACHE_PATH, NutritionCache
+
+
+class MenuIndex:
+    """
+    (hall, ISO date, meal) -> {filter mask: {Food IDs}}, plus the menu keys of each hall, date
+    and meal so a query only visits the menus it names.
+    """
+
+    def __init__(self):
+        self.menus = {}
+        self.keys_by_hall = {}
+        self.keys_by_date = {}
+        self.keys_by_meal = {}
+
+    def add(self, hall_name, date_value, meal_time, food_id, mask):
+        key = (hall_name, scraper_common.normalize_date(date_value), meal_time)
+        if key not in self.menus:
+            self.menus[key] = {}
+            self.keys_by_hall.setdefault(key[0], set()).add(key)
+            self.keys_by_date.setdefault(key[1], set()).add(key)
+            self.keys_by_meal.setdefault(key[2], set()).add(key)
+        self.menus[key].setdefault(mask, set()).add(food_id)
+
+    def menu_keys(self, hall_name=None, date_value=None, meal_time=None):
+        """
+        The (hall, date, meal) keys matching the given parts; None matches all.
+        """
+        if hall_name is not None and date_value is not None and meal_time is not None:
+            key = (hall_name, date_value, meal_time)
+            return [key] if key in self.menus else []
+        candidates = None
+        for value, keys_by in ((hall_name, self.keys_by_hall), (date_value, self.keys_by_date),
+                               (meal_time, self.keys_by_meal)):
+            if value is None:
+                continue
+            keys = keys_by.get(value, set())
+            candidates = keys if candidates is None else candidates & keys
+        return list(self.menus) if candidates is None else sorted(candidates)
+
+    @classmethod
+    def build(cls, food_masks, meals_csv=scraper_common.meals_csv_filename, today=None):
+        """
+        Index dining_meals_nutrition.csv. Items without a known mask are left out, since their
+        flags can't be checked.
+        """
+        index = cls()
+        skipped = 0
+        with open(meals_csv, mode='r', newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                food_id = int(row["Food ID"]) if row.get("Food ID", "").isdigit() else None
+                if food_id not in food_masks:
+                    skipped += 1
+                    continue
+                key_date = scraper_common.normalize_date(row["Date"], today)
+                index.add(row["Dining Hall"], key_date, row["Meal"], food_id, food_masks[food_id])
+        if skipped:
+            print(f"Skipped {skipped} menu items without nutrition data")
+        return index
+
+    def query(self, require=(), exclude=(), hall_name=None, date_value=None, meal_time=None):
+        """
+        Food IDs with every required filter (e.g. Vegan) and none of the excluded ones (e.g. Gluten),
+        grouped by (hall, date, meal). hall_name, date_value and meal_time narrow the menus; None matches all.
+        """
+        require_mask = scraper_common.names_mask(require)
+        exclude_mask = scraper_common.names_mask(exclude)
+        date_value = scraper_common.normalize_date(date_value) if date_value is not None else None
+
+        results = {}
+        for key in self.menu_keys(hall_name, date_value, meal_time):
+            food_ids = []
+            for mask, ids in self.menus[key].items():
+                if mask & require_mask == require_mask and not mask & exclude_mask:
+                    food_ids.extend(ids)
+            if food_ids:
+                results[key] = sorted(food_ids)
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the scraped menus by diet and allergen filters.")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Nutrition cache the filter masks are read from")
+    parser.add_argument("--nutrition-csv", default=scraper_common.nutrition_csv_filename,
+                        help="Seeds the cache if it doesn't exist yet")
+    parser.add_argument("--meals-csv", default=scraper_common.meals_csv_filename)
+    parser.add_argument("--hall")
+    parser.add_argument("--date", help="ISO date, YYYY/MM/DD or Today")
+    parser.add_argument("--meal")
+    parser.add_argument("--require", nargs="*", default=[], help="Filters every item must have, e.g. Vegan")
+    parser.add_argument("--exclude", nargs="*", default=[], help="Filters no item may have, e.g. Gluten Sesame")
+    args = parser.parse_args(argv)
+
+    cache = NutritionCache(args.cache, seed_csv=args.nutrition_csv)
+    try:
+        food_masks = cache.food_masks()
+    finally:
+        cache.close()
+    index = MenuIndex.build(food_masks, args.meals_csv)
+    results = index.query(args.require, args.exclude, args.hall, args.date, args.meal)
+    for (hall, date, meal), food_ids in sorted(results.items()):
+        print(f"{hall} {date} {meal}: {', '.join(str(food_id) for food_id in food_ids)}")
+
+
+if __name__ == "__main__":
+    main()
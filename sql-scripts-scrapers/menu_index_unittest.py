@@ -0,0 +1,82 @@
+import csv
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+import scraper_common
+from menu_index import MenuIndex
+from nutrition_cache import NutritionCache
+
+
+class TestFilterMask(unittest.TestCase):
+
+    def test_mask_round_trip(self):
+        filter_attributes = scraper_common.empty_filter_attributes()
+        filter_attributes.update({"Vegan": True, "Soy": True})
+        mask = scraper_common.filter_mask(filter_attributes)
+        self.assertEqual(mask, scraper_common.names_mask(["Vegan", "Soy"]))
+        self.assertEqual(scraper_common.mask_filters(mask), filter_attributes)
+
+
+class TestMenuIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = MenuIndex()
+        vegan = scraper_common.names_mask(["Vegan", "Vegetarian"])
+        self.index.add("Rand", "2024/11/05", "Dinner", 1, vegan)
+        self.index.add("Rand", "2024/11/05", "Dinner", 2, vegan | scraper_common.names_mask(["Gluten"]))
+        self.index.add("Rand", "2024/11/05", "Dinner", 3, scraper_common.names_mask(["Dairy"]))
+        self.index.add("Rand", "2024/11/05", "Dinner", 1, vegan)
+        self.index.add("Commons", "2024/11/05", "Dinner", 4, vegan | scraper_common.names_mask(["Sesame"]))
+
+    def test_require_and_exclude(self):
+        self.assertEqual(self.index.query(["Vegan"], ["Gluten", "Sesame"], "Rand", "2024-11-05", "Dinner"),
+                         {("Rand", "2024-11-05", "Dinner"): [1]})
+        self.assertEqual(self.index.query(exclude=["Dairy"], date_value="2024/11/05"),
+                         {("Rand", "2024-11-05", "Dinner"): [1, 2], ("Commons", "2024-11-05", "Dinner"): [4]})
+
+    def test_menu_keys_come_from_the_secondary_indexes(self):
+        self.index.add("Rand", "2024/11/06", "Lunch", 1, 0)
+        self.assertEqual(self.index.menu_keys("Rand", "2024-11-05", "Dinner"), [("Rand", "2024-11-05", "Dinner")])
+        self.assertEqual(self.index.menu_keys("Rand", "2024-11-05", "Lunch"), [])
+        self.assertEqual(self.index.menu_keys(hall_name="Rand"),
+                         [("Rand", "2024-11-05", "Dinner"), ("Rand", "2024-11-06", "Lunch")])
+        self.assertEqual(self.index.menu_keys(date_value="2024-11-05", meal_time="Dinner"),
+                         [("Commons", "2024-11-05", "Dinner"), ("Rand", "2024-11-05", "Dinner")])
+        self.assertEqual(self.index.menu_keys(meal_time="Brunch"), [])
+        self.assertEqual(len(self.index.menu_keys()), 3)
+
+    def test_unknown_filter_name(self):
+        with self.assertRaises(KeyError):
+            self.index.query(["Vegetable"])
+
+
+class TestBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_build_from_cached_masks(self):
+        meals_csv = os.path.join(self.tmpdir, "dining_meals_nutrition.csv")
+        with open(meals_csv, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(scraper_common.MEALS_HEADER)
+            writer.writerow([1, "Rand Dining Center", "Today", "Lunch", "Sauteed Kale & Spinach", "Sides"])
+            writer.writerow([3, "Rand Dining Center", "Today", "Lunch", "Scrambled Eggs", "Hot Line"])
+            writer.writerow([999999, "Rand Dining Center", "Today", "Lunch", "Unknown Item", "Hot Line"])
+
+        cache = NutritionCache(os.path.join(self.tmpdir, "nutrition_cache.db"), seed_csv="nutrition_info.csv")
+        food_masks = cache.food_masks()
+        cache.close()
+        index = MenuIndex.build(food_masks, meals_csv, today=datetime.date(2024, 11, 5))
+        self.assertEqual(index.query(["Vegan"]), {("Rand Dining Center", "2024-11-05", "Lunch"): [1]})
+        self.assertEqual(index.query(), {("Rand Dining Center", "2024-11-05", "Lunch"): [1, 3]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+Precomputed responses for the API's /dining-halls/:name/menu endpoint.
+
+server.js builds every menu response from a LIKE lookup on the hall name and
+a menu_items/foods join. After a scrape this stage builds the same response
+for every (date, hall) in the menu store, with each item's key nutrition
+values merged in, and writes it as gzipped static JSON:
+
+    menu_api/
+        manifest.json                          # {"halls": [...], "menus": {date: {hall: {"path", "etag", ...}}}}
+        2024-11-05/rand-dining-center.json.gz
+
+The ETag is a hash of the uncompressed JSON. A file is only rewritten when its
+ETag changes, and the server compares ETags to reload only those files. It
+serves the gzipped bytes as they are, and answers a matching If-None-Match
+with 304.
+
+    python menu_payloads.py                           # after menu_store.py / the scrapers
+    python menu_payloads.py --date 2024-11-05
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+
+import db_loader
+import menu_store
+import scraper_common
+
+DEFAULT_PAYLOAD_DIR = "menu_api"
+MANIFEST_NAME = "manifest.json"
+
+# server.js orders meals Breakfast, Lunch, Dinner, then everything else
+MEAL_ORDER = {"Breakfast": 1, "Lunch": 2, "Dinner": 3}
+
+# dietaryInfo key -> foods column, as in server.js
+DIETARY_COLUMNS = [
+    ("vegan", "is_vegan"),
+    ("vegetarian", "is_vegetarian"),
+    ("containsGluten", "has_gluten"),
+    ("containsDairy", "has_dairy"),
+    ("containsPeanuts", "has_peanut"),
+    ("containsTreeNuts", "has_tree_nut"),
+    ("containsShellfish", "has_shellfish")
+]
+
+# nutrition key -> foods column, named like the /menu-items/:foodId/nutrition response
+NUTRITION_COLUMNS = [
+    ("servingSize", "serving_size"),
+    ("calories", "calories"),
+    ("totalFat", "total_fat"),
+    ("totalCarbohydrates", "total_carbohydrates"),
+    ("dietaryFiber", "dietary_fiber"),
+    ("sugars", "sugars"),
+    ("protein", "protein"),
+    ("sodium", "sodium")
+]
+
+
+def load_foods(nutrition_csv=scraper_common.nutrition_csv_filename):
+    """
+    Return {Food ID: {foods column: parsed value}} parsed the same way db_loader loads the foods table.
+    """
+    columns = [column for field, column, kind in db_loader.FOOD_COLUMNS]
+    foods = {}
+    if not os.path.exists(nutrition_csv):
+        return foods
+    for row in db_loader.read_csv_rows(nutrition_csv, db_loader.food_row):
+        if row[0] is not None:
+            foods[row[0]] = dict(zip(columns, row))
+    return foods
+
+
+def menu_payload(rows, foods):
+    """
+    Build the /dining-halls/:name/menu response ({meal: {category: [items]}}) from one partition's rows.
+    """
+    def order(row):
+        return MEAL_ORDER.get(row["Meal"], 4), row["Category"] or ""
+
+    payload = {}
+    for row in sorted(rows, key=order):
+        food_id = db_loader.parse_int(row["Food ID"])
+        # menu_items stores a missing category as '', which is what the server's database path returns
+        category = db_loader.parse_text(row["Category"]) or ""
+        food = foods.get(food_id, {})
+        payload.setdefault(row["Meal"] or "Other", {}).setdefault(category or "Uncategorized", []).append({
+            "id": food_id,
+            "name": row["Food Name"],
+            "category": category,
+            "dietaryInfo": {key: bool(food.get(column)) for key, column in DIETARY_COLUMNS},
+            "nutrition": {key: food.get(column) for key, column in NUTRITION_COLUMNS}
+        })
+    return payload
+
+
+def encode_payload(payload):
+    """
+    Return (gzipped JSON, ETag). The gzip header carries no timestamp, so equal payloads give equal bytes.
+    """
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    return gzip.compress(body, compresslevel=9, mtime=0), etag, len(body)
+
+
+def _write_bytes(path, data):
+    # Write to a temporary file first so the server never reads a half-written payload
+    temp_path = path + ".tmp"
+    with open(temp_path, mode='wb') as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def read_manifest(payload_dir=DEFAULT_PAYLOAD_DIR):
+    path = os.path.join(payload_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"halls": [], "menus": {}}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def build_payloads(store, nutrition_csv=scraper_common.nutrition_csv_filename, payload_dir=DEFAULT_PAYLOAD_DIR,
+                   dates=None):
+    """
+    Write a payload for every (date, hall) in the menu store (or only the given dates), skipping files whose
+    ETag hasn't changed and removing payloads for menus no longer in the store.
+    Returns {"written", "unchanged", "removed"} counts.
+    """
+    foods = load_foods(nutrition_csv)
+    previous = read_manifest(payload_dir)
+    store_manifest = store.manifest()
+    dates = sorted(store_manifest) if dates is None else [scraper_common.normalize_date(date) for date in dates]
+    counts = {"written": 0, "unchanged": 0, "removed": 0}
+
+    menus = {date: halls for date, halls in previous.get("menus", {}).items() if date in store_manifest}
+    for date in dates:
+        entries = {}
+        for hall_name in sorted(store_manifest.get(date, {})):
+            data, etag, size = encode_payload(menu_payload(store.read_partition(date, hall_name), foods))
+            relative_path = f"{date}/{menu_store.partition_name(hall_name)[:-len('.json')]}.json.gz"
+            path = os.path.join(payload_dir, relative_path)
+            known = menus.get(date, {}).get(hall_name)
+            if known is not None and known["etag"] == etag and os.path.exists(path):
+                counts["unchanged"] += 1
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _write_bytes(path, data)
+                counts["written"] += 1
+            entries[hall_name] = {"path": relative_path, "etag": etag, "bytes": size, "gzip_bytes": len(data)}
+        menus[date] = entries
+
+    # Payloads whose date or hall left the store would otherwise be served forever
+    for date, halls in previous.get("menus", {}).items():
+        for hall_name, entry in halls.items():
+            if hall_name not in menus.get(date, {}):
+                path = os.path.join(payload_dir, entry["path"])
+                if os.path.exists(path):
+                    os.remove(path)
+                counts["removed"] += 1
+
+    os.makedirs(payload_dir, exist_ok=True)
+    manifest = {
+        "halls": sorted({hall_name for halls in menus.values() for hall_name in halls}),
+        "menus": {date: menus[date] for date in sorted(menus) if menus[date]}
+    }
+    _write_bytes(os.path.join(payload_dir, MANIFEST_NAME), json.dumps(manifest, indent=1).encode("utf-8"))
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the API's menu responses as gzipped JSON.")
+    parser.add_argument("--store", default=menu_store.DEFAULT_STORE_DIR)
+    parser.add_argument("--nutrition-csv", default=scraper_common.nutrition_csv_filename)
+    parser.add_argument("--output", default=DEFAULT_PAYLOAD_DIR)
+    parser.add_argument("--date", action="append", help="Only rebuild this date (repeatable)")
+    args = parser.parse_args(argv)
+
+    counts = build_payloads(menu_store.MenuStore(args.store), args.nutrition_csv, args.output, args.date)
+    print(f"Menu payloads: {counts['written']} written, {counts['unchanged']} unchanged, "
+          f"{counts['removed']} removed in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import csv
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import menu_payloads
+import scraper_common
+from menu_store import MenuStore
+from scraper_common import meals_csv_dict as meal_row
+
+
+class TestMenuPayloads(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.payload_dir = os.path.join(self.tmpdir, "menu_api")
+        self.nutrition_csv = os.path.join(self.tmpdir, "nutrition_info.csv")
+        with open(self.nutrition_csv, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(scraper_common.NUTRITION_HEADER)
+            writer.writerow(scraper_common.nutrition_csv_row(1, "Kale", {"Calories": "20", "Protein": "< 1g"},
+                                                             {"Vegan": True, "Vegetarian": True}))
+            writer.writerow(scraper_common.nutrition_csv_row(2, "Scrambled Eggs", {"Calories": "180"}, {"Egg": True}))
+        self.store = MenuStore(os.path.join(self.tmpdir, "menu_store"))
+        self.store.import_rows([
+            meal_row(1, "Rand Dining Center", "2024/11/05", "Dinner", "Kale", "Sides"),
+            meal_row(2, "Rand Dining Center", "2024/11/05", "Breakfast", "Scrambled Eggs", "Hot Line"),
+            meal_row(1, "Rand Dining Center", "2024/11/05", "Daily Offerings", "Kale", ""),
+            meal_row(2, "The Commons Dining Center", "2024/11/05", "Breakfast", "Scrambled Eggs", "Hot Line")
+        ], today=datetime.date(2024, 11, 5))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def build(self, dates=None):
+        return menu_payloads.build_payloads(self.store, self.nutrition_csv, self.payload_dir, dates)
+
+    def read_payload(self, date, hall):
+        entry = menu_payloads.read_manifest(self.payload_dir)["menus"][date][hall]
+        with open(os.path.join(self.payload_dir, entry["path"]), mode='rb') as file:
+            return json.loads(gzip.decompress(file.read()))
+
+    def test_payload_matches_the_api_response(self):
+        self.build()
+        payload = self.read_payload("2024-11-05", "Rand Dining Center")
+        # Meals in the API's order, items grouped by category
+        self.assertEqual(list(payload), ["Breakfast", "Dinner", "Daily Offerings"])
+        kale = payload["Dinner"]["Sides"][0]
+        self.assertEqual((kale["id"], kale["name"], kale["category"]), (1, "Kale", "Sides"))
+        self.assertTrue(kale["dietaryInfo"]["vegan"])
+        self.assertFalse(kale["dietaryInfo"]["containsGluten"])
+        self.assertEqual(kale["nutrition"]["calories"], 20)
+        self.assertEqual(kale["nutrition"]["protein"], "< 1g")
+        self.assertEqual(payload["Daily Offerings"]["Uncategorized"][0]["category"], "")
+
+    def test_only_changed_payloads_are_rewritten(self):
+        self.assertEqual(self.build(), {"written": 2, "unchanged": 0, "removed": 0})
+        before = menu_payloads.read_manifest(self.payload_dir)
+        self.assertEqual(before["halls"], ["Rand Dining Center", "The Commons Dining Center"])
+        self.assertEqual(self.build(), {"written": 0, "unchanged": 2, "removed": 0})
+
+        self.store.write_partition("2024-11-05", "The Commons Dining Center",
+                                   [meal_row(1, "The Commons Dining Center", "2024-11-05", "Lunch", "Kale", "Sides")])
+        self.assertEqual(self.build(), {"written": 1, "unchanged": 1, "removed": 0})
+        after = menu_payloads.read_manifest(self.payload_dir)
+        self.assertEqual(after["menus"]["2024-11-05"]["Rand Dining Center"]["etag"],
+                         before["menus"]["2024-11-05"]["Rand Dining Center"]["etag"])
+        self.assertNotEqual(after["menus"]["2024-11-05"]["The Commons Dining Center"]["etag"],
+                            before["menus"]["2024-11-05"]["The Commons Dining Center"]["etag"])
+
+    def test_equal_payloads_give_equal_bytes(self):
+        first = menu_payloads.encode_payload({"Lunch": {}})
+        second = menu_payloads.encode_payload({"Lunch": {}})
+        self.assertEqual(first, second)
+
+    def test_menus_that_left_the_store_are_removed(self):
+        self.build()
+        path = os.path.join(self.payload_dir, "2024-11-05", "rand-dining-center.json.gz")
+        self.assertTrue(os.path.exists(path))
+        shutil.rmtree(self.store.root)
+        self.store.import_rows([meal_row(2, "The Commons Dining Center", "2024-11-06", "Lunch", "Scrambled Eggs", "Hot Line")])
+        counts = self.build()
+        self.assertEqual(counts["removed"], 2)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(list(menu_payloads.read_manifest(self.payload_dir)["menus"]), ["2024-11-06"])
+
+
+if __name__ == "__main__":
+    unittest.main()
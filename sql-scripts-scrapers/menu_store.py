@@ -0,0 +1,250 @@
+"""
+Date-partitioned menu store.
+
+dining_meals_nutrition.csv is one flat file that repeats hall, meal, category
+and food names on every row and keeps NetNutrition's date labels ("Today").
+The store splits the same rows into one partition per (ISO date, hall):
+
+    menu_store/
+        manifest.json                                  # {date: {hall: {"path", "rows", "written_at"}}}
+        2024-11-05/rand-dining-center.json
+
+Each partition holds its columns with the meal, category and food name
+strings dictionary-encoded, so a day's loader or query reads only that day's
+files.
+
+    python menu_store.py --import dining_meals_nutrition.csv
+    python menu_store.py --date Today --hall "Rand Dining Center"
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import scraper_common
+
+DEFAULT_STORE_DIR = "menu_store"
+MANIFEST_NAME = "manifest.json"
+
+# Columns stored as an index into a per-partition list of distinct values
+ENCODED_COLUMNS = ["Meal", "Food Name", "Category"]
+
+
+def partition_name(hall_name):
+    return re.sub(r"[^a-z0-9]+", "-", hall_name.lower()).strip("-") + ".json"
+
+
+def _meal_order(row):
+    meal_time = row["Meal"]
+    return scraper_common.MEAL_TIMES.index(meal_time) if meal_time in scraper_common.MEAL_TIMES else len(scraper_common.MEAL_TIMES)
+
+
+def encode_columns(rows):
+    """
+    Turn meals CSV rows into {"Food ID": [...], column: [codes]} plus {column: [distinct values]}.
+    """
+    dictionaries = {column: [] for column in ENCODED_COLUMNS}
+    codes = {column: {} for column in ENCODED_COLUMNS}
+    columns = {"Food ID": []}
+    columns.update({column: [] for column in ENCODED_COLUMNS})
+    for row in rows:
+        columns["Food ID"].append(row["Food ID"])
+        for column in ENCODED_COLUMNS:
+            value = row[column]
+            code = codes[column].get(value)
+            if code is None:
+                code = codes[column][value] = len(dictionaries[column])
+                dictionaries[column].append(value)
+            columns[column].append(code)
+    return columns, dictionaries
+
+
+def decode_columns(columns, dictionaries):
+    rows = []
+    for index, food_id in enumerate(columns["Food ID"]):
+        row = {"Food ID": food_id}
+        for column in ENCODED_COLUMNS:
+            row[column] = dictionaries[column][columns[column][index]]
+        rows.append(row)
+    return rows
+
+
+def _write_json(path, data):
+    # Write to a temporary file first so readers never see a half-written partition
+    temp_path = path + ".tmp"
+    with open(temp_path, mode='w', encoding='utf-8') as file:
+        json.dump(data, file, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+class MenuStore:
+    """
+    Reads and writes (date, hall) menu partitions and keeps the manifest up to date.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    def manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, encoding='utf-8') as file:
+            return json.load(file)
+
+    def write_partition(self, date_value, hall_name, rows):
+        """
+        Replace the partition for a date and hall. rows are dicts with Food ID, Meal, Food Name and Category.
+        """
+        self.write_partitions({(date_value, hall_name): rows})
+
+    def write_partitions(self, partitions, closed=()):
+        """
+        Replace several {(date, hall): rows} partitions, updating the manifest once at the end.
+        The (date, hall) pairs in closed that aren't in partitions are removed. Returns the pairs removed.
+        """
+        with self.lock:
+            entries = {}
+            for (date_value, hall_name), rows in partitions.items():
+                date = scraper_common.normalize_date(date_value)
+                relative_path = os.path.join(date, partition_name(hall_name))
+                columns, dictionaries = encode_columns(rows)
+                os.makedirs(os.path.join(self.root, date), exist_ok=True)
+                _write_json(os.path.join(self.root, relative_path), {
+                    "date": date,
+                    "hall": hall_name,
+                    "columns": columns,
+                    "dictionaries": dictionaries
+                })
+                entries[(date, hall_name)] = {
+                    "path": relative_path.replace(os.sep, "/"),
+                    "rows": len(columns["Food ID"]),
+                    "written_at": time.time()
+                }
+
+            manifest = self.manifest()
+            removed = []
+            # Only halls the scraper confirmed closed lose their old menu; a hall that merely failed keeps it
+            for date_value, hall_name in closed:
+                date = scraper_common.normalize_date(date_value)
+                entry = manifest.get(date, {}).get(hall_name)
+                if (date, hall_name) in entries or entry is None:
+                    continue
+                path = os.path.join(self.root, entry["path"])
+                if os.path.exists(path):
+                    os.remove(path)
+                del manifest[date][hall_name]
+                if not manifest[date]:
+                    del manifest[date]
+                removed.append((date, hall_name))
+            for (date, hall_name), entry in entries.items():
+                manifest.setdefault(date, {})[hall_name] = entry
+            _write_json(self.manifest_path, manifest)
+            return removed
+
+    def dates(self):
+        return sorted(self.manifest())
+
+    def halls(self, date_value):
+        return sorted(self.manifest().get(scraper_common.normalize_date(date_value), {}))
+
+    def read_partition(self, date_value, hall_name):
+        """
+        Rows of one partition as meals CSV style dicts (Dining Hall and ISO Date included), or [] if missing.
+        """
+        date = scraper_common.normalize_date(date_value)
+        entry = self.manifest().get(date, {}).get(hall_name)
+        if entry is None:
+            return []
+        with open(os.path.join(self.root, entry["path"]), encoding='utf-8') as file:
+            partition = json.load(file)
+        rows = decode_columns(partition["columns"], partition["dictionaries"])
+        for row in rows:
+            row["Dining Hall"] = hall_name
+            row["Date"] = date
+        return rows
+
+    def read_date(self, date_value, hall_name=None):
+        """
+        Every row for one date, optionally for a single hall. Other dates aren't read.
+        """
+        halls = [hall_name] if hall_name is not None else self.halls(date_value)
+        rows = []
+        for hall in halls:
+            rows.extend(self.read_partition(date_value, hall))
+        return rows
+
+    def import_rows(self, rows, today=None, closed=(), done=None):
+        """
+        Partition meals CSV rows by (ISO date, hall). Halls that aren't in rows keep their stored menu unless
+        their (date, hall) is in closed. Without done, each (date, hall) in rows is replaced wholesale. With
+        done, the (date, hall, meal) menus the run finished, only those meals are replaced (an empty one is
+        removed) and a hall's other stored meals are kept, so a meal that failed doesn't lose its last menu.
+        Returns the partitions written or removed.
+        """
+        partitions = {}
+        for row in rows:
+            date = scraper_common.normalize_date(row["Date"], today)
+            partitions.setdefault((date, row["Dining Hall"]), []).append(row)
+        closed = [(scraper_common.normalize_date(date_value, today), hall_name) for date_value, hall_name in closed]
+        if done is not None:
+            done = {(scraper_common.normalize_date(date_value, today), hall_name, meal_time)
+                    for date_value, hall_name, meal_time in done}
+            partitions = self._merge_meals(partitions, done)
+            # A hall left with no meals at all is removed like a closed one
+            closed += [key for key, partition_rows in partitions.items() if not partition_rows]
+            partitions = {key: partition_rows for key, partition_rows in partitions.items() if partition_rows}
+        removed = self.write_partitions(partitions, closed)
+        return sorted(set(partitions) | set(removed))
+
+    def _merge_meals(self, partitions, done):
+        """
+        Combine each new partition with its stored rows meal by meal. A meal's new rows win if it's in done
+        or wasn't stored before (a partial menu beats none); otherwise its stored rows are kept.
+        """
+        merged = {}
+        for date, hall_name in set(partitions) | {(date, hall_name) for date, hall_name, meal_time in done}:
+            stored = self.read_partition(date, hall_name)
+            stored_meals = {row["Meal"] for row in stored}
+            fresh = [row for row in partitions.get((date, hall_name), [])
+                     if (date, hall_name, row["Meal"]) in done or row["Meal"] not in stored_meals]
+            replaced = {row["Meal"] for row in fresh} | {meal_time for key_date, key_hall, meal_time in done
+                                                         if (key_date, key_hall) == (date, hall_name)}
+            kept = [row for row in stored if row["Meal"] not in replaced]
+            merged[(date, hall_name)] = sorted(kept + fresh, key=_meal_order)
+        return merged
+
+    def import_csv(self, meals_csv=scraper_common.meals_csv_filename, today=None, closed=(), done=None):
+        with open(meals_csv, mode='r', newline='', encoding='utf-8') as file:
+            return self.import_rows(csv.DictReader(file), today, closed, done)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partition scraped menus by date and hall, or read a day back.")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--import", dest="import_csv", metavar="CSV", help="Partition a dining_meals_nutrition.csv")
+    parser.add_argument("--date", help="Print the menu rows for a date")
+    parser.add_argument("--hall")
+    args = parser.parse_args(argv)
+
+    store = MenuStore(args.store)
+    if args.import_csv:
+        partitions = store.import_csv(args.import_csv)
+        print(f"Wrote {len(partitions)} partitions to {args.store}")
+    if args.date:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(scraper_common.MEALS_HEADER)
+        for row in store.read_date(args.date, args.hall):
+            writer.writerow([row[column] for column in scraper_common.MEALS_HEADER])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import menu_store
+from menu_store import MenuStore
+from scraper_common import meals_csv_dict as meal_row
+
+
+class TestMenuStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = MenuStore(os.path.join(self.tmpdir, "menu_store"))
+        self.today = datetime.date(2024, 11, 5)
+        self.store.import_rows([
+            meal_row(1, "Rand Dining Center", "Today", "Lunch", "Kale", "Sides"),
+            meal_row(2, "Rand Dining Center", "Today", "Lunch", "Yellow Rice", "Sides"),
+            meal_row(2, "Rand Dining Center", "Today", "Dinner", "Yellow Rice", "Sides"),
+            meal_row(3, "The Commons Dining Center", "2024/11/05", "Breakfast", "Scrambled Eggs", "Hot Line"),
+            meal_row(3, "Rand Dining Center", "2024/11/06", "Breakfast", "Scrambled Eggs", "Hot Line")
+        ], today=self.today)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_partitions_by_iso_date_and_hall(self):
+        self.assertEqual(self.store.dates(), ["2024-11-05", "2024-11-06"])
+        self.assertEqual(self.store.halls("2024/11/05"), ["Rand Dining Center", "The Commons Dining Center"])
+        manifest = self.store.manifest()
+        self.assertEqual(manifest["2024-11-05"]["Rand Dining Center"]["path"], "2024-11-05/rand-dining-center.json")
+        self.assertEqual(manifest["2024-11-05"]["Rand Dining Center"]["rows"], 3)
+
+    def test_strings_are_dictionary_encoded(self):
+        with open(os.path.join(self.store.root, "2024-11-05", "rand-dining-center.json"), encoding='utf-8') as file:
+            partition = json.load(file)
+        self.assertEqual(partition["dictionaries"]["Food Name"], ["Kale", "Yellow Rice"])
+        self.assertEqual(partition["columns"]["Food Name"], [0, 1, 1])
+        self.assertEqual(partition["dictionaries"]["Category"], ["Sides"])
+
+    def test_read_date_round_trips_rows(self):
+        rows = self.store.read_date("2024-11-05", "Rand Dining Center")
+        self.assertEqual(rows[0], meal_row(1, "Rand Dining Center", "2024-11-05", "Lunch", "Kale", "Sides"))
+        self.assertEqual(len(self.store.read_date("2024-11-05")), 4)
+        self.assertEqual(self.store.read_date("2024-11-07"), [])
+
+    def test_rewriting_a_partition_leaves_others_alone(self):
+        self.store.write_partition("2024-11-05", "Rand Dining Center",
+                                   [meal_row(4, "Rand Dining Center", "2024-11-05", "Lunch", "Tofu", "Sides")])
+        self.assertEqual([row["Food Name"] for row in self.store.read_date("2024-11-05", "Rand Dining Center")], ["Tofu"])
+        self.assertEqual(len(self.store.read_date("2024-11-06")), 1)
+
+    def test_reimported_date_keeps_halls_that_werent_scraped(self):
+        # The Commons failing to scrape this time doesn't take its last menu away
+        self.store.import_rows([meal_row(4, "Rand Dining Center", "2024-11-05", "Lunch", "Pasta", "Entrees")])
+        self.assertEqual(self.store.halls("2024-11-05"), ["Rand Dining Center", "The Commons Dining Center"])
+        self.assertEqual(len(self.store.read_date("2024-11-05", "The Commons Dining Center")), 1)
+
+    def test_closed_halls_are_dropped(self):
+        partitions = self.store.import_rows([meal_row(4, "Rand Dining Center", "2024-11-05", "Lunch", "Pasta", "Entrees")],
+                                            closed=[("2024/11/05", "The Commons Dining Center"),
+                                                    ("2024/11/05", "Rand Dining Center")])
+        self.assertEqual(partitions, [("2024-11-05", "Rand Dining Center"), ("2024-11-05", "The Commons Dining Center")])
+        self.assertEqual(self.store.halls("2024-11-05"), ["Rand Dining Center"])
+        self.assertFalse(os.path.exists(os.path.join(self.store.root, "2024-11-05", "the-commons-dining-center.json")))
+        self.assertEqual([row["Food Name"] for row in self.store.read_date("2024-11-05")], ["Pasta"])
+        # A date whose last hall closes leaves the manifest
+        self.store.import_rows([], closed=[("2024-11-06", "Rand Dining Center")])
+        self.assertEqual(self.store.dates(), ["2024-11-05"])
+
+    def test_only_finished_meals_replace_stored_ones(self):
+        # Lunch finished with a new menu, Dinner failed, and the 11/06 Breakfast finished empty
+        partitions = self.store.import_rows(
+            [meal_row(4, "Rand Dining Center", "2024-11-05", "Lunch", "Pasta", "Entrees")],
+            done=[("2024/11/05", "Rand Dining Center", "Lunch"), ("2024-11-06", "Rand Dining Center", "Breakfast")])
+        self.assertEqual(partitions, [("2024-11-05", "Rand Dining Center"), ("2024-11-06", "Rand Dining Center")])
+        self.assertEqual([(row["Meal"], row["Food Name"]) for row in self.store.read_date("2024-11-05", "Rand Dining Center")],
+                         [("Lunch", "Pasta"), ("Dinner", "Yellow Rice")])
+        self.assertEqual(self.store.dates(), ["2024-11-05"])
+
+        # A meal that failed but was never stored keeps whatever the run got
+        self.store.import_rows([meal_row(5, "Rand Dining Center", "2024-11-05", "Brunch", "Waffles", "Grill")], done=[])
+        self.assertEqual([row["Meal"] for row in self.store.read_date("2024-11-05", "Rand Dining Center")],
+                         ["Lunch", "Dinner", "Brunch"])
+
+    def test_partition_name(self):
+        self.assertEqual(menu_store.partition_name("E. Bronson Ingram Dining Center"), "e-bronson-ingram-dining-center.json")
+
+
+if __name__ == '__main__':
+    unittest.main()
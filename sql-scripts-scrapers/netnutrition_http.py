@@ -0,0 +1,389 @@
+"""
+HTTP-level NetNutrition scraper.
+
+Instead of driving Chrome through every dropdown and popup, this engine posts
+the same requests the NetNutrition page makes itself (select unit, select menu,
+show nutrition label) and parses the returned HTML panels with BeautifulSoup.
+It writes the same dining_meals_nutrition.csv / nutrition_info.csv rows as
+scraper_other.py.
+
+Requires: requests, beautifulsoup4, lxml
+"""
+import argparse
+import concurrent.futures
+import re
+import time
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import change_feed
+import menu_payloads
+import menu_store
+import nutrition_cache
+import retry_policy
+import scrape_checkpoint
+import scrape_shards
+import scraper_common
+import scraper_trace
+from csv_writer import BufferedCsvWriter
+from nutrition_label import element_text as _text, parse_nutrition_label
+from scraper_trace import tracer
+
+# Endpoints the NetNutrition page posts to (relative to the base URL)
+UNIT_SELECT_PATH = "/Unit/SelectUnitFromUnitsList"
+MENU_SELECT_PATH = "/Menu/SelectMenu"
+LABEL_PATH = "/NutritionDetail/ShowItemNutritionLabel"
+
+HTML_PARSER = "lxml"
+
+REQUEST_TIMEOUT = 20
+
+
+def create_session(pool_size=4):
+    """
+    Create a requests session with a keep-alive connection pool and retries that back off
+    like retry_policy.selection_policy (exponential, capped and jittered).
+    """
+    session = requests.Session()
+    policy = retry_policy.selection_policy
+    retry = Retry(total=3, backoff_factor=policy.base_delay, backoff_max=policy.max_delay,
+                  backoff_jitter=policy.base_delay, status_forcelist=[500, 502, 503, 504],
+                  allowed_methods=["GET", "POST"])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"X-Requested-With": "XMLHttpRequest"})
+    return session
+
+
+def _oid(element, attribute):
+    """
+    Read an object id from a data attribute, falling back to the last number in the onclick handler.
+    """
+    value = element.get(attribute)
+    if value:
+        return value
+    numbers = re.findall(r"\d+", element.get("onclick", ""))
+    return numbers[-1] if numbers else None
+
+
+def _panels(response):
+    """
+    Return {panel id: html} from a NetNutrition JSON response, or the raw body as a single panel.
+    """
+    try:
+        payload = response.json()
+    except ValueError:
+        return {"": response.text}
+    if isinstance(payload, dict) and "panels" in payload:
+        return {panel.get("id", ""): panel.get("html", "") for panel in payload["panels"]}
+    return {"": payload if isinstance(payload, str) else response.text}
+
+
+def parse_dining_halls(html):
+    """
+    Return [(unit oid, hall name)] from the landing page, excluding 'Show All Units'.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    halls = []
+    for link in soup.select("a[data-unitoid]"):
+        unit_oid = link.get("data-unitoid")
+        if unit_oid == "-1":
+            continue
+        halls.append((unit_oid, link.get("title") or _text(link)))
+    return halls
+
+
+def parse_menu_list(html):
+    """
+    Return [(date value, meal time, menu oid)] from the unit's menu list panel.
+    Each date card carries the same data-date value the date dropdown uses ('Today', '2024/11/05').
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    menus = []
+    for card in soup.select(".cbo_nn_menuListDiv [data-date]"):
+        date_value = card.get("data-date")
+        for link in card.select("a.cbo_nn_menuLink"):
+            meal_time = _text(link)
+            menu_oid = _oid(link, "data-menuoid")
+            if meal_time in scraper_common.MEAL_TIMES and menu_oid:
+                menus.append((date_value, meal_time, menu_oid))
+    return menus
+
+
+def parse_menu_items(html):
+    """
+    Return the menu table as a list of dicts with category, name, detail oid, filter flags and filter mask.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    items = []
+    current_category = None
+    for row in soup.select("tr"):
+        classes = row.get("class", [])
+        if "cbo_nn_itemGroupRow" in classes:
+            current_category = _text(row.select_one("div[role='button']")) or "Unknown"
+        elif "cbo_nn_itemPrimaryRow" in classes or "cbo_nn_itemAlternateRow" in classes:
+            link = row.select_one("a.cbo_nn_itemHover")
+            if link is None:
+                continue
+            filter_attributes = scraper_common.empty_filter_attributes()
+            for icon in link.select("span.pl-2 img"):
+                if icon.get("title") in filter_attributes:
+                    filter_attributes[icon.get("title")] = True
+            items.append({
+                "category": current_category,
+                "name": _text(link),
+                "detail_oid": _oid(link, "data-detailoid"),
+                "filters": filter_attributes
+            })
+    return items
+
+
+class HttpScraper:
+    """
+    Scrapes every dining hall over plain HTTP and writes the scraper CSV files.
+    Each hall gets its own session because NetNutrition keeps the selected unit and menu server-side.
+    With a checkpoint, finished menus are recorded so an interrupted run can resume, and
+    incremental runs reuse the previous run's rows for menus the hall still lists under the same menu oid,
+    without opening them, and for opened menus whose table hasn't changed.
+    A hall whose menus keep failing is given up on after breaker_threshold failures in a row.
+    With shard=(I, N) only the (hall, date) menus in that shard are scraped (see scrape_shards.py).
+    """
+
+    def __init__(self, base_url=scraper_common.BASE_URL, nutrition_csv=scraper_common.nutrition_csv_filename,
+                 meals_csv=scraper_common.meals_csv_filename, pool_size=4,
+                 cache_path=nutrition_cache.DEFAULT_CACHE_PATH, label_ttl=None,
+                 checkpoint=None, resume=False, incremental=False, menu_store_dir=None, breaker_threshold=3,
+                 shard=None, payload_dir=None, feed_dir=None):
+        self.base_url = base_url.rstrip("/")
+        self.nutrition_csv = nutrition_csv
+        self.meals_csv = meals_csv
+        self.pool_size = pool_size
+        self.nutrition_cache = nutrition_cache.NutritionCache(cache_path, seed_csv=nutrition_csv)
+        self.label_ttl = label_ttl
+        self.checkpoint = checkpoint
+        self.resume = resume
+        self.incremental = incremental
+        self.menu_store = menu_store.MenuStore(menu_store_dir) if menu_store_dir else None
+        self.payload_dir = payload_dir
+        self.feed_dir = feed_dir
+        self.writer = BufferedCsvWriter()
+        self.breaker = retry_policy.CircuitBreaker(threshold=breaker_threshold)
+        self.shard = shard
+        # (date, hall) menus the run reached and found empty for every meal, dropped from the menu store
+        self.closed = []
+
+    def open_session(self):
+        """
+        Open the landing page so the server issues the cookies the unit/menu selections are stored under.
+        """
+        session = create_session(self.pool_size)
+        tracer.count("requests")
+        response = session.get(self.base_url + "/", timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return session, response.text
+
+    def post(self, session, path, data):
+        tracer.count("requests")
+        response = session.post(self.base_url + path, data=data, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response
+
+    def get_dining_halls(self):
+        session, landing_html = self.open_session()
+        session.close()
+        return parse_dining_halls(landing_html)
+
+    def get_nutritional_info(self, session, detail_oid):
+        response = self.post(session, LABEL_PATH, {"detailOid": detail_oid})
+        html = "".join(_panels(response).values())
+        return parse_nutrition_label(html)
+
+    def food_id_for(self, session, item):
+        """
+        Return the Food ID for an item, fetching its label when it isn't cached or the cached label is stale.
+        """
+        item_name = item["name"]
+        with tracer.span("item", item=item_name) as span:
+            cached = self.nutrition_cache.get(item_name, ttl=self.label_ttl)
+            if cached is not None:
+                print(f"Using cached data for item: {item_name}")
+                tracer.count("nutrition_cache_hits")
+                span["cache"] = "hit"
+                return cached["Food ID"]
+
+            tracer.count("nutrition_cache_misses")
+            span["cache"] = "miss"
+            meal_name, nutrition_info = self.get_nutritional_info(session, item["detail_oid"])
+            if nutrition_info is None:
+                raise ValueError(f"No nutrition label for {item_name}")
+            return self.nutrition_cache.put(item_name, nutrition_info, item["filters"])
+
+    def scrape_hall(self, unit_oid, hall_name):
+        with tracer.span("hall", hall=hall_name):
+            session, _ = self.open_session()
+            try:
+                panels = _panels(self.post(session, UNIT_SELECT_PATH, {"unitOid": unit_oid}))
+                menus = parse_menu_list(panels.get("menuPanel", ""))
+                if not menus:
+                    print(f"No dates available for dining hall: {hall_name}")
+
+                for date_value, meal_time, menu_oid in menus:
+                    if not scrape_shards.in_shard(self.shard, hall_name, date_value):
+                        continue
+                    if self.checkpoint is not None and self.checkpoint.is_done(hall_name, date_value, meal_time):
+                        continue
+                    # The hall still lists the menu the previous run read, so it's reused without being opened
+                    if (self.incremental and self.checkpoint is not None
+                            and self.checkpoint.previous_source(hall_name, date_value, meal_time) == menu_oid):
+                        with tracer.span("meal", date=date_value, meal=meal_time) as span:
+                            scraped_items = self.checkpoint.carry_over(hall_name, date_value, meal_time)
+                            self.writer.write_rows(self.meals_csv, [
+                                scraper_common.meals_csv_row(food_id, hall_name, date_value, meal_time, item_name, category)
+                                for food_id, item_name, category in scraped_items
+                            ])
+                            span["reused"] = True
+                            span["items"] = len(scraped_items)
+                        print(f"Menu unchanged for {meal_time} at {hall_name} on {date_value}, reusing previous rows.")
+                        continue
+                    if not self.breaker.allow(hall_name):
+                        print(f"Giving up on {hall_name} after repeated menu failures")
+                        break
+                    with tracer.span("meal", date=date_value, meal=meal_time) as span:
+                        try:
+                            panels = _panels(self.post(session, MENU_SELECT_PATH, {"menuOid": menu_oid}))
+                            items = parse_menu_items(panels.get("itemPanel", ""))
+                            signature = scrape_checkpoint.menu_signature(items)
+                            # The menu came back and parsed, even if it's empty, so the hall is answering
+                            self.breaker.record_success(hall_name)
+                            if not items:
+                                print(f"No meal items available for {meal_time} at {hall_name} on {date_value}, skipping.")
+                                if self.checkpoint is not None:
+                                    self.checkpoint.mark_done(hall_name, date_value, meal_time, signature, [], menu_oid)
+                                continue
+
+                            scraped_items = None
+                            if self.incremental and self.checkpoint is not None:
+                                scraped_items = self.checkpoint.previous_items(hall_name, date_value, meal_time, signature)
+                                if scraped_items is not None:
+                                    print(f"Menu unchanged for {meal_time} at {hall_name} on {date_value}, reusing previous rows.")
+                                    span["reused"] = True
+
+                            if scraped_items is None:
+                                scraped_items = []
+                                for item in items:
+                                    try:
+                                        food_id = self.food_id_for(session, item)
+                                    except Exception as e:
+                                        print(f"Error scraping nutrition info for {item['name']}: {e}")
+                                        continue
+                                    scraped_items.append([food_id, item["name"], item["category"]])
+
+                            self.writer.write_rows(self.meals_csv, [
+                                scraper_common.meals_csv_row(food_id, hall_name, date_value, meal_time, item_name, category)
+                                for food_id, item_name, category in scraped_items
+                            ])
+                            # Only checkpoint menus where every item made it, so a resumed run retries the rest
+                            if self.checkpoint is not None and len(scraped_items) == len(items):
+                                self.checkpoint.mark_done(hall_name, date_value, meal_time, signature, scraped_items, menu_oid)
+                            span["items"] = len(scraped_items)
+                            print(f"Scraped {len(scraped_items)} items for {meal_time} at {hall_name} on {date_value}")
+                        except Exception as e:
+                            print(f"Error scraping {meal_time} at {hall_name} on {date_value}: {e}")
+                            span["error"] = str(e)
+                            self.breaker.record_failure(hall_name)
+
+                if self.checkpoint is not None:
+                    meal_times = {}
+                    for date_value, meal_time, _ in menus:
+                        meal_times.setdefault(date_value, []).append(meal_time)
+                    for date_value, date_meals in meal_times.items():
+                        if self.checkpoint.is_closed(hall_name, date_value, date_meals):
+                            self.closed.append((date_value, hall_name))
+            except Exception as e:
+                print(f"Error scraping dining hall {hall_name}: {e}")
+            finally:
+                session.close()
+
+    def run(self):
+        # Recreate the meals CSV to start with a blank file for each new run, keeping finished menus when resuming
+        self.writer.open_file(self.meals_csv, header=scraper_common.MEALS_HEADER)
+        if self.checkpoint is not None:
+            self.checkpoint.begin(resume=self.resume)
+            self.writer.write_rows(self.meals_csv, self.checkpoint.completed_rows())
+
+        try:
+            dining_halls = self.get_dining_halls()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+                futures = [executor.submit(self.scrape_hall, unit_oid, name) for unit_oid, name in dining_halls]
+                concurrent.futures.wait(futures)
+        finally:
+            self.writer.close()
+            self.nutrition_cache.export_csv(self.nutrition_csv)
+            self.nutrition_cache.close()
+            if self.checkpoint is not None:
+                self.checkpoint.close()
+
+        # Split the finished run into per-date, per-hall partitions
+        if self.menu_store is not None:
+            # With a checkpoint only the meals it marked done replace the stored ones
+            partitions = self.menu_store.import_csv(
+                self.meals_csv, closed=self.closed,
+                done=self.checkpoint.done_menus() if self.checkpoint is not None else None)
+            dates = sorted({date for date, _ in partitions})
+            # and rebuild the API's precomputed menu responses for those dates
+            if self.payload_dir is not None:
+                menu_payloads.build_payloads(self.menu_store, self.nutrition_csv, self.payload_dir, dates=dates)
+            # and log what changed since the last run for change_feed.py apply
+            if self.feed_dir is not None:
+                change_feed.publish(self.nutrition_csv, self.menu_store, dates, self.feed_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape NetNutrition over HTTP without a browser.")
+    parser.add_argument("--base-url", default=scraper_common.BASE_URL)
+    parser.add_argument("--workers", type=int, default=4, help="Number of halls scraped in parallel")
+    parser.add_argument("--refresh-days", type=float, default=None,
+                        help="Re-fetch cached nutrition labels older than this many days")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run, skipping menus it already finished")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse the previous run's rows for menus still listed under the same menu oid, "
+                             "or whose table hasn't changed")
+    parser.add_argument("--trace", default=scraper_trace.DEFAULT_TRACE_PATH,
+                        help="JSONL file the run's spans are appended to ('' to skip)")
+    parser.add_argument("--metrics", default=scraper_trace.DEFAULT_METRICS_PATH,
+                        help="Prometheus text file written at the end of the run ('' to skip)")
+    parser.add_argument("--shard", type=scrape_shards.parse_shard, default=None,
+                        help="Only scrape the (hall, date) menus of shard I of N, e.g. 2/4")
+    parser.add_argument("--output-dir", default="",
+                        help="Directory for the CSV files, nutrition cache and checkpoint (default: here)")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    label_ttl = args.refresh_days * 86400 if args.refresh_days is not None else None
+    paths = scrape_shards.output_paths(args.output_dir)
+    tracer.start(args.trace, engine="http")
+    try:
+        # A shard's menus only reach the menu store through scrape_shards.py merge
+        HttpScraper(base_url=args.base_url, nutrition_csv=paths["nutrition_csv"], meals_csv=paths["meals_csv"],
+                    pool_size=args.workers, cache_path=paths["cache"], label_ttl=label_ttl,
+                    checkpoint=scrape_checkpoint.ScrapeCheckpoint(paths["checkpoint"]), resume=args.resume,
+                    incremental=args.incremental, shard=args.shard,
+                    menu_store_dir=None if args.shard else menu_store.DEFAULT_STORE_DIR,
+                    payload_dir=None if args.shard else menu_payloads.DEFAULT_PAYLOAD_DIR,
+                    feed_dir=None if args.shard else change_feed.DEFAULT_FEED_DIR).run()
+    finally:
+        tracer.finish(args.metrics)
+
+    hit_ratio = tracer.cache_hit_ratio()
+    if hit_ratio is not None:
+        print(f"Nutrition cache hit rate: {hit_ratio:.0%}")
+    print(f"Total runtime: {time.time() - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import menu_store
+import netnutrition_http
+import replay_server
+import scrape_checkpoint
+import scraper_common
+
+
+class TestHttpScraper(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.base_url = replay_server.start_replay_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.nutrition_csv = os.path.join(self.tmpdir, "nutrition_info.csv")
+        self.meals_csv = os.path.join(self.tmpdir, "dining_meals_nutrition.csv")
+        self.cache_path = os.path.join(self.tmpdir, "nutrition_cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read_csv(self, filename):
+        with open(filename, newline='', encoding='utf-8') as file:
+            return list(csv.reader(file))
+
+    def test_parse_menu_list_skips_unknown_meals(self):
+        with open(os.path.join(replay_server.DEFAULT_FIXTURE_DIR, "unit_1.json"), encoding='utf-8') as file:
+            html = json.load(file)["panels"][0]["html"]
+        menus = netnutrition_http.parse_menu_list(html)
+        self.assertEqual(menus, [("Today", "Breakfast", "101"), ("Today", "Lunch", "102"), ("2024/11/05", "Lunch", "103")])
+
+    def test_empty_menu_counts_as_a_success_for_the_breaker(self):
+        scraper = netnutrition_http.HttpScraper(self.base_url, self.nutrition_csv, self.meals_csv, pool_size=1,
+                                               cache_path=self.cache_path, breaker_threshold=2)
+        scraper.breaker.record_failure("Rand Dining Center")
+        scraper.open_session = lambda: (mock.MagicMock(), "")
+        scraper.post = lambda session, path, data: None
+        with mock.patch.object(netnutrition_http, "_panels", return_value={}), \
+                mock.patch.object(netnutrition_http, "parse_menu_list", return_value=[("Today", "Lunch", "102")]), \
+                mock.patch.object(netnutrition_http, "parse_menu_items", return_value=[]):
+            scraper.scrape_hall("1", "Rand Dining Center")
+        scraper.nutrition_cache.close()
+        # The earlier failure was cleared, so one more doesn't open the circuit
+        self.assertFalse(scraper.breaker.record_failure("Rand Dining Center"))
+
+    def test_only_halls_with_every_meal_empty_are_closed(self):
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(os.path.join(self.tmpdir, "scrape_checkpoint.jsonl"))
+        checkpoint.begin()
+        scraper = netnutrition_http.HttpScraper(self.base_url, self.nutrition_csv, self.meals_csv, pool_size=1,
+                                               cache_path=self.cache_path, checkpoint=checkpoint)
+        scraper.open_session = lambda: (mock.MagicMock(), "")
+        scraper.post = lambda session, path, data: data
+
+        def menu_items(data):
+            if data == {"menuOid": "103"}:
+                raise ValueError("menu didn't load")
+            return []
+
+        menus = [("Today", "Breakfast", "101"), ("Today", "Lunch", "102"), ("2024/11/05", "Lunch", "103")]
+        with mock.patch.object(netnutrition_http, "_panels", side_effect=lambda data: {"itemPanel": data}), \
+                mock.patch.object(netnutrition_http, "parse_menu_list", return_value=menus), \
+                mock.patch.object(netnutrition_http, "parse_menu_items", side_effect=menu_items):
+            scraper.scrape_hall("1", "Rand Dining Center")
+        scraper.nutrition_cache.close()
+        checkpoint.close()
+        # 2024/11/05 failed rather than came back empty, so its stored menu is kept
+        self.assertEqual(scraper.closed, [("Today", "Rand Dining Center")])
+
+    def test_run_writes_same_rows_as_selenium_scraper(self):
+        menu_store_dir = os.path.join(self.tmpdir, "menu_store")
+        scraper = netnutrition_http.HttpScraper(self.base_url, self.nutrition_csv, self.meals_csv, pool_size=2,
+                                               cache_path=self.cache_path, menu_store_dir=menu_store_dir)
+        scraper.run()
+
+        meals = self.read_csv(self.meals_csv)
+        self.assertEqual(meals[0], scraper_common.MEALS_HEADER)
+        self.assertIn(["Rand Dining Center", "Today", "Breakfast", "Scrambled Eggs", "Hot Line Main"],
+                      [row[1:] for row in meals[1:]])
+        self.assertEqual(len(meals) - 1, 7)
+
+        nutrition = self.read_csv(self.nutrition_csv)
+        self.assertEqual(nutrition[0], scraper_common.NUTRITION_HEADER)
+        # Items shared between halls are fetched once and get one Food ID each
+        self.assertEqual(sorted(int(row[0]) for row in nutrition[1:]), [1, 2, 3, 4])
+        self.assertTrue(all(len(row) == len(scraper_common.NUTRITION_HEADER) for row in nutrition))
+
+        food_ids = {row[1]: row[0] for row in nutrition[1:]}
+        for row in meals[1:]:
+            self.assertEqual(row[0], food_ids[row[4]])
+
+        # The run is also split into per-date, per-hall partitions
+        store = menu_store.MenuStore(menu_store_dir)
+        self.assertEqual(sum(len(store.read_date(date)) for date in store.dates()), 7)
+        self.assertIn("2024-11-05", store.dates())
+
+    def test_labels_match_captured_csv_values(self):
+        scraper = netnutrition_http.HttpScraper(self.base_url, self.nutrition_csv, self.meals_csv, pool_size=1,
+                                               cache_path=self.cache_path)
+        scraper.run()
+
+        expected = scraper_common.load_nutrition_cache("nutrition_info.csv")
+        with open(self.nutrition_csv, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                for field in scraper_common.NUTRITION_FIELDS:
+                    self.assertEqual(row[field], expected[row["Food Name"]][field], field)
+                for name in scraper_common.FILTER_NAMES:
+                    self.assertEqual(row[name] == "True", expected[row["Food Name"]][name] == "TRUE", name)
+
+    def test_resume_and_incremental_runs_skip_finished_menus(self):
+        checkpoint_path = os.path.join(self.tmpdir, "scrape_checkpoint.jsonl")
+        netnutrition_http.HttpScraper(self.base_url, self.nutrition_csv, self.meals_csv, pool_size=2,
+                                      cache_path=self.cache_path,
+                                      checkpoint=scrape_checkpoint.ScrapeCheckpoint(checkpoint_path)).run()
+        first_rows = sorted(map(tuple, self.read_csv(self.meals_csv)[1:]))
+
+        def fail_post(session, path, data):
+            if path != netnutrition_http.UNIT_SELECT_PATH:
+                raise AssertionError(f"Unexpected request to {path}")
+            return netnutrition_http.HttpScraper.post(scraper, session, path, data)
+
+        # Resuming a finished run doesn't open any menu and keeps every row
+        scraper = netnutrition_http.HttpScraper(self.base_url, self.nutrition_csv, self.meals_csv, pool_size=2,
+                                                cache_path=self.cache_path, resume=True,
+                                                checkpoint=scrape_checkpoint.ScrapeCheckpoint(checkpoint_path))
+        scraper.post = fail_post
+        scraper.run()
+        self.assertEqual(sorted(map(tuple, self.read_csv(self.meals_csv)[1:])), first_rows)
+
+        # An incremental run opens no menu or label, since every hall lists the same menu oids as before
+        scraper = netnutrition_http.HttpScraper(self.base_url, self.nutrition_csv, self.meals_csv, pool_size=2,
+                                                cache_path=os.path.join(self.tmpdir, "empty_cache.db"), incremental=True,
+                                                checkpoint=scrape_checkpoint.ScrapeCheckpoint(checkpoint_path))
+        scraper.post = fail_post
+        scraper.get_nutritional_info = None
+        scraper.run()
+        self.assertEqual(sorted(map(tuple, self.read_csv(self.meals_csv)[1:])), first_rows)
+
+        # A menu listed under a new oid is opened, and reused once its table turns out to be the same
+        entries = list(scrape_checkpoint.read_manifest(checkpoint_path).values())
+        with open(checkpoint_path, mode='w', encoding='utf-8') as file:
+            for entry in entries:
+                file.write(json.dumps(dict(entry, source="0") if entry["meal"] == "Breakfast" else entry) + "\n")
+        opened = []
+
+        def record_post(session, path, data):
+            opened.append(data.get("menuOid"))
+            return netnutrition_http.HttpScraper.post(scraper, session, path, data)
+
+        scraper = netnutrition_http.HttpScraper(self.base_url, self.nutrition_csv, self.meals_csv, pool_size=1,
+                                                cache_path=os.path.join(self.tmpdir, "empty_cache.db"), incremental=True,
+                                                checkpoint=scrape_checkpoint.ScrapeCheckpoint(checkpoint_path))
+        scraper.post = record_post
+        scraper.get_nutritional_info = None
+        scraper.run()
+        self.assertEqual([oid for oid in opened if oid], ["101"])
+        self.assertEqual(sorted(map(tuple, self.read_csv(self.meals_csv)[1:])), first_rows)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,269 @@
+"""
+Persistent nutrition cache backed by SQLite.
+
+Replaces the module-level dict that was rebuilt from nutrition_info.csv on
+every import. Food IDs are issued by SQLite inside a transaction, so
+concurrent scraper threads can't hand out the same ID, and a food keeps its
+ID across runs. Each entry records when its label was last fetched so stale
+labels can be refreshed after a TTL, and its filter flags packed into one
+integer (scraper_common.filter_mask). Lookups are single-key queries on an
+indexed column; nothing is loaded into memory up front.
+
+Ingredient declarations repeat the same long sub-ingredient entries across
+hundreds of foods, so each distinct entry (ingredient_index.split_declaration)
+is stored once in ingredient_entries and a food keeps only its list of entry
+IDs. Entries come back as the full Ingredients text when a food is read, and
+ingredient_index.IngredientIndex.from_cache builds its inverted index from
+the same table.
+"""
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import ingredient_index
+import scraper_common
+
+DEFAULT_CACHE_PATH = "nutrition_cache.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS foods (
+    food_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    food_name TEXT NOT NULL UNIQUE,
+    nutrition TEXT NOT NULL,
+    filters TEXT NOT NULL,
+    fetched_at REAL,
+    filter_mask INTEGER NOT NULL DEFAULT 0,
+    ingredient_ids TEXT
+);
+CREATE TABLE IF NOT EXISTS ingredient_entries (
+    entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entry TEXT NOT NULL UNIQUE
+);
+"""
+
+FOOD_SELECT = "SELECT food_id, food_name, nutrition, filters, fetched_at, filter_mask, ingredient_ids FROM foods"
+
+
+class NutritionCache:
+    """
+    Thread-safe nutrition cache keyed by food name. Entries are returned in the same
+    shape as a nutrition_info.csv row ("Food ID", "Food Name", label fields, filter flags).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, seed_csv=scraper_common.nutrition_csv_filename):
+        self.path = path
+        self.seed_csv = seed_csv
+        self.lock = threading.RLock()
+        self.connection = None
+
+    def connect(self):
+        with self.lock:
+            if self.connection is None:
+                self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.executescript(SCHEMA)
+                self.migrate()
+                if self.seed_csv and self.count() == 0 and os.path.exists(self.seed_csv):
+                    self.import_csv(self.seed_csv)
+            return self.connection
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def migrate(self):
+        """
+        Add the filter_mask and ingredient_ids columns to caches created before they existed.
+        """
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(foods)")]
+        if "filter_mask" not in columns:
+            with self.connection:
+                self.connection.execute("ALTER TABLE foods ADD COLUMN filter_mask INTEGER NOT NULL DEFAULT 0")
+                rows = self.connection.execute("SELECT food_id, filters FROM foods").fetchall()
+                self.connection.executemany(
+                    "UPDATE foods SET filter_mask = ? WHERE food_id = ?",
+                    [(scraper_common.filter_mask(json.loads(filters)), food_id) for food_id, filters in rows]
+                )
+        if "ingredient_ids" not in columns:
+            with self.connection:
+                self.connection.execute("ALTER TABLE foods ADD COLUMN ingredient_ids TEXT")
+                rows = self.connection.execute("SELECT food_id, nutrition FROM foods").fetchall()
+                for food_id, nutrition in rows:
+                    nutrition, ingredient_ids = self._split_ingredients(json.loads(nutrition))
+                    self.connection.execute("UPDATE foods SET nutrition = ?, ingredient_ids = ? WHERE food_id = ?",
+                                            (nutrition, ingredient_ids, food_id))
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM foods").fetchone()[0]
+
+    def _intern(self, entry):
+        # Called inside the caller's transaction, under self.lock
+        self.connection.execute("INSERT OR IGNORE INTO ingredient_entries (entry) VALUES (?)", (entry,))
+        return self.connection.execute("SELECT entry_id FROM ingredient_entries WHERE entry = ?", (entry,)).fetchone()[0]
+
+    def _split_ingredients(self, nutrition_info):
+        """
+        Return the nutrition JSON without Ingredients and the JSON list of its interned entry IDs. Declarations
+        that don't rebuild exactly from their entries (N/A, odd spacing) stay in the nutrition JSON as text.
+        """
+        nutrition_info = {field: nutrition_info.get(field, "N/A") for field in scraper_common.NUTRITION_FIELDS}
+        declaration = nutrition_info["Ingredients"]
+        entries = ingredient_index.split_declaration(declaration)
+        if not entries or ", ".join(entries) != declaration:
+            return json.dumps(nutrition_info), None
+        del nutrition_info["Ingredients"]
+        return json.dumps(nutrition_info), json.dumps([self._intern(entry) for entry in entries])
+
+    def _ingredient_entries(self, entry_ids=None):
+        """
+        {entry ID: entry} for the given IDs, or for the whole dictionary if None.
+        """
+        if entry_ids is None:
+            return dict(self.connection.execute("SELECT entry_id, entry FROM ingredient_entries").fetchall())
+        entry_ids = sorted(set(entry_ids))
+        if not entry_ids:
+            return {}
+        return dict(self.connection.execute(
+            f"SELECT entry_id, entry FROM ingredient_entries WHERE entry_id IN ({', '.join('?' * len(entry_ids))})",
+            entry_ids
+        ).fetchall())
+
+    def _entry(self, row, ingredient_entries):
+        food_id, food_name, nutrition, filters, fetched_at, filter_mask, ingredient_ids = row
+        entry = {"Food ID": food_id, "Food Name": food_name}
+        entry.update(json.loads(nutrition))
+        if ingredient_ids is not None:
+            entry["Ingredients"] = ", ".join(ingredient_entries[entry_id] for entry_id in json.loads(ingredient_ids))
+        entry.update(json.loads(filters))
+        entry["Fetched At"] = fetched_at
+        entry["Filter Mask"] = filter_mask
+        return entry
+
+    def get(self, food_name, ttl=None):
+        """
+        Return the cached entry for food_name, or None if missing or fetched more than ttl seconds ago.
+        """
+        connection = self.connect()
+        with self.lock:
+            row = connection.execute(FOOD_SELECT + " WHERE food_name = ?", (food_name,)).fetchone()
+            if row is None:
+                return None
+            if ttl is not None and (row[4] is None or row[4] < time.time() - ttl):
+                return None
+            ingredient_entries = self._ingredient_entries(json.loads(row[6]) if row[6] is not None else [])
+        return self._entry(row, ingredient_entries)
+
+    def __contains__(self, food_name):
+        return self.get(food_name) is not None
+
+    def put(self, food_name, nutrition_info, filter_attributes, fetched_at=None):
+        """
+        Store a freshly fetched label and return its Food ID. A refreshed food keeps its existing ID.
+        """
+        filters = json.dumps({name: bool(filter_attributes.get(name, False)) for name in scraper_common.FILTER_NAMES})
+        filter_mask = scraper_common.filter_mask(filter_attributes)
+        fetched_at = time.time() if fetched_at is None else fetched_at
+
+        connection = self.connect()
+        with self.lock, connection:
+            nutrition, ingredient_ids = self._split_ingredients(nutrition_info)
+            connection.execute(
+                "INSERT INTO foods (food_name, nutrition, filters, fetched_at, filter_mask, ingredient_ids) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(food_name) DO UPDATE SET nutrition = excluded.nutrition, "
+                "filters = excluded.filters, fetched_at = excluded.fetched_at, filter_mask = excluded.filter_mask, "
+                "ingredient_ids = excluded.ingredient_ids",
+                (food_name, nutrition, filters, fetched_at, filter_mask, ingredient_ids)
+            )
+            return connection.execute("SELECT food_id FROM foods WHERE food_name = ?", (food_name,)).fetchone()[0]
+
+    def food_masks(self):
+        """
+        Return {Food ID: filter mask} for every cached food.
+        """
+        connection = self.connect()
+        with self.lock:
+            return dict(connection.execute("SELECT food_id, filter_mask FROM foods").fetchall())
+
+    def ingredient_dictionary(self):
+        """
+        Return ({entry ID: entry}, {Food ID: entry IDs}, {Food ID: declaration}) for ingredient_index. The
+        last holds the declarations stored as text because they don't rebuild from their entries.
+        """
+        connection = self.connect()
+        with self.lock:
+            entries = self._ingredient_entries()
+            rows = connection.execute("SELECT food_id, ingredient_ids, nutrition FROM foods").fetchall()
+        foods = {}
+        declarations = {}
+        for food_id, ingredient_ids, nutrition in rows:
+            if ingredient_ids is not None:
+                foods[food_id] = json.loads(ingredient_ids)
+            else:
+                declarations[food_id] = json.loads(nutrition).get("Ingredients")
+        return entries, foods, declarations
+
+    def entries(self):
+        """
+        Return every cached entry in Food ID order.
+        """
+        connection = self.connect()
+        with self.lock:
+            rows = connection.execute(FOOD_SELECT + " ORDER BY food_id").fetchall()
+            ingredient_entries = self._ingredient_entries()
+        return [self._entry(row, ingredient_entries) for row in rows]
+
+    def backup(self, path):
+        """
+        Copy the cache to a new SQLite file, including changes still in the write-ahead log.
+        """
+        connection = self.connect()
+        target = sqlite3.connect(path)
+        try:
+            with self.lock:
+                connection.backup(target)
+        finally:
+            target.close()
+
+    def import_csv(self, filename):
+        """
+        Load an existing nutrition_info.csv, keeping its Food IDs where they are unique.
+        Rows are stamped with the file's modification time as their fetch time.
+        """
+        fetched_at = os.path.getmtime(filename)
+        connection = self.connection
+        with self.lock, connection:
+            with open(filename, mode='r', newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    nutrition, ingredient_ids = self._split_ingredients(row)
+                    filter_attributes = {name: str(row.get(name, "")).lower() == "true" for name in scraper_common.FILTER_NAMES}
+                    filters = json.dumps(filter_attributes)
+                    food_id = int(row["Food ID"]) if row.get("Food ID", "").isdigit() else None
+                    taken = food_id is not None and connection.execute(
+                        "SELECT 1 FROM foods WHERE food_id = ?", (food_id,)).fetchone()
+                    connection.execute(
+                        "INSERT OR IGNORE INTO foods (food_id, food_name, nutrition, filters, fetched_at, filter_mask, "
+                        "ingredient_ids) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (None if taken else food_id, row["Food Name"], nutrition, filters, fetched_at,
+                         scraper_common.filter_mask(filter_attributes), ingredient_ids)
+                    )
+
+    def export_csv(self, filename=scraper_common.nutrition_csv_filename):
+        """
+        Rewrite nutrition_info.csv from the cache, one row per food in Food ID order.
+        """
+        entries = self.entries()
+        # Write to a temporary file first so db_loader and the other readers never see a half-written file
+        temp_path = filename + ".tmp"
+        with open(temp_path, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(scraper_common.NUTRITION_HEADER)
+            for entry in entries:
+                writer.writerow(scraper_common.nutrition_csv_row(entry["Food ID"], entry["Food Name"], entry, entry))
+        os.replace(temp_path, filename)
@@ -0,0 +1,113 @@
+import concurrent.futures
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import scraper_common
+from nutrition_cache import NutritionCache
+
+
+class TestNutritionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_seeds_from_csv_and_keeps_ids(self):
+        cache = NutritionCache(self.path, seed_csv="nutrition_info.csv")
+        entry = cache.get("Yellow Rice")
+        self.assertEqual(entry["Food ID"], 2)
+        self.assertEqual(entry["Serving Size"], "5 oz. portion (141g)")
+        self.assertTrue(entry["Vegan"])
+        self.assertIsNone(cache.get("Not A Food"))
+        cache.close()
+
+    def test_concurrent_puts_issue_unique_ids(self):
+        cache = NutritionCache(self.path, seed_csv=None)
+        names = [f"Item {i}" for i in range(50)]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            ids = list(executor.map(lambda name: cache.put(name, {"Calories": "10"}, {}), names + names))
+        self.assertEqual(len(set(ids)), 50)
+        self.assertEqual(ids[:50], ids[50:])
+        cache.close()
+
+    def test_ids_are_stable_across_runs_and_refreshes(self):
+        cache = NutritionCache(self.path, seed_csv=None)
+        food_id = cache.put("Tater Tots", {"Calories": "150"}, {"Vegan": True})
+        cache.close()
+
+        cache = NutritionCache(self.path, seed_csv=None)
+        self.assertEqual(cache.put("Tater Tots", {"Calories": "160"}, {"Vegan": True}), food_id)
+        self.assertEqual(cache.get("Tater Tots")["Calories"], "160")
+        cache.close()
+
+    def test_ttl_treats_old_labels_as_missing(self):
+        cache = NutritionCache(self.path, seed_csv=None)
+        cache.put("Old Soup", {}, {}, fetched_at=time.time() - 10 * 86400)
+        self.assertIsNotNone(cache.get("Old Soup"))
+        self.assertIsNone(cache.get("Old Soup", ttl=86400))
+        cache.close()
+
+    def test_export_writes_one_row_per_food(self):
+        cache = NutritionCache(self.path, seed_csv=None)
+        cache.put("B", {"Calories": "2"}, {})
+        cache.put("A", {"Calories": "1"}, {"Halal": True})
+        cache.put("B", {"Calories": "3"}, {})
+        out = os.path.join(self.tmpdir, "nutrition_info.csv")
+        cache.export_csv(out)
+        cache.close()
+
+        with open(out, newline='', encoding='utf-8') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], scraper_common.NUTRITION_HEADER)
+        self.assertEqual([(row[0], row[1], row[3]) for row in rows[1:]], [("1", "B", "3"), ("2", "A", "1")])
+        # Written beside the target and swapped in, so no temporary file is left behind
+        self.assertFalse(os.path.exists(out + ".tmp"))
+
+    def test_filter_masks_are_stored_and_migrated(self):
+        cache = NutritionCache(self.path, seed_csv=None)
+        food_id = cache.put("Kale", {}, {"Vegan": True, "Vegetarian": True})
+        self.assertEqual(cache.food_masks(), {food_id: scraper_common.names_mask(["Vegan", "Vegetarian"])})
+
+        # A cache from before the column existed gets it filled in from the stored flags
+        with cache.connection:
+            cache.connection.execute("ALTER TABLE foods DROP COLUMN filter_mask")
+        cache.close()
+        cache = NutritionCache(self.path, seed_csv=None)
+        self.assertEqual(cache.get("Kale")["Filter Mask"], scraper_common.names_mask(["Vegan", "Vegetarian"]))
+        cache.close()
+
+    def test_ingredient_entries_are_stored_once(self):
+        base = "GF Vegetable Base (SALT, SUGAR, MALTODEXTRIN)"
+        cache = NutritionCache(self.path, seed_csv=None)
+        cache.put("Kale", {"Ingredients": f"Kale, {base}"}, {})
+        cache.put("Rice", {"Ingredients": f"Brown Rice, Water, {base}"}, {})
+        cache.put("Tea", {"Ingredients": "N/A"}, {})
+        self.assertEqual(cache.get("Rice")["Ingredients"], f"Brown Rice, Water, {base}")
+        self.assertEqual(cache.get("Tea")["Ingredients"], "N/A")
+        self.assertEqual(cache.connection.execute("SELECT COUNT(*) FROM ingredient_entries").fetchone()[0], 4)
+        nutrition = cache.connection.execute("SELECT nutrition FROM foods WHERE food_name = 'Kale'").fetchone()[0]
+        self.assertNotIn("Ingredients", json.loads(nutrition))
+
+        # A cache that kept the declarations in its nutrition JSON is split into entries on open
+        with cache.connection:
+            cache.connection.execute("ALTER TABLE foods DROP COLUMN ingredient_ids")
+            cache.connection.execute("UPDATE foods SET nutrition = ? WHERE food_name = 'Kale'",
+                                     (json.dumps({"Calories": "20", "Ingredients": "Kale, Garlic"}),))
+        cache.close()
+        cache = NutritionCache(self.path, seed_csv=None)
+        self.assertEqual(cache.get("Kale")["Ingredients"], "Kale, Garlic")
+        self.assertEqual(cache.get("Kale")["Calories"], "20")
+        self.assertEqual(cache.connection.execute("SELECT COUNT(*) FROM ingredient_entries").fetchone()[0], 5)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
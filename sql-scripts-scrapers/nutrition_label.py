@@ -0,0 +1,90 @@
+"""
+Pure parser for the NetNutrition nutrition label popup.
+
+Both scrapers hand it the label HTML in one piece (the HTTP engine from the
+label response, the Selenium scraper from a single outerHTML read) so every
+field is read in-process instead of through separate WebDriver calls.
+
+Requires: beautifulsoup4, lxml
+"""
+from bs4 import BeautifulSoup
+
+HTML_PARSER = "lxml"
+
+
+def element_text(element):
+    """
+    Return the text of an element with whitespace collapsed, like WebElement.text.
+    """
+    if element is None:
+        return ""
+    return " ".join(element.get_text().replace("\xa0", " ").split())
+
+
+def parse_nutrition_label(html):
+    """
+    Extract meal name and nutritional info from one snapshot of the nutrition label HTML.
+    Returns the same (meal_name, nutrition_info) pair as scraper_other.get_nutritional_info_selenium.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    header = soup.select_one(".cbo_nn_LabelHeader")
+    meal_name = element_text(header) if header is not None else None
+
+    nutrition_info = {}
+
+    # Extract serving size
+    serving_text = element_text(soup.select_one(".cbo_nn_LabelBottomBorderLabel"))
+    nutrition_info["Serving Size"] = serving_text.split(':', 1)[1].strip() if ':' in serving_text else "N/A"
+
+    # Extract calories and calories from fat
+    nutrition_info["Calories"] = "N/A"
+    nutrition_info["Calories from Fat"] = "N/A"
+    calories_cell = soup.find(lambda tag: tag.name == "td" and any(
+        "Calories" in string for string in tag.find_all(string=True, recursive=False)))
+    if calories_cell is not None and calories_cell.parent is not None and calories_cell.parent.parent is not None:
+        cells = calories_cell.parent.parent.find_all("td")
+        if len(cells) == 2:
+            nutrition_info["Calories"] = element_text(cells[0].select_one(".cbo_nn_SecondaryNutrient")) or "N/A"
+            nutrition_info["Calories from Fat"] = element_text(cells[1].select_one(".cbo_nn_SecondaryNutrient")) or "N/A"
+
+    # Extract other nutrition information
+    for row in soup.select("table[style='width:100%;'] tr"):
+        if "Calories" in element_text(row):
+            continue
+        cells = row.find_all("td")
+        if len(cells) == 3:
+            nutrient_name = element_text(cells[0])
+            nutrient_value = element_text(cells[1])
+            daily_value = element_text(cells[2])
+
+            if nutrient_name == "Total Carbohydrate":
+                nutrition_info["Total Carbohydrates"] = nutrient_value
+                nutrition_info["Total Carbohydrates %"] = daily_value
+            elif nutrient_name not in ["Trans Fat", "Sugars"]:
+                nutrition_info[nutrient_name] = nutrient_value
+                if daily_value:
+                    nutrition_info[f"{nutrient_name} %"] = daily_value
+            else:
+                nutrition_info[nutrient_name] = nutrient_value
+
+    # Extract vitamin information (percent only)
+    for vitamin_cell in soup.select(".cbo_nn_SecondaryNutrientLabel"):
+        value_cell = vitamin_cell.find_next_sibling("td")
+        vitamin_value = element_text(value_cell)
+        if vitamin_value.endswith("%"):
+            nutrition_info[f"{element_text(vitamin_cell)} %"] = vitamin_value
+
+    # Extract Vitamin D specifically if not captured earlier
+    for row in soup.find_all("tr"):
+        if any("Vitamin D" in "".join(cell.find_all(string=True, recursive=False))
+               for cell in row.find_all("td", recursive=False)):
+            vitamin_d_cells = row.find_all("td")
+            if len(vitamin_d_cells) == 2:
+                nutrition_info["Vitamin D %"] = element_text(vitamin_d_cells[1])
+            break
+
+    # Extract ingredients
+    ingredients = soup.select_one(".cbo_nn_LabelIngredients")
+    nutrition_info["Ingredients"] = element_text(ingredients) if ingredients is not None else "N/A"
+
+    return meal_name, nutrition_info
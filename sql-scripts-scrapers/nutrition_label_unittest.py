@@ -0,0 +1,51 @@
+import os
+import unittest
+
+import nutrition_label
+import scraper_common
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_fixture(*parts):
+    with open(os.path.join(FIXTURE_DIR, *parts), encoding='utf-8') as file:
+        return file.read()
+
+
+class TestParseNutritionLabel(unittest.TestCase):
+
+    def test_full_label_matches_scraped_csv(self):
+        expected = scraper_common.load_nutrition_cache("nutrition_info.csv")["Yellow Rice"]
+        meal_name, nutrition_info = nutrition_label.parse_nutrition_label(read_fixture("netnutrition", "label_900002.html"))
+
+        self.assertEqual(meal_name, "Yellow Rice")
+        for field in scraper_common.NUTRITION_FIELDS:
+            self.assertEqual(nutrition_info[field], expected[field], field)
+
+    def test_missing_percent_values_are_kept_as_shown(self):
+        expected = scraper_common.load_nutrition_cache("nutrition_info.csv")["Sauteed Kale & Spinach"]
+        _, nutrition_info = nutrition_label.parse_nutrition_label(read_fixture("netnutrition", "label_900001.html"))
+
+        self.assertEqual(nutrition_info["Saturated Fat"], "NA")
+        self.assertEqual(nutrition_info["Saturated Fat %"], expected["Saturated Fat %"])
+
+    def test_minimal_label(self):
+        meal_name, nutrition_info = nutrition_label.parse_nutrition_label(read_fixture("labels", "label_minimal.html"))
+
+        self.assertEqual(meal_name, "Hot Tea")
+        self.assertEqual(nutrition_info["Serving Size"], "1 cup (240ml)")
+        self.assertEqual(nutrition_info["Calories"], "N/A")
+        self.assertEqual(nutrition_info["Sodium"], "5mg")
+        self.assertEqual(nutrition_info["Sugars"], "0g")
+        self.assertNotIn("Sugars %", nutrition_info)
+        self.assertEqual(nutrition_info["Ingredients"], "N/A")
+
+    def test_not_a_label(self):
+        meal_name, nutrition_info = nutrition_label.parse_nutrition_label("<div>Loading...</div>")
+
+        self.assertIsNone(meal_name)
+        self.assertEqual(nutrition_info["Serving Size"], "N/A")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,287 @@
+"""
+Columnar nutrition store.
+
+compile_store() turns nutrition_info.csv into typed NumPy columns with one
+unit per column (kcal, g, mg or % daily value), written as a directory of
+.npy files that open memory-mapped. NutritionStore answers nutrient range
+filters and sorts with vectorized operations over the whole catalog instead
+of reparsing strings like "2.5g" or "< 1g" row by row.
+
+Each compile writes a new version directory and then swaps meta.json to
+point at it, so a reader never mixes columns from two compiles and files a
+reader has mapped are never rewritten in place:
+
+    nutrition_store/
+        meta.json                 # {"version", "count", "names", "units"}
+        v-<time>/food_id.npy, calories.npy, ...
+
+    python nutrition_store.py                       # compile nutrition_info.csv into nutrition_store/
+    python nutrition_store.py --query "calories<=300" "protein_g>=20" --sort protein_g --descending
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import scraper_common
+
+DEFAULT_STORE_DIR = "nutrition_store"
+
+# nutrition_info.csv field -> (column, unit). Amounts are converted to the column's unit.
+NUTRIENTS = [
+    ("Calories", "calories", "kcal"),
+    ("Calories from Fat", "calories_from_fat", "kcal"),
+    ("Total Fat", "total_fat_g", "g"),
+    ("Total Fat %", "total_fat_pdv", "%"),
+    ("Saturated Fat", "saturated_fat_g", "g"),
+    ("Saturated Fat %", "saturated_fat_pdv", "%"),
+    ("Trans Fat", "trans_fat_g", "g"),
+    ("Cholesterol", "cholesterol_mg", "mg"),
+    ("Cholesterol %", "cholesterol_pdv", "%"),
+    ("Sodium", "sodium_mg", "mg"),
+    ("Sodium %", "sodium_pdv", "%"),
+    ("Potassium", "potassium_mg", "mg"),
+    ("Potassium %", "potassium_pdv", "%"),
+    ("Total Carbohydrates", "total_carbohydrates_g", "g"),
+    ("Total Carbohydrates %", "total_carbohydrates_pdv", "%"),
+    ("Dietary Fiber", "dietary_fiber_g", "g"),
+    ("Dietary Fiber %", "dietary_fiber_pdv", "%"),
+    ("Sugars", "sugars_g", "g"),
+    ("Protein", "protein_g", "g"),
+    ("Protein %", "protein_pdv", "%"),
+    ("Vitamin A %", "vitamin_a_pdv", "%"),
+    ("Vitamin C %", "vitamin_c_pdv", "%"),
+    ("Calcium %", "calcium_pdv", "%"),
+    ("Iron %", "iron_pdv", "%"),
+    ("Vitamin D %", "vitamin_d_pdv", "%")
+]
+
+COLUMNS = [column for field, column, unit in NUTRIENTS]
+
+# Conversion factors into grams
+GRAMS_PER_UNIT = {"g": 1.0, "mg": 0.001, "mcg": 0.000001}
+
+AMOUNT_PATTERN = re.compile(r"^(<)?\s*([0-9]*\.?[0-9]+)\s*(kcal|mcg|mg|g|%)?$")
+
+
+def parse_nutrient(value, unit):
+    """
+    Parse a label value into the column's unit. Missing values ('NA', 'N/A', '%', '') become NaN.
+    A '< 1g' style value is stored as half its bound.
+    """
+    match = AMOUNT_PATTERN.match((value or "").strip().replace(",", ""))
+    if match is None:
+        return np.nan
+    less_than, number, value_unit = match.groups()
+    number = float(number)
+    if less_than:
+        number /= 2
+    if value_unit in GRAMS_PER_UNIT and unit in GRAMS_PER_UNIT:
+        number *= GRAMS_PER_UNIT[value_unit] / GRAMS_PER_UNIT[unit]
+    return number
+
+
+def _read_meta(store_dir):
+    meta_path = os.path.join(store_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _remove_old_versions(store_dir, keep):
+    # Readers that read meta.json just before the swap may still open the previous version
+    versions = sorted(name for name in os.listdir(store_dir)
+                      if name.startswith("v-") and os.path.isdir(os.path.join(store_dir, name)))
+    for name in versions:
+        if name not in keep:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+
+def compile_store(csv_filename=scraper_common.nutrition_csv_filename, store_dir=DEFAULT_STORE_DIR):
+    """
+    Compile nutrition_info.csv into a new version of store_dir: one float32 .npy per nutrient (NaN when
+    missing) and food_id.npy, then a meta.json with food names and units that switches readers over to it.
+    Returns the number of foods.
+    """
+    food_ids = []
+    names = []
+    values = {column: [] for column in COLUMNS}
+    with open(csv_filename, mode='r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            if not row.get("Food ID", "").isdigit():
+                continue
+            food_ids.append(int(row["Food ID"]))
+            names.append(row["Food Name"])
+            for field, column, unit in NUTRIENTS:
+                values[column].append(parse_nutrient(row.get(field), unit))
+
+    os.makedirs(store_dir, exist_ok=True)
+    previous_version = _read_meta(store_dir).get("version")
+    version_dir = tempfile.mkdtemp(prefix=f"v-{time.time_ns()}-", dir=store_dir)
+    np.save(os.path.join(version_dir, "food_id.npy"), np.array(food_ids, dtype=np.int32))
+    for column in COLUMNS:
+        np.save(os.path.join(version_dir, column + ".npy"), np.array(values[column], dtype=np.float32))
+    meta = {
+        "version": os.path.basename(version_dir),
+        "count": len(food_ids),
+        "names": names,
+        "units": {column: unit for field, column, unit in NUTRIENTS}
+    }
+    # The columns are complete before meta.json points at them
+    meta_path = os.path.join(store_dir, "meta.json")
+    with open(meta_path + ".tmp", mode='w', encoding='utf-8') as file:
+        json.dump(meta, file)
+    os.replace(meta_path + ".tmp", meta_path)
+    _remove_old_versions(store_dir, keep={meta["version"], previous_version})
+    return len(food_ids)
+
+
+class NutritionStore:
+    """
+    Read-only view of one compiled version of a store. Every column is memory-mapped when the view
+    is opened, so a later compile doesn't change what it reads.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        meta = _read_meta(store_dir)
+        if not meta:
+            raise FileNotFoundError(f"No compiled nutrition store in {store_dir}")
+        self.version_dir = os.path.join(store_dir, meta["version"])
+        self.names = np.array(meta["names"], dtype=object)
+        self.units = meta["units"]
+        self.food_ids = self._load("food_id")
+        self.columns = {column: self._load(column) for column in self.units}
+
+    def __len__(self):
+        return len(self.food_ids)
+
+    def _load(self, column):
+        return np.load(os.path.join(self.version_dir, column + ".npy"), mmap_mode='r')
+
+    def column(self, column):
+        if column not in self.columns:
+            raise KeyError(f"Unknown nutrient column: {column}")
+        return self.columns[column]
+
+    def indices_for(self, food_ids):
+        """
+        Row index of each Food ID in food_ids (an array), -1 for foods not in the store.
+        """
+        food_ids = np.asarray(food_ids, dtype=np.int64)
+        if not len(self):
+            return np.full(len(food_ids), -1, dtype=np.int64)
+        order = np.argsort(self.food_ids, kind="stable")
+        sorted_ids = np.asarray(self.food_ids)[order]
+        positions = np.minimum(np.searchsorted(sorted_ids, food_ids), len(sorted_ids) - 1)
+        found = sorted_ids[positions] == food_ids
+        return np.where(found, order[positions], -1)
+
+    def mask(self, ranges):
+        """
+        Boolean mask of foods inside every {column: (low, high)} range. Either bound may be None;
+        foods missing a filtered value never match. Bounds are inclusive unless the range is given as
+        (low, high, low_exclusive, high_exclusive).
+        """
+        selected = np.ones(len(self), dtype=bool)
+        for column, bounds in ranges.items():
+            low, high, low_exclusive, high_exclusive = tuple(bounds) + (False, False)[len(bounds) - 2:]
+            values = self.column(column)
+            if low is not None:
+                selected &= values > low if low_exclusive else values >= low
+            if high is not None:
+                selected &= values < high if high_exclusive else values <= high
+        return selected
+
+    def query(self, ranges=None, sort_by=None, descending=False, limit=None):
+        """
+        Row indices of the foods matching ranges, optionally sorted by a column (missing values last).
+        """
+        indices = np.flatnonzero(self.mask(ranges or {}))
+        if sort_by is not None:
+            keys = np.asarray(self.column(sort_by)[indices])
+            keys = np.where(np.isnan(keys), np.inf, -keys if descending else keys)
+            indices = indices[np.argsort(keys, kind="stable")]
+        if limit is not None:
+            indices = indices[:limit]
+        return indices
+
+    def rows(self, indices, columns=None):
+        """
+        Matching foods as dicts with Food ID, Food Name and the requested columns (None when missing).
+        """
+        columns = columns or []
+        results = []
+        for index in indices:
+            row = {"Food ID": int(self.food_ids[index]), "Food Name": self.names[index]}
+            for column in columns:
+                value = float(self.column(column)[index])
+                row[column] = None if np.isnan(value) else value
+            results.append(row)
+        return results
+
+
+def parse_condition(condition):
+    """
+    'protein_g>=20' -> ('protein_g', 20.0, None, False); the last value is True for the exclusive < and >.
+    """
+    match = re.match(r"^\s*(\w+)\s*(<=|>=|<|>|=)\s*([0-9.]+)\s*$", condition)
+    if match is None:
+        raise ValueError(f"Bad condition: {condition}")
+    column, operator, number = match.group(1), match.group(2), float(match.group(3))
+    exclusive = operator in ("<", ">")
+    if operator in ("<=", "<"):
+        return column, None, number, exclusive
+    if operator in (">=", ">"):
+        return column, number, None, exclusive
+    return column, number, number, False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile and query the columnar nutrition store.")
+    parser.add_argument("--csv", default=scraper_common.nutrition_csv_filename)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--query", nargs="*", help="Conditions like calories<=300 protein_g>=20; skips compiling")
+    parser.add_argument("--sort", help="Column to sort by")
+    parser.add_argument("--descending", action="store_true")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.query is None:
+        count = compile_store(args.csv, args.store)
+        print(f"Compiled {count} foods into {args.store}")
+        return
+
+    ranges = {}
+    for condition in args.query:
+        try:
+            column, low, high, exclusive = parse_condition(condition)
+        except ValueError as error:
+            parser.error(str(error))
+        if column not in COLUMNS:
+            parser.error(f"Unknown nutrient column {column!r} in {condition!r} (choose from {', '.join(COLUMNS)})")
+        bounds = list(ranges.get(column, (None, None, False, False)))
+        if low is not None:
+            bounds[0], bounds[2] = low, exclusive
+        if high is not None:
+            bounds[1], bounds[3] = high, exclusive
+        ranges[column] = tuple(bounds)
+    if args.sort is not None and args.sort not in COLUMNS:
+        parser.error(f"Unknown --sort column {args.sort!r} (choose from {', '.join(COLUMNS)})")
+
+    store = NutritionStore(args.store)
+    indices = store.query(ranges, sort_by=args.sort, descending=args.descending, limit=args.limit)
+    columns = list(ranges) + ([args.sort] if args.sort and args.sort not in ranges else [])
+    for row in store.rows(indices, columns):
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
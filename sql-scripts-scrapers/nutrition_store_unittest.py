@@ -0,0 +1,105 @@
+import contextlib
+import csv
+import io
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import nutrition_store
+import scraper_common
+
+
+class TestParseNutrient(unittest.TestCase):
+
+    def test_units_and_missing_values(self):
+        self.assertEqual(nutrition_store.parse_nutrient("2.5g", "g"), 2.5)
+        self.assertEqual(nutrition_store.parse_nutrient("< 1g", "g"), 0.5)
+        self.assertEqual(nutrition_store.parse_nutrient("250mg", "g"), 0.25)
+        self.assertEqual(nutrition_store.parse_nutrient("12%", "%"), 12)
+        self.assertEqual(nutrition_store.parse_nutrient("210", "kcal"), 210)
+        for missing in ("NA", "N/A", "%", ""):
+            self.assertTrue(math.isnan(nutrition_store.parse_nutrient(missing, "g")))
+
+
+class TestNutritionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        csv_filename = os.path.join(self.tmpdir, "nutrition_info.csv")
+        foods = [
+            (1, "Kale", {"Calories": "20", "Protein": "< 1g"}),
+            (2, "Grilled Chicken", {"Calories": "210", "Protein": "36g"}),
+            (3, "Tilapia", {"Calories": "250", "Protein": "33g"}),
+            (4, "Lasagna", {"Calories": "480", "Protein": "28g"}),
+            (5, "Hot Tea", {"Calories": "N/A", "Protein": "NA"})
+        ]
+        with open(csv_filename, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(scraper_common.NUTRITION_HEADER)
+            for food_id, name, nutrition_info in foods:
+                writer.writerow(scraper_common.nutrition_csv_row(food_id, name, nutrition_info, {}))
+        self.csv_filename = csv_filename
+        self.store_dir = os.path.join(self.tmpdir, "store")
+        self.assertEqual(nutrition_store.compile_store(csv_filename, self.store_dir), 5)
+        self.store = nutrition_store.NutritionStore(self.store_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_range_filter_and_sort(self):
+        indices = self.store.query({"calories": (None, 300), "protein_g": (20, None)}, sort_by="protein_g", descending=True)
+        self.assertEqual([row["Food Name"] for row in self.store.rows(indices)], ["Grilled Chicken", "Tilapia"])
+
+    def test_missing_values_sort_last_and_never_match(self):
+        indices = self.store.query(sort_by="calories")
+        self.assertEqual([int(self.store.food_ids[index]) for index in indices], [1, 2, 3, 4, 5])
+        self.assertEqual(len(self.store.query({"calories": (0, None)})), 4)
+        self.assertEqual(self.store.rows([4], ["calories"]), [{"Food ID": 5, "Food Name": "Hot Tea", "calories": None}])
+
+    def test_columns_are_memory_mapped(self):
+        self.assertIsInstance(self.store.column("sodium_mg"), nutrition_store.np.memmap)
+        with self.assertRaises(KeyError):
+            self.store.column("Calories")
+
+    def test_recompile_leaves_open_views_alone(self):
+        with open(self.csv_filename, mode='a', newline='', encoding='utf-8') as file:
+            csv.writer(file).writerow(scraper_common.nutrition_csv_row(6, "Oatmeal", {"Calories": "150"}, {}))
+        for _ in range(3):
+            self.assertEqual(nutrition_store.compile_store(self.csv_filename, self.store_dir), 6)
+
+        # The view opened before the compiles still reads its own five foods
+        self.assertEqual(len(self.store), 5)
+        self.assertEqual(len(self.store.column("calories")), 5)
+        self.assertEqual(len(nutrition_store.NutritionStore(self.store_dir).column("calories")), 6)
+        # Only the current and the previous version are kept
+        versions = [name for name in os.listdir(self.store_dir) if name.startswith("v-")]
+        self.assertEqual(len(versions), 2)
+
+    def test_parse_condition(self):
+        self.assertEqual(nutrition_store.parse_condition("protein_g>=20"), ("protein_g", 20.0, None, False))
+        self.assertEqual(nutrition_store.parse_condition("calories <= 300"), ("calories", None, 300.0, False))
+        self.assertEqual(nutrition_store.parse_condition("calories<300"), ("calories", None, 300.0, True))
+        self.assertEqual(nutrition_store.parse_condition("calories>300"), ("calories", 300.0, None, True))
+
+    def test_unknown_query_columns_are_usage_errors(self):
+        for argv in (["--query", "protien_g>=20"], ["--query", "calories=="], ["--query", "calories<=300", "--sort", "fat"]):
+            stderr = io.StringIO()
+            with self.assertRaises(SystemExit) as raised, contextlib.redirect_stderr(stderr):
+                nutrition_store.main(argv + ["--store", self.store_dir])
+            self.assertEqual(raised.exception.code, 2)
+        self.assertIn("Unknown --sort column 'fat'", stderr.getvalue())
+
+    def test_exclusive_bounds_leave_out_the_boundary(self):
+        def names(ranges):
+            return [row["Food Name"] for row in self.store.rows(self.store.query(ranges, sort_by="calories"))]
+
+        self.assertEqual(names({"calories": (None, 210)}), ["Kale", "Grilled Chicken"])
+        self.assertEqual(names({"calories": (None, 210, False, True)}), ["Kale"])
+        self.assertEqual(names({"calories": (210, None)}), ["Grilled Chicken", "Tilapia", "Lasagna"])
+        self.assertEqual(names({"calories": (210, None, True, False)}), ["Tilapia", "Lasagna"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,291 @@
+"""
+Per-user, per-day nutrition totals for the meal planner.
+
+/meal-planner/:userId returns raw planner rows, and the app adds them up again
+on every screen load. This batch job reads meal_planner, looks up each food's
+typed nutrients in the columnar nutrition store (nutrition_store.py), and
+computes every user's daily totals and % daily values at once: the rows are
+grouped by (user, day) with NumPy and summed column by column. The results go
+to meal_planner_daily, one row per user and day, which the API serves from
+/meal-planner/:userId/daily.
+
+    calories, protein, fat, carbohydrates, sodium, dietary_fiber
+        the planner's own scaled values, the numbers the app shows
+    saturated_fat, sugars, cholesterol, potassium
+        label amount per serving times servings
+    *_pdv
+        the label's % daily value times servings; calories_pdv uses 2,000 kcal
+
+Runs are incremental. A fingerprint of each user's planner rows is kept in
+meal_planner_rollup_state: the row count and ids, and per-row weighted sums of
+every column the rollup reads (day, food, servings and the planner values), so
+an insert, delete or edit of any of them changes it. Only users whose
+fingerprint changed are re-read and recomputed.
+Users with no planner rows left lose their summary rows.
+
+    python planner_rollups.py                           # MySQL, using DB_HOST/DB_PORT/... like db_loader.py
+    python planner_rollups.py --sqlite dining.db --full
+    python planner_rollups.py --interval 300            # roll up every 5 minutes
+
+Requires: numpy
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+import db_loader
+import nutrition_store
+import scraper_common
+
+SUMMARY_TABLE = "meal_planner_daily"
+STATE_TABLE = "meal_planner_rollup_state"
+
+# Already scaled by servings when the item was added to the planner
+PLANNER_COLUMNS = ["calories", "protein", "fat", "carbohydrates", "sodium", "dietary_fiber"]
+
+# summary column -> nutrition store column (per serving)
+STORE_COLUMNS = [
+    ("saturated_fat", "saturated_fat_g"),
+    ("sugars", "sugars_g"),
+    ("cholesterol", "cholesterol_mg"),
+    ("potassium", "potassium_mg"),
+    ("total_fat_pdv", "total_fat_pdv"),
+    ("saturated_fat_pdv", "saturated_fat_pdv"),
+    ("cholesterol_pdv", "cholesterol_pdv"),
+    ("sodium_pdv", "sodium_pdv"),
+    ("potassium_pdv", "potassium_pdv"),
+    ("total_carbohydrates_pdv", "total_carbohydrates_pdv"),
+    ("dietary_fiber_pdv", "dietary_fiber_pdv"),
+    ("protein_pdv", "protein_pdv"),
+    ("vitamin_a_pdv", "vitamin_a_pdv"),
+    ("vitamin_c_pdv", "vitamin_c_pdv"),
+    ("calcium_pdv", "calcium_pdv"),
+    ("iron_pdv", "iron_pdv"),
+    ("vitamin_d_pdv", "vitamin_d_pdv")
+]
+
+CALORIES_DAILY_VALUE = 2000
+
+VALUE_COLUMNS = PLANNER_COLUMNS + [column for column, _ in STORE_COLUMNS] + ["calories_pdv"]
+SUMMARY_COLUMNS = ["user_id", "day", "items", "servings"] + VALUE_COLUMNS + ["updated_at"]
+
+SUMMARY_TYPES = {
+    "mysql": {"user_id": "VARCHAR(128) NOT NULL", "day": "DATE NOT NULL", "items": "INT NOT NULL",
+              "value": "FLOAT", "updated_at": "DOUBLE", "fingerprint": "VARCHAR(255) NOT NULL"},
+    "sqlite": {"user_id": "TEXT NOT NULL", "day": "TEXT NOT NULL", "items": "INTEGER NOT NULL",
+               "value": "REAL", "updated_at": "REAL", "fingerprint": "TEXT NOT NULL"}
+}
+
+# The day and food id of a planner row as numbers, for planner_fingerprints
+FINGERPRINT_KEYS = {
+    "mysql": {"day": "TO_DAYS(date_added)", "food_id": "CAST(food_id AS SIGNED)"},
+    "sqlite": {"day": "CAST(julianday(DATE(date_added)) AS INTEGER)", "food_id": "CAST(food_id AS INTEGER)"}
+}
+
+# Scrambles the row id into each row's fingerprint weight, so edits to different rows don't cancel out
+ROW_WEIGHT = "((id * 2654435761) % 1000003 + 1)"
+
+
+def create_tables(connection, dialect):
+    types = SUMMARY_TYPES[dialect.name]
+    values = ",\n    ".join(f"{column} {types['value']}" for column in ["servings"] + VALUE_COLUMNS)
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (\n"
+                   f"    user_id {types['user_id']},\n"
+                   f"    day {types['day']},\n"
+                   f"    items {types['items']},\n"
+                   f"    {values},\n"
+                   f"    updated_at {types['updated_at']},\n"
+                   "    PRIMARY KEY (user_id, day)\n"
+                   ")")
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} (\n"
+                   f"    user_id {types['user_id']} PRIMARY KEY,\n"
+                   f"    fingerprint {types['fingerprint']}\n"
+                   ")")
+    connection.commit()
+
+
+def planner_fingerprints(connection, dialect):
+    """
+    {user_id: fingerprint} for every user with planner rows. Each column the rollup reads is summed with a
+    per-row weight, NULLs counted the way read_planner_rows does, so inserts, deletes and edits to the day,
+    food, servings or planner values all change it; edits to several rows would have to cancel out exactly
+    under pseudo-random weights to go unnoticed.
+    """
+    keys = FINGERPRINT_KEYS[dialect.name]
+    columns = [keys["day"], keys["food_id"], "COALESCE(servings, 1)"] + [f"COALESCE({column}, 0)"
+                                                                          for column in PLANNER_COLUMNS]
+    sums = ", ".join(f"SUM({ROW_WEIGHT} * {column})" for column in columns)
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT user_id, COUNT(*), SUM(id), {sums} FROM meal_planner GROUP BY user_id")
+    fingerprints = {}
+    for user_id, count, id_sum, *weighted in cursor.fetchall():
+        content = ":".join([str(count), str(id_sum)] + [f"{float(value or 0):.4f}" for value in weighted])
+        fingerprints[user_id] = hashlib.sha1(content.encode("utf-8")).hexdigest()
+    return fingerprints
+
+
+def stored_fingerprints(connection):
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT user_id, fingerprint FROM {STATE_TABLE}")
+    return dict(cursor.fetchall())
+
+
+def read_planner_rows(connection, dialect, user_ids):
+    """
+    Planner rows of the given users as (user_id, day, food_id, servings, planner values) columns.
+    """
+    select = ", ".join(PLANNER_COLUMNS)
+    rows = []
+    cursor = connection.cursor()
+    for batch in db_loader.batches(sorted(user_ids), 500):
+        placeholders = ", ".join([dialect.placeholder] * len(batch))
+        cursor.execute(f"SELECT user_id, DATE(date_added), food_id, servings, {select} "
+                       f"FROM meal_planner WHERE user_id IN ({placeholders})", batch)
+        rows.extend(cursor.fetchall())
+
+    user_column = np.array([row[0] for row in rows], dtype=object)
+    day_column = np.array([str(row[1]) for row in rows], dtype=object)
+    food_ids = np.array([db_loader.parse_int(str(row[2])) or -1 for row in rows], dtype=np.int64)
+    servings = np.array([1.0 if row[3] is None else float(row[3]) for row in rows], dtype=np.float64)
+    values = np.array([[np.nan if value is None else float(value) for value in row[4:]] for row in rows],
+                      dtype=np.float64).reshape(len(rows), len(PLANNER_COLUMNS))
+    return user_column, day_column, food_ids, servings, values
+
+
+def daily_rollups(user_ids, days, food_ids, servings, planner_values, store=None):
+    """
+    Sum planner rows per (user, day). Returns (keys, items, servings, totals, missing): keys are (user_id, day)
+    pairs, totals has one column per VALUE_COLUMNS entry and missing lists the Food IDs that aren't in the
+    store, whose label-based values are left out of the totals. Missing planner values count as 0.
+    """
+    count = len(user_ids)
+    users, user_codes = np.unique(np.asarray(user_ids, dtype=str), return_inverse=True)
+    day_values, day_codes = np.unique(np.asarray(days, dtype=str), return_inverse=True)
+    # One integer code per (user, day), so grouping is a single unique over ints
+    day_count = max(len(day_values), 1)
+    groups, group_index = np.unique(user_codes * day_count + day_codes, return_inverse=True)
+
+    per_row = np.zeros((count, len(VALUE_COLUMNS)))
+    per_row[:, :len(PLANNER_COLUMNS)] = np.nan_to_num(planner_values)
+    missing = sorted({int(food_id) for food_id in food_ids})
+    if store is not None and count:
+        indices = store.indices_for(food_ids)
+        found = indices >= 0
+        missing = sorted({int(food_id) for food_id in np.asarray(food_ids)[~found]})
+        for offset, (_, column) in enumerate(STORE_COLUMNS, len(PLANNER_COLUMNS)):
+            per_serving = np.zeros(count)
+            per_serving[found] = store.column(column)[indices[found]]
+            per_row[:, offset] = np.nan_to_num(per_serving) * servings
+
+    totals = np.zeros((len(groups), len(VALUE_COLUMNS)))
+    for column in range(len(VALUE_COLUMNS) - 1):
+        totals[:, column] = np.bincount(group_index, weights=per_row[:, column], minlength=len(groups))
+    totals[:, -1] = totals[:, PLANNER_COLUMNS.index("calories")] / CALORIES_DAILY_VALUE * 100
+
+    items = np.bincount(group_index, minlength=len(groups))
+    total_servings = np.bincount(group_index, weights=servings, minlength=len(groups))
+    keys = [(str(users[group // day_count]), str(day_values[group % day_count])) for group in groups]
+    return keys, items, total_servings, totals, missing
+
+
+def rollup(connection, dialect, store=None, full=False):
+    """
+    Recompute the summary rows of users whose planner rows changed (every user with full=True).
+    Returns (users recomputed, summary rows written, users removed).
+    """
+    current = planner_fingerprints(connection, dialect)
+    stored = stored_fingerprints(connection)
+    previous = {} if full else stored
+    changed = sorted(user_id for user_id, fingerprint in current.items() if previous.get(user_id) != fingerprint)
+    removed = sorted(set(stored) - set(current))
+
+    summary_rows = []
+    if changed:
+        keys, items, servings, totals, missing = daily_rollups(*read_planner_rows(connection, dialect, changed),
+                                                               store=store)
+        if missing:
+            print(f"{len(missing)} planner foods have no label in the nutrition store, so their label-based "
+                  f"totals and %DV are left out: {missing[:20]}")
+        updated_at = time.time()
+        for (user_id, day), count, day_servings, values in zip(keys, items, servings, np.round(totals, 2)):
+            summary_rows.append((user_id, day, int(count), float(day_servings)) + tuple(float(value) for value in values)
+                                + (updated_at,))
+
+    placeholder = dialect.placeholder
+    state_sql = dialect.upsert(STATE_TABLE, ["user_id", "fingerprint"], ["user_id"])
+    summary_sql = (f"INSERT INTO {SUMMARY_TABLE} ({', '.join(SUMMARY_COLUMNS)}) "
+                   f"VALUES ({', '.join([placeholder] * len(SUMMARY_COLUMNS))})")
+    cursor = connection.cursor()
+    try:
+        if full:
+            cursor.execute(f"DELETE FROM {SUMMARY_TABLE}")
+            cursor.execute(f"DELETE FROM {STATE_TABLE}")
+        stale = [(user_id,) for user_id in changed + removed]
+        cursor.executemany(f"DELETE FROM {SUMMARY_TABLE} WHERE user_id = {placeholder}", stale)
+        cursor.executemany(f"DELETE FROM {STATE_TABLE} WHERE user_id = {placeholder}", [(user_id,) for user_id in removed])
+        for batch in db_loader.batches(summary_rows):
+            cursor.executemany(summary_sql, batch)
+        cursor.executemany(state_sql, [(user_id, current[user_id]) for user_id in changed])
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return len(changed), len(summary_rows), len(removed)
+
+
+def open_store(store_dir=nutrition_store.DEFAULT_STORE_DIR, nutrition_csv=scraper_common.nutrition_csv_filename):
+    """
+    The compiled nutrition store, (re)compiling it first when nutrition_info.csv is newer, so foods added by
+    later scrapes have their labels. None if neither exists.
+    """
+    meta_path = os.path.join(store_dir, "meta.json")
+    if os.path.exists(nutrition_csv) and (not os.path.exists(meta_path)
+                                          or os.path.getmtime(nutrition_csv) > os.path.getmtime(meta_path)):
+        nutrition_store.compile_store(nutrition_csv, store_dir)
+    if not os.path.exists(meta_path):
+        return None
+    return nutrition_store.NutritionStore(store_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roll meal planner rows up into per-user daily totals.")
+    parser.add_argument("--sqlite", metavar="PATH", help="Use a SQLite file instead of MySQL")
+    parser.add_argument("--store", default=nutrition_store.DEFAULT_STORE_DIR, help="Compiled nutrition store")
+    parser.add_argument("--nutrition-csv", default=scraper_common.nutrition_csv_filename)
+    parser.add_argument("--full", action="store_true", help="Recompute every user instead of only changed ones")
+    parser.add_argument("--interval", type=float, help="Keep running, rolling up every this many seconds")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        connection, dialect = sqlite3.connect(args.sqlite), db_loader.Dialect("sqlite")
+    else:
+        connection, dialect = db_loader.connect_mysql(), db_loader.Dialect("mysql")
+    try:
+        create_tables(connection, dialect)
+        full = args.full
+        while True:
+            start_time = time.time()
+            # Reopened every round so a scrape in between is picked up
+            store = open_store(args.store, args.nutrition_csv)
+            if store is None:
+                print("No nutrition store or nutrition_info.csv; label-based totals and %DV are left out")
+            users, rows, removed = rollup(connection, dialect, store, full=full)
+            print(f"Rolled up {users} users into {rows} daily rows ({removed} users removed) "
+                  f"in {time.time() - start_time:.2f} seconds")
+            if args.interval is None:
+                break
+            full = False
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import csv
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+import db_loader
+import nutrition_store
+import planner_rollups
+import scraper_common
+
+# The table server.js creates, in SQLite
+PLANNER_TABLE = """
+CREATE TABLE meal_planner (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    food_id TEXT NOT NULL,
+    dining_hall TEXT NOT NULL,
+    servings REAL NOT NULL DEFAULT 1,
+    calories REAL,
+    protein REAL,
+    fat REAL,
+    carbohydrates REAL,
+    sodium REAL,
+    dietary_fiber REAL,
+    date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, food_id)
+)
+"""
+
+
+class TestPlannerRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_filename = csv_filename = os.path.join(self.tmpdir, "nutrition_info.csv")
+        with open(csv_filename, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(scraper_common.NUTRITION_HEADER)
+            writer.writerow(scraper_common.nutrition_csv_row(1, "Kale", {"Sugars": "< 1g", "Sodium %": "2%",
+                                                                         "Saturated Fat": "0.5g"}, {}))
+            writer.writerow(scraper_common.nutrition_csv_row(2, "Yellow Rice", {"Sugars": "2g", "Sodium %": "11%"}, {}))
+        self.store_dir = store_dir = os.path.join(self.tmpdir, "nutrition_store")
+        nutrition_store.compile_store(csv_filename, store_dir)
+        self.store = nutrition_store.NutritionStore(store_dir)
+
+        self.connection = sqlite3.connect(os.path.join(self.tmpdir, "dining.db"))
+        self.dialect = db_loader.Dialect("sqlite")
+        self.connection.execute(PLANNER_TABLE)
+        planner_rollups.create_tables(self.connection, self.dialect)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.tmpdir)
+
+    def add(self, user_id, food_id, servings, calories, protein, day="2024-11-05 12:00:00"):
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO meal_planner (user_id, food_id, dining_hall, servings, calories, protein, date_added) "
+                "VALUES (?, ?, 'Rand', ?, ?, ?, ?) ON CONFLICT(user_id, food_id) DO UPDATE SET "
+                "servings = excluded.servings, calories = excluded.calories, protein = excluded.protein, "
+                "date_added = excluded.date_added",
+                (user_id, str(food_id), servings, calories, protein, day))
+
+    def summary(self):
+        cursor = self.connection.execute(
+            f"SELECT {', '.join(planner_rollups.SUMMARY_COLUMNS)} FROM {planner_rollups.SUMMARY_TABLE} ORDER BY user_id, day")
+        return [dict(zip(planner_rollups.SUMMARY_COLUMNS, row)) for row in cursor.fetchall()]
+
+    def test_daily_rollups_group_every_user_at_once(self):
+        keys, items, servings, totals, missing = planner_rollups.daily_rollups(
+            ["a", "b", "a", "a"], ["2024-11-05", "2024-11-05", "2024-11-05", "2024-11-06"],
+            np.array([1, 2, 2, 9]), np.array([2.0, 1.0, 1.0, 1.0]),
+            np.array([[40, 2, 0, 0, 0, 0], [210, 4, 0, 0, 0, 0], [210, 4, 0, 0, 0, np.nan], [100, 0, 0, 0, 0, 0]]),
+            store=self.store)
+        self.assertEqual(keys, [("a", "2024-11-05"), ("a", "2024-11-06"), ("b", "2024-11-05")])
+        self.assertEqual(items.tolist(), [2, 1, 1])
+        self.assertEqual(servings.tolist(), [3.0, 1.0, 1.0])
+        column = planner_rollups.VALUE_COLUMNS.index
+        self.assertEqual(totals[0, column("calories")], 250)
+        # Label values are per serving: 2 x Kale (< 1g counts as 0.5g) + 1 x Yellow Rice
+        self.assertAlmostEqual(totals[0, column("sugars")], 3.0)
+        self.assertAlmostEqual(totals[0, column("sodium_pdv")], 15.0)
+        self.assertAlmostEqual(totals[0, column("calories_pdv")], 12.5)
+        # Food 9 isn't in the store, so only its planner values count, and it's reported
+        self.assertEqual(missing, [9])
+        self.assertEqual(totals[1, column("sugars")], 0)
+        self.assertEqual(totals[1, column("calories")], 100)
+
+    def test_rollup_is_incremental(self):
+        self.add("alice", 1, 2, 40, 2)
+        self.add("alice", 2, 1, 210, 4)
+        self.add("bob", 2, 1, 210, 4)
+        self.assertEqual(planner_rollups.rollup(self.connection, self.dialect, self.store), (2, 2, 0))
+        rows = self.summary()
+        self.assertEqual([(row["user_id"], row["day"], row["items"]) for row in rows],
+                         [("alice", "2024-11-05", 2), ("bob", "2024-11-05", 1)])
+        self.assertEqual(rows[0]["calories"], 250)
+
+        # Nothing changed: nobody is recomputed
+        self.assertEqual(planner_rollups.rollup(self.connection, self.dialect, self.store), (0, 0, 0))
+
+        # Bob changes his servings; only Bob is recomputed
+        self.add("bob", 2, 2, 420, 8)
+        self.assertEqual(planner_rollups.rollup(self.connection, self.dialect, self.store), (1, 1, 0))
+        self.assertEqual(self.summary()[1]["calories"], 420)
+
+        # Edits that leave the count, ids and total servings alone are still seen: Alice's Kale
+        # gets more calories, then one serving moves from her Kale to her rice
+        with self.connection:
+            self.connection.execute("UPDATE meal_planner SET calories = 50 WHERE user_id = 'alice' AND food_id = '1'")
+        self.assertEqual(planner_rollups.rollup(self.connection, self.dialect, self.store), (1, 1, 0))
+        self.assertEqual(self.summary()[0]["calories"], 260)
+        with self.connection:
+            self.connection.execute("UPDATE meal_planner SET servings = servings - 1 WHERE user_id = 'alice' AND food_id = '1'")
+            self.connection.execute("UPDATE meal_planner SET servings = servings + 1 WHERE user_id = 'alice' AND food_id = '2'")
+        self.assertEqual(planner_rollups.rollup(self.connection, self.dialect, self.store), (1, 1, 0))
+        self.assertAlmostEqual(self.summary()[0]["sugars"], 4.5)
+
+        # Alice removes everything; her summary rows go too
+        with self.connection:
+            self.connection.execute("DELETE FROM meal_planner WHERE user_id = 'alice'")
+        self.assertEqual(planner_rollups.rollup(self.connection, self.dialect, self.store), (0, 0, 1))
+        self.assertEqual([row["user_id"] for row in self.summary()], ["bob"])
+
+    def test_full_rebuild(self):
+        self.add("alice", 1, 1, 20, 1)
+        planner_rollups.rollup(self.connection, self.dialect, self.store)
+        self.assertEqual(planner_rollups.rollup(self.connection, self.dialect, self.store, full=True), (1, 1, 0))
+        self.assertEqual(len(self.summary()), 1)
+
+    def test_open_store_recompiles_after_a_scrape(self):
+        with open(self.csv_filename, mode='a', newline='', encoding='utf-8') as file:
+            csv.writer(file).writerow(scraper_common.nutrition_csv_row(3, "Tofu", {"Sugars": "1g"}, {}))
+        meta_path = os.path.join(self.store_dir, "meta.json")
+        os.utime(meta_path, (os.path.getmtime(self.csv_filename) - 10,) * 2)
+        store = planner_rollups.open_store(self.store_dir, self.csv_filename)
+        self.assertEqual(store.indices_for([3]).tolist(), [2])
+        # Up to date: not compiled again
+        compiled_at = os.path.getmtime(meta_path)
+        planner_rollups.open_store(self.store_dir, self.csv_filename)
+        self.assertEqual(os.path.getmtime(meta_path), compiled_at)
+
+    def test_indices_for_unknown_foods(self):
+        self.assertEqual(self.store.indices_for([2, 7, 1]).tolist(), [1, -1, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,328 @@
+"""
+Offline benchmark of the scraping pipeline against replay_server.py.
+
+Each case runs in its own process against a local replay server (with an
+optional per-request latency) and reports:
+
+    items               rows or labels produced
+    seconds             wall time of the case, excluding process start
+    items_per_second
+    round_trips         requests the replay server answered during the case
+    round_trips_per_item
+    peak_rss_kb         peak resident memory of the case's process
+
+Cases, each recorded with the engine it measures:
+    http_scrape_hall                netnutrition_http.HttpScraper.scrape_hall for every hall (fresh cache each repeat)
+    http_get_nutritional_info       HttpScraper.get_nutritional_info, one label request and parse per fixture label
+    selenium_scrape_meals_for_hall  scraper_other.scrape_meals_for_hall for every hall (fresh cache each repeat)
+    selenium_get_nutritional_info   scraper_other.get_nutritional_info on the label modal, opened once per fixture
+                                    label the way scrape_nutritional_info opens it
+    hours                           hours_scraper batch and per-unit modal paths on fixtures/hours
+
+The selenium cases need Chrome and are recorded as skipped when it can't
+start (set SCRAPER_CHROMEDRIVER to use a chromedriver already on disk). They
+drive the replay landing page's script (see replay_server.py), so the numbers
+include the scraper's clicks and waits on dropdowns, collapsed menu groups and
+the label modal, but not the real site's page weight or scripts. Meals a date
+has no menu for are cleared without a request, so each one costs the scraper
+its one-second page_update start grace. A case that crashes or runs past
+--timeout is recorded as skipped too.
+
+replay_benchmark_results.json is a run of every case (--repeat 3 --latency 0.02)
+with Chromium 140 (QtWebEngine 6.11, headless) and chromedriver 140; the
+Selenium scraper wrote the same meal rows as the HTTP engine.
+
+    python replay_benchmark.py --latency 0.02 --repeat 5 --output bench.json
+    python replay_benchmark.py --output after.json --baseline bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import time
+
+import replay_server
+
+HOURS_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "hours")
+# Seconds a case may run before it is stopped and recorded as skipped
+CASE_TIMEOUT = 900
+CASES = ["http_scrape_hall", "http_get_nutritional_info", "selenium_scrape_meals_for_hall",
+         "selenium_get_nutritional_info", "hours"]
+CASE_ENGINES = {"http_scrape_hall": "http", "http_get_nutritional_info": "http",
+                "selenium_scrape_meals_for_hall": "selenium", "selenium_get_nutritional_info": "selenium",
+                "hours": "selenium"}
+
+
+def peak_rss_kb():
+    try:
+        import resource  # Not available on Windows
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def label_detail_oids(fixture_dir=replay_server.DEFAULT_FIXTURE_DIR):
+    return sorted(name[len("label_"):-len(".html")] for name in os.listdir(fixture_dir)
+                  if name.startswith("label_") and name.endswith(".html"))
+
+
+def dining_halls(fixture_dir=replay_server.DEFAULT_FIXTURE_DIR):
+    import netnutrition_http
+
+    with open(os.path.join(fixture_dir, "index.html"), encoding='utf-8') as file:
+        return netnutrition_http.parse_dining_halls(file.read())
+
+
+def case_http_scrape_hall(base_url, repeat):
+    import netnutrition_http
+    import scraper_common
+
+    items = 0
+    for _ in range(repeat):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            meals_csv = os.path.join(tmpdir, "dining_meals_nutrition.csv")
+            scraper = netnutrition_http.HttpScraper(base_url, os.path.join(tmpdir, "nutrition_info.csv"), meals_csv,
+                                                   pool_size=1, cache_path=os.path.join(tmpdir, "nutrition_cache.db"))
+            scraper.writer.open_file(meals_csv, header=scraper_common.MEALS_HEADER)
+            for unit_oid, hall_name in scraper.get_dining_halls():
+                scraper.scrape_hall(unit_oid, hall_name)
+            scraper.writer.close()
+            scraper.nutrition_cache.close()
+            with open(meals_csv, encoding='utf-8') as file:
+                items += sum(1 for _ in file) - 1
+        finally:
+            shutil.rmtree(tmpdir)
+    return {"items": items}
+
+
+def case_http_get_nutritional_info(base_url, repeat):
+    import netnutrition_http
+
+    scraper = netnutrition_http.HttpScraper(base_url, cache_path=":memory:")
+    session, _ = scraper.open_session()
+    items = 0
+    try:
+        for _ in range(repeat):
+            for detail_oid in label_detail_oids():
+                meal_name, nutrition_info = scraper.get_nutritional_info(session, detail_oid)
+                if nutrition_info is not None:
+                    items += 1
+    finally:
+        session.close()
+        scraper.nutrition_cache.close()
+    return {"items": items}
+
+
+def case_selenium_scrape_meals_for_hall(base_url, repeat):
+    import scraper_common
+    import scraper_other
+    from nutrition_cache import NutritionCache
+
+    scraper_other.base_url = base_url
+    items = 0
+    for _ in range(repeat):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            meals_csv = os.path.join(tmpdir, "dining_meals_nutrition.csv")
+            scraper_other.meals_csv_filename = meals_csv
+            scraper_other.nutrition_cache = NutritionCache(os.path.join(tmpdir, "nutrition_cache.db"),
+                                                           seed_csv=os.path.join(tmpdir, "nutrition_info.csv"))
+            scraper_other.output_writer.open_file(meals_csv, header=scraper_common.MEALS_HEADER)
+            for hall_index, (_, hall_name) in enumerate(dining_halls()):
+                scraper_other.scrape_meals_for_hall(hall_index, hall_name)
+            scraper_other.output_writer.close()
+            scraper_other.nutrition_cache.close()
+            with open(meals_csv, encoding='utf-8') as file:
+                items += sum(1 for _ in file) - 1
+        finally:
+            shutil.rmtree(tmpdir)
+    return {"items": items}
+
+
+def case_selenium_get_nutritional_info(base_url, repeat):
+    import driver_profile
+    import scraper_other
+    import scraper_waits
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    scraper_other.base_url = base_url
+    driver = scraper_other.create_driver()
+    items = 0
+    try:
+        for _ in range(repeat):
+            for detail_oid in label_detail_oids():
+                with scraper_waits.page_update(driver):
+                    driver.execute_script("getItemNutritionLabelOnClick(null, arguments[0]);", detail_oid)
+                scraper_waits.wait_until(
+                    driver, EC.visibility_of_element_located((By.CLASS_NAME, "cbo_nn_LabelHeader")), 10
+                )
+                meal_name, nutrition_info = scraper_other.get_nutritional_info(driver)
+                if nutrition_info is not None:
+                    items += 1
+                close_button = driver.find_element(By.ID, "btn_nn_nutrition_close")
+                close_button.click()
+                scraper_waits.wait_until(driver, EC.invisibility_of_element(close_button), 10)
+        return {"items": items, "browser_rss_kb": (driver_profile.driver_memory(driver) or 0) // 1024}
+    finally:
+        driver.quit()
+
+
+def case_hours(base_url, repeat):
+    import driver_profile
+    import hours_scraper
+
+    driver = hours_scraper.create_driver(url=base_url)
+    try:
+        hours_scraper.click_continue(driver)
+        items = 0
+        batch_seconds = modal_seconds = 0.0
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            batch = hours_scraper.scrape_hours_batch(driver) or []
+            batch_seconds += time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            modal = hours_scraper.scrape_hours_modal(driver)
+            modal_seconds += time.perf_counter() - start_time
+            items += len(batch) + len(modal)
+        return {"items": items, "batch_seconds": batch_seconds, "modal_seconds": modal_seconds,
+                "rows_match": batch == modal, "browser_rss_kb": (driver_profile.driver_memory(driver) or 0) // 1024}
+    finally:
+        driver.quit()
+
+
+CASE_FUNCTIONS = {
+    "http_scrape_hall": case_http_scrape_hall,
+    "http_get_nutritional_info": case_http_get_nutritional_info,
+    "selenium_scrape_meals_for_hall": case_selenium_scrape_meals_for_hall,
+    "selenium_get_nutritional_info": case_selenium_get_nutritional_info,
+    "hours": case_hours
+}
+
+
+def _run_case(name, base_url, repeat, results):
+    # Runs in a child process so peak RSS belongs to this case alone
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start_time = time.perf_counter()
+            result = CASE_FUNCTIONS[name](base_url, repeat)
+            result["seconds"] = time.perf_counter() - start_time
+        result["peak_rss_kb"] = peak_rss_kb()
+    except Exception as e:
+        message = (str(e).strip().splitlines() or [""])[0]
+        result = {"skipped": f"{type(e).__name__}: {message}"}
+    result["engine"] = CASE_ENGINES[name]
+    results.put(result)
+
+
+def collect_result(process, results, timeout=CASE_TIMEOUT):
+    """
+    Wait for a case process's result. A process that exits without one (a crash) or runs past timeout
+    seconds is stopped and its case recorded as skipped.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            # The result may have been queued just before the process exited
+            try:
+                return results.get(timeout=1)
+            except queue.Empty:
+                return {"skipped": f"case process exited with code {process.exitcode} without a result"}
+        if time.monotonic() > deadline:
+            process.terminate()
+            return {"skipped": f"no result within {timeout}s"}
+
+
+def run_case(name, latency=0.0, repeat=1, timeout=CASE_TIMEOUT):
+    """
+    Run one case in a fresh process against its own replay server. Returns the result dict.
+    """
+    fixture_dir = HOURS_FIXTURE_DIR if name == "hours" else replay_server.DEFAULT_FIXTURE_DIR
+    server, base_url = replay_server.start_replay_server(fixture_dir, latency=latency)
+    try:
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        process = context.Process(target=_run_case, args=(name, base_url, repeat, results))
+        requests_before = server.request_count
+        process.start()
+        result = collect_result(process, results, timeout)
+        process.join()
+        result.setdefault("engine", CASE_ENGINES[name])
+        result["round_trips"] = server.request_count - requests_before
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if "skipped" not in result:
+        items = result["items"]
+        result["items_per_second"] = items / result["seconds"] if result["seconds"] else None
+        result["round_trips_per_item"] = result["round_trips"] / items if items else None
+    return result
+
+
+def run_suite(cases=CASES, latency=0.0, repeat=1, timeout=CASE_TIMEOUT):
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "latency": latency,
+        "repeat": repeat,
+        "cases": {name: run_case(name, latency, repeat, timeout) for name in cases}
+    }
+
+
+def report(results, baseline=None):
+    lines = [f"{'case':31} {'engine':8} {'items/s':>10} {'trips/item':>11} {'peak RSS':>10}"
+             + ("  vs baseline" if baseline else "")]
+    for name, result in results["cases"].items():
+        if "skipped" in result:
+            lines.append(f"{name:31} {result.get('engine', ''):8} skipped ({result['skipped']})")
+            continue
+        line = (f"{name:31} {result.get('engine', ''):8} {result['items_per_second'] or 0:10.1f} "
+                f"{result['round_trips_per_item'] or 0:11.2f} "
+                f"{'n/a' if result['peak_rss_kb'] is None else str(result['peak_rss_kb'] // 1024) + ' MB':>10}")
+        previous = (baseline or {}).get("cases", {}).get(name, {})
+        if previous.get("items_per_second") and result["items_per_second"]:
+            line += f"  {result['items_per_second'] / previous['items_per_second']:.2f}x throughput"
+        lines.append(line)
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against the local replay server.")
+    parser.add_argument("--cases", nargs="*", choices=CASES, default=CASES)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the replay server adds to every request")
+    parser.add_argument("--repeat", type=int, default=3, help="Times each case repeats its work")
+    parser.add_argument("--output", default="replay_benchmark.json", help="Where to write the results")
+    parser.add_argument("--baseline", help="Earlier results file to compare throughput against")
+    parser.add_argument("--timeout", type=float, default=CASE_TIMEOUT,
+                        help="Seconds a case may run before it is stopped and recorded as skipped")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.cases, args.latency, args.repeat, args.timeout)
+    with open(args.output, mode='w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+    for line in report(results, baseline):
+        print(line)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import filecmp
+import json
+import os
+import queue
+import re
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import requests
+
+import replay_benchmark
+import replay_server
+
+
+class TestReplayServer(unittest.TestCase):
+
+    def test_counts_requests_and_adds_latency(self):
+        server, base_url = replay_server.start_replay_server(latency=0.05)
+        try:
+            start_time = time.perf_counter()
+            requests.get(base_url + "/", timeout=5)
+            requests.post(base_url + "/Unit/SelectUnitFromUnitsList", data={"unitOid": "1"}, timeout=5)
+            self.assertGreaterEqual(time.perf_counter() - start_time, 0.1)
+            self.assertEqual(server.request_count, 2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_landing_page_script_covers_the_fixtures(self):
+        with open(os.path.join(replay_server.DEFAULT_FIXTURE_DIR, "index.html"), encoding='utf-8') as file:
+            page = file.read()
+        # Everything scraper_other.py clicks or waits for
+        for element_id in ["cbo_nn_mobileDisclaimer", "dropdownUnitButton", "cbo_nn_HeaderSelectedUnit",
+                           "dropdownDateButton", "dropdownMealButton", "itemPanel"]:
+            self.assertIn(f'id="{element_id}"', page)
+        self.assertIn("window.jQuery", page)
+        # Every handler the menu and item panels call is defined by the page
+        handlers = set()
+        for name in os.listdir(replay_server.DEFAULT_FIXTURE_DIR):
+            if name.endswith(".json"):
+                with open(os.path.join(replay_server.DEFAULT_FIXTURE_DIR, name), encoding='utf-8') as file:
+                    handlers.update(re.findall(r"javascript:(\w+)\(", file.read()))
+        self.assertEqual(handlers, {"menuListSelectMenu", "getItemNutritionLabelOnClick"})
+        for handler in handlers:
+            self.assertIn(f"function {handler}(", page)
+
+    def test_capture_saves_the_fixture_layout(self):
+        server, base_url = replay_server.start_replay_server()
+        tmpdir = tempfile.mkdtemp()
+        try:
+            saved = replay_server.capture_fixtures(base_url, tmpdir)
+            # Every hand-built fixture comes back byte for byte, landing page included
+            names = sorted(os.listdir(replay_server.DEFAULT_FIXTURE_DIR))
+            self.assertEqual(sorted(os.listdir(tmpdir)), names)
+            self.assertEqual(saved, len(names) - 1)
+            _, mismatch, errors = filecmp.cmpfiles(replay_server.DEFAULT_FIXTURE_DIR, tmpdir, names, shallow=False)
+            self.assertEqual(mismatch + errors, [])
+        finally:
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(tmpdir)
+
+    def test_unit_links_escape_names(self):
+        links = replay_server.unit_links([("7", 'Rand "Late" & Co')])
+        self.assertIn('data-unitoid="-1" title="Show All Units"', links)
+        self.assertIn('data-unitoid="7" title="Rand &quot;Late&quot; &amp; Co">Rand &quot;Late&quot; &amp; Co</a>', links)
+
+    def test_hours_fixture_has_a_schedule_per_unit(self):
+        with open(os.path.join(replay_benchmark.HOURS_FIXTURE_DIR, "index.html"), encoding='utf-8') as file:
+            html = file.read()
+        self.assertEqual(html.count('class="unit__wrapper"'), 4)
+        self.assertIn('id="cbo_nn_hoursOfOperation"', html)
+
+
+class TestReplayBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_label_case_counts_items_and_round_trips(self):
+        result = replay_benchmark.run_case("http_get_nutritional_info", repeat=2)
+        labels = len(replay_benchmark.label_detail_oids())
+        self.assertEqual(result["items"], 2 * labels)
+        # One landing page request, then one request per label
+        self.assertEqual(result["round_trips"], 1 + 2 * labels)
+        self.assertGreater(result["items_per_second"], 0)
+
+    def test_selenium_cases_run_the_selenium_scraper(self):
+        for name in ["selenium_scrape_meals_for_hall", "selenium_get_nutritional_info"]:
+            self.assertIn(name, replay_benchmark.CASES)
+            self.assertEqual(replay_benchmark.CASE_ENGINES[name], "selenium")
+        self.assertEqual(replay_benchmark.dining_halls(), [("1", "Rand Dining Center"), ("2", "The Commons Dining Center")])
+
+    def test_crashed_or_stuck_cases_are_skipped(self):
+        crashed = MagicMock(exitcode=-11)
+        crashed.is_alive.return_value = False
+        result = replay_benchmark.collect_result(crashed, queue.Queue())
+        self.assertIn("exited with code -11", result["skipped"])
+
+        stuck = MagicMock()
+        stuck.is_alive.return_value = True
+        result = replay_benchmark.collect_result(stuck, queue.Queue(), timeout=0)
+        self.assertIn("no result", result["skipped"])
+        stuck.terminate.assert_called_once()
+
+    def test_suite_writes_json_and_compares_to_baseline(self):
+        output = os.path.join(self.tmpdir, "bench.json")
+        replay_benchmark.main(["--cases", "http_scrape_hall", "--repeat", "1", "--output", output])
+        with open(output, encoding='utf-8') as file:
+            results = json.load(file)
+        case = results["cases"]["http_scrape_hall"]
+        self.assertEqual(case["engine"], "http")
+        self.assertEqual(case["items"], 7)
+        self.assertGreater(case["round_trips_per_item"], 1)
+        lines = replay_benchmark.report(results, baseline=results)
+        self.assertIn("1.00x throughput", lines[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+"""
+Local stand-in for the NetNutrition site that replays captured responses.
+
+Fixture layout (see fixtures/netnutrition):
+    index.html            landing page with the unit dropdown
+    unit_<unitOid>.json   response to Unit/SelectUnitFromUnitsList
+    menu_<menuOid>.json   response to Menu/SelectMenu
+    label_<detailOid>.html response to NutritionDetail/ShowItemNutritionLabel
+
+Every GET serves index.html, so any directory with one can be replayed
+(fixtures/hours is the units list with its hours modals). The server counts
+the requests it answers and can add a fixed latency to each one to stand in
+for the real site's round-trip time.
+
+The landing page is not a copy of the site's: it carries a small page script
+(a jQuery stand-in, the unit/date/meal dropdowns, collapsible menu groups and
+the nutrition label modal) that posts to the routes above, so scraper_other.py
+can drive it in Chrome as well. The unit, menu and label responses checked in
+under fixtures/netnutrition are hand-built; --capture saves a live site's
+responses in their place and lists its units in the page's dropdown.
+
+Run it directly to point a scraper at it:
+    python replay_server.py --port 8765 --latency 0.05
+    python netnutrition_http.py --base-url http://127.0.0.1:8765/nn-prod/vucampusdining
+    python scraper_other.py --base-url http://127.0.0.1:8765/nn-prod/vucampusdining --workers 1
+    python replay_server.py --capture https://netnutrition.cbord.com/nn-prod/vucampusdining --fixtures captured
+"""
+import argparse
+import html
+import os
+import re
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "netnutrition")
+
+# Maps the last two path segments of a POST to (form field, fixture prefix)
+POST_ROUTES = {
+    "Unit/SelectUnitFromUnitsList": ("unitOid", "unit_{}.json"),
+    "Menu/SelectMenu": ("menuOid", "menu_{}.json"),
+    "NutritionDetail/ShowItemNutritionLabel": ("detailOid", "label_{}.html"),
+}
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Threaded server that counts requests and delays each response by latency seconds.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, handler, latency=0.0):
+        super().__init__(address, handler)
+        self.latency = latency
+        self.request_count = 0
+        self.count_lock = threading.Lock()
+
+    def count_request(self):
+        with self.count_lock:
+            self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    fixture_dir = DEFAULT_FIXTURE_DIR
+
+    def send_fixture(self, name):
+        path = os.path.join(self.fixture_dir, name)
+        if not os.path.exists(path):
+            self.send_error(404, f"No fixture {name}")
+            return
+        with open(path, "rb") as file:
+            body = file.read()
+        content_type = "application/json" if name.endswith(".json") else "text/html; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.count_request()
+        self.send_fixture("index.html")
+
+    def do_POST(self):
+        self.server.count_request()
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        route = "/".join(self.path.split("?")[0].strip("/").split("/")[-2:])
+        if route not in POST_ROUTES:
+            self.send_error(404, f"Unknown route {route}")
+            return
+        field, pattern = POST_ROUTES[route]
+        self.send_fixture(pattern.format(form.get(field, [""])[0]))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_replay_server(fixture_dir=DEFAULT_FIXTURE_DIR, port=0, latency=0.0):
+    """
+    Start the replay server on a background thread. Returns (server, base_url); call server.shutdown() to stop.
+    """
+    handler = type("FixtureReplayHandler", (ReplayHandler,), {"fixture_dir": fixture_dir})
+    server = ReplayServer(("127.0.0.1", port), handler, latency)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/nn-prod/vucampusdining"
+    return server, base_url
+
+
+# The unit dropdown entries of the landing page, between these markers
+UNITS_PATTERN = re.compile(r"(<!-- units -->\n).*?(<!-- /units -->)", re.S)
+
+
+def unit_links(halls):
+    """
+    The landing page's unit dropdown entries for [(unit oid, hall name)], after 'Show All Units'.
+    """
+    lines = []
+    for unit_oid, hall_name in [("-1", "Show All Units")] + list(halls):
+        name = html.escape(hall_name)
+        lines.append(f'<div class="dropdown-item"><a href="#" data-unitoid="{html.escape(unit_oid)}" '
+                     f'title="{name}">{name}</a></div>\n')
+    return "".join(lines)
+
+
+def capture_fixtures(base_url, fixture_dir):
+    """
+    Save a site's responses in the fixture layout: every unit, the menus its menu list offers for
+    scraper_common.MEAL_TIMES, and the label of every item on them. index.html is this directory's
+    landing page with the captured units in its dropdown. Returns the number of responses saved.
+    """
+    import netnutrition_http  # Only needed for capturing
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    scraper = netnutrition_http.HttpScraper(base_url, cache_path=":memory:")
+    saved = set()
+
+    def save(name, response):
+        with open(os.path.join(fixture_dir, name), "wb") as file:
+            file.write(response.content)
+        saved.add(name)
+
+    try:
+        halls = scraper.get_dining_halls()
+        for unit_oid, hall_name in halls:
+            # The site keeps the selected unit and menu per session, like HttpScraper.scrape_hall
+            session, _ = scraper.open_session()
+            try:
+                response = scraper.post(session, netnutrition_http.UNIT_SELECT_PATH, {"unitOid": unit_oid})
+                save(f"unit_{unit_oid}.json", response)
+                menus = netnutrition_http.parse_menu_list(netnutrition_http._panels(response).get("menuPanel", ""))
+                for date_value, meal_time, menu_oid in menus:
+                    if f"menu_{menu_oid}.json" in saved:
+                        continue
+                    response = scraper.post(session, netnutrition_http.MENU_SELECT_PATH, {"menuOid": menu_oid})
+                    save(f"menu_{menu_oid}.json", response)
+                    items = netnutrition_http.parse_menu_items(netnutrition_http._panels(response).get("itemPanel", ""))
+                    for item in items:
+                        name = f"label_{item['detail_oid']}.html"
+                        if item["detail_oid"] and name not in saved:
+                            response = scraper.post(session, netnutrition_http.LABEL_PATH,
+                                                    {"detailOid": item["detail_oid"]})
+                            save(name, response)
+            finally:
+                session.close()
+    finally:
+        scraper.nutrition_cache.close()
+
+    index_path = os.path.join(fixture_dir, "index.html")
+    if not os.path.exists(index_path):
+        shutil.copyfile(os.path.join(DEFAULT_FIXTURE_DIR, "index.html"), index_path)
+    with open(index_path, encoding="utf-8") as file:
+        page = file.read()
+    with open(index_path, mode="w", encoding="utf-8") as file:
+        file.write(UNITS_PATTERN.sub(lambda match: match.group(1) + unit_links(halls) + match.group(2), page, count=1))
+    return len(saved)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured NetNutrition responses locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--capture", metavar="URL",
+                        help="Save this site's unit, menu and label responses into --fixtures instead of serving")
+    args = parser.parse_args()
+
+    if args.capture:
+        saved = capture_fixtures(args.capture, args.fixtures)
+        print(f"Saved {saved} responses from {args.capture} to {args.fixtures}")
+        return
+
+    server, base_url = start_replay_server(args.fixtures, args.port, args.latency)
+    print(f"Replaying {args.fixtures} at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Shared retry policy and circuit breakers for the scrapers.
+
+RetryPolicy.call() retries a function on the given exceptions with jittered
+exponential backoff ("full jitter": a random delay between 0 and
+base_delay * 2**attempt, capped at max_delay). Every retry is taken from a
+RetryBudget shared by the whole run, so a site that is down stops the run
+from retrying forever; once the budget is spent, failures are raised on the
+first attempt.
+
+CircuitBreaker tracks consecutive failures per key (a hall, or a hall and
+date). After `threshold` failures in a row the key is open and callers skip it
+straight away; after `cooldown` seconds one trial call is let through again.
+
+Retries, the time they cost (failed attempts plus backoff sleeps) and circuit
+skips are counted on scraper_trace.tracer and in report().
+"""
+import collections
+import random
+import threading
+import time
+
+from scraper_trace import tracer
+
+
+class RetryBudgetExhausted(Exception):
+    pass
+
+
+class RetryBudget:
+    """
+    A run-wide allowance of retries. None means unlimited.
+    """
+
+    def __init__(self, total=None):
+        self.total = total
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            if self.total is not None and self.used >= self.total:
+                return False
+            self.used += 1
+            return True
+
+    def remaining(self):
+        with self.lock:
+            return None if self.total is None else max(self.total - self.used, 0)
+
+    def reset(self, total=None):
+        with self.lock:
+            self.total = total
+            self.used = 0
+
+
+class RetryPolicy:
+    """
+    attempts counts the first try, so attempts=5 means up to 4 retries.
+    """
+
+    def __init__(self, attempts=5, base_delay=0.5, max_delay=8.0, budget=None, sleep=time.sleep, rng=None):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget if budget is not None else RetryBudget()
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.lock = threading.Lock()
+        self.retries = collections.Counter()
+        self.retry_seconds = collections.Counter()
+        self.exhausted = collections.Counter()
+
+    def delay(self, attempt):
+        """
+        Backoff before retry number attempt + 1 (attempt 0 is the first failure).
+        """
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, func, retry_on=(Exception,), name="call", attempts=None, on_retry=None):
+        """
+        Call func() until it returns, retrying on retry_on exceptions. on_retry(error, attempt) runs
+        before each backoff, e.g. to close a blocking modal. The last error is re-raised when attempts
+        run out; RetryBudgetExhausted (chained to it) is raised when the run's budget does.
+        """
+        attempts = attempts or self.attempts
+        for attempt in range(attempts):
+            start_time = time.perf_counter()
+            try:
+                return func()
+            except retry_on as e:
+                if attempt == attempts - 1:
+                    raise
+                if not self.budget.take():
+                    with self.lock:
+                        self.exhausted[name] += 1
+                    raise RetryBudgetExhausted(f"Retry budget spent, giving up on {name}") from e
+                if on_retry is not None:
+                    on_retry(e, attempt)
+                self.sleep(self.delay(attempt))
+                self._record(name, time.perf_counter() - start_time)
+
+    def _record(self, name, seconds):
+        with self.lock:
+            self.retries[name] += 1
+            self.retry_seconds[name] += seconds
+        tracer.count("retries")
+        tracer.count("retry_seconds", seconds)
+
+    def reset(self, budget_total=None):
+        self.budget.reset(budget_total)
+        with self.lock:
+            self.retries.clear()
+            self.retry_seconds.clear()
+            self.exhausted.clear()
+
+    def report(self):
+        """
+        One line per retried operation: retries, seconds lost to failed attempts and backoff, and budget refusals.
+        """
+        with self.lock:
+            lines = [f"{'Retried':<16}{'Retries':>8}{'Lost (s)':>12}{'Refused':>10}"]
+            for name in sorted(set(self.retries) | set(self.exhausted), key=lambda name: -self.retry_seconds[name]):
+                lines.append(f"{name:<16}{self.retries[name]:>8}{self.retry_seconds[name]:>12.2f}{self.exhausted[name]:>10}")
+        remaining = self.budget.remaining()
+        lines.append(f"Retry budget left: {'unlimited' if remaining is None else remaining}")
+        return lines
+
+
+class CircuitBreaker:
+    """
+    Per-key breaker: closed until `threshold` consecutive failures, then open for `cooldown` seconds,
+    then half-open (one trial call; success closes it, failure opens it again).
+    """
+
+    def __init__(self, threshold=3, cooldown=300.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.failures = collections.Counter()
+        self.opened_at = {}
+        self.trial = set()
+        self.skips = collections.Counter()
+
+    def allow(self, key):
+        """
+        True if a call for key may go ahead. Skips are counted.
+        """
+        with self.lock:
+            opened_at = self.opened_at.get(key)
+            if opened_at is None:
+                return True
+            if self.clock() - opened_at >= self.cooldown and key not in self.trial:
+                self.trial.add(key)
+                return True
+            self.skips[key] += 1
+        tracer.count("circuit_skips")
+        return False
+
+    def is_open(self, key):
+        with self.lock:
+            return key in self.opened_at
+
+    def record_success(self, key):
+        with self.lock:
+            self.failures.pop(key, None)
+            self.opened_at.pop(key, None)
+            self.trial.discard(key)
+
+    def record_failure(self, key):
+        """
+        Count a failure; returns True if it opened (or re-opened) the circuit.
+        """
+        with self.lock:
+            self.failures[key] += 1
+            if key in self.trial or self.failures[key] >= self.threshold:
+                self.trial.discard(key)
+                self.opened_at[key] = self.clock()
+                return True
+            return False
+
+    def reset(self):
+        with self.lock:
+            self.failures.clear()
+            self.opened_at.clear()
+            self.trial.clear()
+            self.skips.clear()
+
+
+# Run-wide defaults: clicks back off briefly, page selections a little longer
+budget = RetryBudget(200)
+click_policy = RetryPolicy(attempts=5, base_delay=0.25, max_delay=2.0, budget=budget)
+selection_policy = RetryPolicy(attempts=5, base_delay=0.5, max_delay=8.0, budget=budget)
+hall_breaker = CircuitBreaker(threshold=3)
+date_breaker = CircuitBreaker(threshold=2)
+
+
+def reset(budget_total=200):
+    """
+    Start a run: refill the shared budget, clear the retry counts and close every circuit.
+    """
+    click_policy.reset(budget_total)
+    selection_policy.reset(budget_total)
+    hall_breaker.reset()
+    date_breaker.reset()
+
+
+def report():
+    lines = click_policy.report()[:-1] + selection_policy.report()[1:]
+    skipped = sum(hall_breaker.skips.values()) + sum(date_breaker.skips.values())
+    lines.append(f"Circuit breaker skips: {skipped} (open halls: {len(hall_breaker.opened_at)}, "
+                 f"open dates: {len(date_breaker.opened_at)})")
+    return lines
@@ -0,0 +1,163 @@
+import random
+import unittest
+from unittest.mock import patch, MagicMock
+
+import retry_policy
+import scraper_other
+from retry_policy import CircuitBreaker, RetryBudget, RetryBudgetExhausted, RetryPolicy
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        self.policy = RetryPolicy(attempts=4, base_delay=0.5, max_delay=2.0, budget=RetryBudget(10),
+                                  sleep=self.sleeps.append, rng=random.Random(7))
+
+    def flaky(self, failures):
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise TimeoutError("not yet")
+            return "done"
+        return func, calls
+
+    def test_backoff_is_jittered_and_capped(self):
+        for attempt in range(8):
+            for _ in range(50):
+                self.assertLessEqual(self.policy.delay(attempt), min(2.0, 0.5 * 2 ** attempt))
+        # Full jitter spreads retries out instead of sleeping the same amount every time
+        self.assertGreater(len({round(self.policy.delay(3), 3) for _ in range(20)}), 1)
+
+    def test_retries_until_success(self):
+        func, calls = self.flaky(2)
+        self.assertEqual(self.policy.call(func, retry_on=(TimeoutError,), name="click"), "done")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertEqual(self.policy.retries["click"], 2)
+        self.assertEqual(self.policy.budget.remaining(), 8)
+
+    def test_last_error_is_reraised(self):
+        func, calls = self.flaky(10)
+        with self.assertRaises(TimeoutError):
+            self.policy.call(func, retry_on=(TimeoutError,))
+        self.assertEqual(len(calls), 4)
+
+    def test_other_errors_are_not_retried(self):
+        func, calls = self.flaky(1)
+        with self.assertRaises(TimeoutError):
+            self.policy.call(func, retry_on=(ValueError,))
+        self.assertEqual(len(calls), 1)
+
+    def test_budget_is_shared_and_exhausted(self):
+        budget = RetryBudget(3)
+        first = RetryPolicy(attempts=5, budget=budget, sleep=self.sleeps.append)
+        second = RetryPolicy(attempts=5, budget=budget, sleep=self.sleeps.append)
+        func, _ = self.flaky(2)
+        first.call(func, retry_on=(TimeoutError,))
+        func, calls = self.flaky(2)
+        with self.assertRaises(RetryBudgetExhausted):
+            second.call(func, retry_on=(TimeoutError,), name="select_date")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(second.exhausted["select_date"], 1)
+        self.assertEqual(budget.remaining(), 0)
+
+    def test_on_retry_runs_before_each_backoff(self):
+        seen = []
+        func, _ = self.flaky(2)
+        self.policy.call(func, retry_on=(TimeoutError,), on_retry=lambda error, attempt: seen.append(attempt))
+        self.assertEqual(seen, [0, 1])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(threshold=2, cooldown=60, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        self.assertFalse(self.breaker.record_failure("Rand"))
+        self.assertTrue(self.breaker.record_failure("Rand"))
+        self.assertFalse(self.breaker.allow("Rand"))
+        self.assertTrue(self.breaker.allow("Kissam"))
+        self.assertEqual(self.breaker.skips["Rand"], 1)
+
+    def test_success_resets_the_count(self):
+        self.breaker.record_failure("Rand")
+        self.breaker.record_success("Rand")
+        self.assertFalse(self.breaker.record_failure("Rand"))
+        self.assertTrue(self.breaker.allow("Rand"))
+
+    def test_half_open_after_cooldown(self):
+        self.breaker.record_failure("Rand")
+        self.breaker.record_failure("Rand")
+        self.clock.now = 61
+        # One trial call goes through; the next waits for its outcome
+        self.assertTrue(self.breaker.allow("Rand"))
+        self.assertFalse(self.breaker.allow("Rand"))
+        self.assertTrue(self.breaker.record_failure("Rand"))
+        self.assertFalse(self.breaker.allow("Rand"))
+
+        self.clock.now = 122
+        self.assertTrue(self.breaker.allow("Rand"))
+        self.breaker.record_success("Rand")
+        self.assertFalse(self.breaker.is_open("Rand"))
+        self.assertTrue(self.breaker.allow("Rand"))
+
+
+class TestScraperRetries(unittest.TestCase):
+
+    def setUp(self):
+        retry_policy.reset(5)
+
+    def tearDown(self):
+        retry_policy.reset()
+
+    @patch('scraper_other.scraper_waits.wait_until')
+    @patch('scraper_other.WebDriverWait')
+    def test_intercepted_click_is_retried(self, mock_webdriverwait, mock_wait_until):
+        element = MagicMock()
+        element.click.side_effect = [scraper_other.ElementClickInterceptedException(), None]
+        mock_webdriverwait.return_value.until.return_value = element
+        with patch.object(retry_policy.click_policy, "sleep"):
+            self.assertTrue(scraper_other.wait_and_click(MagicMock(), (scraper_other.By.ID, "test")))
+        self.assertEqual(retry_policy.click_policy.retries["click"], 1)
+
+    @patch('scraper_other.scraper_waits.wait_until')
+    @patch('scraper_other.WebDriverWait')
+    def test_click_fails_once_the_budget_is_spent(self, mock_webdriverwait, mock_wait_until):
+        element = MagicMock()
+        element.click.side_effect = scraper_other.ElementClickInterceptedException()
+        mock_webdriverwait.return_value.until.return_value = element
+        with patch.object(retry_policy.click_policy, "sleep"):
+            self.assertFalse(scraper_other.wait_and_click(MagicMock(), (scraper_other.By.ID, "a"), retries=10))
+        self.assertEqual(retry_policy.budget.remaining(), 0)
+        self.assertEqual(element.click.call_count, 6)
+
+    @patch('scraper_other.scrape_meal')
+    @patch('scraper_other.select_date')
+    def test_open_date_circuit_skips_pool_jobs(self, mock_select_date, mock_scrape_meal):
+        worker = MagicMock(state={"hall": "Rand", "date": "Today"})
+        for _ in range(retry_policy.date_breaker.threshold):
+            retry_policy.date_breaker.record_failure(("Rand", "Today"))
+        scraper_other.handle_pool_job(MagicMock(), worker, ("meal", 0, "Rand", "Today", "Lunch"))
+        mock_scrape_meal.assert_not_called()
+
+        mock_scrape_meal.return_value = True
+        scraper_other.handle_pool_job(MagicMock(), worker, ("meal", 0, "Rand", "Tomorrow", "Lunch"))
+        mock_scrape_meal.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
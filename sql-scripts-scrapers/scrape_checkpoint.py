@@ -0,0 +1,191 @@
+"""
+Checkpoint manifest for scraper runs.
+
+Every finished (hall, date, meal) is appended as one JSON line to
+scrape_checkpoint.jsonl together with a signature of its menu table and the
+items it produced. A crashed run can be resumed from that file (--resume),
+and the previous run's file lets an incremental run reuse the rows of any
+menu it can tell hasn't changed instead of scraping it again: before opening
+it when the menu's id (source) is the same or the hall's finished date was
+read recently enough (DEFAULT_MENU_MAX_AGE), or once its table is read when
+the signature matches.
+
+Dates are keyed by their ISO date, so "Today" in one run and "2024/11/05"
+in the next refer to the same menu.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import scraper_common
+
+DEFAULT_CHECKPOINT_PATH = "scrape_checkpoint.jsonl"
+
+# Seconds after which an incremental run opens a finished date again to catch later edits to its menus
+DEFAULT_MENU_MAX_AGE = 24 * 3600
+
+
+def menu_signature(meal_items):
+    """
+    Hash of the menu table's categories, item names and filter flags.
+    """
+    content = [[item["category"], item["name"], sorted(name for name, value in item["filters"].items() if value)]
+               for item in meal_items]
+    return hashlib.sha1(json.dumps(content).encode("utf-8")).hexdigest()
+
+
+def read_manifest(path):
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Partly written last line of a crashed run
+            entries[entry["key"]] = entry
+    return entries
+
+
+class ScrapeCheckpoint:
+    """
+    Append-only record of finished (hall, date, meal) combinations for the current run,
+    plus read access to the previous run's record.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self.previous_path = path[:-len(".jsonl")] + ".prev.jsonl" if path.endswith(".jsonl") else path + ".prev"
+        self.lock = threading.Lock()
+        self.completed = {}
+        self.previous = {}
+        self.file = None
+
+    def begin(self, resume=False):
+        """
+        Start a run. A fresh run moves the last manifest aside as the previous run; a resumed run keeps appending to it.
+        """
+        if not resume and os.path.exists(self.path):
+            os.replace(self.path, self.previous_path)
+        self.completed = read_manifest(self.path) if resume else {}
+        self.previous = read_manifest(self.previous_path)
+        self.file = open(self.path, mode='a', encoding='utf-8')
+        # Start on a fresh line after a partly written one from a crashed run
+        if self.file.tell() > 0:
+            with open(self.path, mode='rb') as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    self.file.write("\n")
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def key(self, hall_name, date_value, meal_time):
+        return f"{hall_name}|{scraper_common.normalize_date(date_value)}|{meal_time}"
+
+    def is_done(self, hall_name, date_value, meal_time):
+        return self.key(hall_name, date_value, meal_time) in self.completed
+
+    def is_closed(self, hall_name, date_value, meal_times):
+        """
+        True if every one of meal_times was finished for this hall and date with no items,
+        i.e. the hall was reached and isn't serving that day.
+        """
+        entries = [self.completed.get(self.key(hall_name, date_value, meal_time)) for meal_time in meal_times]
+        return bool(entries) and all(entry is not None and not entry["items"] for entry in entries)
+
+    def closed_menus(self, meal_times):
+        """
+        (ISO date, hall) pairs this run confirmed closed for all of meal_times.
+        """
+        pairs = {(entry["date"], entry["hall"], entry["date_label"]) for entry in self.completed.values()}
+        return sorted((date, hall_name) for date, hall_name, date_label in pairs
+                      if self.is_closed(hall_name, date_label, meal_times))
+
+    def done_menus(self):
+        """
+        (ISO date, hall, meal) of every menu finished in this run, for MenuStore.import_rows(done=...).
+        """
+        return sorted((entry["date"], entry["hall"], entry["meal"]) for entry in self.completed.values())
+
+    def previous_items(self, hall_name, date_value, meal_time, signature):
+        """
+        Return the previous run's [food id, food name, category] items for this menu if its table is unchanged.
+        """
+        entry = self.previous.get(self.key(hall_name, date_value, meal_time))
+        if entry is not None and entry["signature"] == signature:
+            return entry["items"]
+        return None
+
+    def previous_source(self, hall_name, date_value, meal_time):
+        """
+        The source (NetNutrition's menu oid) the previous run recorded for this menu, or None.
+        """
+        entry = self.previous.get(self.key(hall_name, date_value, meal_time))
+        return entry.get("source") if entry is not None else None
+
+    def previous_done(self, hall_name, date_value, meal_times, max_age=None):
+        """
+        True if the previous run finished every one of meal_times for this hall and date, each read from
+        the site no more than max_age seconds ago (any age if None).
+        """
+        oldest = time.time() - max_age if max_age is not None else None
+        for meal_time in meal_times:
+            entry = self.previous.get(self.key(hall_name, date_value, meal_time))
+            if entry is None:
+                return False
+            if oldest is not None and entry.get("scraped_at", entry["finished_at"]) < oldest:
+                return False
+        return True
+
+    def carry_over(self, hall_name, date_value, meal_time):
+        """
+        Mark a menu done with the previous run's entry, without it being opened. Returns its items.
+        """
+        entry = self.previous[self.key(hall_name, date_value, meal_time)]
+        self.mark_done(hall_name, date_value, meal_time, entry["signature"], entry["items"], entry.get("source"),
+                       scraped_at=entry.get("scraped_at", entry["finished_at"]))
+        return entry["items"]
+
+    def mark_done(self, hall_name, date_value, meal_time, signature, items, source=None, scraped_at=None):
+        """
+        Record a finished menu. items are [food id, food name, category] lists; source identifies the menu
+        on the site where it has an id of its own. scraped_at is when the items were last read from the site,
+        now unless they were carried over.
+        """
+        key = self.key(hall_name, date_value, meal_time)
+        finished_at = time.time()
+        entry = {
+            "key": key,
+            "hall": hall_name,
+            "date": scraper_common.normalize_date(date_value),
+            "date_label": date_value,
+            "meal": meal_time,
+            "signature": signature,
+            "source": source,
+            "items": items,
+            "finished_at": finished_at,
+            "scraped_at": finished_at if scraped_at is None else scraped_at
+        }
+        with self.lock:
+            self.completed[key] = entry
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def completed_rows(self):
+        """
+        dining_meals_nutrition.csv rows for everything already finished in this run.
+        """
+        rows = []
+        for entry in self.completed.values():
+            for food_id, item_name, category in entry["items"]:
+                rows.append(scraper_common.meals_csv_row(food_id, entry["hall"], entry["date_label"], entry["meal"],
+                                                         item_name, category))
+        return rows
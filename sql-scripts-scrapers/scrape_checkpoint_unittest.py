@@ -0,0 +1,129 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import scrape_checkpoint
+import scraper_common
+
+
+def menu_item(name, category="Entrees", **filters):
+    filter_attributes = scraper_common.empty_filter_attributes()
+    filter_attributes.update(filters)
+    return {"category": category, "name": name, "detail_oid": "1", "filters": filter_attributes}
+
+
+class TestMenuSignature(unittest.TestCase):
+
+    def test_signature_ignores_detail_oids(self):
+        first = menu_item("Kale", Vegan=True)
+        second = dict(first, detail_oid="2")
+        self.assertEqual(scrape_checkpoint.menu_signature([first]), scrape_checkpoint.menu_signature([second]))
+
+    def test_signature_changes_with_menu(self):
+        signature = scrape_checkpoint.menu_signature([menu_item("Kale")])
+        self.assertNotEqual(signature, scrape_checkpoint.menu_signature([menu_item("Kale", Vegan=True)]))
+        self.assertNotEqual(signature, scrape_checkpoint.menu_signature([menu_item("Kale", category="Sides")]))
+        self.assertNotEqual(signature, scrape_checkpoint.menu_signature([menu_item("Kale"), menu_item("Rice")]))
+
+
+class TestScrapeCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "scrape_checkpoint.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def finish_run(self, resume=False):
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(self.path)
+        checkpoint.begin(resume=resume)
+        checkpoint.mark_done("Rand Dining Center", "Today", "Lunch", "abc", [[3, "Kale", "Sides"]])
+        checkpoint.close()
+        return checkpoint
+
+    def test_resume_keeps_finished_menus(self):
+        self.finish_run()
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(self.path)
+        checkpoint.begin(resume=True)
+        self.assertTrue(checkpoint.is_done("Rand Dining Center", "Today", "Lunch"))
+        self.assertFalse(checkpoint.is_done("Rand Dining Center", "Today", "Dinner"))
+        self.assertEqual(checkpoint.completed_rows(), [[3, "Rand Dining Center", "Today", "Lunch", "Kale", "Sides"]])
+        checkpoint.close()
+
+    def test_fresh_run_moves_manifest_to_previous(self):
+        self.finish_run()
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(self.path)
+        checkpoint.begin()
+        self.assertFalse(checkpoint.is_done("Rand Dining Center", "Today", "Lunch"))
+        self.assertTrue(os.path.exists(checkpoint.previous_path))
+        # The same menu seen under its dated label is still recognised
+        iso_date = datetime.date.today().strftime("%Y/%m/%d")
+        self.assertEqual(checkpoint.previous_items("Rand Dining Center", iso_date, "Lunch", "abc"), [[3, "Kale", "Sides"]])
+        self.assertIsNone(checkpoint.previous_items("Rand Dining Center", iso_date, "Lunch", "changed"))
+        checkpoint.close()
+
+    def test_partly_written_last_line_is_ignored(self):
+        self.finish_run()
+        with open(self.path, mode='a', encoding='utf-8') as file:
+            file.write(json.dumps({"key": "Rand Dining Center|2024-11-05|Dinner"})[:20])
+        entries = scrape_checkpoint.read_manifest(self.path)
+        self.assertEqual(list(entries), ["Rand Dining Center|" + datetime.date.today().isoformat() + "|Lunch"])
+
+        # Resuming appends after the broken line instead of onto it
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(self.path)
+        checkpoint.begin(resume=True)
+        checkpoint.mark_done("Rand Dining Center", "2024/11/05", "Dinner", "def", [])
+        checkpoint.close()
+        self.assertEqual(len(scrape_checkpoint.read_manifest(self.path)), 2)
+
+    def test_closed_needs_every_meal_empty(self):
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(self.path)
+        checkpoint.begin()
+        for meal_time in ("Breakfast", "Lunch", "Dinner"):
+            checkpoint.mark_done("Rand Dining Center", "2024/11/05", meal_time, "e", [])
+        checkpoint.mark_done("Rand Dining Center", "2024/11/06", "Lunch", "abc", [[3, "Kale", "Sides"]])
+        # Breakfast finished empty but Lunch and Dinner never did, so the hall may just have failed
+        checkpoint.mark_done("The Commons Dining Center", "2024/11/05", "Breakfast", "e", [])
+        checkpoint.close()
+        meal_times = ["Breakfast", "Lunch", "Dinner"]
+        self.assertTrue(checkpoint.is_closed("Rand Dining Center", "2024/11/05", meal_times))
+        self.assertFalse(checkpoint.is_closed("The Commons Dining Center", "2024/11/05", meal_times))
+        self.assertEqual(checkpoint.closed_menus(meal_times), [("2024-11-05", "Rand Dining Center")])
+        self.assertIn(("2024-11-05", "The Commons Dining Center", "Breakfast"), checkpoint.done_menus())
+
+    def test_carried_over_menus_keep_their_scrape_time(self):
+        self.finish_run()
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(self.path)
+        checkpoint.begin()
+        self.assertTrue(checkpoint.previous_done("Rand Dining Center", "Today", ["Lunch"]))
+        self.assertFalse(checkpoint.previous_done("Rand Dining Center", "Today", ["Lunch", "Dinner"]))
+        scraped_at = checkpoint.previous[checkpoint.key("Rand Dining Center", "Today", "Lunch")]["scraped_at"]
+        self.assertEqual(checkpoint.carry_over("Rand Dining Center", "Today", "Lunch"), [[3, "Kale", "Sides"]])
+        checkpoint.close()
+
+        # The next run sees the original scrape time, so a max_age eventually sends the date back to the site
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(self.path)
+        checkpoint.begin()
+        self.assertEqual(checkpoint.previous[checkpoint.key("Rand Dining Center", "Today", "Lunch")]["scraped_at"],
+                         scraped_at)
+        self.assertTrue(checkpoint.previous_done("Rand Dining Center", "Today", ["Lunch"], max_age=3600))
+        self.assertFalse(checkpoint.previous_done("Rand Dining Center", "Today", ["Lunch"], max_age=-1))
+        checkpoint.close()
+
+
+class TestNormalizeDate(unittest.TestCase):
+
+    def test_normalize_date(self):
+        today = datetime.date(2024, 11, 5)
+        self.assertEqual(scraper_common.normalize_date("Today", today), "2024-11-05")
+        self.assertEqual(scraper_common.normalize_date("Tomorrow", today), "2024-11-06")
+        self.assertEqual(scraper_common.normalize_date("2024/11/07", today), "2024-11-07")
+        self.assertEqual(scraper_common.normalize_date("Late Night", today), "Late Night")
+
+
+if __name__ == '__main__':
+    unittest.main()
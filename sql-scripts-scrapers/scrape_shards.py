@@ -0,0 +1,302 @@
+"""
+Sharded scraping across processes or machines, and a deterministic merge.
+
+The (hall, date) menus are split into N shards by a stable hash of the hall
+name and ISO date, so every process or machine that runs shard I of N picks
+the same menus without talking to the others. Each shard writes its own
+directory (shards/shard-I-of-N/) with its own CSVs, nutrition cache,
+checkpoint, trace and metrics, seeded from the main nutrition cache so labels
+scraped before aren't fetched again.
+
+The merge reads every shard's nutrition cache and meals CSV and rebuilds
+nutrition_info.csv and dining_meals_nutrition.csv:
+
+    - foods are deduplicated by name; when shards disagree, the most recently
+      fetched label wins (ties broken on the label contents)
+    - Food IDs come from the main nutrition cache, so known foods keep their
+      IDs and new foods are numbered in name order
+    - menus are written in (hall, date, meal) order, and a menu scraped by more
+      than one shard keeps the most complete copy
+
+so the result depends only on what the shards scraped, not on which finished first.
+
+    python scrape_shards.py run --shards 4                  # 4 local processes, then merge
+    python scrape_shards.py shard 2/4 --engine selenium     # one shard, e.g. on another machine
+    python scrape_shards.py merge shards/shard-*-of-4       # after copying the shard directories back
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import subprocess
+import sys
+import zlib
+
+import change_feed
+import menu_payloads
+import menu_store
+import nutrition_cache
+import scrape_checkpoint
+import scraper_common
+import scraper_trace
+
+DEFAULT_OUTPUT_ROOT = "shards"
+ENGINES = ["http", "selenium"]
+
+
+def parse_shard(value):
+    """
+    Parse 'I/N' (1-based) into (I, N).
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected a shard like 2/4, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Shard {index} is outside 1..{count}")
+    return index, count
+
+
+def shard_of(hall_name, date_value, count):
+    """
+    1-based shard of a (hall, date). Dates are hashed by ISO date so 'Today' and '2024/11/05' agree.
+    """
+    key = f"{hall_name}|{scraper_common.normalize_date(date_value)}"
+    return zlib.crc32(key.encode("utf-8")) % count + 1
+
+
+def in_shard(shard, hall_name, date_value):
+    """
+    True if the (hall, date) belongs to shard (I, N). shard=None means everything.
+    """
+    return shard is None or shard_of(hall_name, date_value, shard[1]) == shard[0]
+
+
+def shard_dir(index, count, output_root=DEFAULT_OUTPUT_ROOT):
+    return os.path.join(output_root, f"shard-{index}-of-{count}")
+
+
+def output_paths(directory=""):
+    """
+    Where a scraper run keeps its files. An empty directory gives the usual names in the working directory.
+    """
+    return {
+        "nutrition_csv": os.path.join(directory, scraper_common.nutrition_csv_filename),
+        "meals_csv": os.path.join(directory, scraper_common.meals_csv_filename),
+        "cache": os.path.join(directory, nutrition_cache.DEFAULT_CACHE_PATH),
+        "checkpoint": os.path.join(directory, scrape_checkpoint.DEFAULT_CHECKPOINT_PATH),
+        "trace": os.path.join(directory, scraper_trace.DEFAULT_TRACE_PATH),
+        "metrics": os.path.join(directory, scraper_trace.DEFAULT_METRICS_PATH)
+    }
+
+
+def seed_shard(directory, base_cache=nutrition_cache.DEFAULT_CACHE_PATH,
+               base_nutrition_csv=scraper_common.nutrition_csv_filename):
+    """
+    Create a shard directory and start its cache as a copy of the main one (if the shard has none yet).
+    """
+    os.makedirs(directory, exist_ok=True)
+    shard_cache = output_paths(directory)["cache"]
+    if os.path.exists(shard_cache) or not (os.path.exists(base_cache) or os.path.exists(base_nutrition_csv)):
+        return
+    cache = nutrition_cache.NutritionCache(base_cache, seed_csv=base_nutrition_csv)
+    try:
+        cache.backup(shard_cache)
+    finally:
+        cache.close()
+
+
+def run_shard(index, count, engine="http", output_root=DEFAULT_OUTPUT_ROOT, engine_args=()):
+    """
+    Scrape one shard into its own directory with the chosen engine.
+    """
+    directory = shard_dir(index, count, output_root)
+    seed_shard(directory)
+    paths = output_paths(directory)
+    argv = ["--shard", f"{index}/{count}", "--output-dir", directory,
+            "--trace", paths["trace"], "--metrics", paths["metrics"]] + list(engine_args)
+    if engine == "http":
+        import netnutrition_http
+        netnutrition_http.main(argv)
+    else:
+        import scraper_other
+        scraper_other.main(argv)
+
+
+def run_local(count, engine="http", output_root=DEFAULT_OUTPUT_ROOT, engine_args=()):
+    """
+    Run every shard as its own process on this machine and wait for them. Returns the shards that failed.
+    """
+    processes = {}
+    for index in range(1, count + 1):
+        # Seed up front so the shard processes don't all open the main cache at once
+        seed_shard(shard_dir(index, count, output_root))
+        command = [sys.executable, os.path.abspath(__file__), "shard", f"{index}/{count}",
+                   "--engine", engine, "--output-root", output_root] + list(engine_args)
+        processes[index] = subprocess.Popen(command)
+    return [index for index, process in processes.items() if process.wait() != 0]
+
+
+def _label_key(entry):
+    # Latest fetch wins; the label itself breaks ties so the choice never depends on shard order
+    label = {name: value for name, value in entry.items() if name not in ("Food ID", "Fetched At")}
+    return entry.get("Fetched At") or 0, json.dumps(label, sort_keys=True)
+
+
+def read_shard_foods(directories):
+    """
+    Return {food name: entry} with one label per food across every shard's cache.
+    """
+    foods = {}
+    for directory in directories:
+        cache_path = output_paths(directory)["cache"]
+        if not os.path.exists(cache_path):
+            print(f"No nutrition cache in {directory}, skipping its foods")
+            continue
+        cache = nutrition_cache.NutritionCache(cache_path, seed_csv=None)
+        try:
+            for entry in cache.entries():
+                current = foods.get(entry["Food Name"])
+                if current is None or _label_key(entry) > _label_key(current):
+                    foods[entry["Food Name"]] = entry
+        finally:
+            cache.close()
+    return foods
+
+
+def read_shard_menus(directories):
+    """
+    Return {(hall, ISO date, meal): rows} from every shard's meals CSV, keeping the most complete copy of each menu.
+    """
+    menus = {}
+    for directory in directories:
+        meals_csv = output_paths(directory)["meals_csv"]
+        if not os.path.exists(meals_csv):
+            print(f"No meals CSV in {directory}, skipping its menus")
+            continue
+        shard_menus = {}
+        with open(meals_csv, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                key = (row["Dining Hall"], scraper_common.normalize_date(row["Date"]), row["Meal"])
+                shard_menus.setdefault(key, []).append(
+                    [row["Dining Hall"], row["Date"], row["Meal"], row["Food Name"], row["Category"]])
+        for key, rows in shard_menus.items():
+            current = menus.get(key)
+            if current is None or (-len(rows), rows) < (-len(current), current):
+                menus[key] = rows
+    return menus
+
+
+def read_shard_done(directories):
+    """
+    (ISO date, hall, meal) of every menu a shard's checkpoint marked done, or None if no shard has a checkpoint.
+    """
+    done = None
+    for directory in directories:
+        checkpoint_path = output_paths(directory)["checkpoint"]
+        if not os.path.exists(checkpoint_path):
+            continue
+        if done is None:
+            done = set()
+        done.update((entry["date"], entry["hall"], entry["meal"])
+                    for entry in scrape_checkpoint.read_manifest(checkpoint_path).values())
+    return done
+
+
+def _menu_order(key):
+    hall_name, date_value, meal_time = key
+    meal_index = scraper_common.MEAL_TIMES.index(meal_time) if meal_time in scraper_common.MEAL_TIMES else len(scraper_common.MEAL_TIMES)
+    return hall_name, date_value, meal_index, meal_time
+
+
+def merge_shards(directories, nutrition_csv=scraper_common.nutrition_csv_filename,
+                 meals_csv=scraper_common.meals_csv_filename, cache_path=nutrition_cache.DEFAULT_CACHE_PATH,
+                 store_dir=menu_store.DEFAULT_STORE_DIR, payload_dir=menu_payloads.DEFAULT_PAYLOAD_DIR,
+                 feed_dir=change_feed.DEFAULT_FEED_DIR):
+    """
+    Combine shard outputs into the main nutrition cache, nutrition_info.csv and dining_meals_nutrition.csv
+    (and the menu store, API payloads and change feed, unless store_dir is None). Returns (foods, menu rows) written.
+    """
+    foods = read_shard_foods(directories)
+    menus = read_shard_menus(directories)
+
+    cache = nutrition_cache.NutritionCache(cache_path, seed_csv=nutrition_csv)
+    try:
+        # Sorted so foods new to the main cache get their IDs in name order
+        for food_name in sorted(foods):
+            entry = foods[food_name]
+            known = cache.get(food_name)
+            if known is None or (known["Fetched At"] or 0) < (entry["Fetched At"] or 0):
+                cache.put(food_name, entry, entry, fetched_at=entry["Fetched At"])
+        food_ids = {entry["Food Name"]: entry["Food ID"] for entry in cache.entries()}
+        cache.export_csv(nutrition_csv)
+    finally:
+        cache.close()
+
+    rows = 0
+    temp_path = meals_csv + ".tmp"
+    with open(temp_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(scraper_common.MEALS_HEADER)
+        for key in sorted(menus, key=_menu_order):
+            for hall_name, date_value, meal_time, item_name, category in menus[key]:
+                if item_name not in food_ids:
+                    print(f"No nutrition label for {item_name} at {hall_name}, leaving it out")
+                    continue
+                writer.writerow(scraper_common.meals_csv_row(food_ids[item_name], hall_name, date_value, meal_time,
+                                                             item_name, category))
+                rows += 1
+    os.replace(temp_path, meals_csv)
+
+    if store_dir is not None:
+        store = menu_store.MenuStore(store_dir)
+        partitions = store.import_csv(meals_csv, done=read_shard_done(directories))
+        dates = sorted({date for date, _ in partitions})
+        if payload_dir is not None:
+            menu_payloads.build_payloads(store, nutrition_csv, payload_dir, dates=dates)
+        if feed_dir is not None:
+            change_feed.publish(nutrition_csv, store, dates, feed_dir)
+    return len(foods), rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape NetNutrition in shards and merge the results.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run every shard as a local process, then merge")
+    run_parser.add_argument("--shards", type=int, default=4)
+    shard_parser = commands.add_parser("shard", help="Run one shard (I/N), e.g. on its own machine")
+    shard_parser.add_argument("shard", type=parse_shard)
+    for command_parser in (run_parser, shard_parser):
+        command_parser.add_argument("--engine", choices=ENGINES, default="http")
+        command_parser.add_argument("--output-root", default=DEFAULT_OUTPUT_ROOT)
+    merge_parser = commands.add_parser("merge", help="Merge shard directories into the main CSV files")
+    merge_parser.add_argument("directories", nargs="*",
+                              help="Shard directories (default: every shard under --output-root)")
+    merge_parser.add_argument("--output-root", default=DEFAULT_OUTPUT_ROOT)
+    # Anything else (--workers, --refresh-days, --incremental, ...) is passed on to the engine
+    args, engine_args = parser.parse_known_args(argv)
+
+    if args.command == "shard":
+        run_shard(args.shard[0], args.shard[1], args.engine, args.output_root, engine_args)
+        return 0
+
+    if args.command == "run":
+        failed = run_local(args.shards, args.engine, args.output_root, engine_args)
+        if failed:
+            print(f"Shards {failed} failed; rerun them with 'shard I/{args.shards} --resume' and then merge")
+            return 1
+        directories = [shard_dir(index, args.shards, args.output_root) for index in range(1, args.shards + 1)]
+    else:
+        if engine_args:
+            parser.error(f"unrecognized arguments: {' '.join(engine_args)}")
+        directories = args.directories or sorted(glob.glob(os.path.join(args.output_root, "shard-*")))
+
+    foods, rows = merge_shards(sorted(directories))
+    print(f"Merged {len(directories)} shards: {foods} foods, {rows} menu rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import netnutrition_http
+import replay_server
+import scrape_shards
+import scraper_common
+
+
+class TestShardAssignment(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual(scrape_shards.parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "two"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                scrape_shards.parse_shard(value)
+
+    def test_every_menu_lands_in_exactly_one_shard(self):
+        keys = [(f"Hall {hall}", f"2024/11/{day:02d}") for hall in range(10) for day in range(1, 8)]
+        for count in (1, 3, 4):
+            for hall_name, date_value in keys:
+                owners = [index for index in range(1, count + 1)
+                          if scrape_shards.in_shard((index, count), hall_name, date_value)]
+                self.assertEqual(len(owners), 1)
+        self.assertTrue(scrape_shards.in_shard(None, "Rand", "Today"))
+
+    def test_date_labels_hash_like_their_iso_date(self):
+        today = scraper_common.normalize_date("Today").replace("-", "/")
+        self.assertEqual(scrape_shards.shard_of("Rand", "Today", 8), scrape_shards.shard_of("Rand", today, 8))
+
+
+class TestShardMerge(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.base_url = replay_server.start_replay_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def scrape(self, directory, shard=None):
+        os.makedirs(directory, exist_ok=True)
+        paths = scrape_shards.output_paths(directory)
+        netnutrition_http.HttpScraper(self.base_url, paths["nutrition_csv"], paths["meals_csv"], pool_size=2,
+                                      cache_path=paths["cache"], shard=shard).run()
+        return paths
+
+    def merge(self, name, directories):
+        paths = scrape_shards.output_paths(os.path.join(self.tmpdir, name))
+        os.makedirs(os.path.dirname(paths["cache"]))
+        scrape_shards.merge_shards(directories, paths["nutrition_csv"], paths["meals_csv"], paths["cache"],
+                                   store_dir=None)
+        with open(paths["nutrition_csv"], encoding='utf-8') as nutrition, open(paths["meals_csv"], encoding='utf-8') as meals:
+            return nutrition.read(), meals.read()
+
+    def read_rows(self, filename):
+        with open(filename, newline='', encoding='utf-8') as file:
+            return list(csv.reader(file))[1:]
+
+    def test_merge_matches_unsharded_run_in_any_order(self):
+        full = self.scrape(os.path.join(self.tmpdir, "full"))
+        shards = [os.path.join(self.tmpdir, f"shard-{index}-of-3") for index in (1, 2, 3)]
+        for index, directory in enumerate(shards, 1):
+            self.scrape(directory, (index, 3))
+
+        forward = self.merge("forward", shards)
+        backward = self.merge("backward", list(reversed(shards)))
+        self.assertEqual(forward, backward)
+
+        merged_meals = list(csv.reader(forward[1].splitlines()))[1:]
+        merged_nutrition = list(csv.reader(forward[0].splitlines()))[1:]
+        self.assertEqual(sorted(row[1:] for row in merged_meals), sorted(row[1:] for row in self.read_rows(full["meals_csv"])))
+        # One row and one Food ID per food, and every menu row points at its food's ID
+        food_ids = {row[1]: row[0] for row in merged_nutrition}
+        self.assertEqual(len(food_ids), len(merged_nutrition))
+        self.assertEqual(len(set(food_ids.values())), len(food_ids))
+        self.assertTrue(all(food_ids[row[4]] == row[0] for row in merged_meals))
+
+    def test_known_foods_keep_their_ids(self):
+        shard = os.path.join(self.tmpdir, "shard-1-of-1")
+        self.scrape(shard, (1, 1))
+        target = os.path.join(self.tmpdir, "main")
+        os.makedirs(target)
+        paths = scrape_shards.output_paths(target)
+        with open(paths["nutrition_csv"], mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(scraper_common.NUTRITION_HEADER)
+            writer.writerow(scraper_common.nutrition_csv_row(42, "Scrambled Eggs", {}, {}))
+
+        scrape_shards.merge_shards([shard], paths["nutrition_csv"], paths["meals_csv"], paths["cache"], store_dir=None)
+        ids = {row[1]: int(row[0]) for row in self.read_rows(paths["nutrition_csv"])}
+        self.assertEqual(ids["Scrambled Eggs"], 42)
+        # New foods are numbered after the known ones in name order
+        new_foods = sorted(name for name in ids if name != "Scrambled Eggs")
+        self.assertEqual([ids[name] for name in new_foods], list(range(43, 43 + len(new_foods))))
+
+
+if __name__ == "__main__":
+    unittest.main()
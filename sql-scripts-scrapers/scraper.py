@@ -1,13 +1,11 @@
-import time
-from selenium import webdriver
+import driver_profile
+import scraper_waits
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-# Set up your browser driver with options for maximizing the window
-options = webdriver.ChromeOptions()
-options.add_argument("--start-maximized")  # Start the browser maximized
-driver = webdriver.Chrome(options=options)
+# Set up your browser driver with the shared profile (set SCRAPER_BROWSER_PROFILE=full to watch it)
+driver = driver_profile.create_chrome()
 
 # Open the NetNutrition URL
 driver.get('https://netnutrition.cbord.com/nn-prod/vucampusdining')
@@ -54,13 +52,14 @@ try:
             all_dates_option = WebDriverWait(driver, 10).until(
                 EC.element_to_be_clickable((By.XPATH, "//a[text()='Show All Dates']"))
             )
-            all_dates_option.click()
+            # Wait for the menu list to load
+            with scraper_waits.page_update(driver):
+                all_dates_option.click()
             print("Selected 'Show All Dates'.")
         except Exception as e:
             print("Error selecting 'Show All Dates':", e)
 
         # Check for the presence of the menu panel and its content
-        time.sleep(2)  # Wait for the content to load
         try:
             menu_list = driver.find_elements(By.CLASS_NAME, "cbo_nn_menuListDiv")
             if menu_list:
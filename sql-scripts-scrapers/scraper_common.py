@@ -0,0 +1,162 @@
+import csv
+import datetime
+import os
+
+# Shared constants for the NetNutrition scrapers. Both the Selenium scraper
+# (scraper_other.py) and the HTTP engine (netnutrition_http.py) write the same
+# CSV files, so the layout lives here instead of being repeated in each script.
+
+BASE_URL = "https://netnutrition.cbord.com/nn-prod/vucampusdining"
+
+nutrition_csv_filename = "nutrition_info.csv"
+meals_csv_filename = "dining_meals_nutrition.csv"
+
+MEAL_TIMES = ["Breakfast", "Lunch", "Dinner", "Daily Offerings", "Brunch"]
+
+# Filter icons shown next to each menu item, in CSV column order
+FILTER_NAMES = [
+    "Alcohol",
+    "Coconut",
+    "Dairy",
+    "Egg",
+    "Fish",
+    "Gluten",
+    "Peanut",
+    "Pork",
+    "Sesame",
+    "Shellfish",
+    "Soy",
+    "Tree Nut",
+    "Cage Free Certified",
+    "Certified Organic",
+    "Halal",
+    "Humanely Raised & Handled",
+    "Kosher",
+    "Local",
+    "Vegan",
+    "Vegetarian"
+]
+
+# Values read off the nutrition label, in CSV column order
+NUTRITION_FIELDS = [
+    "Serving Size",
+    "Calories",
+    "Calories from Fat",
+    "Total Fat",
+    "Total Fat %",
+    "Saturated Fat",
+    "Saturated Fat %",
+    "Trans Fat",
+    "Cholesterol",
+    "Cholesterol %",
+    "Sodium",
+    "Sodium %",
+    "Potassium",
+    "Potassium %",
+    "Total Carbohydrates",
+    "Total Carbohydrates %",
+    "Dietary Fiber",
+    "Dietary Fiber %",
+    "Sugars",
+    "Protein",
+    "Protein %",
+    "Vitamin A %",
+    "Vitamin C %",
+    "Calcium %",
+    "Iron %",
+    "Vitamin D %",
+    "Ingredients"
+]
+
+# Bit for each filter in an item's filter mask, in FILTER_NAMES order
+FILTER_BITS = {name: 1 << index for index, name in enumerate(FILTER_NAMES)}
+
+NUTRITION_HEADER = ["Food ID", "Food Name"] + NUTRITION_FIELDS + FILTER_NAMES
+MEALS_HEADER = ["Food ID", "Dining Hall", "Date", "Meal", "Food Name", "Category"]
+
+
+def empty_filter_attributes():
+    """
+    Return a filter dict with every filter set to False.
+    """
+    return {name: False for name in FILTER_NAMES}
+
+
+def filter_mask(filter_attributes):
+    """
+    Pack a filter dict into one integer with a FILTER_BITS bit set for every true filter.
+    """
+    mask = 0
+    for name, value in filter_attributes.items():
+        if value and name in FILTER_BITS:
+            mask |= FILTER_BITS[name]
+    return mask
+
+
+def mask_filters(mask):
+    """
+    Unpack a filter mask back into a filter dict.
+    """
+    return {name: bool(mask & bit) for name, bit in FILTER_BITS.items()}
+
+
+def names_mask(filter_names):
+    """
+    Mask with the bits of the given filter names set. Unknown names raise KeyError.
+    """
+    mask = 0
+    for name in filter_names:
+        mask |= FILTER_BITS[name]
+    return mask
+
+
+def nutrition_csv_row(food_id, item_name, nutrition_info, filter_attributes):
+    """
+    Build a nutrition_info.csv row in header order. Missing label values are written as N/A.
+    """
+    return ([food_id, item_name]
+            + [nutrition_info.get(field, "N/A") for field in NUTRITION_FIELDS]
+            + [filter_attributes.get(name, False) for name in FILTER_NAMES])
+
+
+def meals_csv_row(food_id, hall_name, date_value, meal_time, item_name, category):
+    """
+    Build a dining_meals_nutrition.csv row in header order.
+    """
+    return [food_id, hall_name, date_value, meal_time, item_name, category]
+
+
+def meals_csv_dict(food_id, hall_name, date_value, meal_time, item_name, category):
+    """
+    Build a dining_meals_nutrition.csv row as csv.DictReader returns it, with the Food ID as a string.
+    """
+    return dict(zip(MEALS_HEADER, meals_csv_row(str(food_id), hall_name, date_value, meal_time, item_name, category)))
+
+
+def load_nutrition_cache(filename=nutrition_csv_filename):
+    """
+    Load previously scraped nutrition rows keyed by food name.
+    """
+    cache = {}
+    if os.path.exists(filename):
+        with open(filename, mode='r', newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                cache[row["Food Name"]] = row
+    return cache
+
+
+def normalize_date(date_value, today=None):
+    """
+    Turn a NetNutrition date label ('Today', '2024/11/05') into an ISO date ('2024-11-05').
+    Labels that aren't dates are returned unchanged.
+    """
+    today = today or datetime.date.today()
+    if date_value == "Today":
+        return today.isoformat()
+    if date_value == "Tomorrow":
+        return (today + datetime.timedelta(days=1)).isoformat()
+    try:
+        return datetime.datetime.strptime(date_value, "%Y/%m/%d").date().isoformat()
+    except (TypeError, ValueError):
+        return date_value
@@ -1,193 +1,317 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import ElementClickInterceptedException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
-import concurrent.futures
-import time
-import csv
+import argparse
 import os
+import time
 import threading
-
-# Cache to store previously scraped nutritional information
-nutrition_cache = {}
-
-# Load existing nutrition data into cache
-nutrition_csv_filename = "nutrition_info.csv"
-if os.path.exists(nutrition_csv_filename):
-    with open(nutrition_csv_filename, mode='r', newline='', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            nutrition_cache[row["Food Name"]] = row
-
-# Create a lock object for thread-safe CSV writing
-write_lock = threading.Lock()
+from csv_writer import BufferedCsvWriter
+import scraper_common
+import nutrition_label
+import browser_pool
+import scraper_waits
+import retry_policy
+import scrape_checkpoint
+import scrape_shards
+import menu_store
+import change_feed
+import menu_payloads
+import driver_profile
+from nutrition_cache import NutritionCache
+import scraper_trace
+from scraper_trace import tracer
+
+# Cache to store previously scraped nutritional information, seeded from the existing CSV on first use
+nutrition_csv_filename = scraper_common.nutrition_csv_filename
+meals_csv_filename = scraper_common.meals_csv_filename
+nutrition_cache = NutritionCache(seed_csv=nutrition_csv_filename)
+
+# Cached labels older than this many seconds are fetched again (None keeps them forever)
+label_ttl = None
+
+# Record of finished (hall, date, meal) menus; set up by main(), None when scraping a single hall directly
+checkpoint = None
+# When True, menus whose table matches the previous run reuse its rows instead of being scraped again
+incremental = False
+# Incremental runs open a finished date again once its menus were read from the site this many seconds ago
+menu_max_age = scrape_checkpoint.DEFAULT_MENU_MAX_AGE
+
+# (I, N) to scrape only shard I of N of the (hall, date) menus, None for all of them
+shard = None
+
+# driver_profile.LEAN or FULL; None uses the SCRAPER_BROWSER_PROFILE environment variable
+browser_profile = None
+
+# Site every browser opens; replay_benchmark.py points it at a replay_server.py URL
+base_url = scraper_common.BASE_URL
+
+# Single writer thread for the CSV output; scraping threads only queue rows
+output_writer = BufferedCsvWriter()
+
+# ChromeDriverManager().install() is resolved once per process, not once per browser
+chromedriver_path = None
+chromedriver_lock = threading.Lock()
+
+def get_chromedriver_path():
+    global chromedriver_path
+    with chromedriver_lock:
+        if chromedriver_path is None:
+            chromedriver_path = os.environ.get(driver_profile.DRIVER_PATH_ENV) or ChromeDriverManager().install()
+        return chromedriver_path
 
 def create_driver():
-    # Configure Chrome options for headless mode
-    options = Options()
-    # options.add_argument("--headless")  # Run Chrome in headless mode
-    options.add_argument("--disable-gpu")  # Disable GPU hardware acceleration
-    options.add_argument("--window-size=1920,1080")  # Set the window size to ensure everything fits correctly
-    options.add_argument("--no-sandbox")  # Bypass OS security model
-    options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
-
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    url = "https://netnutrition.cbord.com/nn-prod/vucampusdining"
-    driver.get(url)
-
-    # Handle the pop-up modal
-    try:
-        WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.ID, "cbo_nn_mobileDisclaimer"))
-        )
-        continue_button = driver.find_element(By.XPATH, '//button[@aria-label="Continue"]')
-        continue_button.click()
-        print("Pop-up closed successfully!")
-    except Exception as e:
-        print(f"An error occurred while closing the pop-up: {e}")
+    # Headless with images, fonts and analytics blocked unless browser_profile says otherwise
+    with scraper_waits.timer.stage("create_driver"):
+        driver = driver_profile.create_chrome(browser_profile, get_chromedriver_path())
+        driver.get(base_url)
+
+        # Handle the pop-up modal
+        try:
+            scraper_waits.wait_until(driver, EC.visibility_of_element_located((By.ID, "cbo_nn_mobileDisclaimer")), 10)
+            continue_button = driver.find_element(By.XPATH, '//button[@aria-label="Continue"]')
+            continue_button.click()
+            scraper_waits.wait_until(driver, EC.invisibility_of_element_located((By.ID, "cbo_nn_mobileDisclaimer")), 10)
+            print("Pop-up closed successfully!")
+        except Exception as e:
+            print(f"An error occurred while closing the pop-up: {e}")
 
-    time.sleep(0.5)  # Wait for the page to fully load
+        # Wait for the page to fully load
+        scraper_waits.wait_until(driver, scraper_waits.network_idle)
 
     return driver
 
 def wait_and_click(driver, by_locator, retries=5):
     """
-    Wait for an element to be clickable and attempt to click it with retries.
+    Wait for an element to be clickable and click it. A click intercepted by a modal closes the
+    modal and is retried with backoff; an element that never becomes clickable returns False.
     """
-    for attempt in range(retries):
-        try:
+    def click():
+        with scraper_waits.timer.waiting():
             element = WebDriverWait(driver, 15).until(
                 EC.element_to_be_clickable(by_locator)
             )
-            driver.execute_script("arguments[0].scrollIntoView(true);", element)
-            element.click()
-            return True
-        except ElementClickInterceptedException:
-            # Handle modals if they're blocking
-            try:
-                close_buttons = driver.find_elements(By.XPATH, "//button[contains(@id, 'btn_nn_nutrition_close')]")
-                for button in close_buttons:
-                    if button.is_displayed():
-                        button.click()
-                        WebDriverWait(driver, 10).until(EC.invisibility_of_element(button))
-            except Exception as e:
-                print(f"Error ensuring modal is closed: {e}")
+        driver.execute_script("arguments[0].scrollIntoView(true);", element)
+        element.click()
+        tracer.count("clicks")
 
-            time.sleep(1)  # Small delay before retrying
-            print(f"Retrying click for {by_locator}. Attempt {attempt + 1}")
-    return False
+    def close_blocking_modal(error, attempt):
+        # Handle modals if they're blocking
+        try:
+            close_buttons = driver.find_elements(By.XPATH, "//button[contains(@id, 'btn_nn_nutrition_close')]")
+            for button in close_buttons:
+                if button.is_displayed():
+                    button.click()
+                    scraper_waits.wait_until(driver, EC.invisibility_of_element(button), 10)
+            # Let whatever the blocking click triggered finish before retrying
+            scraper_waits.wait_until(driver, scraper_waits.network_idle, 10)
+        except Exception as e:
+            print(f"Error ensuring modal is closed: {e}")
+
+        print(f"Retrying click for {by_locator}. Attempt {attempt + 1}")
+
+    try:
+        retry_policy.click_policy.call(click, retry_on=(ElementClickInterceptedException,), name="click",
+                                       attempts=retries, on_retry=close_blocking_modal)
+        return True
+    except (ElementClickInterceptedException, TimeoutException, retry_policy.RetryBudgetExhausted) as e:
+        print(f"Failed to click {by_locator}: {e}")
+        return False
 
 
 def wait_for_page_transition(driver, element_to_appear, timeout=20):
     """
     Wait for a specific element to appear after a page transition.
     """
-    WebDriverWait(driver, timeout).until(
-        EC.visibility_of_element_located(element_to_appear)
-    )
-    time.sleep(1)  # Adding a slight delay for stability
+    scraper_waits.wait_until(driver, EC.visibility_of_element_located(element_to_appear), timeout)
+    scraper_waits.wait_until(driver, scraper_waits.network_idle, timeout)
 
-def scrape_meals_for_hall(hall_index, hall_name):
-    driver = create_driver()
-    csv_filename = "dining_meals_nutrition.csv"
-
-    try:
+def select_hall(driver, hall_index, hall_name):
+    """
+    Open the dining hall dropdown and select the hall at hall_index.
+    """
+    with scraper_waits.timer.stage("select_hall"):
         # Click dropdown to open dining halls list for each iteration
         if not wait_and_click(driver, (By.ID, "dropdownUnitButton")):
             print("Failed to click dining halls dropdown.")
-            return
+            return False
 
         print("Dining halls dropdown clicked!")
 
-        # Retry mechanism for refreshing the dining halls element list
-        retries = 5
-        dining_halls = []
-        for attempt in range(retries):
-            dining_halls = driver.find_elements(By.XPATH, "//a[@data-unitoid!='-1']")
-            if len(dining_halls) > 0:
-                break
-            print(f"Attempt {attempt + 1} to load dining halls failed, retrying...")
-            time.sleep(3)
-
-        if len(dining_halls) == 0:
+        # Wait for the dining halls element list to be populated
+        try:
+            dining_halls = scraper_waits.wait_until(
+                driver, lambda d: d.find_elements(By.XPATH, "//a[@data-unitoid!='-1']"), 15
+            )
+        except TimeoutException:
             print("Failed to load dining halls after retries.")
-            return
+            return False
 
-        # Click on the current dining hall
+        # Click on the current dining hall and wait for the hall to load
         hall = dining_halls[hall_index]
-        hall.click()
+        with scraper_waits.page_update(driver):
+            hall.click()
         print(f"Clicked on dining hall: {hall_name}")
         wait_for_page_transition(driver, (By.ID, "cbo_nn_HeaderSelectedUnit"))
+        return True
 
-        time.sleep(2)  # Give time for the dining hall to load properly
+def get_date_values(driver):
+    """
+    Return the data-date values offered in the date dropdown of the selected hall, or None if it can't be opened.
+    """
+    if not wait_and_click(driver, (By.ID, "dropdownDateButton")):
+        print("Failed to click date dropdown.")
+        return None
 
-        # Iterate over all available dates
-        if not wait_and_click(driver, (By.ID, "dropdownDateButton")):
-            print("Failed to click date dropdown.")
-            return
+    print("Date dropdown clicked!")
 
-        print("Date dropdown clicked!")
+    dates = driver.find_elements(By.XPATH, "//a[@data-type='DT' and @data-date!='Show All Dates']")
+    return [date.get_attribute("data-date") for date in dates]
 
-        # Retry mechanism for date selection
-        dates = driver.find_elements(By.XPATH, "//a[@data-type='DT' and @data-date!='Show All Dates']")
-        date_values = [date.get_attribute("data-date") for date in dates]
+def select_date(driver, date_value, retries=5):
+    """
+    Select a date from the date dropdown, retrying with backoff and re-raising the timeout after the last try.
+    """
+    def choose_date():
+        if not wait_and_click(driver, (By.ID, "dropdownDateButton")):
+            raise TimeoutException(f"Failed to click date dropdown for date: {date_value}")
 
-        if not date_values:
-            print(f"No dates available for dining hall: {hall_name}")
+        date_option = scraper_waits.wait_until(
+            driver, EC.visibility_of_element_located((By.XPATH, f"//a[@data-date='{date_value}']"))
+        )
+        # Wait for the date to be applied
+        with scraper_waits.page_update(driver):
+            driver.execute_script("arguments[0].click();", date_option)
+        tracer.count("clicks")
 
-        for date_value in date_values:
-            for attempt in range(retries):
-                try:
-                    if not wait_and_click(driver, (By.ID, "dropdownDateButton")):
-                        print(f"Failed to click date dropdown for date: {date_value}")
-                        continue
+    def log_retry(error, attempt):
+        print(f"Attempt {attempt + 1} to click on date {date_value} failed, retrying...")
 
-                    date_option = WebDriverWait(driver, 20).until(
-                        EC.visibility_of_element_located((By.XPATH, f"//a[@data-date='{date_value}']"))
-                    )
-                    driver.execute_script("arguments[0].click();", date_option)
-                    print(f"Selected date: {date_value}")
-                    break
-                except TimeoutException:
-                    print(f"Attempt {attempt + 1} to click on date {date_value} failed, retrying...")
-                    time.sleep(2)
-                    if attempt == retries - 1:
-                        raise
+    with scraper_waits.timer.stage("select_date"):
+        retry_policy.selection_policy.call(choose_date, retry_on=(TimeoutException,), name="select_date",
+                                           attempts=retries, on_retry=log_retry)
+        print(f"Selected date: {date_value}")
 
-            time.sleep(2)  # Wait for the date to be applied
+def scrape_meal(driver, hall_name, date_value, meal_time, csv_filename):
+    """
+    Select a meal time for the current hall and date and scrape its items. Returns False if the meal failed.
+    """
+    with tracer.span("meal", hall=hall_name, date=date_value, meal=meal_time) as span:
+        try:
+            with scraper_waits.timer.stage("select_meal"):
+                if not wait_and_click(driver, (By.ID, "dropdownMealButton")):
+                    print(f"Failed to click meal dropdown for meal: {meal_time}")
+                    span["error"] = "meal dropdown not clickable"
+                    return False
+
+                meal_option = scraper_waits.wait_until(
+                    driver, EC.element_to_be_clickable((By.XPATH, f"//a[@title='{meal_time}']"))
+                )
+                # Wait for the meal content to load
+                with scraper_waits.page_update(driver):
+                    meal_option.click()
+                tracer.count("clicks")
+                print(f"Selected {meal_time}")
+
+            # Check if there are meal items available
+            if check_meal_items(driver):
+                print(f"Meal items found for {meal_time} at {hall_name} on {date_value}")
+                expand_meal_items(driver)
+                with scraper_waits.timer.stage("read_table"):
+                    meal_items = extract_menu_table(driver)
+                signature = scrape_checkpoint.menu_signature(meal_items)
+
+                # In incremental mode an unchanged menu reuses the previous run's rows
+                previous_items = checkpoint.previous_items(hall_name, date_value, meal_time, signature) if incremental else None
+                if previous_items is not None:
+                    print(f"Menu unchanged for {meal_time} at {hall_name} on {date_value}, reusing previous rows.")
+                    span["reused"] = True
+                    span["items"] = len(previous_items)
+                    output_writer.write_rows(csv_filename, [
+                        scraper_common.meals_csv_row(food_id, hall_name, date_value, meal_time, item_name, category)
+                        for food_id, item_name, category in previous_items
+                    ])
+                    checkpoint.mark_done(hall_name, date_value, meal_time, signature, previous_items)
+                    return True
+
+                scraped_items = scrape_nutritional_info(driver, hall_name, meal_time, date_value, csv_filename, meal_items)
+                span["items"] = len(scraped_items)
+                # Only checkpoint menus where every item made it, so a resumed run retries the rest
+                if checkpoint is not None and len(scraped_items) == len(meal_items):
+                    checkpoint.mark_done(hall_name, date_value, meal_time, signature, scraped_items)
+            else:
+                print(f"No meal items available for {meal_time} at {hall_name} on {date_value}, skipping.")
+                if checkpoint is not None:
+                    checkpoint.mark_done(hall_name, date_value, meal_time, scrape_checkpoint.menu_signature([]), [])
 
-            meal_times = ["Breakfast", "Lunch", "Dinner", "Daily Offerings", "Brunch"]
+        except Exception as e:
+            print(f"Error scraping {meal_time} at {hall_name} on {date_value}: {e}")
+            span["error"] = str(e)
+            return False
+        return True
 
-            # Iterate over all meal times
-            for meal_time in meal_times:
-                try:
-                    if not wait_and_click(driver, (By.ID, "dropdownMealButton")):
-                        print(f"Failed to click meal dropdown for meal: {meal_time}")
-                        continue
+def reuse_previous_date(hall_name, date_value, csv_filename):
+    """
+    In incremental mode, carry over a date whose every meal the previous run finished, without selecting it.
+    Dates last read from the site more than menu_max_age ago are opened again, so later edits to a menu are picked
+    up; their unchanged meals still reuse the previous rows once the table is read. Returns True if the date was reused.
+    """
+    if not incremental or not checkpoint.previous_done(hall_name, date_value, scraper_common.MEAL_TIMES, menu_max_age):
+        return False
+    rows = []
+    for meal_time in scraper_common.MEAL_TIMES:
+        if checkpoint.is_done(hall_name, date_value, meal_time):
+            continue
+        rows.extend(scraper_common.meals_csv_row(food_id, hall_name, date_value, meal_time, item_name, category)
+                    for food_id, item_name, category in checkpoint.carry_over(hall_name, date_value, meal_time))
+    output_writer.write_rows(csv_filename, rows)
+    tracer.count("reused_dates")
+    print(f"Reusing the previous run's rows for {date_value} at {hall_name}.")
+    return True
 
-                    meal_option = WebDriverWait(driver, 20).until(
-                        EC.element_to_be_clickable((By.XPATH, f"//a[@title='{meal_time}']"))
-                    )
-                    meal_option.click()
-                    print(f"Selected {meal_time}")
+def scrape_meals_for_hall(hall_index, hall_name):
+    driver = create_driver()
+    csv_filename = meals_csv_filename
 
-                    time.sleep(2)  # Allow time for meal content to load
+    try:
+        with tracer.span("hall", hall=hall_name):
+            if not select_hall(driver, hall_index, hall_name):
+                return
 
-                    # Check if there are meal items available
-                    if check_meal_items(driver):
-                        print(f"Meal items found for {meal_time} at {hall_name} on {date_value}")
-                        expand_meal_items(driver)
-                        scrape_nutritional_info(driver, hall_name, meal_time, date_value, csv_filename)
-                    else:
-                        print(f"No meal items available for {meal_time} at {hall_name} on {date_value}, skipping.")
+            # Iterate over all available dates
+            date_values = get_date_values(driver)
+            if date_values is None:
+                return
 
-                except Exception as e:
-                    print(f"Error scraping {meal_time} at {hall_name} on {date_value}: {e}")
+            if not date_values:
+                print(f"No dates available for dining hall: {hall_name}")
+
+            for date_value in date_values:
+                if not scrape_shards.in_shard(shard, hall_name, date_value):
+                    continue
+                if reuse_previous_date(hall_name, date_value, csv_filename):
                     continue
+                date_key = (hall_name, date_value)
+                if not retry_policy.date_breaker.allow(date_key):
+                    print(f"Skipping {date_value} at {hall_name}: too many failures")
+                    continue
+                with tracer.span("date", date=date_value):
+                    try:
+                        select_date(driver, date_value)
+                    except (TimeoutException, retry_policy.RetryBudgetExhausted) as e:
+                        # One bad date shouldn't cost the rest of the hall
+                        print(f"Could not select {date_value} at {hall_name}: {e}")
+                        retry_policy.date_breaker.record_failure(date_key)
+                        continue
+
+                    # Iterate over all meal times
+                    for meal_time in scraper_common.MEAL_TIMES:
+                        if scrape_meal(driver, hall_name, date_value, meal_time, csv_filename):
+                            retry_policy.date_breaker.record_success(date_key)
+                        elif retry_policy.date_breaker.record_failure(date_key):
+                            print(f"Giving up on {date_value} at {hall_name}")
+                            break
 
     except Exception as e:
         print(f"Error scraping dining hall {hall_name}: {e}")
@@ -197,6 +321,67 @@ def scrape_meals_for_hall(hall_index, hall_name):
         except Exception as e:
             print(f"Error while quitting the driver: {e}")
 
+def handle_pool_job(pool, worker, job):
+    """
+    Run one pooled job. ("hall", index, name) discovers the hall's dates and queues a
+    ("meal", index, name, date, meal) job per meal time on the same worker, where the hall
+    is already selected; idle workers steal them from there.
+    """
+    driver = worker.driver
+    hall_index, hall_name = job[1], job[2]
+    date_key = (hall_name, job[3]) if job[0] == "meal" else None
+
+    # Jobs for a hall or date that keeps failing are dropped instead of burning the retry budget
+    if not retry_policy.hall_breaker.allow(hall_name) or (date_key and not retry_policy.date_breaker.allow(date_key)):
+        print(f"Skipping {job}: too many failures for {hall_name}")
+        return
+
+    # Meal jobs are spread over the pool, so the hall span covers only the hall's discovery job
+    with tracer.span("hall" if job[0] == "hall" else "job", hall=hall_name, worker=worker.index):
+        try:
+            if worker.state.get("hall") != hall_name:
+                worker.state = {}
+                if not select_hall(driver, hall_index, hall_name):
+                    raise RuntimeError(f"Could not select dining hall {hall_name}")
+                worker.state["hall"] = hall_name
+
+            if job[0] == "hall":
+                date_values = get_date_values(driver)
+                if date_values is None:
+                    raise RuntimeError(f"Could not open the date dropdown for {hall_name}")
+                if not date_values:
+                    print(f"No dates available for dining hall: {hall_name}")
+                retry_policy.hall_breaker.record_success(hall_name)
+                for date_value in date_values:
+                    if not scrape_shards.in_shard(shard, hall_name, date_value):
+                        continue
+                    # Dates the previous run finished aren't selected at all in incremental mode
+                    if reuse_previous_date(hall_name, date_value, meals_csv_filename):
+                        continue
+                    for meal_time in scraper_common.MEAL_TIMES:
+                        # Skip menus a resumed run already finished
+                        if checkpoint is not None and checkpoint.is_done(hall_name, date_value, meal_time):
+                            continue
+                        pool.submit(("meal", hall_index, hall_name, date_value, meal_time), worker.index)
+                return
+
+            date_value, meal_time = job[3], job[4]
+            if worker.state.get("date") != date_value:
+                with tracer.span("date", date=date_value):
+                    select_date(driver, date_value)
+                worker.state["date"] = date_value
+        except Exception:
+            retry_policy.hall_breaker.record_failure(hall_name)
+            if date_key:
+                retry_policy.date_breaker.record_failure(date_key)
+            raise
+
+        if scrape_meal(driver, hall_name, date_value, meal_time, meals_csv_filename):
+            retry_policy.hall_breaker.record_success(hall_name)
+            retry_policy.date_breaker.record_success(date_key)
+        else:
+            retry_policy.date_breaker.record_failure(date_key)
+
 
 def check_meal_items(driver):
     """
@@ -214,148 +399,187 @@ def expand_meal_items(driver):
     Expands the entire table holding the meal items by clicking all collapsible sections.
     """
     try:
-        item_groups = driver.find_elements(By.CLASS_NAME, "cbo_nn_itemGroupRow")
+        with scraper_waits.timer.stage("expand"):
+            item_groups = driver.find_elements(By.CLASS_NAME, "cbo_nn_itemGroupRow")
 
-        for group in item_groups:
-            try:
-                # Extract group (category) name
-                category_name = group.find_element(By.XPATH, ".//div[@role='button']").text.strip()
-
-                # Expand if it's collapsed (aria-expanded is "false")
-                if group.get_attribute("aria-expanded") == "false":
-                    group.click()
-                    time.sleep(0.5)  # Give time for items to load after expanding
-                    print(f"Expanded a meal item group: {category_name}")
-
-                # Attach category name to the elements within this group
-                meal_items = group.find_elements(By.XPATH, "following-sibling::tr[contains(@class, 'cbo_nn_itemPrimaryRow')]")
-                for item in meal_items:
-                    driver.execute_script("arguments[0].setAttribute('data-category', arguments[1]);", item, category_name)
-
-            except Exception as e:
-                print(f"Error while expanding a meal group: {e}")
-                continue
+            for group in item_groups:
+                try:
+                    # Extract group (category) name
+                    category_name = group.find_element(By.XPATH, ".//div[@role='button']").text.strip()
+
+                    # Expand if it's collapsed (aria-expanded is "false")
+                    if group.get_attribute("aria-expanded") == "false":
+                        # Wait for the group's items to load after expanding
+                        with scraper_waits.page_update(driver, timeout=10):
+                            group.click()
+                        tracer.count("clicks")
+                        scraper_waits.wait_until(driver, scraper_waits.attribute_equals(group, "aria-expanded", "true"), 5)
+                        print(f"Expanded a meal item group: {category_name}")
+
+                except Exception as e:
+                    print(f"Error while expanding a meal group: {e}")
+                    continue
 
     except Exception as e:
         print(f"Error expanding meal items: {e}")
 
-def scrape_nutritional_info(driver, hall_name, meal_time, date_value, csv_filename):
+# Returns the whole expanded menu table as structured rows in a single WebDriver round-trip
+MENU_TABLE_SCRIPT = """
+var items = [];
+var category = null;
+var rows = document.querySelectorAll("tr[class*='cbo_nn_item']");
+for (var i = 0; i < rows.length; i++) {
+    var row = rows[i];
+    if (row.classList.contains('cbo_nn_itemGroupRow')) {
+        var label = row.querySelector("div[role='button']");
+        category = label ? label.innerText.trim() : 'Unknown';
+    } else if (row.classList.contains('cbo_nn_itemPrimaryRow') || row.classList.contains('cbo_nn_itemAlternateRow')) {
+        var link = row.querySelector('a.cbo_nn_itemHover');
+        if (!link) { continue; }
+        var ids = (link.getAttribute('onclick') || '').match(/\\d+/g);
+        var filters = [];
+        var icons = link.querySelectorAll('span.pl-2 > img');
+        for (var j = 0; j < icons.length; j++) {
+            filters.push(icons[j].getAttribute('title'));
+        }
+        items.push({
+            category: category,
+            name: link.innerText.trim(),
+            itemId: ids ? ids[ids.length - 1] : null,
+            filters: filters,
+            element: link
+        });
+    }
+}
+return items;
+"""
+
+def extract_menu_table(driver):
+    """
+    Read the expanded menu table in one script call.
+    Returns a list of dicts with category, name, detail_oid, filters and the clickable element.
+    """
+    items = []
+    for row in driver.execute_script(MENU_TABLE_SCRIPT) or []:
+        filter_attributes = scraper_common.empty_filter_attributes()
+        for filter_name in row.get("filters") or []:
+            if filter_name in filter_attributes:
+                filter_attributes[filter_name] = True
+        items.append({
+            "category": row.get("category"),
+            "name": row.get("name"),
+            "detail_oid": row.get("itemId"),
+            "filters": filter_attributes,
+            "element": row.get("element")
+        })
+    return items
+
+def scrape_nutritional_info(driver, hall_name, meal_time, date_value, csv_filename, meal_items=None):
     """
     Scrape the nutritional info by clicking each meal item and fetching data from the pop-up.
+    Returns [food id, food name, category] for every item that was written.
     """
+    scraped_items = []
     try:
-        # Get all rows in the meal table (including category and item rows)
-        meal_rows = driver.find_elements(By.XPATH, ".//tr[contains(@class, 'cbo_nn_item')]")
-
-        current_category = None
+        # Read every category and item row of the meal table at once
+        if meal_items is None:
+            with scraper_waits.timer.stage("read_table"):
+                meal_items = extract_menu_table(driver)
 
-        for row in meal_rows:
-            # Check if the row is a category row (cbo_nn_itemGroupRow)
-            if 'cbo_nn_itemGroupRow' in row.get_attribute('class'):
+        for item in meal_items:
+            with tracer.span("item", item=item.get("name")) as span:
                 try:
-                    # Extract category name
-                    current_category = row.find_element(By.XPATH, ".//div[@role='button']").text.strip()
-                    print(f"New category detected: {current_category}")
-                except Exception as e:
-                    print(f"Error extracting category: {e}")
-                    current_category = "Unknown"
-            # Check if the row is an item row (cbo_nn_itemPrimaryRow or cbo_nn_itemAlternateRow)
-            elif 'cbo_nn_itemPrimaryRow' in row.get_attribute('class') or 'cbo_nn_itemAlternateRow' in row.get_attribute('class'):
-                try:
-                    # Extract item details
-                    item_name_element = row.find_element(By.XPATH, ".//a[contains(@class, 'cbo_nn_itemHover')]")
-                    item_name = item_name_element.text.strip()
-
-                    # Extract item attributes (filters)
-                    filter_attributes = {
-                        "Alcohol": False,
-                        "Coconut": False,
-                        "Dairy": False,
-                        "Egg": False,
-                        "Fish": False,
-                        "Gluten": False,
-                        "Peanut": False,
-                        "Pork": False,
-                        "Sesame": False,
-                        "Shellfish": False,
-                        "Soy": False,
-                        "Tree Nut": False,
-                        "Cage Free Certified": False,
-                        "Certified Organic": False,
-                        "Halal": False,
-                        "Humanely Raised & Handled": False,
-                        "Kosher": False,
-                        "Local": False,
-                        "Vegan": False,
-                        "Vegetarian": False
-                    }
-
-                    # Find filter icons
-                    filter_icons = item_name_element.find_elements(By.XPATH, ".//span[@class='pl-2']/img")
-                    for icon in filter_icons:
-                        filter_name = icon.get_attribute("title")
-                        if filter_name in filter_attributes:
-                            filter_attributes[filter_name] = True
+                    item_name = item["name"]
+                    filter_attributes = item["filters"]
 
                     # Check if the item is already in cache
-                    if item_name in nutrition_cache:
+                    cached = nutrition_cache.get(item_name, ttl=label_ttl)
+                    if cached is not None:
                         print(f"Using cached data for item: {item_name}")
-                        nutrition_info = nutrition_cache[item_name]
-                        food_id = nutrition_info["Food ID"]
+                        tracer.count("nutrition_cache_hits")
+                        span["cache"] = "hit"
+                        food_id = cached["Food ID"]
                     else:
+                        tracer.count("nutrition_cache_misses")
+                        span["cache"] = "miss"
                         # Click to open nutritional information
                         try:
                             print(f"Clicking on item: {item_name}")
-                            driver.execute_script("arguments[0].click();", item_name_element)
-                            time.sleep(0.5)
+                            with scraper_waits.timer.stage("open_label"):
+                                with scraper_waits.page_update(driver):
+                                    driver.execute_script("arguments[0].click();", item["element"])
+                                tracer.count("clicks")
+                                scraper_waits.wait_until(
+                                    driver, EC.visibility_of_element_located((By.CLASS_NAME, "cbo_nn_LabelHeader")), 10
+                                )
+                                tracer.count("popups_opened")
 
                             # Extract meal name and nutrition info
-                            meal_name, nutrition_info = get_nutritional_info(driver)
-
-                            # Assign a new Food ID and add the nutritional information to cache
-                            food_id = len(nutrition_cache) + 1
-                            nutrition_info["Food ID"] = food_id
-                            nutrition_cache[item_name] = nutrition_info
-
-                            # Save the nutritional information to the nutrition CSV if not already saved
-                            with write_lock:
-                                with open(nutrition_csv_filename, mode='a', newline='', encoding='utf-8') as file:
-                                    writer = csv.writer(file)
-                                    if file.tell() == 0:
-                                        # Write header if the file is empty
-                                        writer.writerow(["Food ID", "Food Name", "Serving Size", "Calories", "Calories from Fat", "Total Fat", "Total Fat %", "Saturated Fat", "Saturated Fat %", "Trans Fat", "Cholesterol", "Cholesterol %", "Sodium", "Sodium %", "Potassium", "Potassium %", "Total Carbohydrates", "Total Carbohydrates %", "Dietary Fiber", "Dietary Fiber %", "Sugars", "Protein", "Protein %", "Vitamin A %", "Vitamin C %", "Calcium %", "Iron %", "Vitamin D %", "Ingredients", "Alcohol", "Coconut", "Dairy", "Egg", "Fish", "Gluten", "Peanut", "Pork", "Sesame", "Shellfish", "Soy", "Tree Nut", "Cage Free Certified", "Certified Organic", "Halal", "Humanely Raised & Handled", "Kosher", "Local", "Vegan", "Vegetarian"])
-                                    writer.writerow([food_id, item_name] + list(nutrition_info.values()) + list(filter_attributes.values()))
+                            with scraper_waits.timer.stage("read_label"):
+                                meal_name, nutrition_info = get_nutritional_info(driver)
+
+                            # Store the label in the cache, which issues (or keeps) the item's Food ID
+                            food_id = nutrition_cache.put(item_name, nutrition_info, filter_attributes)
 
                         except Exception as e:
                             print(f"Error scraping nutrition info for {item_name}: {e}")
+                            span["error"] = str(e)
                             continue
 
-                    # Write to dining_meals_nutrition CSV
-                    with write_lock:
-                        with open(csv_filename, mode='a', newline='', encoding='utf-8') as file:
-                            writer = csv.writer(file)
-                            writer.writerow([food_id, hall_name, date_value, meal_time, item_name, current_category])
-
-                    # Close the nutrition pop-up if it's open
-                    try:
-                        close_button = driver.find_element(By.ID, "btn_nn_nutrition_close")
-                        if close_button.is_displayed():
-                            close_button.click()
-                            time.sleep(1)
-                    except Exception:
-                        pass
+                        finally:
+                            # Close the nutrition pop-up if it's open
+                            try:
+                                with scraper_waits.timer.stage("close_label"):
+                                    close_button = driver.find_element(By.ID, "btn_nn_nutrition_close")
+                                    if close_button.is_displayed():
+                                        close_button.click()
+                                        tracer.count("clicks")
+                                        scraper_waits.wait_until(driver, EC.invisibility_of_element(close_button), 10)
+                            except Exception:
+                                pass
+
+                    # Queue the row for dining_meals_nutrition CSV
+                    output_writer.write_row(csv_filename, scraper_common.meals_csv_row(food_id, hall_name, date_value, meal_time, item_name, item["category"]))
+                    scraped_items.append([food_id, item_name, item["category"]])
 
                 except Exception as e:
                     print(f"Error scraping meal item: {e}")
+                    span["error"] = str(e)
                     continue
 
     except Exception as e:
         print(f"Error while scraping meal items: {e}")
 
+    return scraped_items
+
+
+# Returns the nutrition pop-up's HTML in a single WebDriver round-trip
+LABEL_SNAPSHOT_SCRIPT = """
+var header = document.querySelector('.cbo_nn_LabelHeader');
+if (!header) { return null; }
+var container = header.closest('.modal') || document.body;
+return container.outerHTML;
+"""
 
 def get_nutritional_info(driver):
     """
     Extract meal name and nutritional info from the pop-up.
+    Reads the label HTML once and parses it in-process, falling back to per-element Selenium reads.
+    """
+    try:
+        label_html = driver.execute_script(LABEL_SNAPSHOT_SCRIPT)
+        if isinstance(label_html, str) and label_html:
+            meal_name, nutrition_info = nutrition_label.parse_nutrition_label(label_html)
+            if meal_name:
+                return meal_name, nutrition_info
+    except Exception as e:
+        print(f"Error parsing nutrition label snapshot, falling back to Selenium: {e}")
+
+    return get_nutritional_info_selenium(driver)
+
+def get_nutritional_info_selenium(driver):
+    """
+    Extract meal name and nutritional info from the pop-up with one WebDriver call per field.
     """
     try:
         meal_name = driver.find_element(By.CLASS_NAME, "cbo_nn_LabelHeader").text
@@ -450,35 +674,115 @@ def parse_nutritional_info(nutrition_info):
     """
     return nutrition_info
 
-def main():
-    start_time = time.time()
-
-    # Create initial driver to get the list of dining halls
-    driver = create_driver()
+def get_dining_hall_names(driver):
+    """
+    Read the dining hall names (excluding 'Show All Units') and close the dropdown again.
+    """
     if wait_and_click(driver, (By.ID, "dropdownUnitButton")):
         print("Dining halls dropdown clicked!")
     else:
         print("Failed to click dining halls dropdown.")
-        return
+        return None
 
-    # Get all dining halls (excluding 'Show All Units')
     dining_halls = driver.find_elements(By.XPATH, "//a[@data-unitoid!='-1']")
     dining_hall_names = [hall.get_attribute("title") for hall in dining_halls]
+    wait_and_click(driver, (By.ID, "dropdownUnitButton"))
+    return dining_hall_names
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape NetNutrition menus and nutrition labels with Selenium.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of warm browsers in the pool")
+    parser.add_argument("--refresh-days", type=float, default=None,
+                        help="Re-fetch cached nutrition labels older than this many days")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run, skipping menus it already finished")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse the previous run's rows for dates it finished (read again after --menu-max-hours) "
+                             "and for menus whose table hasn't changed")
+    parser.add_argument("--menu-max-hours", type=float, default=scrape_checkpoint.DEFAULT_MENU_MAX_AGE / 3600,
+                        help="With --incremental, open a finished date again once its menus are this many hours old")
+    parser.add_argument("--browser", choices=driver_profile.PROFILES, default=None,
+                        help="lean (headless, no images/fonts/analytics) or full (visible, loads everything)")
+    parser.add_argument("--base-url", default=scraper_common.BASE_URL,
+                        help="NetNutrition site to scrape, e.g. a replay_server.py URL")
+    parser.add_argument("--trace", default=scraper_trace.DEFAULT_TRACE_PATH,
+                        help="JSONL file the run's spans are appended to ('' to skip)")
+    parser.add_argument("--metrics", default=scraper_trace.DEFAULT_METRICS_PATH,
+                        help="Prometheus text file written at the end of the run ('' to skip)")
+    parser.add_argument("--retry-budget", type=int, default=200,
+                        help="Retries the whole run may spend on clicks and selections before failing fast")
+    parser.add_argument("--shard", type=scrape_shards.parse_shard, default=None,
+                        help="Only scrape the (hall, date) menus of shard I of N, e.g. 2/4")
+    parser.add_argument("--output-dir", default="",
+                        help="Directory for the CSV files, nutrition cache and checkpoint (default: here)")
+    args = parser.parse_args(argv)
+
+    global label_ttl, checkpoint, incremental, menu_max_age, browser_profile, base_url, shard
+    global nutrition_csv_filename, meals_csv_filename, nutrition_cache
+    browser_profile = args.browser
+    base_url = args.base_url
+    label_ttl = args.refresh_days * 86400 if args.refresh_days is not None else None
+    incremental = args.incremental
+    menu_max_age = args.menu_max_hours * 3600
+    shard = args.shard
+    paths = scrape_shards.output_paths(args.output_dir)
+    if args.output_dir:
+        nutrition_csv_filename, meals_csv_filename = paths["nutrition_csv"], paths["meals_csv"]
+        nutrition_cache = NutritionCache(paths["cache"], seed_csv=nutrition_csv_filename)
+    checkpoint = scrape_checkpoint.ScrapeCheckpoint(paths["checkpoint"])
+    checkpoint.begin(resume=args.resume)
 
-    driver.quit()
+    start_time = time.time()
+    tracer.start(args.trace, engine="selenium")
+    retry_policy.reset(args.retry_budget)
 
-    # Recreate the CSV file to start with a blank file for each new run
-    csv_filename = "dining_meals_nutrition.csv"
-    if os.path.exists(csv_filename):
-        os.remove(csv_filename)
-    with open(csv_filename, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Food ID", "Dining Hall", "Date", "Meal", "Food Name", "Category"])
+    # Start the whole pool up front and reuse one of its browsers to list the dining halls
+    pool = browser_pool.DriverPool(create_driver, size=args.workers)
+    try:
+        # Inside the try so the browsers that did start are closed if one of them fails
+        pool.warm_up()
+        dining_hall_names = get_dining_hall_names(pool.workers[0].driver)
+        if dining_hall_names is None:
+            return
+
+        # Recreate the CSV file to start with a blank file for each new run, keeping finished menus when resuming
+        output_writer.open_file(meals_csv_filename, header=scraper_common.MEALS_HEADER)
+        output_writer.write_rows(meals_csv_filename, checkpoint.completed_rows())
 
-    # Use ThreadPoolExecutor to scrape each dining hall in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-        futures = [executor.submit(scrape_meals_for_hall, i, name) for i, name in enumerate(dining_hall_names)]
-        concurrent.futures.wait(futures)
+        # One discovery job per hall; each fans out into (hall, date, meal) jobs that idle browsers steal
+        pool.run([("hall", i, name) for i, name in enumerate(dining_hall_names)], handle_pool_job)
+    finally:
+        pool.close()
+        output_writer.close()
+        checkpoint.close()
+        # Rewrite nutrition_info.csv from the cache so it has exactly one row per Food ID
+        nutrition_cache.export_csv(nutrition_csv_filename)
+        tracer.finish(args.metrics, scraper_waits.timer)
+
+    # Split the finished run into per-date, per-hall partitions; a shard's menus get there through the merge
+    if shard is None:
+        store = menu_store.MenuStore()
+        # Only meals the run finished replace the stored ones; halls and meals that failed keep their last menu,
+        # and halls whose every meal came back empty are closed that day
+        partitions = store.import_csv(meals_csv_filename,
+                                      closed=checkpoint.closed_menus(scraper_common.MEAL_TIMES),
+                                      done=checkpoint.done_menus())
+        # Rebuild the API's precomputed menu responses for the dates just scraped
+        dates = sorted({date for date, _ in partitions})
+        menu_payloads.build_payloads(store, nutrition_csv_filename, dates=dates)
+        # and log what changed since the last run for change_feed.py apply
+        change_feed.publish(nutrition_csv_filename, store, dates)
+
+    for line in pool.utilization_report():
+        print(line)
+    for line in scraper_waits.timer.report():
+        print(line)
+    for line in retry_policy.report():
+        print(line)
+
+    hit_ratio = tracer.cache_hit_ratio()
+    if hit_ratio is not None:
+        print(f"Nutrition cache hit rate: {hit_ratio:.0%}")
 
     end_time = time.time()
     total_time = end_time - start_time
@@ -486,5 +790,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
@@ -1,5 +1,10 @@
+import os
+import shutil
+import tempfile
+import time
 import unittest
 from unittest.mock import patch, MagicMock
+import scrape_checkpoint
 import scraper_other  # Import your main script, previously named scraper
 
 class TestScraperFunctions(unittest.TestCase):
@@ -11,8 +16,15 @@ class TestScraperFunctions(unittest.TestCase):
         driver = scraper_other.create_driver()
         self.assertEqual(driver, mock_driver)
     
+    @patch('scraper_other.ChromeDriverManager')
+    @patch('scraper_other.chromedriver_path', None)
+    def test_chromedriver_from_environment(self, mock_manager):
+        with patch.dict(os.environ, {scraper_other.driver_profile.DRIVER_PATH_ENV: "/opt/chromedriver"}):
+            self.assertEqual(scraper_other.get_chromedriver_path(), "/opt/chromedriver")
+        mock_manager.assert_not_called()
+
     @patch('scraper_other.WebDriverWait')
-    @patch('scraper_other.webdriver.Chrome')
+    @patch('driver_profile.webdriver.Chrome')
     def test_wait_and_click_success(self, mock_chrome, mock_webdriverwait):
         mock_driver = MagicMock()
         mock_chrome.return_value = mock_driver
@@ -21,16 +33,19 @@ class TestScraperFunctions(unittest.TestCase):
         self.assertTrue(scraper_other.wait_and_click(mock_driver, (scraper_other.By.ID, "test")))
 
     @patch('scraper_other.WebDriverWait')
-    @patch('scraper_other.webdriver.Chrome')
+    @patch('driver_profile.webdriver.Chrome')
     def test_wait_and_click_fail(self, mock_chrome, mock_webdriverwait):
         mock_driver = MagicMock()
         mock_chrome.return_value = mock_driver
         mock_webdriverwait.return_value.until.side_effect = scraper_other.TimeoutException
         self.assertFalse(scraper_other.wait_and_click(mock_driver, (scraper_other.By.ID, "test")))
 
+    # A MagicMock driver never reports the network idle, so the waits are patched out rather than timing out
+    @patch('scraper_waits.wait_until')
+    @patch('scraper_waits.page_update')
     @patch('scraper_other.create_driver')
     @patch('scraper_other.wait_and_click')
-    def test_scrape_meals_for_hall(self, mock_wait_and_click, mock_create_driver):
+    def test_scrape_meals_for_hall(self, mock_wait_and_click, mock_create_driver, mock_page_update, mock_wait_until):
         mock_driver = MagicMock()
         mock_create_driver.return_value = mock_driver
         mock_wait_and_click.return_value = True
@@ -39,15 +54,17 @@ class TestScraperFunctions(unittest.TestCase):
         mock_create_driver.assert_called_once()
         mock_wait_and_click.assert_called()
 
-    @patch('scraper_other.webdriver.Chrome')
+    @patch('driver_profile.webdriver.Chrome')
     def test_check_meal_items(self, mock_chrome):
         mock_driver = MagicMock()
         mock_chrome.return_value = mock_driver
         mock_driver.find_elements.return_value = ["item1", "item2"]
         self.assertTrue(scraper_other.check_meal_items(mock_driver))
     
-    @patch('scraper_other.webdriver.Chrome')
-    def test_expand_meal_items(self, mock_chrome):
+    @patch('scraper_waits.wait_until')
+    @patch('scraper_waits.page_update')
+    @patch('driver_profile.webdriver.Chrome')
+    def test_expand_meal_items(self, mock_chrome, mock_page_update, mock_wait_until):
         mock_driver = MagicMock()
         mock_chrome.return_value = mock_driver
         mock_group = MagicMock()
@@ -55,6 +72,99 @@ class TestScraperFunctions(unittest.TestCase):
         mock_driver.find_elements.return_value = [mock_group]
         scraper_other.expand_meal_items(mock_driver)
         mock_group.click.assert_called()
+        mock_page_update.assert_called_once_with(mock_driver, timeout=10)
+
+    def test_get_nutritional_info_uses_label_snapshot(self):
+        mock_driver = MagicMock()
+        with open("fixtures/labels/label_minimal.html", encoding="utf-8") as file:
+            mock_driver.execute_script.return_value = file.read()
+        meal_name, nutrition_info = scraper_other.get_nutritional_info(mock_driver)
+        self.assertEqual(meal_name, "Hot Tea")
+        self.assertEqual(nutrition_info["Serving Size"], "1 cup (240ml)")
+        mock_driver.execute_script.assert_called_once()
+        mock_driver.find_element.assert_not_called()
+
+    @patch('scraper_other.get_nutritional_info_selenium')
+    def test_get_nutritional_info_falls_back_to_selenium(self, mock_selenium_path):
+        mock_driver = MagicMock()
+        mock_driver.execute_script.return_value = None
+        mock_selenium_path.return_value = ("Item", {})
+        self.assertEqual(scraper_other.get_nutritional_info(mock_driver), ("Item", {}))
+        mock_selenium_path.assert_called_once_with(mock_driver)
+
+    def test_extract_menu_table(self):
+        mock_driver = MagicMock()
+        mock_element = MagicMock()
+        mock_driver.execute_script.return_value = [
+            {"category": "Sides", "name": "Yellow Rice", "itemId": "900002", "filters": ["Vegan", "Unknown"], "element": mock_element}
+        ]
+        items = scraper_other.extract_menu_table(mock_driver)
+        mock_driver.execute_script.assert_called_once_with(scraper_other.MENU_TABLE_SCRIPT)
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0]["category"], "Sides")
+        self.assertEqual(items[0]["detail_oid"], "900002")
+        self.assertIs(items[0]["element"], mock_element)
+        self.assertTrue(items[0]["filters"]["Vegan"])
+        self.assertEqual(sum(items[0]["filters"].values()), 1)
+        self.assertEqual(len(items[0]["filters"]), 20)
+
+    @patch('scraper_other.select_date')
+    @patch('scraper_other.get_date_values', return_value=["2024/11/05", "2024/11/06"])
+    @patch('scraper_other.select_hall', return_value=True)
+    @patch('scraper_other.create_driver')
+    def test_incremental_run_skips_dates_the_previous_run_finished(self, mock_create_driver, mock_select_hall,
+                                                                    mock_get_date_values, mock_select_date):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "scrape_checkpoint.jsonl")
+        previous = scrape_checkpoint.ScrapeCheckpoint(path)
+        previous.begin()
+        for meal_time in scraper_other.scraper_common.MEAL_TIMES:
+            previous.mark_done("Test Hall", "2024/11/05", meal_time, "abc", [[1, "Kale", "Sides"]])
+        previous.close()
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(path)
+        checkpoint.begin()
+        self.addCleanup(checkpoint.close)
+        mock_writer = MagicMock()
+
+        with patch.object(scraper_other, 'checkpoint', checkpoint), patch.object(scraper_other, 'incremental', True), \
+                patch.object(scraper_other, 'output_writer', mock_writer), \
+                patch('scraper_other.scrape_meal', return_value=True):
+            scraper_other.scrape_meals_for_hall(0, "Test Hall")
+
+        # Only the date the previous run didn't finish is selected
+        mock_select_date.assert_called_once_with(mock_create_driver.return_value, "2024/11/06")
+        rows = mock_writer.write_rows.call_args_list[0][0][1]
+        self.assertEqual(len(rows), len(scraper_other.scraper_common.MEAL_TIMES))
+        self.assertTrue(checkpoint.is_done("Test Hall", "2024/11/05", "Lunch"))
+
+    @patch('scraper_other.select_date')
+    @patch('scraper_other.get_date_values', return_value=["2024/11/05"])
+    @patch('scraper_other.select_hall', return_value=True)
+    @patch('scraper_other.create_driver')
+    def test_incremental_run_reopens_dates_older_than_the_menu_max_age(self, mock_create_driver, mock_select_hall,
+                                                                        mock_get_date_values, mock_select_date):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "scrape_checkpoint.jsonl")
+        previous = scrape_checkpoint.ScrapeCheckpoint(path)
+        previous.begin()
+        for meal_time in scraper_other.scraper_common.MEAL_TIMES:
+            previous.mark_done("Test Hall", "2024/11/05", meal_time, "abc", [[1, "Kale", "Sides"]],
+                               scraped_at=time.time() - 2 * scrape_checkpoint.DEFAULT_MENU_MAX_AGE)
+        previous.close()
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint(path)
+        checkpoint.begin()
+        self.addCleanup(checkpoint.close)
+
+        with patch.object(scraper_other, 'checkpoint', checkpoint), patch.object(scraper_other, 'incremental', True), \
+                patch.object(scraper_other, 'output_writer', MagicMock()), \
+                patch('scraper_other.scrape_meal', return_value=True) as mock_scrape_meal:
+            scraper_other.scrape_meals_for_hall(0, "Test Hall")
+
+        # Finished two days ago, so the date is opened again to pick up any edits to its menus
+        mock_select_date.assert_called_once_with(mock_create_driver.return_value, "2024/11/05")
+        self.assertEqual(mock_scrape_meal.call_count, len(scraper_other.scraper_common.MEAL_TIMES))
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,245 @@
+"""
+Structured traces and Prometheus-style metrics for scraper runs.
+
+Spans (hall, date, meal, item, ...) nest per thread and inherit their parent's
+attributes, so an item span knows its hall, date and meal. Each finished span
+is appended to a JSONL trace file:
+
+    {"run": "...", "span": 7, "parent": 3, "name": "item", "start": 1730812345.1, "duration": 0.84,
+     "status": "ok", "attributes": {"hall": "Rand Dining Center", "date": "Today", "meal": "Lunch",
+                                    "item": "Kale", "cache": "miss"}}
+
+Counters (cache hits and misses, clicks, retries, timeouts, popups, requests)
+are kept per hall. At the end of a run a "run" record with the totals is
+appended to the trace, and a text metrics file in the Prometheus exposition
+format is written for a textfile collector to pick up. The trace file is
+appended to across runs, so the run records show how the cache hit rate
+changes over time.
+"""
+import collections
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+DEFAULT_TRACE_PATH = "scrape_trace.jsonl"
+DEFAULT_METRICS_PATH = "scrape_metrics.prom"
+METRIC_PREFIX = "scraper_"
+
+COUNTER_HELP = {
+    "nutrition_cache_hits": "Menu items whose nutrition label came from the cache",
+    "nutrition_cache_misses": "Menu items whose nutrition label had to be fetched",
+    "clicks": "Clicks sent to the page",
+    "retries": "Clicks or selections that were retried",
+    "timeouts": "Waits that timed out",
+    "popups_opened": "Nutrition label pop-ups opened",
+    "requests": "HTTP requests sent to NetNutrition",
+    "retry_seconds": "Seconds lost to failed attempts and retry backoff",
+    "circuit_skips": "Jobs skipped because their hall or date circuit was open"
+}
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_label_value(value)}"' for name, value in labels) + "}"
+
+
+class Tracer:
+    """
+    Records spans and counters for one run at a time. Safe to use from several threads.
+    """
+
+    def __init__(self, engine="selenium"):
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.span_ids = itertools.count(1)
+        self.file = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.run_id = None
+            self.started_at = None
+            self.counters = collections.defaultdict(int)
+            self.span_seconds = collections.defaultdict(float)
+            self.span_counts = collections.defaultdict(int)
+            self.span_errors = collections.defaultdict(int)
+
+    def start(self, trace_path=DEFAULT_TRACE_PATH, engine=None):
+        """
+        Begin a run. With trace_path=None spans are only aggregated for the metrics.
+        """
+        self.reset()
+        self.engine = engine or self.engine
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        if trace_path:
+            self.file = open(trace_path, mode='a', encoding='utf-8')
+
+    def _stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def current_attributes(self):
+        stack = self._stack()
+        return stack[-1]["attributes"] if stack else {}
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """
+        Time a block as a span. Yields the span's attribute dict so the block can add results to it.
+        """
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span = {
+            "span": next(self.span_ids),
+            "parent": parent["span"] if parent else None,
+            "name": name,
+            "attributes": dict(parent["attributes"] if parent else {}, **attributes)
+        }
+        stack.append(span)
+        start_time = time.time()
+        start_counter = time.perf_counter()
+        status, error = "ok", None
+        try:
+            yield span["attributes"]
+        except BaseException as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration = time.perf_counter() - start_counter
+            stack.pop()
+            # Blocks that catch their own errors can report them by setting an "error" attribute
+            if error is None and span["attributes"].get("error"):
+                status, error = "error", span["attributes"].pop("error")
+            self._finish_span(span, start_time, duration, status, error)
+
+    def _finish_span(self, span, start_time, duration, status, error):
+        key = (span["name"], span["attributes"].get("hall", ""))
+        record = {"run": self.run_id, "span": span["span"], "parent": span["parent"], "name": span["name"],
+                  "start": round(start_time, 3), "duration": round(duration, 4), "status": status,
+                  "attributes": span["attributes"]}
+        if error:
+            record["error"] = error
+        with self.lock:
+            self.span_seconds[key] += duration
+            self.span_counts[key] += 1
+            if error:
+                self.span_errors[key] += 1
+            if self.file is not None:
+                self.file.write(json.dumps(record, default=str) + "\n")
+
+    def count(self, name, amount=1):
+        """
+        Add to a counter, labelled with the hall of the current span (if any).
+        """
+        hall = self.current_attributes().get("hall", "")
+        with self.lock:
+            self.counters[(name, hall)] += amount
+
+    def totals(self):
+        with self.lock:
+            totals = collections.defaultdict(int)
+            for (name, _), value in self.counters.items():
+                totals[name] += value
+            return dict(totals)
+
+    def cache_hit_ratio(self):
+        totals = self.totals()
+        lookups = totals.get("nutrition_cache_hits", 0) + totals.get("nutrition_cache_misses", 0)
+        return totals.get("nutrition_cache_hits", 0) / lookups if lookups else None
+
+    def metrics_lines(self, timer=None):
+        """
+        The run's counters, span timings and (optionally) scraper_waits stage times in Prometheus text format.
+        """
+        engine = ("engine", self.engine)
+        lines = []
+        with self.lock:
+            counters = dict(self.counters)
+            span_seconds = dict(self.span_seconds)
+            span_counts = dict(self.span_counts)
+            span_errors = dict(self.span_errors)
+
+        for name in sorted(set(COUNTER_HELP) | {name for name, _ in counters}):
+            metric = f"{METRIC_PREFIX}{name}_total"
+            lines.append(f"# HELP {metric} {COUNTER_HELP.get(name, name.replace('_', ' ').capitalize())}")
+            lines.append(f"# TYPE {metric} counter")
+            values = sorted((hall, value) for (counter, hall), value in counters.items() if counter == name)
+            for hall, value in values or [("", 0)]:
+                labels = [engine] + ([("hall", hall)] if hall else [])
+                lines.append(f"{metric}{_labels(labels)} {value}")
+
+        lines.append(f"# HELP {METRIC_PREFIX}span_seconds Time spent in each kind of span, per hall")
+        lines.append(f"# TYPE {METRIC_PREFIX}span_seconds summary")
+        for (name, hall), seconds in sorted(span_seconds.items()):
+            labels = [engine, ("span", name)] + ([("hall", hall)] if hall else [])
+            lines.append(f"{METRIC_PREFIX}span_seconds_sum{_labels(labels)} {seconds:.4f}")
+            lines.append(f"{METRIC_PREFIX}span_seconds_count{_labels(labels)} {span_counts[(name, hall)]}")
+        lines.append(f"# HELP {METRIC_PREFIX}span_errors_total Spans that ended with an exception")
+        lines.append(f"# TYPE {METRIC_PREFIX}span_errors_total counter")
+        for (name, hall), errors in sorted(span_errors.items()):
+            labels = [engine, ("span", name)] + ([("hall", hall)] if hall else [])
+            lines.append(f"{METRIC_PREFIX}span_errors_total{_labels(labels)} {errors}")
+
+        if timer is not None:
+            with timer.lock:
+                stages = {name: (timer.totals.get(name, 0.0), timer.waits.get(name, 0.0))
+                          for name in set(timer.totals) | set(timer.waits)}
+            lines.append(f"# HELP {METRIC_PREFIX}stage_seconds_total Wall time per scraper stage")
+            lines.append(f"# TYPE {METRIC_PREFIX}stage_seconds_total counter")
+            for name, (total, _) in sorted(stages.items()):
+                lines.append(f"{METRIC_PREFIX}stage_seconds_total{_labels([engine, ('stage', name)])} {total:.4f}")
+            lines.append(f"# HELP {METRIC_PREFIX}stage_wait_seconds_total Time per stage spent waiting on the site")
+            lines.append(f"# TYPE {METRIC_PREFIX}stage_wait_seconds_total counter")
+            for name, (_, waiting) in sorted(stages.items()):
+                lines.append(f"{METRIC_PREFIX}stage_wait_seconds_total{_labels([engine, ('stage', name)])} {waiting:.4f}")
+
+        ratio = self.cache_hit_ratio()
+        if ratio is not None:
+            lines.append(f"# HELP {METRIC_PREFIX}nutrition_cache_hit_ratio Share of label lookups served from the cache")
+            lines.append(f"# TYPE {METRIC_PREFIX}nutrition_cache_hit_ratio gauge")
+            lines.append(f"{METRIC_PREFIX}nutrition_cache_hit_ratio{_labels([engine])} {ratio:.4f}")
+        if self.started_at is not None:
+            lines.append(f"# HELP {METRIC_PREFIX}run_duration_seconds Length of the last run")
+            lines.append(f"# TYPE {METRIC_PREFIX}run_duration_seconds gauge")
+            lines.append(f"{METRIC_PREFIX}run_duration_seconds{_labels([engine])} {time.time() - self.started_at:.3f}")
+            lines.append(f"# HELP {METRIC_PREFIX}run_end_timestamp_seconds When the last run finished")
+            lines.append(f"# TYPE {METRIC_PREFIX}run_end_timestamp_seconds gauge")
+            lines.append(f"{METRIC_PREFIX}run_end_timestamp_seconds{_labels([engine])} {time.time():.0f}")
+        return lines
+
+    def write_metrics(self, path=DEFAULT_METRICS_PATH, timer=None):
+        # Write to a temporary file first so a collector never reads a half-written file
+        temp_path = path + ".tmp"
+        with open(temp_path, mode='w', encoding='utf-8') as file:
+            file.write("\n".join(self.metrics_lines(timer)) + "\n")
+        os.replace(temp_path, path)
+
+    def finish(self, metrics_path=DEFAULT_METRICS_PATH, timer=None):
+        """
+        End the run: append a run record with the totals to the trace, write the metrics file and close the trace.
+        """
+        record = {"run": self.run_id, "name": "run", "engine": self.engine, "start": round(self.started_at or 0, 3),
+                  "duration": round(time.time() - (self.started_at or time.time()), 3),
+                  "counters": self.totals(), "cache_hit_ratio": self.cache_hit_ratio()}
+        with self.lock:
+            if self.file is not None:
+                self.file.write(json.dumps(record) + "\n")
+                self.file.close()
+                self.file = None
+        if metrics_path:
+            self.write_metrics(metrics_path, timer)
+
+
+tracer = Tracer()
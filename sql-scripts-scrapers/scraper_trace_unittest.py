@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import netnutrition_http
+import replay_server
+import scraper_waits
+from scraper_trace import Tracer, tracer
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.trace_path = os.path.join(self.tmpdir, "trace.jsonl")
+        self.metrics_path = os.path.join(self.tmpdir, "metrics.prom")
+        self.tracer = Tracer()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_spans_nest_and_inherit_attributes(self):
+        self.tracer.start(self.trace_path)
+        with self.tracer.span("hall", hall="Rand"):
+            with self.tracer.span("meal", date="Today", meal="Lunch"):
+                with self.tracer.span("item", item="Kale") as span:
+                    span["cache"] = "miss"
+        self.tracer.finish(None)
+
+        item, meal, hall, run = read_jsonl(self.trace_path)
+        self.assertEqual(item["attributes"], {"hall": "Rand", "date": "Today", "meal": "Lunch", "item": "Kale", "cache": "miss"})
+        self.assertEqual(item["parent"], meal["span"])
+        self.assertEqual(meal["parent"], hall["span"])
+        self.assertIsNone(hall["parent"])
+        self.assertEqual(run["name"], "run")
+        self.assertEqual(len({record["run"] for record in (item, meal, hall, run)}), 1)
+
+    def test_errors_are_recorded(self):
+        self.tracer.start(self.trace_path)
+        with self.assertRaises(ValueError):
+            with self.tracer.span("meal", hall="Rand"):
+                raise ValueError("no menu")
+        with self.tracer.span("item", hall="Rand") as span:
+            span["error"] = "label did not open"
+        self.tracer.finish(self.metrics_path)
+
+        raised, caught = read_jsonl(self.trace_path)[:2]
+        self.assertEqual((raised["status"], raised["error"]), ("error", "ValueError: no menu"))
+        self.assertEqual((caught["status"], caught["error"]), ("error", "label did not open"))
+        self.assertNotIn("error", caught["attributes"])
+        with open(self.metrics_path, encoding='utf-8') as file:
+            self.assertIn('scraper_span_errors_total{engine="selenium",span="meal",hall="Rand"} 1', file.read())
+
+    def test_counters_are_per_hall_and_thread_safe(self):
+        self.tracer.start(None)
+
+        def work(hall):
+            with self.tracer.span("hall", hall=hall):
+                for _ in range(500):
+                    self.tracer.count("clicks")
+                self.tracer.count("nutrition_cache_hits", 3)
+                self.tracer.count("nutrition_cache_misses")
+
+        threads = [threading.Thread(target=work, args=(hall,)) for hall in ("Rand", "Kissam")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.tracer.totals()["clicks"], 1000)
+        self.assertEqual(self.tracer.cache_hit_ratio(), 0.75)
+        lines = self.tracer.metrics_lines()
+        self.assertIn('scraper_clicks_total{engine="selenium",hall="Kissam"} 500', lines)
+        self.assertIn("# TYPE scraper_clicks_total counter", lines)
+        # Counters that never moved are still exported as 0
+        self.assertIn('scraper_popups_opened_total{engine="selenium"} 0', lines)
+        self.assertIn('scraper_nutrition_cache_hit_ratio{engine="selenium"} 0.7500', lines)
+
+    def test_stage_times_are_exported(self):
+        timer = scraper_waits.StageTimer()
+        with timer.stage("open_label"):
+            pass
+        self.tracer.start(None)
+        lines = self.tracer.metrics_lines(timer)
+        self.assertTrue(any(line.startswith('scraper_stage_seconds_total{engine="selenium",stage="open_label"}')
+                            for line in lines))
+
+    def test_label_values_are_escaped(self):
+        self.tracer.start(None)
+        with self.tracer.span("hall", hall='Suzie\'s "Cafe"'):
+            self.tracer.count("clicks")
+        self.assertIn('scraper_clicks_total{engine="selenium",hall="Suzie\'s \\"Cafe\\""} 1', self.tracer.metrics_lines())
+
+
+class TestHttpScraperTrace(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.base_url = replay_server.start_replay_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_scraper(self, trace_path, metrics_path):
+        tracer.start(trace_path, engine="http")
+        netnutrition_http.HttpScraper(self.base_url, os.path.join(self.tmpdir, "nutrition_info.csv"),
+                                      os.path.join(self.tmpdir, "dining_meals_nutrition.csv"), pool_size=2,
+                                      cache_path=os.path.join(self.tmpdir, "nutrition_cache.db")).run()
+        tracer.finish(metrics_path)
+
+    def test_second_run_hits_the_cache(self):
+        trace_path = os.path.join(self.tmpdir, "trace.jsonl")
+        metrics_path = os.path.join(self.tmpdir, "metrics.prom")
+        self.run_scraper(trace_path, metrics_path)
+        self.run_scraper(trace_path, metrics_path)
+
+        records = read_jsonl(trace_path)
+        runs = [record for record in records if record["name"] == "run"]
+        self.assertEqual(len(runs), 2)
+        self.assertEqual(runs[1]["cache_hit_ratio"], 1.0)
+        self.assertLess(runs[0]["cache_hit_ratio"], 1.0)
+        self.assertLess(runs[1]["counters"]["requests"], runs[0]["counters"]["requests"])
+
+        items = [record for record in records if record["name"] == "item" and record["run"] == runs[0]["run"]]
+        self.assertEqual(len(items), 7)
+        self.assertTrue(all(set(item["attributes"]) >= {"hall", "date", "meal", "item", "cache"} for item in items))
+        with open(metrics_path, encoding='utf-8') as file:
+            metrics = file.read()
+        self.assertIn('scraper_nutrition_cache_hits_total{engine="http",hall="Rand Dining Center"}', metrics)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Condition-based waits for the Selenium scrapers, plus a per-stage timing report.
+
+Instead of sleeping a fixed time after every click, the scrapers wait for a
+specific signal: the AJAX request the click triggered has finished, an element
+became visible/invisible, or an attribute changed. Every wait is charged to the
+stage the calling thread is in, so the report shows how much wall time each
+stage spent waiting on the site versus doing useful work.
+"""
+import collections
+import contextlib
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+import scraper_trace
+
+POLL_FREQUENCY = 0.1
+
+# Installs (once per page load) a counter of jQuery AJAX requests and returns how many have started.
+# Returns -1 when the page has no jQuery, in which case only document.readyState is used.
+REQUEST_COUNT_SCRIPT = """
+if (!window.jQuery) { return -1; }
+if (!window.__nnRequestWatch) {
+    window.__nnRequestWatch = {started: 0};
+    jQuery(document).ajaxSend(function () { window.__nnRequestWatch.started++; });
+}
+return window.__nnRequestWatch.started;
+"""
+
+NETWORK_IDLE_SCRIPT = """
+return document.readyState === 'complete' && (!window.jQuery || jQuery.active === 0);
+"""
+
+
+class StageTimer:
+    """
+    Accumulates wall time and waiting time per named stage. Stages are tracked per
+    thread, so waits from concurrent workers are charged to the right stage.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.totals = collections.defaultdict(float)
+        self.waits = collections.defaultdict(float)
+        self.counts = collections.defaultdict(int)
+
+    def current_stage(self):
+        stack = getattr(self.local, "stack", None)
+        return stack[-1] if stack else "other"
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        self.local.stack.append(name)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.local.stack.pop()
+            with self.lock:
+                self.totals[name] += elapsed
+                self.counts[name] += 1
+
+    @contextlib.contextmanager
+    def waiting(self):
+        name = self.current_stage()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            with self.lock:
+                self.waits[name] += elapsed
+
+    def reset(self):
+        with self.lock:
+            self.totals.clear()
+            self.waits.clear()
+            self.counts.clear()
+
+    def report(self):
+        """
+        Return report lines: per stage count, wall time, time spent waiting and time spent working.
+        Nested stages are charged to the innermost one, so a parent stage's work includes its children.
+        """
+        with self.lock:
+            names = sorted(set(self.totals) | set(self.waits), key=lambda name: -self.totals.get(name, 0.0))
+            lines = [f"{'Stage':<16}{'Count':>8}{'Wall (s)':>12}{'Waiting (s)':>14}{'Working (s)':>14}"]
+            for name in names:
+                total = self.totals.get(name, 0.0)
+                waiting = self.waits.get(name, 0.0)
+                lines.append(f"{name:<16}{self.counts.get(name, 0):>8}{total:>12.2f}{waiting:>14.2f}"
+                             f"{max(total - waiting, 0.0):>14.2f}")
+            return lines
+
+
+timer = StageTimer()
+
+
+def wait_until(driver, condition, timeout=20):
+    """
+    WebDriverWait(...).until(condition), charged to the current stage as waiting time. Timeouts are counted.
+    """
+    with timer.waiting():
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+        except TimeoutException:
+            scraper_trace.tracer.count("timeouts")
+            raise
+
+
+def requests_started(driver):
+    count = driver.execute_script(REQUEST_COUNT_SCRIPT)
+    return count if isinstance(count, int) else -1
+
+
+def network_idle(driver):
+    return driver.execute_script(NETWORK_IDLE_SCRIPT) is True
+
+
+@contextlib.contextmanager
+def page_update(driver, timeout=20, start_grace=1):
+    """
+    Wrap an action that makes the page fetch new content. After the action, wait for the
+    request it triggered to start (up to start_grace seconds) and for the network to go idle.
+    """
+    before = requests_started(driver)
+    yield
+    with timer.waiting():
+        if before >= 0:
+            try:
+                WebDriverWait(driver, start_grace, poll_frequency=POLL_FREQUENCY).until(
+                    lambda d: requests_started(d) > before
+                )
+            except TimeoutException:
+                pass  # The action was handled client-side without a request
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(network_idle)
+        except TimeoutException:
+            scraper_trace.tracer.count("timeouts")
+            raise
+
+
+def attribute_equals(element, attribute, value):
+    """
+    Expected condition: element's attribute has the given value.
+    """
+    return lambda driver: element.get_attribute(attribute) == value
@@ -0,0 +1,67 @@
+import time
+import unittest
+
+import scraper_waits
+
+
+class FakeDriver:
+    """
+    Answers the request-count and network-idle scripts like a page whose click starts one request.
+    """
+
+    def __init__(self, request_time=0.2):
+        self.started = 0
+        self.finish_at = 0.0
+        self.request_time = request_time
+
+    def click(self):
+        self.started += 1
+        self.finish_at = time.time() + self.request_time
+
+    def execute_script(self, script, *args):
+        if script == scraper_waits.REQUEST_COUNT_SCRIPT:
+            return self.started
+        if script == scraper_waits.NETWORK_IDLE_SCRIPT:
+            return time.time() >= self.finish_at
+        return None
+
+
+class TestPageUpdate(unittest.TestCase):
+
+    def setUp(self):
+        scraper_waits.timer.reset()
+
+    def test_waits_for_triggered_request_to_finish(self):
+        driver = FakeDriver(request_time=0.3)
+        with scraper_waits.timer.stage("select_meal"):
+            with scraper_waits.page_update(driver):
+                driver.click()
+        self.assertGreaterEqual(time.time(), driver.finish_at)
+        self.assertGreater(scraper_waits.timer.waits["select_meal"], 0.2)
+
+    def test_client_side_action_only_waits_for_grace_period(self):
+        driver = FakeDriver()
+        start_time = time.time()
+        with scraper_waits.page_update(driver, start_grace=0.3):
+            pass
+        self.assertLess(time.time() - start_time, 1.0)
+
+
+class TestStageTimer(unittest.TestCase):
+
+    def test_report_splits_waiting_and_working(self):
+        timer = scraper_waits.StageTimer()
+        with timer.stage("open_label"):
+            with timer.waiting():
+                time.sleep(0.05)
+            time.sleep(0.02)
+        lines = timer.report()
+        self.assertEqual(len(lines), 2)
+        name, count, total, waiting, working = lines[1].split()
+        self.assertEqual((name, count), ("open_label", "1"))
+        self.assertAlmostEqual(float(total), float(waiting) + float(working), places=1)
+        self.assertGreater(float(waiting), float(working))
+
+
+if __name__ == '__main__':
+    unittest.main()